@@ -59,6 +59,12 @@ def translate_text(text, lang_code):
         return f"Translation error: {e}"
 
 # --- Gemini Response ---
+# Replies are cached for a day across sessions, keyed on the question with
+# whitespace collapsed, so repeated questions do not call Gemini again
+def canonical_question(user_query):
+    return " ".join(user_query.split())
+
+@st.cache_data(ttl=86400, show_spinner=False)
 def generate_response(user_query):
     prompt = f"""
 You are AgriBot, an expert AI assistant in agriculture.
@@ -99,7 +105,7 @@ if user_input:
     st.session_state.chat_history.append(("user", user_input))
 
     with st.spinner("AgriBot is thinking..."):
-        reply = generate_response(user_input)
+        reply = generate_response(canonical_question(user_input))
         translated_reply = translate_text(reply, target_lang)
         st.session_state.chat_history.append(("bot", translated_reply))
 
@@ -5,6 +5,7 @@ Provides crop data, calculations, and helper functions
 """
 
 import math
+import numpy as np
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple, Union
 import json
@@ -429,61 +430,169 @@ def recommend_crops(
     Returns:
         List of recommended crops with suitability scores
     """
-    recommendations = []
+    return recommend_crops_batch([{
+        "soil_type": soil_type,
+        "ph": ph,
+        "nitrogen": nitrogen,
+        "phosphorus": phosphorus,
+        "potassium": potassium,
+        "temperature": temperature,
+        "humidity": humidity,
+        "rainfall_mm": rainfall_mm,
+        "season": season
+    }])[0]
+
+
+# Factor labels by points awarded, per scoring factor
+_FACTOR_STATUS = {
+    "pH": {25: "optimal", 15: "acceptable", 0: "not_suitable"},
+    "temperature": {25: "optimal", 15: "acceptable", 0: "not_suitable"},
+    "water": {25: "optimal", 15: "acceptable", 5: "irrigation_needed"},
+    "season": {25: "optimal", 15: "not_specified", 0: "off_season"},
+}
+
+_crop_matrix = None
+
+
+def compile_crop_matrix() -> Dict:
+    """
+    Precompile CROP_DATABASE into NumPy arrays for vectorized scoring.
     
-    for crop_id, crop in CROP_DATABASE.items():
-        score = 0
-        factors = []
-        
-        # pH compatibility (0-25 points)
-        ph_min, ph_max = crop["optimal_ph"]
-        if ph_min <= ph <= ph_max:
-            score += 25
-            factors.append({"factor": "pH", "status": "optimal", "score": 25})
-        elif ph_min - 0.5 <= ph <= ph_max + 0.5:
-            score += 15
-            factors.append({"factor": "pH", "status": "acceptable", "score": 15})
-        else:
-            factors.append({"factor": "pH", "status": "not_suitable", "score": 0})
-        
-        # Temperature compatibility (0-25 points)
-        temp_min, temp_max = crop["optimal_temperature"]
-        if temp_min <= temperature <= temp_max:
-            score += 25
-            factors.append({"factor": "temperature", "status": "optimal", "score": 25})
-        elif temp_min - 5 <= temperature <= temp_max + 5:
-            score += 15
-            factors.append({"factor": "temperature", "status": "acceptable", "score": 15})
-        else:
-            factors.append({"factor": "temperature", "status": "not_suitable", "score": 0})
-        
-        # Water requirement compatibility (0-25 points)
-        water_min, water_max = crop["water_requirement_mm"]
-        if water_min <= rainfall_mm <= water_max:
-            score += 25
-            factors.append({"factor": "water", "status": "optimal", "score": 25})
-        elif water_min * 0.7 <= rainfall_mm <= water_max * 1.3:
-            score += 15
-            factors.append({"factor": "water", "status": "acceptable", "score": 15})
-        else:
-            score += 5
-            factors.append({"factor": "water", "status": "irrigation_needed", "score": 5})
-        
-        # Season compatibility (0-25 points)
-        if season:
-            if season.lower() in crop["growing_season"]:
-                score += 25
-                factors.append({"factor": "season", "status": "optimal", "score": 25})
-            else:
-                factors.append({"factor": "season", "status": "off_season", "score": 0})
-        else:
-            score += 15  # Partial score if season not specified
-            factors.append({"factor": "season", "status": "not_specified", "score": 15})
-        
-        # Calculate suitability percentage
-        suitability = (score / 100) * 100
-        
-        if suitability >= 40:  # Only recommend if at least 40% suitable
+    Call again after modifying CROP_DATABASE at runtime.
+    
+    Returns:
+        Dict of crop ids, range arrays and per-crop season bitmasks
+    """
+    global _crop_matrix
+    
+    crop_ids = list(CROP_DATABASE)
+    seasons = sorted({s for crop in CROP_DATABASE.values() for s in crop["growing_season"]})
+    season_bits = {season: 1 << i for i, season in enumerate(seasons)}
+    
+    def ranges(key):
+        return np.array([CROP_DATABASE[c][key] for c in crop_ids], dtype=np.float64).reshape(-1, 2)
+    
+    ph = ranges("optimal_ph")
+    temperature = ranges("optimal_temperature")
+    water = ranges("water_requirement_mm")
+    
+    _crop_matrix = {
+        "crop_ids": crop_ids,
+        "ph_min": ph[:, 0], "ph_max": ph[:, 1],
+        "temp_min": temperature[:, 0], "temp_max": temperature[:, 1],
+        "water_min": water[:, 0], "water_max": water[:, 1],
+        "season_bits": season_bits,
+        "season_mask": np.array([
+            sum(season_bits[s] for s in set(CROP_DATABASE[c]["growing_season"])) for c in crop_ids
+        ], dtype=np.int64)
+    }
+    return _crop_matrix
+
+
+def score_crops_batch(
+    ph,
+    temperature,
+    rainfall_mm,
+    seasons: Optional[List[Optional[str]]] = None
+) -> Dict:
+    """
+    Score M fields against every crop in one vectorized pass
+    
+    Args:
+        ph: Array-like of M soil pH values
+        temperature: Array-like of M average temperatures (Celsius)
+        rainfall_mm: Array-like of M annual rainfall values
+        seasons: Optional list of M seasons (None entries = not specified)
+    
+    Returns:
+        Dict with crop_ids and (M x N) arrays: total score plus the points
+        awarded for pH, temperature, water and season
+    """
+    matrix = _crop_matrix or compile_crop_matrix()
+    
+    ph = np.asarray(ph, dtype=np.float64)[:, None]
+    temperature = np.asarray(temperature, dtype=np.float64)[:, None]
+    rainfall = np.asarray(rainfall_mm, dtype=np.float64)[:, None]
+    
+    def banded(value, low, high, low_margin, high_margin, inside, near, outside):
+        optimal = (low <= value) & (value <= high)
+        acceptable = (low_margin <= value) & (value <= high_margin)
+        return np.where(optimal, inside, np.where(acceptable, near, outside))
+    
+    ph_points = banded(ph, matrix["ph_min"], matrix["ph_max"],
+                       matrix["ph_min"] - 0.5, matrix["ph_max"] + 0.5, 25, 15, 0)
+    temp_points = banded(temperature, matrix["temp_min"], matrix["temp_max"],
+                         matrix["temp_min"] - 5, matrix["temp_max"] + 5, 25, 15, 0)
+    water_points = banded(rainfall, matrix["water_min"], matrix["water_max"],
+                          matrix["water_min"] * 0.7, matrix["water_max"] * 1.3, 25, 15, 5)
+    
+    if seasons is None:
+        seasons = [None] * len(ph)
+    specified = np.array([bool(s) for s in seasons])[:, None]
+    field_bits = np.array([
+        matrix["season_bits"].get(s.lower(), 0) if s else 0 for s in seasons
+    ], dtype=np.int64)[:, None]
+    in_season = (field_bits & matrix["season_mask"]) != 0
+    season_points = np.where(specified, np.where(in_season, 25, 0), 15)
+    
+    return {
+        "crop_ids": matrix["crop_ids"],
+        "score": ph_points + temp_points + water_points + season_points,
+        "pH": ph_points,
+        "temperature": temp_points,
+        "water": water_points,
+        "season": season_points
+    }
+
+
+def recommend_crops_batch(fields: List[Dict], top_k: int = 10) -> List[List[Dict]]:
+    """
+    Recommend crops for many fields at once
+    
+    Args:
+        fields: List of dicts with the recommend_crops arguments
+            (ph, temperature, rainfall_mm, optional season; other keys ignored)
+        top_k: Number of recommendations per field
+    
+    Returns:
+        One recommend_crops-style list per field, in input order
+    """
+    if not fields:
+        return []
+    
+    scored = score_crops_batch(
+        [f["ph"] for f in fields],
+        [f["temperature"] for f in fields],
+        [f["rainfall_mm"] for f in fields],
+        [f.get("season") for f in fields]
+    )
+    crop_ids = scored["crop_ids"]
+    suitability_scores = scored["score"]
+    
+    # Stable descending order keeps CROP_DATABASE order among ties
+    order = np.argsort(-suitability_scores, axis=1, kind="stable")[:, :top_k]
+    
+    # Gather the top-k columns once and hand plain lists to the result loop
+    top_scores = np.take_along_axis(suitability_scores, order, axis=1).tolist()
+    top_points = [
+        (factor, np.take_along_axis(scored[factor], order, axis=1).tolist())
+        for factor in ("pH", "temperature", "water", "season")
+    ]
+    order = order.tolist()
+    
+    results = []
+    for row, columns in enumerate(order):
+        recommendations = []
+        for rank, col in enumerate(columns):
+            suitability = top_scores[row][rank]
+            if suitability < 40:  # Only recommend if at least 40% suitable
+                break
+            crop_id = crop_ids[col]
+            crop = CROP_DATABASE[crop_id]
+            factors = []
+            for factor, points in top_points:
+                score = points[row][rank]
+                factors.append({"factor": factor, "status": _FACTOR_STATUS[factor][score], "score": score})
             recommendations.append({
                 "crop_id": crop_id,
                 "crop_name": crop["name"],
@@ -496,11 +605,9 @@ def recommend_crops(
                 "common_diseases": crop["common_diseases"][:3],
                 "nutrients_required": crop["nutrients_required"]
             })
+        results.append(recommendations)
     
-    # Sort by suitability score
-    recommendations.sort(key=lambda x: x["suitability_score"], reverse=True)
-    
-    return recommendations[:10]  # Return top 10 recommendations
+    return results
 
 
 # ============================================================
@@ -3,7 +3,6 @@ import google.generativeai as genai
 import traceback
 import os
 import re
-import hashlib
 import json
 from flask_cors import CORS
 from dotenv import load_dotenv
@@ -19,6 +18,9 @@ from crop_recommendation.routes import crop_bp
 from spatial_analytics.routes import spatial_bp
 from backend.extensions.cache import cache
 from backend.monitoring.routes import health_bp
+from backend.monitoring import metrics
+from backend.services.model_registry import ModelRegistry
+from backend.services.llm_gateway import LLMGateway, LLMGatewayError, canonical_json
 from backend.api import register_api
 from backend.config import config
 from backend.schemas.loan_schema import LoanRequestSchema
@@ -70,6 +72,14 @@ celery = make_celery(app)
 # Initialize Audit Middleware
 audit_mw = AuditMiddleware(app)
 
+# Per-endpoint request metrics for /metrics
+metrics.init_app(app)
+
+# Preload ML models under ML_MODEL_LOAD_POLICY='preload' (with gunicorn --preload
+# this runs in the master, so forked workers share the loaded pages)
+with app.app_context():
+    ModelRegistry.warm()
+
 # Import models after db initialization
 from backend.models import User
 
@@ -108,9 +118,8 @@ with app.app_context():
     db.create_all()
 
 # Initialize Gemini API
-# Configure Gemini Client
+# Configure Gemini Client (loan analysis goes through the LLM gateway)
 genai.configure(api_key=app.config['GEMINI_API_KEY'])
-model = genai.GenerativeModel(app.config['GEMINI_MODEL_ID'])
 
 
 
@@ -154,6 +163,12 @@ def get_task_status(task_id):
             'status': 'processing',
             'message': 'Task is currently being processed'
         }
+    elif task.state == 'PROGRESS':
+        response = {
+            'status': 'processing',
+            'progress': (task.info or {}).get('progress'),
+            'message': (task.info or {}).get('message') or 'Task is currently being processed'
+        }
     elif task.state == 'SUCCESS':
         response = {
             'status': 'completed',
@@ -284,7 +299,7 @@ You will focus only on loan schemes and eligibility criteria followed by:
 5. NABARD & government schemes
 Do not suggest generic or international financing options.
 
-JSON Data = {json_data}
+JSON Data = {canonical_json(json_data)}
 
 IMPORTANT: You must provide your entire response in {target_language}.
 
@@ -305,37 +320,23 @@ Do not use "\\n" for newlines. Instead, structure properly.
 Do not add assumptions that are not supported by the data provided.
 """
 
-        # Create a cache key based on the prompt
-        cache_key = f"gemini_loan_{hashlib.md5(prompt.encode()).hexdigest()}"
-        cached_response = cache.get(cache_key)
-        
-        if cached_response:
-            logger.info("Serving loan processing from cache")
-            return jsonify({
-                "status": "success",
-                "message": "Loan processed successfully (cached)",
-                "result": cached_response
-            }), 200
-
-        response = model.generate_content(prompt)
-        reply = response.text
-
-        
-        if not response.candidates:
+        # Equivalent applications share one cached, coalesced Gemini call
+        try:
+            reply = LLMGateway.generate('loan_eligibility', prompt, model_id=app.config['GEMINI_MODEL_ID'])
+        except LLMGatewayError as e:
+            logger.error("Loan processing LLM call failed: %s", e)
             return jsonify({
                 "status": "error",
                 "message": "No response generated from Gemini API"
-          }), 500
+            }), 500
+
+        if reply.cached:
+            logger.info("Serving loan processing from cache")
 
-        reply = response.candidates[0].content.parts[0].text
-        
-        # Cache the result for 24 hours (86400 seconds)
-        cache.set(cache_key, reply, timeout=86400)
-        
         return jsonify({
             "status": "success",
-            "message": "Loan processed successfully",
-            "result": reply
+            "message": "Loan processed successfully (cached)" if reply.cached else "Loan processed successfully",
+            "result": reply.text
         }), 200
 
     except Exception:
@@ -453,6 +454,12 @@ def get_task_status_public(task_id):
                 'status': 'processing',
                 'message': 'Task is being processed'
             }
+        elif task.state == 'PROGRESS':
+            response = {
+                'status': 'processing',
+                'progress': (task.info or {}).get('progress'),
+                'message': (task.info or {}).get('message') or 'Task is being processed'
+            }
         elif task.state == 'SUCCESS':
             response = {
                 'status': 'completed',
@@ -479,6 +486,31 @@ def get_task_status_public(task_id):
         }), 500
 
 
+# ==================== LEDGER MAINTENANCE COMMANDS ====================
+
+@app.cli.command('ledger-rebuild-checkpoints')
+def ledger_rebuild_checkpoints():
+    """Recompute ledger balance checkpoints from raw entries."""
+    from backend.services.ledger_service import LedgerService
+    result = LedgerService.rebuild_balance_checkpoints()
+    print(f"Rebuilt {result['checkpoints_written']} checkpoints "
+          f"across {result['accounts_rebuilt']} accounts")
+
+
+@app.cli.command('ledger-verify-checkpoints')
+def ledger_verify_checkpoints():
+    """Verify ledger balance checkpoints against raw entries."""
+    from backend.services.ledger_service import LedgerService
+    result = LedgerService.verify_balance_checkpoints()
+    for mismatch in result['mismatches']:
+        print(f"Account {mismatch['account_id']} @ {mismatch['checkpoint_date']}: "
+              f"expected {mismatch['expected']}, stored {mismatch['stored']}")
+    print(f"Checked {result['checkpoints_checked']} checkpoints across "
+          f"{result['accounts_checked']} accounts: {result['mismatch_count']} mismatches")
+    if not result['is_consistent']:
+        raise SystemExit(1)
+
+
 # Serve HTML pages
 @app.route('/')
 def index():
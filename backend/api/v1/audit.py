@@ -1,5 +1,6 @@
 from flask import Blueprint, jsonify, request
 from backend.services.audit_service import AuditService
+from backend.services.audit_pipeline import AuditWriter
 from auth_utils import token_required, roles_required
 
 audit_bp = Blueprint('audit_bp', __name__, url_prefix='/audit')
@@ -66,6 +67,7 @@ def get_audit_stats():
             'total_actions_24h': total_actions,
             'threats_detected_24h': threats_detected,
             'active_users': active_users,
-            'risk_distribution': {level: count for level, count in categories}
+            'risk_distribution': {level: count for level, count in categories},
+            'writer': AuditWriter.stats()
         }
     })
@@ -1,8 +1,9 @@
 from flask import Blueprint, request, jsonify
 from backend.services.forum_service import forum_service
 from backend.services.ai_moderator import ai_moderator
+from backend.services.moderation_pipeline import ModerationPipeline
 from backend.models import ForumCategory
-from auth_utils import token_required
+from auth_utils import token_required, roles_required
 from backend.utils.logger import logger
 from backend.middleware.audit import audit_request
 from backend.services.audit_service import AuditService
@@ -270,11 +271,12 @@ def ai_search():
     try:
         query = request.args.get('q', '')
         limit = request.args.get('limit', 5, type=int)
+        rerank = request.args.get('rerank', 'true').lower() != 'false'
         
         if not query:
             return jsonify({'status': 'error', 'message': 'Query parameter q is required'}), 400
         
-        results = ai_moderator.search_knowledge_base(query, limit=min(limit, 10))
+        results = ai_moderator.search_knowledge_base(query, limit=min(limit, 10), rerank=rerank)
         
         return jsonify({
             'status': 'success',
@@ -286,6 +288,14 @@ def ai_search():
         return jsonify({'status': 'error', 'message': str(e)}), 500
 
 
+@forum_bp.route('/forum/moderation/stats', methods=['GET'])
+@token_required
+@roles_required('admin')
+def moderation_stats():
+    """Moderation pipeline throughput and LLM calls saved"""
+    return jsonify({'status': 'success', 'data': ModerationPipeline.stats()}), 200
+
+
 @forum_bp.route('/forum/flag', methods=['POST'])
 @token_required
 @audit_request("FLAG_FORUM_CONTENT")
@@ -1,7 +1,7 @@
 from flask import Blueprint, request, jsonify, current_app
-import google.generativeai as genai
 from backend.utils.validation import sanitize_input, validate_input
 from backend.services.audit_service import AuditService
+from backend.services.llm_gateway import LLMGateway, LLMGatewayError, canonical_json
 
 from auth_utils import token_required, roles_required
 
@@ -28,32 +28,23 @@ def process_loan():
                 if isinstance(value, str):
                     json_data[key] = sanitize_input(value)
         
-        API_KEY = current_app.config.get('GEMINI_API_KEY')
-        if not API_KEY:
-            return jsonify({
-                "status": "error",
-                "message": "API key not configured"
-            }), 500
-        
-        genai.configure(api_key=API_KEY)
-        model = genai.GenerativeModel(current_app.config.get('GEMINI_MODEL_ID', 'gemini-2.5-flash'))
-        
         prompt = f"""
 You are a financial loan eligibility advisor specializing in agricultural loans for farmers in India.
-JSON Data = {json_data}
+JSON Data = {canonical_json(json_data)}
 Analyze the farmer's provided details and assess their loan eligibility.
 Respond in a structured format with labeled sections: Loan Type, Eligibility Status, Loan Range, Improvements, Schemes.
 """
         
-        response = model.generate_content(prompt)
-        
-        if not response.candidates:
+        try:
+            reply = LLMGateway.generate_text(
+                'loan_eligibility', prompt,
+                model_id=current_app.config.get('GEMINI_MODEL_ID', 'gemini-2.5-flash')
+            )
+        except LLMGatewayError as e:
             return jsonify({
                 "status": "error",
-                "message": "No response generated from Gemini API"
+                "message": f"No response generated from Gemini API: {e}"
             }), 500
-
-        reply = response.candidates[0].content.parts[0].text
         
         AuditService.log_action(
             action="LOAN_ELIGIBILITY_CHECK",
@@ -118,6 +118,38 @@ def ingest_gps():
     return jsonify({'status': 'success', 'data': result}), 200
 
 
+# ─── 4b. Ingest GPS Telemetry Batch ───────────────────────────────────────────
+@smart_freight_bp.route('/gps/batch', methods=['POST'])
+def ingest_gps_batch():
+    """
+    IoT gateway endpoint for arrays of GPS pings.
+    Pings are buffered for bulk insert; geo-fences are evaluated for the
+    whole batch and escrow release is triggered autonomously.
+    Required: pings (list of {route_id, vehicle_id, lat, lng})
+    Optional per ping: speed, heading, fuel_price, recorded_at
+    """
+    data = request.get_json()
+    pings = data.get('pings') if isinstance(data, dict) else data
+    if not isinstance(pings, list) or not pings:
+        return jsonify({'status': 'error', 'message': 'pings array required.'}), 400
+
+    required = ['route_id', 'vehicle_id', 'lat', 'lng']
+    invalid = [i for i, ping in enumerate(pings)
+               if not isinstance(ping, dict) or not all(k in ping for k in required)]
+    if invalid:
+        return jsonify({
+            'status': 'error',
+            'message': f'Pings missing route_id, vehicle_id, lat or lng at positions {invalid[:20]}'
+        }), 400
+
+    try:
+        result = LogisticsOrchestrator.ingest_gps_batch(pings)
+    except (TypeError, ValueError) as e:
+        return jsonify({'status': 'error', 'message': f'Invalid ping payload: {e}'}), 400
+
+    return jsonify({'status': 'success', 'data': result}), 200
+
+
 # ─── 5. Log Customs Arrival ───────────────────────────────────────────────────
 @smart_freight_bp.route('/customs/arrive', methods=['POST'])
 @token_required
@@ -1,7 +1,5 @@
 from flask import Blueprint, request, jsonify
 from backend.services.market_service import MarketIntelligenceService
-from backend.models import PriceWatchlist
-from backend.extensions import db
 from backend.services.audit_service import AuditService
 
 market_bp = Blueprint('market', __name__)
@@ -36,29 +34,72 @@ def add_to_watchlist():
     user_id = data.get('user_id')
     crop = data.get('crop')
     target_price = data.get('target_price')
+    district = data.get('district')
     
     if not all([user_id, crop, target_price]):
         return jsonify({"status": "error", "message": "Missing required fields"}), 400
         
-    watchlist_item = PriceWatchlist(
-        user_id=user_id,
-        crop_name=crop,
-        target_price=target_price
-    )
-    db.session.add(watchlist_item)
-    db.session.commit()
+    watchlist_item = MarketIntelligenceService.add_watch(user_id, crop, target_price, district=district)
     
     AuditService.log_action(
         action="MARKET_WATCHLIST_ADD",
         user_id=user_id,
         resource_type="MARKET_WATCHLIST",
         resource_id=str(watchlist_item.id),
-        meta_data={"crop": crop, "target": target_price}
+        meta_data={"crop": crop, "district": district, "target": target_price}
+    )
+    
+    return jsonify({
+        "status": "success",
+        "message": f"Added {crop} to your watchlist.",
+        "data": watchlist_item.to_dict()
+    })
+
+@market_bp.route('/market/watchlist/<int:watch_id>', methods=['PATCH'])
+def update_watchlist_item(watch_id):
+    data = request.get_json() or {}
+    user_id = data.get('user_id')
+    changes = {k: data[k] for k in ('target_price', 'district', 'alert_enabled') if k in data}
+    
+    if not user_id or not changes:
+        return jsonify({"status": "error", "message": "Missing required fields"}), 400
+        
+    watchlist_item = MarketIntelligenceService.update_watch(watch_id, user_id, **changes)
+    if not watchlist_item:
+        return jsonify({"status": "error", "message": "Watchlist item not found"}), 404
+    
+    AuditService.log_action(
+        action="MARKET_WATCHLIST_UPDATE",
+        user_id=user_id,
+        resource_type="MARKET_WATCHLIST",
+        resource_id=str(watch_id),
+        meta_data=changes
+    )
+    
+    return jsonify({
+        "status": "success",
+        "data": watchlist_item.to_dict()
+    })
+
+@market_bp.route('/market/watchlist/<int:watch_id>', methods=['DELETE'])
+def remove_from_watchlist(watch_id):
+    user_id = request.args.get('user_id', type=int)
+    if not user_id:
+        return jsonify({"status": "error", "message": "user_id is required"}), 400
+        
+    if not MarketIntelligenceService.remove_watch(watch_id, user_id):
+        return jsonify({"status": "error", "message": "Watchlist item not found"}), 404
+    
+    AuditService.log_action(
+        action="MARKET_WATCHLIST_REMOVE",
+        user_id=user_id,
+        resource_type="MARKET_WATCHLIST",
+        resource_id=str(watch_id)
     )
     
     return jsonify({
         "status": "success",
-        "message": f"Added {crop} to your watchlist."
+        "message": "Removed from your watchlist."
     })
 
 @market_bp.route('/market/refresh', methods=['POST'])
@@ -1,8 +1,47 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, request
 from auth_utils import token_required
+from backend.services.task_progress import TaskProgressHub
 
 tasks_bp = Blueprint('tasks', __name__)
 
+MAX_WATCHED_TASKS = 200
+
+
+@tasks_bp.route('/tasks/updates', methods=['GET'])
+@token_required
+def get_task_updates():
+    """
+    Long-poll for state and progress changes of one or more async tasks.
+
+    Query params:
+        task_ids: Comma-separated task ids (or repeated task_ids params)
+        since: Cursor from the previous response; 0 returns immediately
+        timeout: Seconds to wait for a change (capped server-side)
+    """
+    task_ids = [
+        task_id.strip()
+        for value in request.args.getlist('task_ids')
+        for task_id in value.split(',') if task_id.strip()
+    ]
+    task_ids = list(dict.fromkeys(task_ids))
+    if not task_ids:
+        return jsonify({'status': 'error', 'message': 'task_ids is required'}), 400
+    if len(task_ids) > MAX_WATCHED_TASKS:
+        return jsonify({'status': 'error', 'message': f'At most {MAX_WATCHED_TASKS} task ids'}), 400
+
+    since = request.args.get('since', 0, type=int)
+    timeout = request.args.get('timeout', 25.0, type=float)
+    updates = TaskProgressHub.wait(task_ids, since=since, timeout=timeout)
+    states = TaskProgressHub.snapshot(task_ids)
+
+    return jsonify({
+        'status': 'success',
+        'cursor': updates['cursor'],
+        'events': updates['events'],
+        'tasks': states,
+        'summary': TaskProgressHub.summarize(states)
+    })
+
 
 @tasks_bp.route('/tasks/<task_id>', methods=['GET'])
 @token_required
@@ -22,6 +61,12 @@ def get_task_status(task_id):
                 'status': 'processing',
                 'message': 'Task is currently being processed'
             }
+        elif task.state == 'PROGRESS':
+            response = {
+                'status': 'processing',
+                'progress': (task.info or {}).get('progress'),
+                'message': (task.info or {}).get('message') or 'Task is currently being processed'
+            }
         elif task.state == 'SUCCESS':
             response = {
                 'status': 'completed',
@@ -7,6 +7,7 @@ This module provides:
 - Transfer between vaults
 - Ledger history and auditing
 - FX revaluation endpoints
+- Cost basis lots and realized gains
 """
 
 from flask import Blueprint, jsonify, request
@@ -17,6 +18,7 @@ from backend.auth_utils import token_required
 from backend.services.vault_service import VaultService
 from backend.services.ledger_service import LedgerService
 from backend.services.fx_service import FXService
+from backend.services.cost_basis_service import CostBasisService
 from backend.models.ledger import Vault, LedgerTransaction
 
 vaults_bp = Blueprint('vaults', __name__)
@@ -160,7 +162,9 @@ def withdraw(current_user, vault_id):
         "currency": "EUR",
         "fx_rate": 1.09,  // optional
         "description": "Wire transfer out",
-        "reference": "WD-12345"
+        "reference": "WD-12345",
+        "cost_basis_method": "FIFO",  // optional: AVERAGE, FIFO, LIFO, HIFO, SPECIFIC
+        "lot_ids": [12, 15]  // required for SPECIFIC
     }
     """
     vault = VaultService.get_vault(vault_id)
@@ -186,7 +190,9 @@ def withdraw(current_user, vault_id):
             fx_rate=Decimal(str(data['fx_rate'])) if data.get('fx_rate') else None,
             destination_description=data.get('description'),
             reference=data.get('reference'),
-            created_by=current_user.id
+            created_by=current_user.id,
+            cost_basis_method=data.get('cost_basis_method'),
+            lot_ids=data.get('lot_ids')
         )
         
         return jsonify({
@@ -442,6 +448,63 @@ def get_fx_valuation_history(current_user, vault_id):
     })
 
 
+@vaults_bp.route('/<vault_id>/lots', methods=['GET'])
+@token_required
+def get_cost_basis_lots(current_user, vault_id):
+    """Get open acquisition lots per currency position."""
+    vault = VaultService.get_vault(vault_id)
+    
+    if not vault:
+        return jsonify({'error': 'Vault not found'}), 404
+    
+    if vault.owner_type == 'user' and vault.owner_id != current_user.id:
+        return jsonify({'error': 'Access denied'}), 403
+    
+    currency = request.args.get('currency')
+    positions = vault.currency_positions.all()
+    if currency:
+        positions = [p for p in positions if p.currency == currency]
+    
+    return jsonify({
+        'status': 'success',
+        'lots': {
+            position.currency: [lot.to_dict() for lot in CostBasisService.get_open_lots(position)]
+            for position in positions
+        }
+    })
+
+
+@vaults_bp.route('/<vault_id>/realized-gains', methods=['GET'])
+@token_required
+def get_realized_gains(current_user, vault_id):
+    """Get realized FX gains per currency for a date range."""
+    vault = VaultService.get_vault(vault_id)
+    
+    if not vault:
+        return jsonify({'error': 'Vault not found'}), 404
+    
+    if vault.owner_type == 'user' and vault.owner_id != current_user.id:
+        return jsonify({'error': 'Access denied'}), 403
+    
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+    
+    if start_date:
+        start_date = datetime.fromisoformat(start_date)
+    if end_date:
+        end_date = datetime.fromisoformat(end_date)
+    
+    positions = {position.id: position.currency for position in vault.currency_positions.all()}
+    gains = CostBasisService.realized_gain(list(positions), start_date, end_date)
+    
+    return jsonify({
+        'status': 'success',
+        'base_currency': vault.base_currency,
+        'realized_gains': {positions[position_id]: float(gain) for position_id, gain in gains.items()},
+        'total': float(sum(gains.values()))
+    })
+
+
 @vaults_bp.route('/<vault_id>/lock', methods=['POST'])
 @token_required
 def lock_vault(current_user, vault_id):
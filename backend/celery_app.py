@@ -1,5 +1,7 @@
 import os
 from celery import Celery
+from celery.signals import worker_init
+import backend.services.task_progress  # noqa: F401  Publishes task state transitions
 
 # Redis URL from environment or default
 REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
@@ -49,6 +51,17 @@ celery_app.conf.update(
         'pathogen-propagation-simulation': {
             'task': 'tasks.pathogen_propagation_run',
             'schedule': 1800.0, # Every 30 mins
+        },
+        'moderate-pending-forum-posts': {
+            'task': 'tasks.moderate_pending_posts',
+            'schedule': 60.0,  # Sweeps posts whose dispatch was lost
         }
     }
 )
+
+
+@worker_init.connect
+def warm_models(**kwargs):
+    """Preload ML models in the parent process so forked pool workers share them."""
+    from backend.services.model_registry import ModelRegistry
+    ModelRegistry.warm()
@@ -36,6 +36,9 @@ class Config:
     # Gemini API
     GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY')
     GEMINI_MODEL_ID = 'gemini-2.5-flash'
+    # LLM gateway: 'gemini', or 'stub' for a local stand-in model
+    LLM_BACKEND = os.environ.get('LLM_BACKEND', 'gemini')
+    LLM_MAX_CONCURRENCY = int(os.environ.get('LLM_MAX_CONCURRENCY', 8))
     
     # Weather API
     WEATHER_API_KEY = os.environ.get('WEATHER_API_KEY')
@@ -50,6 +53,10 @@ class Config:
     FIREBASE_APP_ID = os.environ.get('FIREBASE_APP_ID')
     FIREBASE_MEASUREMENT_ID = os.environ.get('FIREBASE_MEASUREMENT_ID')
 
+    # ML models: 'lazy' loads on first use, 'preload' at startup (before workers fork)
+    ML_MODEL_LOAD_POLICY = os.environ.get('ML_MODEL_LOAD_POLICY', 'lazy')
+    ML_MODEL_RELOAD_CHECK_SECONDS = float(os.environ.get('ML_MODEL_RELOAD_CHECK_SECONDS', 30))
+
     # Redis & Caching
     REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
     CACHE_TYPE = 'RedisCache'
@@ -77,6 +84,7 @@ class TestingConfig(Config):
     TESTING = True
     DEBUG = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'  # In-memory database for testing
+    LLM_BACKEND = 'stub'  # Never call Gemini from tests
 
 config = {
     'development': DevelopmentConfig,
@@ -6,6 +6,7 @@ Configures Celery for async task processing
 from celery import Celery
 from dotenv import load_dotenv
 import os
+import backend.services.task_progress  # noqa: F401  Publishes task state transitions
 
 load_dotenv()
 
@@ -2,6 +2,7 @@ import time
 import functools
 from flask import request, g, has_request_context
 from backend.services.audit_service import AuditService
+from backend.services.audit_pipeline import AuditWriter
 
 def audit_request(action_name=None):
     """
@@ -22,15 +23,14 @@ def audit_request(action_name=None):
             # Calculate duration
             duration = time.time() - start_time
             
-            # Async log or direct log depends on performance needs
-            # For this "hard" issue, we'll do direct logging but capture status codes
+            # Queued for the background AuditWriter so the request never commits
             status_code = 200
             if hasattr(response, 'status_code'):
                 status_code = response.status_code
             elif isinstance(response, tuple) and len(response) > 1:
                 status_code = response[1]
                 
-            AuditService.log_action(
+            AuditService.enqueue_action(
                 action=action,
                 meta_data={
                     "duration_ms": int(duration * 1000),
@@ -53,6 +53,7 @@ class AuditMiddleware:
     def init_app(self, app):
         app.before_request(self.before_request)
         app.after_request(self.after_request)
+        AuditWriter.start(app)
 
     def before_request(self):
         # Store start time in flask.g for duration calculation
@@ -77,7 +78,7 @@ class AuditMiddleware:
             if 'audit' in request.path:
                 return response
                 
-            AuditService.log_action(
+            AuditService.enqueue_action(
                 action=f"{request.method}_{request.endpoint or 'unknown'}",
                 risk_level='MEDIUM' if is_state_change else 'LOW',
                 meta_data={
@@ -46,15 +46,16 @@ from .transparency import ProduceReview, PriceAdjustmentLog
 from .barter import BarterTransaction, BarterResource, ResourceValueIndex
 from .financials import FarmBalanceSheet, SolvencySnapshot, ProfitabilityIndex
 from .reliability_log import ReliabilityLog
-from .market import ForwardContract, PriceHedgingLog
+from .market import ForwardContract, PriceHedgingLog, MarketPrice, PriceWatchlist
 from .arbitrage import ArbitrageOpportunity, AlgorithmicTradeRecord
 from .spatial_yield import SpatialYieldGrid, TemporalYieldForex
 from .circular import WasteInventory, BioEnergyOutput, CircularCredit
 from .carbon_escrow import CarbonTradeEscrow, EscrowAuditLog, CarbonCreditWallet
 from .disease import MigrationVector, ContainmentZone
 from .ledger import (
-    LedgerAccount, LedgerTransaction, LedgerEntry,
+    LedgerAccount, LedgerTransaction, LedgerEntry, LedgerBalanceCheckpoint,
     FXValuationSnapshot, Vault, VaultCurrencyPosition, FXRate,
+    CostBasisLot, CostBasisDisposal,
     AccountType, EntryType, TransactionType
 )
 
@@ -124,13 +125,14 @@ __all__ = [
     'ProduceReview', 'PriceAdjustmentLog',
     'BarterTransaction', 'BarterResource', 'ResourceValueIndex',
     # Reliability & Market
-    'ReliabilityLog', 'ForwardContract', 'PriceHedgingLog',
+    'ReliabilityLog', 'ForwardContract', 'PriceHedgingLog', 'MarketPrice', 'PriceWatchlist',
     # Circular Economy & Biomass Energy
     'WasteInventory', 'BioEnergyOutput', 'CircularCredit',
     # Carbon Trading Escrow (L3-1642)
     'CarbonTradeEscrow', 'EscrowAuditLog', 'CarbonCreditWallet',
     # Double-Entry Ledger
-    'LedgerAccount', 'LedgerTransaction', 'LedgerEntry',
+    'LedgerAccount', 'LedgerTransaction', 'LedgerEntry', 'LedgerBalanceCheckpoint',
     'FXValuationSnapshot', 'Vault', 'VaultCurrencyPosition', 'FXRate',
+    'CostBasisLot', 'CostBasisDisposal',
     'AccountType', 'EntryType', 'TransactionType',
 ]
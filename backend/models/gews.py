@@ -74,33 +74,12 @@ class OutbreakZone(db.Model):
     containment_status = db.Column(db.String(30), default='NONE') # NONE, IRRIGATION_LOCKDOWN, ACCESS_RESTRICTED, FULL_QUARANTINE
     containment_applied_at = db.Column(db.DateTime)
     
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-
-class OutbreakProjection(db.Model):
-    __tablename__ = 'outbreak_projections'
-    
-    id = db.Column(db.Integer, primary_key=True)
-    outbreak_zone_id = db.Column(db.Integer, db.ForeignKey('outbreak_zones.id'), nullable=False)
-    projection_time = db.Column(db.DateTime, nullable=False)
-    
-    projected_latitude = db.Column(db.Float, nullable=False)
-    projected_longitude = db.Column(db.Float, nullable=False)
-    expected_radius = db.Column(db.Float, nullable=False)
-    confidence_score = db.Column(db.Float, default=0.0)
+    # Batch simulation bookkeeping: fingerprint of the last simulated inputs
+    propagation_inputs_hash = db.Column(db.String(40))
+    last_simulated_at = db.Column(db.DateTime)
     
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
-    def to_dict(self):
-        return {
-            'id': self.id,
-            'outbreak_zone_id': self.outbreak_zone_id,
-            'projection_time': self.projection_time.isoformat(),
-            'latitude': self.projected_latitude,
-            'longitude': self.projected_longitude,
-            'radius': self.expected_radius,
-            'confidence': self.confidence_score
-        }
-
     def set_center_location(self, lat, lon):
         self.center_latitude = lat
         self.center_longitude = lon
@@ -119,6 +98,11 @@ class OutbreakProjection(db.Model):
             'total_affected_area': self.total_affected_area,
             'status': self.status,
             'risk_level': self.risk_level,
+            'propagation_velocity': self.propagation_velocity,
+            'transmission_radius': self.transmission_radius,
+            'wind_vector_deg': self.wind_vector_deg,
+            'containment_status': self.containment_status,
+            'last_simulated_at': self.last_simulated_at.isoformat() if self.last_simulated_at else None,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
@@ -133,6 +117,38 @@ class OutbreakProjection(db.Model):
         }
 
 
+class OutbreakProjection(db.Model):
+    __tablename__ = 'outbreak_projections'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    outbreak_zone_id = db.Column(db.Integer, db.ForeignKey('outbreak_zones.id'), nullable=False)
+    projection_time = db.Column(db.DateTime, nullable=False)
+    horizon_hours = db.Column(db.Integer)
+    
+    projected_latitude = db.Column(db.Float, nullable=False)
+    projected_longitude = db.Column(db.Float, nullable=False)
+    expected_radius = db.Column(db.Float, nullable=False)
+    confidence_score = db.Column(db.Float, default=0.0)
+    
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('idx_outbreak_projection_zone_horizon', 'outbreak_zone_id', 'horizon_hours'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'outbreak_zone_id': self.outbreak_zone_id,
+            'projection_time': self.projection_time.isoformat(),
+            'horizon_hours': self.horizon_hours,
+            'latitude': self.projected_latitude,
+            'longitude': self.projected_longitude,
+            'radius': self.expected_radius,
+            'confidence': self.confidence_score
+        }
+
+
 class OutbreakAlert(db.Model):
     __tablename__ = 'outbreak_alerts'
     
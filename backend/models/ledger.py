@@ -4,12 +4,14 @@ Double-Entry Ledger Models for Multi-Currency Vault Accounting.
 This module implements a robust double-entry accounting system with:
 - Ledger accounts (assets, liabilities, equity, income, expense)
 - Ledger entries with debit/credit legs
+- Daily balance checkpoints for fast balance reconstruction
 - FX valuation snapshots for tracking realized/unrealized gains
 - Multi-currency vault support
 """
 
-from datetime import datetime
+from datetime import datetime, time
 from decimal import Decimal
+from sqlalchemy import event
 from backend.extensions import db
 import enum
 
@@ -45,8 +47,7 @@ class TransactionType(enum.Enum):
     FEE = 'FEE'
     INTEREST = 'INTEREST'
     CARBON_ESCROW_FEE = 'CARBON_ESCROW_FEE'      # Platform fee for managing carbon settlements
-    CARBON_CREDIT_MINT = 'CARBON_CREDIT_MINT'    # New credit minted from sequestration
-    CARBON_CREDIT_SALE = 'CARBON_CREDIT_SALE'    # Credit sold to ESG buyer
+    ARBITRAGE_EXECUTION = 'ARBITRAGE_EXECUTION'  # Autonomous spatial arbitrage trade
 
 
 class LedgerAccount(db.Model):
@@ -109,26 +110,62 @@ class LedgerAccount(db.Model):
         
         For ASSET and EXPENSE accounts: Debits increase, Credits decrease
         For LIABILITY, EQUITY, INCOME accounts: Credits increase, Debits decrease
+        
+        Reads the nearest balance checkpoint and only sums the entries
+        posted after it. Accounts without checkpoints fall back to a full
+        aggregate over their entries.
         """
-        from sqlalchemy import func
+        if as_of_date is not None and not isinstance(as_of_date, datetime):
+            as_of_date = datetime.combine(as_of_date, time.min)
         
-        query = LedgerEntry.query.filter_by(account_id=self.id)
+        checkpoint_query = LedgerBalanceCheckpoint.query.filter_by(account_id=self.id)
         
         if as_of_date:
-            query = query.filter(LedgerEntry.entry_date <= as_of_date)
+            day_start = datetime.combine(as_of_date.date(), time.min)
+            checkpoint_query = checkpoint_query.filter(
+                LedgerBalanceCheckpoint.checkpoint_date < as_of_date.date()
+            )
         
-        debits = query.filter_by(entry_type=EntryType.DEBIT).with_entities(
-            func.coalesce(func.sum(LedgerEntry.amount), 0)
-        ).scalar() or Decimal('0')
+        checkpoint = checkpoint_query.order_by(
+            LedgerBalanceCheckpoint.checkpoint_date.desc()
+        ).first()
         
-        credits = query.filter_by(entry_type=EntryType.CREDIT).with_entities(
-            func.coalesce(func.sum(LedgerEntry.amount), 0)
-        ).scalar() or Decimal('0')
+        if checkpoint is None:
+            debits, credits = self._sum_entries(until=as_of_date)
+        elif as_of_date:
+            delta_debits, delta_credits = self._sum_entries(since=day_start, until=as_of_date)
+            debits = Decimal(str(checkpoint.debit_total)) + delta_debits
+            credits = Decimal(str(checkpoint.credit_total)) + delta_credits
+        else:
+            # Every day with activity has a checkpoint, so the latest one is complete
+            debits = Decimal(str(checkpoint.debit_total))
+            credits = Decimal(str(checkpoint.credit_total))
         
         if self.account_type in [AccountType.ASSET, AccountType.EXPENSE]:
-            return Decimal(str(debits)) - Decimal(str(credits))
+            return debits - credits
         else:
-            return Decimal(str(credits)) - Decimal(str(debits))
+            return credits - debits
+    
+    def _sum_entries(self, since=None, until=None):
+        """Sum raw entry amounts by side, returning (debits, credits)."""
+        from sqlalchemy import func
+        
+        query = db.session.query(
+            LedgerEntry.entry_type,
+            func.coalesce(func.sum(LedgerEntry.amount), 0)
+        ).filter(LedgerEntry.account_id == self.id)
+        
+        if since:
+            query = query.filter(LedgerEntry.entry_date >= since)
+        if until:
+            query = query.filter(LedgerEntry.entry_date <= until)
+        
+        totals = dict(query.group_by(LedgerEntry.entry_type).all())
+        
+        return (
+            Decimal(str(totals.get(EntryType.DEBIT, 0))),
+            Decimal(str(totals.get(EntryType.CREDIT, 0)))
+        )
 
 
 class LedgerTransaction(db.Model):
@@ -272,6 +309,45 @@ class LedgerEntry(db.Model):
         }
 
 
+class LedgerBalanceCheckpoint(db.Model):
+    """
+    Materialized running totals for a ledger account.
+    
+    One row exists per account per day with activity. Each row holds the
+    cumulative debit and credit totals of every entry dated on or before
+    ``checkpoint_date``, so a balance only needs the nearest checkpoint
+    plus the entries posted after it.
+    """
+    __tablename__ = 'ledger_balance_checkpoints'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    account_id = db.Column(db.Integer, db.ForeignKey('ledger_accounts.id'), nullable=False)
+    checkpoint_date = db.Column(db.Date, nullable=False)
+    
+    # Cumulative totals in account currency
+    debit_total = db.Column(db.Numeric(18, 6), default=0, nullable=False)
+    credit_total = db.Column(db.Numeric(18, 6), default=0, nullable=False)
+    entry_count = db.Column(db.Integer, default=0, nullable=False)
+    
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        db.UniqueConstraint('account_id', 'checkpoint_date', name='uq_ledger_checkpoint_day'),
+        db.Index('idx_ledger_checkpoint_account_date', 'account_id', 'checkpoint_date'),
+    )
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'account_id': self.account_id,
+            'checkpoint_date': self.checkpoint_date.isoformat() if self.checkpoint_date else None,
+            'debit_total': float(self.debit_total),
+            'credit_total': float(self.credit_total),
+            'entry_count': self.entry_count,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+
 class FXValuationSnapshot(db.Model):
     """
     Point-in-time FX valuation for multi-currency positions.
@@ -463,6 +539,85 @@ class VaultCurrencyPosition(db.Model):
         }
 
 
+class CostBasisLot(db.Model):
+    """
+    Acquisition lot of a vault currency position.
+    
+    Lots are opened on deposit and consumed on withdrawal according to the
+    cost basis method (FIFO, LIFO, HIFO or specific identification).
+    """
+    __tablename__ = 'cost_basis_lots'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    position_id = db.Column(db.Integer, db.ForeignKey('vault_currency_positions.id'), nullable=False)
+    
+    acquired_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    amount = db.Column(db.Numeric(18, 6), nullable=False)
+    remaining_amount = db.Column(db.Numeric(18, 6), nullable=False)
+    rate = db.Column(db.Numeric(18, 8), nullable=False)  # Acquisition rate to base currency
+    is_closed = db.Column(db.Boolean, default=False, nullable=False)
+    
+    reference = db.Column(db.String(100), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('idx_cost_basis_lot_open', 'position_id', 'is_closed', 'acquired_at'),
+    )
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'position_id': self.position_id,
+            'acquired_at': self.acquired_at.isoformat() if self.acquired_at else None,
+            'amount': float(self.amount),
+            'remaining_amount': float(self.remaining_amount),
+            'rate': float(self.rate),
+            'is_closed': self.is_closed,
+            'reference': self.reference
+        }
+
+
+class CostBasisDisposal(db.Model):
+    """
+    Realized gain from consuming (part of) a lot.
+    
+    Disposals without a lot cover balances that predate lot tracking and
+    are costed at the position's weighted average rate.
+    """
+    __tablename__ = 'cost_basis_disposals'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    position_id = db.Column(db.Integer, db.ForeignKey('vault_currency_positions.id'), nullable=False)
+    lot_id = db.Column(db.Integer, db.ForeignKey('cost_basis_lots.id'), nullable=True)
+    
+    disposed_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    amount = db.Column(db.Numeric(18, 6), nullable=False)
+    cost_rate = db.Column(db.Numeric(18, 8), nullable=False)
+    proceeds_rate = db.Column(db.Numeric(18, 8), nullable=False)
+    realized_gain = db.Column(db.Numeric(18, 6), nullable=False)
+    method = db.Column(db.String(10), nullable=False)
+    
+    reference = db.Column(db.String(100), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('idx_cost_basis_disposal_date', 'position_id', 'disposed_at'),
+    )
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'position_id': self.position_id,
+            'lot_id': self.lot_id,
+            'disposed_at': self.disposed_at.isoformat() if self.disposed_at else None,
+            'amount': float(self.amount),
+            'cost_rate': float(self.cost_rate),
+            'proceeds_rate': float(self.proceeds_rate),
+            'realized_gain': float(self.realized_gain),
+            'method': self.method,
+            'reference': self.reference
+        }
+
 class FXRate(db.Model):
     """
     Historical and current FX rates.
@@ -496,3 +651,33 @@ class FXRate(db.Model):
             'source': self.source,
             'is_current': self.is_current
         }
+
+
+@event.listens_for(db.session, 'after_flush')
+def _checkpoint_new_entries(session, flush_context):
+    """
+    Fold entries inserted through the ORM into the balance checkpoints.
+    
+    Services that add LedgerEntry rows directly (carbon minting, energy
+    tokens, arbitrage, insurance payouts, logistics settlement) keep the
+    checkpoints correct without going through LedgerService. Bulk inserts
+    do not fire this event; LedgerService.create_transactions_bulk updates
+    the checkpoints itself.
+    
+    Registered on the app's session only, and writes through the session
+    being flushed so the checkpoints land in the same transaction.
+    """
+    entries = [obj for obj in session.new if isinstance(obj, LedgerEntry)]
+    if not entries:
+        return
+    
+    from backend.services.ledger_service import LedgerService
+    LedgerService._update_balance_checkpoints([
+        {
+            'account_id': entry.account_id,
+            'entry_type': entry.entry_type,
+            'amount': Decimal(str(entry.amount)),
+            'entry_date': entry.entry_date
+        }
+        for entry in entries
+    ], session=session)
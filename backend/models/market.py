@@ -58,3 +58,67 @@ class PriceHedgingLog(db.Model):
     market_price_snapshot = db.Column(db.Float)
     
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class MarketPrice(db.Model):
+    """Latest mandi price of a crop in a district."""
+    __tablename__ = 'market_prices'
+
+    id = db.Column(db.Integer, primary_key=True)
+    crop_name = db.Column(db.String(100), nullable=False)
+    district = db.Column(db.String(100), nullable=False)
+    state = db.Column(db.String(100))
+
+    modal_price = db.Column(db.Float, nullable=False)
+    min_price = db.Column(db.Float)
+    max_price = db.Column(db.Float)
+    unit = db.Column(db.String(20), default='Quintal')
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('crop_name', 'district', name='uq_market_price_crop_district'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'crop_name': self.crop_name,
+            'district': self.district,
+            'state': self.state,
+            'modal_price': self.modal_price,
+            'min_price': self.min_price,
+            'max_price': self.max_price,
+            'unit': self.unit,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+
+class PriceWatchlist(db.Model):
+    """A user's target price for a crop, in one district or (district NULL) any district."""
+    __tablename__ = 'price_watchlists'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
+    crop_name = db.Column(db.String(100), nullable=False)
+    district = db.Column(db.String(100))
+    target_price = db.Column(db.Float, nullable=False)
+    alert_enabled = db.Column(db.Boolean, default=True)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+
+    __table_args__ = (
+        db.Index('ix_price_watchlists_crop_district', 'crop_name', 'district'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'crop_name': self.crop_name,
+            'district': self.district,
+            'target_price': self.target_price,
+            'alert_enabled': self.alert_enabled,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
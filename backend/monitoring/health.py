@@ -53,26 +53,27 @@ class HealthChecker:
             }
     
     def check_ml_models(self):
-        """Check if ML models are loadable."""
+        """Check ML model files and registry state without loading models."""
         try:
-            import joblib
-            import os as os_module
+            from backend.services.model_registry import ModelRegistry
             
-            base_dir = os_module.path.dirname(os_module.path.dirname(os_module.path.dirname(__file__)))
-            model_path = os_module.path.join(base_dir, "crop_recommendation", "model", "rf_model.pkl")
+            models = ModelRegistry.status()
+            missing = [name for name, info in models.items() if info['required'] and not info['available']]
+            loaded = [name for name, info in models.items() if info['loaded']]
             
-            if os_module.path.exists(model_path):
-                return {
-                    'name': 'ml_models',
-                    'status': 'healthy',
-                    'message': 'Crop model available'
-                }
-            else:
+            if missing:
                 return {
                     'name': 'ml_models',
                     'status': 'degraded',
-                    'message': 'Crop model file not found'
+                    'message': f'Model files not found: {missing}',
+                    'models': models
                 }
+            return {
+                'name': 'ml_models',
+                'status': 'healthy',
+                'message': f'{len(loaded)} of {len(models)} models loaded',
+                'models': models
+            }
         except Exception as e:
             return {
                 'name': 'ml_models',
@@ -1,69 +1,416 @@
+import json
+import math
+import os
+import threading
 import time
+from bisect import bisect_left
 from functools import wraps
-from collections import defaultdict
-from datetime import datetime
+
+
+# Prometheus client default latency buckets (seconds)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+DEFAULT_QUANTILES = (0.5, 0.9, 0.95, 0.99)
+
+
+class Histogram:
+    """Fixed-bucket histogram: constant memory regardless of observation count."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def merge(self, other):
+        if other.buckets != self.buckets:
+            raise ValueError("Cannot merge histograms with different buckets")
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.sum += other.sum
+        self.count += other.count
+
+    def to_dict(self):
+        return {'buckets': list(self.buckets), 'counts': self.counts, 'sum': self.sum, 'count': self.count}
+
+    @classmethod
+    def from_dict(cls, data):
+        hist = cls(data['buckets'])
+        hist.counts = list(data['counts'])
+        hist.sum = data['sum']
+        hist.count = data['count']
+        return hist
+
+
+class QuantileSketch:
+    """
+    Streaming quantile sketch with bounded relative error (DDSketch style).
+
+    Values are counted in logarithmic bins, so any quantile is within
+    ``relative_accuracy`` of the true value. Sketches merge by adding bin
+    counts, which is what makes per-worker summaries combinable.
+    """
+
+    def __init__(self, relative_accuracy=0.01, max_bins=2048):
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max_bins
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        if value <= 0:
+            self.zero_count += 1
+            return
+        index = math.ceil(math.log(value) / self._log_gamma)
+        self.bins[index] = self.bins.get(index, 0) + 1
+        if len(self.bins) > self.max_bins:
+            self._collapse()
+
+    def _collapse(self):
+        """Fold the lowest bins together to stay within max_bins."""
+        keys = sorted(self.bins)
+        excess = len(keys) - self.max_bins + 1
+        folded = sum(self.bins.pop(k) for k in keys[:excess])
+        target = keys[excess]
+        self.bins[target] = self.bins.get(target, 0) + folded
+
+    def quantile(self, q):
+        if self.count == 0:
+            return float('nan')
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if seen > rank:
+                return 2 * self.gamma ** index / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.bins) / (self.gamma + 1)
+
+    def merge(self, other):
+        for index, count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        while len(self.bins) > self.max_bins:
+            self._collapse()
+
+    def to_dict(self):
+        return {
+            'relative_accuracy': self.relative_accuracy,
+            'bins': [[k, v] for k, v in self.bins.items()],
+            'zero_count': self.zero_count,
+            'count': self.count,
+            'sum': self.sum
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data['relative_accuracy'])
+        sketch.bins = {int(k): v for k, v in data['bins']}
+        sketch.zero_count = data['zero_count']
+        sketch.count = data['count']
+        sketch.sum = data['sum']
+        return sketch
 
 
 class MetricsCollector:
-    """Simple metrics collector for Prometheus-compatible output."""
-    
-    def __init__(self):
-        self.counters = defaultdict(int)
-        self.gauges = defaultdict(float)
-        self.histograms = defaultdict(list)
+    """
+    Thread-safe metrics collector for Prometheus-compatible output.
+
+    Observations go into a fixed-bucket histogram and a quantile sketch, so
+    memory stays flat for long-running workers. When METRICS_MULTIPROC_DIR
+    (or PROMETHEUS_MULTIPROC_DIR) is set, each process periodically writes
+    its state there and the exporter merges every worker's file.
+    """
+
+    SNAPSHOT_INTERVAL_SECONDS = 5.0
+
+    def __init__(self, multiproc_dir=None):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        self.sketches = {}
+        self.help = {}
+        self.bucket_config = {}
         self.start_time = time.time()
-    
+        self.multiproc_dir = multiproc_dir or os.environ.get('METRICS_MULTIPROC_DIR') \
+            or os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+        self._last_snapshot = 0.0
+
+    def describe(self, name, help_text, buckets=None):
+        """Register help text and (for histograms) custom buckets for a metric."""
+        with self._lock:
+            self.help[name] = help_text
+            if buckets:
+                self.bucket_config[name] = tuple(sorted(buckets))
+
     def increment(self, name, value=1, labels=None):
         """Increment a counter."""
         key = self._make_key(name, labels)
-        self.counters[key] += value
-    
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+        self._maybe_snapshot()
+
     def set_gauge(self, name, value, labels=None):
         """Set a gauge value."""
         key = self._make_key(name, labels)
-        self.gauges[key] = value
-    
+        with self._lock:
+            self.gauges[key] = value
+        self._maybe_snapshot()
+
     def observe(self, name, value, labels=None):
         """Record a histogram observation."""
         key = self._make_key(name, labels)
-        self.histograms[key].append(value)
-    
+        with self._lock:
+            hist = self.histograms.get(key)
+            if hist is None:
+                hist = self.histograms[key] = Histogram(self.bucket_config.get(name, DEFAULT_BUCKETS))
+                self.sketches[key] = QuantileSketch()
+            hist.observe(value)
+            self.sketches[key].observe(value)
+        self._maybe_snapshot()
+
+    def quantile(self, name, q, labels=None):
+        """Approximate quantile of a histogram metric in this process."""
+        key = self._make_key(name, labels)
+        with self._lock:
+            sketch = self.sketches.get(key)
+            return sketch.quantile(q) if sketch else None
+
     def _make_key(self, name, labels):
         """Create a unique key for metrics with labels."""
         if labels:
-            label_str = ','.join(f'{k}="{v}"' for k, v in sorted(labels.items()))
-            return f'{name}{{{label_str}}}'
-        return name
-    
+            return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+        return name, ()
+
+    @staticmethod
+    def _format_key(name, labels, extra=None):
+        pairs = list(labels) + list(extra or [])
+        if not pairs:
+            return name
+        label_str = ','.join(f'{k}="{_escape(v)}"' for k, v in pairs)
+        return f'{name}{{{label_str}}}'
+
+    # Request instrumentation
+    def init_app(self, app):
+        """Record per-endpoint request counts and latency for every request."""
+        from flask import g, request
+
+        self.describe('agritech_http_requests_total', 'HTTP requests by endpoint, method and status')
+        self.describe('agritech_http_request_duration_seconds', 'HTTP request latency by endpoint and method')
+
+        @app.before_request
+        def _start_request_timer():
+            g._metrics_start = time.perf_counter()
+
+        @app.after_request
+        def _record_request_metrics(response):
+            start = getattr(g, '_metrics_start', None)
+            if start is None:
+                return response
+            endpoint = request.endpoint or 'unmatched'
+            self.increment('agritech_http_requests_total', labels={
+                'endpoint': endpoint, 'method': request.method, 'status': response.status_code
+            })
+            self.observe('agritech_http_request_duration_seconds', time.perf_counter() - start, labels={
+                'endpoint': endpoint, 'method': request.method
+            })
+            return response
+
+    # Multiprocess aggregation
+    def _snapshot_path(self, pid=None):
+        return os.path.join(self.multiproc_dir, f'metrics_{pid or os.getpid()}.json')
+
+    def _state(self):
+        with self._lock:
+            return {
+                'pid': os.getpid(),
+                'start_time': self.start_time,
+                'counters': [[n, l, v] for (n, l), v in self.counters.items()],
+                'gauges': [[n, l, v] for (n, l), v in self.gauges.items()],
+                'histograms': [[n, l, h.to_dict()] for (n, l), h in self.histograms.items()],
+                'sketches': [[n, l, s.to_dict()] for (n, l), s in self.sketches.items()],
+                'help': self.help
+            }
+
+    def _maybe_snapshot(self):
+        if not self.multiproc_dir:
+            return
+        now = time.monotonic()
+        if now - self._last_snapshot < self.SNAPSHOT_INTERVAL_SECONDS:
+            return
+        self._last_snapshot = now
+        self.write_snapshot()
+
+    def write_snapshot(self):
+        """Atomically write this process's metrics to the multiprocess directory."""
+        if not self.multiproc_dir:
+            return
+        os.makedirs(self.multiproc_dir, exist_ok=True)
+        path = self._snapshot_path()
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as fh:
+            json.dump(self._state(), fh)
+        os.replace(tmp_path, path)
+
+    def _collect_states(self):
+        """This process's live state plus the snapshots of other workers."""
+        states = [self._state()]
+        if not self.multiproc_dir or not os.path.isdir(self.multiproc_dir):
+            return states
+
+        own = os.path.basename(self._snapshot_path())
+        for filename in sorted(os.listdir(self.multiproc_dir)):
+            if not filename.startswith('metrics_') or not filename.endswith('.json') or filename == own:
+                continue
+            try:
+                with open(os.path.join(self.multiproc_dir, filename)) as fh:
+                    states.append(json.load(fh))
+            except (OSError, ValueError):
+                continue
+        return states
+
+    def _merged(self):
+        counters, gauges, histograms, sketches, help_text = {}, {}, {}, {}, {}
+        start_time = self.start_time
+
+        for state in self._collect_states():
+            help_text.update(state['help'])
+            start_time = min(start_time, state['start_time'])
+            pid_alive = state['pid'] == os.getpid() or _pid_alive(state['pid'])
+
+            for name, labels, value in state['counters']:
+                key = (name, _labels_tuple(labels))
+                counters[key] = counters.get(key, 0) + value
+
+            # Gauges are point-in-time values: report live workers only, per pid
+            if pid_alive:
+                multi = bool(self.multiproc_dir)
+                for name, labels, value in state['gauges']:
+                    labels = _labels_tuple(labels)
+                    if multi:
+                        labels = labels + (('pid', str(state['pid'])),)
+                    gauges[(name, labels)] = value
+
+            for name, labels, data in state['histograms']:
+                key = (name, _labels_tuple(labels))
+                hist = Histogram.from_dict(data)
+                if key in histograms:
+                    histograms[key].merge(hist)
+                else:
+                    histograms[key] = hist
+
+            for name, labels, data in state['sketches']:
+                key = (name, _labels_tuple(labels))
+                sketch = QuantileSketch.from_dict(data)
+                if key in sketches:
+                    sketches[key].merge(sketch)
+                else:
+                    sketches[key] = sketch
+
+        return counters, gauges, histograms, sketches, help_text, start_time
+
+    # Export
     def to_prometheus(self):
-        """Export metrics in Prometheus format."""
+        """Export metrics in Prometheus format (merged across workers if configured)."""
+        if self.multiproc_dir:
+            self.write_snapshot()
+        counters, gauges, histograms, sketches, help_text, start_time = self._merged()
         lines = []
-        
+
         # Add uptime
-        uptime = time.time() - self.start_time
+        uptime = time.time() - start_time
         lines.append(f'# HELP agritech_uptime_seconds Application uptime in seconds')
         lines.append(f'# TYPE agritech_uptime_seconds gauge')
         lines.append(f'agritech_uptime_seconds {uptime:.2f}')
         lines.append('')
-        
+
+        def family_header(name, metric_type):
+            if name in help_text:
+                lines.append(f'# HELP {name} {help_text[name]}')
+            lines.append(f'# TYPE {name} {metric_type}')
+
         # Counters
-        for key, value in self.counters.items():
-            lines.append(f'# TYPE {key.split("{")[0]} counter')
-            lines.append(f'{key} {value}')
-        
+        for name, keys in _group(counters).items():
+            family_header(name, 'counter')
+            for labels in keys:
+                lines.append(f'{self._format_key(name, labels)} {counters[(name, labels)]}')
+
         # Gauges
-        for key, value in self.gauges.items():
-            lines.append(f'# TYPE {key.split("{")[0]} gauge')
-            lines.append(f'{key} {value}')
-        
-        # Histograms (simplified - just count and sum)
-        for key, values in self.histograms.items():
-            base_name = key.split('{')[0]
-            lines.append(f'# TYPE {base_name} histogram')
-            lines.append(f'{key}_count {len(values)}')
-            lines.append(f'{key}_sum {sum(values):.4f}')
-        
-        return '\n'.join(lines)
+        for name, keys in _group(gauges).items():
+            family_header(name, 'gauge')
+            for labels in keys:
+                lines.append(f'{self._format_key(name, labels)} {gauges[(name, labels)]}')
+
+        # Histograms
+        for name, keys in _group(histograms).items():
+            family_header(name, 'histogram')
+            for labels in keys:
+                hist = histograms[(name, labels)]
+                cumulative = 0
+                for bound, count in zip(list(hist.buckets) + ['+Inf'], hist.counts):
+                    cumulative += count
+                    le = bound if bound == '+Inf' else _format_float(bound)
+                    lines.append(f'{self._format_key(name + "_bucket", labels, [("le", le)])} {cumulative}')
+                lines.append(f'{self._format_key(name + "_sum", labels)} {hist.sum:.6f}')
+                lines.append(f'{self._format_key(name + "_count", labels)} {hist.count}')
+
+        # Summary quantiles from the streaming sketches
+        for name, keys in _group(sketches).items():
+            summary_name = f'{name}_quantiles'
+            family_header(summary_name, 'summary')
+            for labels in keys:
+                sketch = sketches[(name, labels)]
+                for q in DEFAULT_QUANTILES:
+                    value = sketch.quantile(q)
+                    lines.append(f'{self._format_key(summary_name, labels, [("quantile", str(q))])} {value:.6f}')
+                lines.append(f'{self._format_key(summary_name + "_sum", labels)} {sketch.sum:.6f}')
+                lines.append(f'{self._format_key(summary_name + "_count", labels)} {sketch.count}')
+
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_float(value):
+    return repr(float(value))
+
+
+def _labels_tuple(labels):
+    return tuple((k, v) for k, v in labels)
+
+
+def _group(metrics_by_key):
+    grouped = {}
+    for name, labels in sorted(metrics_by_key):
+        grouped.setdefault(name, []).append(labels)
+    return grouped
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
 
 
 # Global metrics collector
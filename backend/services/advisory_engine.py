@@ -1,8 +1,8 @@
-import google.generativeai as genai
 import os
 from datetime import datetime
 from backend.extensions import db
 from backend.models.weather import CropAdvisory, WeatherData
+from backend.services.llm_gateway import LLMGateway
 from backend.services.weather_service import WeatherService
 import logging
 
@@ -67,10 +67,7 @@ class AdvisoryEngine:
             return "Note: High temperature detected. Increase irrigation frequency by 20%. Watch for aphids on lower leaves."
             
         try:
-            genai.configure(api_key=api_key)
-            model = genai.GenerativeModel('gemini-1.5-flash')
-            response = model.generate_content(prompt)
-            return response.text
+            return LLMGateway.generate_text('crop_advisory', prompt, model_id='gemini-1.5-flash')
         except Exception as e:
             logger.warning(f"AI API failed: {str(e)}. Using rule-based fallback.")
             return "Automated Alert: Frost warning tonight. Cover sensitive {crop_name} seedlings or use smudge pots to prevent damage."
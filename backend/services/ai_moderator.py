@@ -2,8 +2,10 @@ import os
 import re
 from datetime import datetime
 import google.generativeai as genai
-from backend.models import ForumThread, PostComment, UserReputation
+from backend.models import PostComment, UserReputation
 from backend.extensions import db
+from backend.services.semantic_index import semantic_index, THREAD
+from backend.services.llm_gateway import LLMGateway
 from backend.utils.logger import logger
 
 
@@ -13,6 +15,9 @@ class AIModerator:
     Handles sentiment analysis, toxicity detection, and auto-answering FAQs
     """
     
+    # Local retrieval candidates the LLM may reorder in search_knowledge_base
+    RERANK_CANDIDATES = 8
+    
     def __init__(self):
         api_key = os.environ.get('GEMINI_API_KEY')
         if not api_key:
@@ -57,8 +62,7 @@ class AIModerator:
             - Misinformation that could harm farmers
             """
             
-            response = self.model.generate_content(prompt)
-            result_text = response.text.strip()
+            result_text = LLMGateway.generate_text('forum_moderation', prompt).strip()
             
             # Extract JSON from response
             json_match = re.search(r'\{[^}]+\}', result_text, re.DOTALL)
@@ -78,7 +82,8 @@ class AIModerator:
                     'sentiment_score': 0.0,
                     'toxicity_score': 0.0,
                     'is_approved': True,
-                    'moderation_reason': ''
+                    'moderation_reason': '',
+                    'fallback': True
                 }
                 
         except Exception as e:
@@ -87,7 +92,8 @@ class AIModerator:
                 'sentiment_score': 0.0,
                 'toxicity_score': 0.0,
                 'is_approved': True,  # Default to approved on error
-                'moderation_reason': ''
+                'moderation_reason': '',
+                'fallback': True
             }
     
     def detect_faq(self, question_text):
@@ -126,8 +132,7 @@ class AIModerator:
             Format your response as plain text, friendly and supportive in tone.
             """
             
-            response = self.model.generate_content(prompt)
-            answer_text = response.text.strip()
+            answer_text = LLMGateway.generate_text('forum_auto_answer', prompt).strip()
             
             # Calculate confidence based on FAQ detection
             confidence = 0.85 if faq_category else 0.5
@@ -162,6 +167,7 @@ class AIModerator:
                 thread.flag_reason = f"AI Auto-flagged: {analysis['moderation_reason']}"
             
             db.session.commit()
+            semantic_index.update_thread(thread)
             
             # If approved and looks like FAQ, generate auto-answer
             if analysis['is_approved'] and analysis['toxicity_score'] < 0.3:
@@ -196,51 +202,71 @@ class AIModerator:
             logger.error(f"Comment moderation failed: {str(e)}")
             return None
     
-    def search_knowledge_base(self, query, limit=5):
+    def search_knowledge_base(self, query, limit=5, rerank=True):
         """
-        Use AI to search through existing threads and find relevant answers
-        Returns: list of relevant thread IDs with relevance scores
+        Find approved threads and knowledge answers relevant to a query.
+        Candidates come from the local semantic index (TF-IDF cosine); with
+        rerank, Gemini only reorders the top RERANK_CANDIDATES of them.
+        Returns: list of dicts with type, ids, title and relevance (0.0 to 1.0)
         """
         try:
-            # Get recent threads (simplified - in production, use vector search)
-            threads = ForumThread.query.filter_by(is_ai_approved=True).order_by(
-                ForumThread.last_activity.desc()
-            ).limit(50).all()
-            
-            if not threads:
-                return []
-            
-            # Create context from threads
-            thread_context = "\n\n".join([
-                f"[Thread {t.id}] {t.title}: {t.content[:200]}..."
-                for t in threads
+            candidates = max(limit, self.RERANK_CANDIDATES) if rerank else limit
+            hits = semantic_index.search(query, limit=candidates)
+            
+            if rerank and len(hits) > 1:
+                hits = self._rerank(query, hits[:self.RERANK_CANDIDATES]) + hits[self.RERANK_CANDIDATES:]
+            
+            results = []
+            for hit in hits[:limit]:
+                if hit.doc_type == THREAD:
+                    results.append({'type': 'thread', 'thread_id': hit.doc_id, 'title': hit.title, 'relevance': hit.score})
+                else:
+                    results.append({'type': 'answer', 'answer_id': hit.doc_id, 'question_id': hit.parent_id,
+                                    'title': hit.title, 'relevance': hit.score})
+            return results
+            
+        except Exception as e:
+            logger.error(f"Knowledge base search failed: {str(e)}")
+            return []
+    
+    def _rerank(self, query, hits):
+        """
+        Ask the LLM to order a handful of retrieved candidates.
+        Falls back to the local order for anything it omits or on failure.
+        """
+        try:
+            candidate_context = "\n\n".join([
+                f"[{i}] {hit.title}: {hit.snippet}"
+                for i, hit in enumerate(hits)
             ])
             
             prompt = f"""
             User Query: "{query}"
             
-            Available Threads:
-            {thread_context}
+            Candidate answers:
+            {candidate_context}
             
-            Which threads are most relevant to answer this query?
-            Return a JSON array of thread IDs sorted by relevance (most relevant first), maximum {limit} items.
-            Format: [{{"thread_id": <id>, "relevance": <0.0 to 1.0>}}]
+            Order the candidates by how well they answer the query, most relevant first.
+            Return only a JSON array of candidate numbers, e.g. [2, 0, 1].
             """
             
-            response = self.model.generate_content(prompt)
+            response_text = LLMGateway.generate_text('knowledge_rerank', prompt)
             
-            # Parse response
             import json
-            json_match = re.search(r'\[.*\]', response.text, re.DOTALL)
-            if json_match:
-                results = json.loads(json_match.group())
-                return results
+            json_match = re.search(r'\[.*?\]', response_text, re.DOTALL)
+            if not json_match:
+                return hits
             
-            return []
+            order = []
+            for index in json.loads(json_match.group()):
+                if isinstance(index, int) and 0 <= index < len(hits) and index not in order:
+                    order.append(index)
+            order += [i for i in range(len(hits)) if i not in order]
+            return [hits[i] for i in order]
             
         except Exception as e:
-            logger.error(f"Knowledge base search failed: {str(e)}")
-            return []
+            logger.warning(f"Knowledge base rerank failed, using local order: {str(e)}")
+            return hits
 
 
 # Singleton instance
@@ -1,7 +1,10 @@
 import json
 import logging
 from datetime import datetime, timedelta
-from typing import Optional, Dict, List, Any
+from typing import Optional, Dict, List, Any, Tuple
+from flask import current_app
+from flask_mail import Message
+from sqlalchemy import and_, insert
 from backend.extensions import db, mail, socketio
 from backend.models import Alert, User, AlertPreference
 from backend.utils.logger import logger
@@ -12,6 +15,9 @@ class AlertRegistry:
     Supports asynchronous delivery, priority-based queuing and multi-channel notification.
     """
 
+    BULK_CHUNK_SIZE = 1000     # users per prefetch query / flag update / email task
+    EMAIL_BATCH_SIZE = 100     # messages per SMTP session
+
     @staticmethod
     def register_alert(
         title: str,
@@ -53,6 +59,268 @@ class AlertRegistry:
             db.session.rollback()
             return None
 
+    @staticmethod
+    def register_alerts_bulk(
+        title: str,
+        message: str,
+        category: str,
+        user_ids: List[int],
+        priority: str = 'MEDIUM',
+        group_key: Optional[str] = None,
+        action_url: Optional[str] = None,
+        metadata: Optional[Dict] = None,
+        ttl_days: int = 30
+    ) -> Dict[str, Any]:
+        """
+        Registers the same alert for many users and delivers it per channel.
+
+        A thin wrapper over register_alerts_batch with one alert per unique
+        user id, so both entry points share the insert and delivery path.
+
+        Returns:
+            Summary with created alert ids and per-channel delivery counts
+        """
+        alert = {
+            'title': title,
+            'message': message,
+            'group_key': group_key,
+            'action_url': action_url,
+            'metadata': metadata
+        }
+        return AlertRegistry.register_alerts_batch(
+            [{**alert, 'user_id': uid} for uid in dict.fromkeys(user_ids) if uid is not None],
+            category=category,
+            priority=priority,
+            ttl_days=ttl_days
+        )
+
+    @staticmethod
+    def register_alerts_batch(
+        alerts: List[Dict[str, Any]],
+        category: str,
+        priority: str = 'MEDIUM',
+        ttl_days: int = 30
+    ) -> Dict[str, Any]:
+        """
+        Registers many per-user alerts of one category in bulk.
+
+        Each alert has its own user, title, message, group_key, action_url
+        and metadata. Recipients and their preferences for the category are
+        prefetched in one query per chunk and alerts are inserted with an
+        ordered multi-row INSERT ... RETURNING, so each socket emit carries
+        its alert's id. Emails go to a Celery task (see _deliver_emails) and
+        delivery flags take one UPDATE per channel.
+
+        Args:
+            alerts: Dicts with user_id, title and message, and optionally
+                group_key, action_url and metadata
+            category: Alert category shared by the batch
+            priority: Alert priority shared by the batch
+
+        Returns:
+            Summary with created alert ids and per-channel delivery counts
+        """
+        summary = {
+            'alerts_created': 0,
+            'skipped_by_priority': 0,
+            'unknown_users': 0,
+            'websocket_delivered': 0,
+            'email_delivered': 0,
+            'email_queued': 0,
+            'email_failed': 0,
+            'sms_delivered': 0,
+            'alert_ids': []
+        }
+        alerts = [a for a in alerts if a.get('user_id') is not None]
+        if not alerts:
+            return summary
+
+        try:
+            user_ids = list(dict.fromkeys(a['user_id'] for a in alerts))
+            recipients = {r['user_id']: r for r in AlertRegistry._prefetch_recipients(user_ids, category)}
+            summary['unknown_users'] = len(user_ids) - len(recipients)
+
+            weight = Alert.get_priority_weight(priority)
+            eligible = [
+                a for a in alerts if a['user_id'] in recipients and (
+                    not recipients[a['user_id']]['min_priority']
+                    or weight >= Alert.get_priority_weight(recipients[a['user_id']]['min_priority'])
+                )
+            ]
+            summary['skipped_by_priority'] = sum(1 for a in alerts if a['user_id'] in recipients) - len(eligible)
+            if not eligible:
+                return summary
+
+            now = datetime.utcnow()
+            expires_at = now + timedelta(days=ttl_days)
+            rows = [{
+                'user_id': a['user_id'],
+                'title': a['title'],
+                'message': a['message'],
+                'category': category,
+                'priority': priority,
+                'group_key': a.get('group_key'),
+                'action_url': a.get('action_url'),
+                'metadata_json': json.dumps(a['metadata']) if a.get('metadata') else None,
+                'expires_at': expires_at,
+                'created_at': now
+            } for a in eligible]
+
+            alert_ids = []
+            for start in range(0, len(rows), AlertRegistry.BULK_CHUNK_SIZE):
+                alert_ids.extend(db.session.execute(
+                    insert(Alert).returning(Alert.id, sort_by_parameter_order=True),
+                    rows[start:start + AlertRegistry.BULK_CHUNK_SIZE]
+                ).scalars().all())
+            db.session.commit()
+            summary['alerts_created'] = len(alert_ids)
+            summary['alert_ids'] = alert_ids
+        except Exception as e:
+            logger.error(f"Failed to register alert batch: {str(e)}", exc_info=True)
+            db.session.rollback()
+            return summary
+
+        websocket_delivered, email_targets, sms_ids = [], [], []
+        for alert_id, row in zip(alert_ids, rows):
+            recipient = recipients[row['user_id']]
+            if recipient['websocket_enabled'] is not False:
+                try:
+                    socketio.emit('new_alert', {
+                        'id': alert_id,
+                        'title': row['title'],
+                        'message': row['message'],
+                        'priority': priority,
+                        'category': category,
+                        'group_key': row['group_key'],
+                        'action_url': row['action_url'],
+                        'metadata': json.loads(row['metadata_json']) if row['metadata_json'] else {},
+                        'created_at': now.isoformat(),
+                        'expires_at': expires_at.isoformat()
+                    }, room=f"user_{row['user_id']}")
+                    websocket_delivered.append(alert_id)
+                except Exception as e:
+                    logger.error(f"WebSocket delivery failed for alert {alert_id}: {str(e)}")
+            if recipient['email_enabled'] is not False and recipient['email']:
+                email_targets.append((alert_id, recipient['email'], row['title'], row['message']))
+            if recipient['sms_enabled'] and recipient['phone']:
+                sms_ids.append(alert_id)
+
+        emailed, summary['email_queued'] = AlertRegistry._deliver_emails(email_targets)
+        delivered = {
+            'websocket_delivered': websocket_delivered,
+            'email_delivered': emailed,
+            'sms_delivered': sms_ids
+        }
+        if sms_ids:
+            logger.info(f"SMS alerts queued for {len(sms_ids)} {category} alerts")
+
+        try:
+            for column, ids in delivered.items():
+                AlertRegistry._mark_delivered(column, ids)
+                summary[column] = len(ids)
+            db.session.commit()
+        except Exception as e:
+            logger.error(f"Failed to record alert batch delivery: {str(e)}", exc_info=True)
+            db.session.rollback()
+
+        summary['email_failed'] = len(email_targets) - summary['email_delivered'] - summary['email_queued']
+        logger.info(
+            f"Registered {summary['alerts_created']} {category} alerts "
+            f"(ws={summary['websocket_delivered']}, email={summary['email_delivered']}, "
+            f"email queued={summary['email_queued']}, sms={summary['sms_delivered']})"
+        )
+        return summary
+
+    @staticmethod
+    def _prefetch_recipients(user_ids: List[int], category: str) -> List[Dict[str, Any]]:
+        """Loads users and their preference for category, one query per chunk."""
+        recipients = []
+        for start in range(0, len(user_ids), AlertRegistry.BULK_CHUNK_SIZE):
+            chunk = user_ids[start:start + AlertRegistry.BULK_CHUNK_SIZE]
+            rows = db.session.query(
+                User.id, User.email, User.phone,
+                AlertPreference.websocket_enabled,
+                AlertPreference.email_enabled,
+                AlertPreference.sms_enabled,
+                AlertPreference.min_priority
+            ).outerjoin(
+                AlertPreference,
+                and_(AlertPreference.user_id == User.id, AlertPreference.category == category)
+            ).filter(User.id.in_(chunk)).all()
+
+            seen = set()
+            for user_id, email, phone, ws, em, sms, min_priority in rows:
+                if user_id in seen:
+                    continue
+                seen.add(user_id)
+                recipients.append({
+                    'user_id': user_id,
+                    'email': email,
+                    'phone': phone,
+                    'websocket_enabled': ws,
+                    'email_enabled': em,
+                    'sms_enabled': sms,
+                    'min_priority': min_priority
+                })
+        return recipients
+
+    @staticmethod
+    def _mark_delivered(column: str, alert_ids: List[int]) -> None:
+        """Sets a delivery flag on many alerts, one UPDATE per chunk; does not commit."""
+        for start in range(0, len(alert_ids), AlertRegistry.BULK_CHUNK_SIZE):
+            Alert.query.filter(
+                Alert.id.in_(alert_ids[start:start + AlertRegistry.BULK_CHUNK_SIZE])
+            ).update({column: True}, synchronize_session=False)
+
+    @staticmethod
+    def _deliver_emails(emails: List[tuple]) -> Tuple[List[int], int]:
+        """
+        Hands (alert_id, email, title, message) emails to send_alert_emails_task,
+        one task per BULK_CHUNK_SIZE messages, so SMTP never runs in the caller.
+
+        Emails are sent inline when ALERT_EMAIL_ASYNC is off (the default
+        under TESTING) or for whatever could not be dispatched because the
+        broker is unreachable.
+
+        Returns:
+            (alert ids sent inline, number of emails queued)
+        """
+        if not emails:
+            return [], 0
+
+        queued = 0
+        if current_app.config.get('ALERT_EMAIL_ASYNC', not current_app.testing):
+            try:
+                from backend.tasks.alert_tasks import send_alert_emails_task
+                for start in range(0, len(emails), AlertRegistry.BULK_CHUNK_SIZE):
+                    chunk = emails[start:start + AlertRegistry.BULK_CHUNK_SIZE]
+                    send_alert_emails_task.apply_async(args=[[list(email) for email in chunk]], retry=False)
+                    queued += len(chunk)
+            except Exception as e:
+                logger.warning(f"Alert email task dispatch failed, sending {len(emails) - queued} inline: {str(e)}")
+        return AlertRegistry._send_emails(emails[queued:]), queued
+
+    @staticmethod
+    def _send_emails(emails: List[tuple]) -> List[Any]:
+        """
+        Sends (key, email, title, message) alert emails reusing one SMTP
+        connection per batch; returns the keys that were sent.
+        """
+        delivered = []
+        for start in range(0, len(emails), AlertRegistry.EMAIL_BATCH_SIZE):
+            chunk = emails[start:start + AlertRegistry.EMAIL_BATCH_SIZE]
+            try:
+                with mail.connect() as conn:
+                    for key, email, title, message in chunk:
+                        try:
+                            conn.send(Message(subject=f"AgriTech: {title}", recipients=[email], body=message))
+                            delivered.append(key)
+                        except Exception as e:
+                            logger.error(f"Email alert to {email} failed: {str(e)}")
+            except Exception as e:
+                logger.error(f"SMTP session for {len(chunk)} alert emails failed: {str(e)}")
+        return delivered
+
     @staticmethod
     def _dispatch_alert(alert: Alert):
         """
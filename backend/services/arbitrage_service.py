@@ -6,19 +6,33 @@ arbitrage trade vectors across borders, automatically opening trades when high c
 """
 
 from datetime import datetime, timedelta
+import json
 import math
+import random
+import numpy as np
+from sqlalchemy import insert
 from backend.extensions import db
 from backend.models.spatial_yield import SpatialYieldGrid, TemporalYieldForex, YieldPredictionConfidence
 from backend.models.arbitrage import ArbitrageOpportunity, AlgorithmicTradeRecord
 from backend.models.farm import Farm
 from backend.services.prophet_engine import CROP_YIELD_BASE_KG_PER_HA
+from backend.utils.spatial_index import geohash_center, haversine_km, wkt_centroid
 import logging
 import uuid
 
 logger = logging.getLogger(__name__)
 
 # Base Arbitrage Execution Threshold
-PROFIT_MARGIN_TRIGGER_PCT = 12.0 # Minimum 12% margin to execute algotrade
+PROFIT_MARGIN_TRIGGER_PCT = 12.0  # Minimum 12% margin to execute algotrade
+TRADE_VOLUME_KG = 20000.0
+INSERT_CHUNK_SIZE = 5000
+# Source x target cells per broadcast block (a few float64 matrices of this size are live at once)
+PAIR_BLOCK_ELEMENTS = 1_000_000
+
+BASE_PRICES_USD_PER_KG = {
+    'RICE': 0.60, 'MAIZE': 0.35, 'WHEAT': 0.45,
+    'COTTON': 1.80, 'SOYBEAN': 0.70, 'BARLEY': 0.50
+}
 
 class AlgorithmicArbitrageMatrix:
     
@@ -28,7 +42,7 @@ class AlgorithmicArbitrageMatrix:
         Uses Haversine spherical math to determine transport carbon+logistics cost precisely.
         Returns total USD logistics cost.
         """
-        R = 6371.0 # Earth radius in km
+        R = 6371.0  # Earth radius in km
         lat1, lon1 = math.radians(source_lat), math.radians(source_lng)
         lat2, lon2 = math.radians(dest_lat), math.radians(dest_lng)
         
@@ -48,97 +62,181 @@ class AlgorithmicArbitrageMatrix:
         return base_logistics + carbon_tax
         
     @staticmethod
-    def _estimate_dynamic_market_price(crop: str, grid: SpatialYieldGrid) -> float:
+    def _price_multiplier(accel):
         """
         Price is inversely proportional to yield density.
         High yield (oversupply) = Price Crash. Low yield (drought) = Price Hike.
-        Returns Price per KG in USD.
+        Works on scalars and NumPy arrays; NaN (no forecast) keeps the base price.
         """
-        base_prices = {
-            'RICE': 0.60, 'MAIZE': 0.35, 'WHEAT': 0.45,
-            'COTTON': 1.80, 'SOYBEAN': 0.70, 'BARLEY': 0.50
-        }
-        
-        base_p = base_prices.get(crop, 0.50)
+        accel = np.asarray(accel, dtype=np.float64)
+        return np.where(accel > 1.2, 0.75, np.where(accel < 0.8, 1.40, 1.0))
+
+    @staticmethod
+    def _estimate_dynamic_market_price(crop: str, grid: SpatialYieldGrid) -> float:
+        """
+        Price per KG in USD of one crop in one grid cell (see _price_multiplier).
+        """
+        base_p = BASE_PRICES_USD_PER_KG.get(crop, 0.50)
         
         forex = TemporalYieldForex.query.filter_by(grid_id=grid.id, crop_type=crop).first()
         if not forex:
             return base_p
-            
-        accel = forex.growth_acceleration_factor
+        return base_p * float(AlgorithmicArbitrageMatrix._price_multiplier(forex.growth_acceleration_factor))
+
+    @staticmethod
+    def _price_matrix(crops, grid_ids) -> np.ndarray:
+        """
+        crops x grids matrix of dynamic market prices, from one forecast query.
+        """
+        column = {grid_id: j for j, grid_id in enumerate(grid_ids)}
+        row = {crop: i for i, crop in enumerate(crops)}
+        accel = np.full((len(crops), len(grid_ids)), np.nan)
+        
+        forecasts = db.session.execute(
+            db.select(TemporalYieldForex.grid_id, TemporalYieldForex.crop_type,
+                      TemporalYieldForex.growth_acceleration_factor)
+            .where(TemporalYieldForex.crop_type.in_(crops))
+            .order_by(TemporalYieldForex.id.desc())
+        )
+        # Descending ids so the first forecast per (grid, crop) is written last, as .first() picked it
+        for grid_id, crop, factor in forecasts:
+            if grid_id in column and factor is not None:
+                accel[row[crop], column[grid_id]] = factor
         
-        if accel > 1.2:
-            return base_p * 0.75 # 25% discount due to bumper harvest oversupply
-        elif accel < 0.8:
-            return base_p * 1.40 # 40% premium due to scarcity and low yield risk
-        return base_p
+        base = np.array([BASE_PRICES_USD_PER_KG.get(crop, 0.50) for crop in crops])
+        return base[:, None] * AlgorithmicArbitrageMatrix._price_multiplier(accel)
+
+    @staticmethod
+    def _grid_centroids(grid_rows):
+        """
+        (lats, lons) of each grid's centroid: the mean of its WKT bounding box
+        vertices, else the center of its geohash region_id, else NaN.
+        """
+        lats = np.full(len(grid_rows), np.nan)
+        lons = np.full(len(grid_rows), np.nan)
+        for j, (_, region_id, wkt) in enumerate(grid_rows):
+            center = wkt_centroid(wkt) or geohash_center(region_id)
+            if center:
+                lats[j], lons[j] = center
+        return lats, lons
 
     @staticmethod
     def identify_arbitrage_vectors():
         """
         Scans all grids pairwise to find geographic arbitrage loops.
         Oversupplied Zone [Low Price] -> Undersupplied Zone [High Price]
+        
+        Prices come from a crops x grids matrix built once; freight costs from
+        a haversine distance matrix between grid centroids, computed in blocks
+        of source rows so thousands of cells fit in memory. Pairs already open
+        as IDENTIFIED are skipped and new opportunities are bulk-inserted.
         """
-        grids = SpatialYieldGrid.query.all()
-        if len(grids) < 2:
-            return # Insufficient grids to trade between
-            
-        stats = {'vectors_detected': 0, 'trades_executed': 0}
+        stats = {'vectors_detected': 0, 'trades_executed': 0, 'grids_scanned': 0, 'grids_without_location': 0}
+        
+        grid_rows = db.session.execute(
+            db.select(SpatialYieldGrid.id, SpatialYieldGrid.region_id, SpatialYieldGrid.bounding_box_wkt)
+            .order_by(SpatialYieldGrid.id)
+        ).all()
+        stats['grids_scanned'] = len(grid_rows)
+        if len(grid_rows) < 2:
+            return stats  # Insufficient grids to trade between
+        
+        crops = list(CROP_YIELD_BASE_KG_PER_HA.keys())
+        grid_ids = np.array([row[0] for row in grid_rows], dtype=np.int64)
+        n = len(grid_ids)
+        prices = AlgorithmicArbitrageMatrix._price_matrix(crops, grid_ids.tolist())
+        lats, lons = AlgorithmicArbitrageMatrix._grid_centroids(grid_rows)
+        located = ~np.isnan(lats)
+        stats['grids_without_location'] = int(n - located.sum())
         
-        for crop in CROP_YIELD_BASE_KG_PER_HA.keys():
-            # Pairwise scan O(N^2), but N is small regional cells
-            for source_grid in grids:
-                source_price = AlgorithmicArbitrageMatrix._estimate_dynamic_market_price(crop, source_grid)
+        # Open opportunities as (crop, source, target) keys encoded into one integer
+        position = {int(grid_id): j for j, grid_id in enumerate(grid_ids)}
+        crop_index = {crop: i for i, crop in enumerate(crops)}
+        existing = np.array([
+            (crop_index[crop] * n + position[source]) * n + position[target]
+            for crop, source, target in db.session.execute(
+                db.select(ArbitrageOpportunity.commodity_type, ArbitrageOpportunity.source_grid_id,
+                          ArbitrageOpportunity.target_grid_id)
+                .where(ArbitrageOpportunity.status == 'IDENTIFIED')
+            )
+            if crop in crop_index and source in position and target in position
+        ], dtype=np.int64)
+        
+        # Try a default cargo size (20 Tons)
+        trade_volume_kg = TRADE_VOLUME_KG
+        truckloads = math.ceil(trade_volume_kg / 25000.0)
+        
+        now = datetime.utcnow()
+        expires_at = now + timedelta(hours=48)
+        rows, auto_execute = [], []
+        block = max(1, PAIR_BLOCK_ELEMENTS // n)
+        for start in range(0, n, block):
+            sources = np.arange(start, min(start + block, n))
+            distance_km = haversine_km(lats[sources][:, None], lons[sources][:, None], lats[None, :], lons[None, :])
+            # Same cost model as calculate_freight_logistics_cost
+            logistics_usd = distance_km * 0.15 * truckloads + truckloads * 20.0
+            tradable = located[sources][:, None] & located[None, :]
+            tradable[np.arange(len(sources)), sources] = False
+            
+            for c, crop in enumerate(crops):
+                source_price = prices[c, sources][:, None]
+                target_price = prices[c][None, :]
+                cogs = source_price * trade_volume_kg + logistics_usd
+                net_profit = target_price * trade_volume_kg - cogs
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    margin_pct = np.where(cogs > 0, net_profit / cogs * 100.0, 0.0)
                 
-                for target_grid in grids:
-                    if source_grid.id == target_grid.id: continue
-                    
-                    target_price = AlgorithmicArbitrageMatrix._estimate_dynamic_market_price(crop, target_grid)
-                    
-                    if target_price > source_price:
-                        # Price is higher at target -> Potential Arbitrage
-                        # Try a default cargo size (20 Tons)
-                        trade_volume_kg = 20000.0 
-                        
-                        # Mock distance based on random coordinates since WKT parsing is complex here
-                        s_lat, s_lng = random.uniform(-90,90), random.uniform(-180,180)
-                        t_lat, t_lng = random.uniform(-90,90), random.uniform(-180,180)
-                        
-                        logistics_usd = AlgorithmicArbitrageMatrix.calculate_freight_logistics_cost(
-                            s_lat, s_lng, t_lat, t_lng, trade_volume_kg
-                        )
-                        
-                        cogs = (source_price * trade_volume_kg) + logistics_usd
-                        revenue = target_price * trade_volume_kg
-                        net_profit = revenue - cogs
-                        margin_pct = (net_profit / cogs) * 100.0 if cogs > 0 else 0
-                        
-                        if margin_pct >= PROFIT_MARGIN_TRIGGER_PCT:
-                            # Lucrative! Log Opportunity.
-                            opp = ArbitrageOpportunity.query.filter_by(
-                                commodity_type=crop, source_grid_id=source_grid.id, target_grid_id=target_grid.id, status='IDENTIFIED'
-                            ).first()
-                            
-                            if not opp:
-                                opp = ArbitrageOpportunity(
-                                    commodity_type=crop,
-                                    source_grid_id=source_grid.id,
-                                    source_price_per_kg=source_price,
-                                    target_grid_id=target_grid.id,
-                                    target_price_per_kg=target_price,
-                                    estimated_transport_cost_usd=logistics_usd,
-                                    gross_margin_pct=round(margin_pct, 2),
-                                    net_arbitrage_profit=round(net_profit, 2),
-                                    confidence_score=0.88,
-                                    expires_at=datetime.utcnow() + timedelta(hours=48)
-                                )
-                                db.session.add(opp)
-                                stats['vectors_detected'] += 1
-                                
-                                # Auto-Execute the trade if margin > 25% (L3 Autonomous Action)
-                                if margin_pct > 25.0:
-                                    AlgorithmicArbitrageMatrix._execute_trade(opp, trade_volume_kg)
-                                    stats['trades_executed'] += 1
+                hits = tradable & (target_price > source_price) & (margin_pct >= PROFIT_MARGIN_TRIGGER_PCT)
+                s_pos, t_pos = np.nonzero(hits)
+                if not len(s_pos):
+                    continue
+                s_idx = sources[s_pos]
+                keys = (c * n + s_idx) * n + t_pos
+                fresh = ~np.isin(keys, existing)
+                s_pos, t_pos, s_idx = s_pos[fresh], t_pos[fresh], s_idx[fresh]
+                
+                for sp, tp, si, margin, profit, freight in zip(
+                    s_pos.tolist(), t_pos.tolist(), s_idx.tolist(),
+                    margin_pct[s_pos, t_pos].tolist(), net_profit[s_pos, t_pos].tolist(),
+                    logistics_usd[s_pos, t_pos].tolist()
+                ):
+                    row = {
+                        'commodity_type': crop,
+                        'source_grid_id': int(grid_ids[si]),
+                        'source_price_per_kg': float(prices[c, si]),
+                        'target_grid_id': int(grid_ids[tp]),
+                        'target_price_per_kg': float(prices[c, tp]),
+                        'estimated_transport_cost_usd': freight,
+                        'gross_margin_pct': round(margin, 2),
+                        'net_arbitrage_profit': round(profit, 2),
+                        'confidence_score': 0.88,
+                        'status': 'IDENTIFIED',
+                        'discovered_at': now,
+                        'expires_at': expires_at
+                    }
+                    # Auto-Execute the trade if margin > 25% (L3 Autonomous Action)
+                    (auto_execute if margin > 25.0 else rows).append(row)
+        
+        for start in range(0, len(rows), INSERT_CHUNK_SIZE):
+            db.session.execute(insert(ArbitrageOpportunity), rows[start:start + INSERT_CHUNK_SIZE])
+        executed_ids = []
+        for start in range(0, len(auto_execute), INSERT_CHUNK_SIZE):
+            executed_ids.extend(db.session.execute(
+                insert(ArbitrageOpportunity).returning(ArbitrageOpportunity.id),
+                auto_execute[start:start + INSERT_CHUNK_SIZE]
+            ).scalars().all())
+        stats['vectors_detected'] = len(rows) + len(auto_execute)
+        
+        # Trades link the opportunity by id, so those rows are loaded back as objects
+        executed_ids.sort()
+        for start in range(0, len(executed_ids), INSERT_CHUNK_SIZE):
+            chunk = executed_ids[start:start + INSERT_CHUNK_SIZE]
+            opportunities = ArbitrageOpportunity.query.filter(
+                ArbitrageOpportunity.id.in_(chunk)
+            ).order_by(ArbitrageOpportunity.id).all()
+            for opp in opportunities:
+                AlgorithmicArbitrageMatrix._execute_trade(opp, trade_volume_kg)
+                stats['trades_executed'] += 1
 
         db.session.commit()
         return stats
@@ -151,7 +249,7 @@ class AlgorithmicArbitrageMatrix:
         opportunity.status = 'EXECUTING'
         
         # In reality, slippage happens during order routing
-        slippage = random.uniform(0.01, 0.05) # 1-5% slippage on margin
+        slippage = random.uniform(0.01, 0.05)  # 1-5% slippage on margin
         realized_profit = opportunity.net_arbitrage_profit * (1 - slippage)
 
         # Build ledger
@@ -172,7 +270,7 @@ class AlgorithmicArbitrageMatrix:
         # Execute Transaction
         txn = LedgerTransaction(
             transaction_id=f"ARB-{uuid.uuid4().hex[:8]}",
-            transaction_type=TransactionType.ARBITRAGE_EXECUTION, # Will inject this later
+            transaction_type=TransactionType.ARBITRAGE_EXECUTION,
             source_type='arbitrage_engine',
             source_id=opportunity.id,
             description=f"Auto-executed {opportunity.commodity_type} spread. Vol: {volume_kg}kg. Margin: {opportunity.gross_margin_pct}%",
@@ -213,7 +311,9 @@ class AlgorithmicArbitrageMatrix:
             is_financial=True,
             financial_impact=realized_profit,
             autonomous_decision_flag=True,
-            details=f"Autonomous bot executed trade pair {opportunity.source_grid_id}->{opportunity.target_grid_id}"
+            meta_data=json.dumps({
+                'details': f"Autonomous bot executed trade pair {opportunity.source_grid_id}->{opportunity.target_grid_id}"
+            })
         ))
         
         logger.info(f"💰 🚀  [AgriTech AI] Arbitrage Trade Executed! ${realized_profit:.2f} profit booked. Margin: {opportunity.gross_margin_pct}%")
@@ -0,0 +1,290 @@
+"""
+Audit Pipeline: Non-blocking audit log persistence.
+
+This module provides:
+- A bounded in-process queue of AuditLog rows
+- A background writer that drains the queue with bulk inserts
+- Sliding-window counters used by threat detection instead of COUNT queries
+- Backpressure metrics and a flush on interpreter shutdown
+"""
+
+from collections import deque
+from typing import Dict, List, Optional
+import atexit
+import queue
+import threading
+import time
+import logging
+
+from backend.extensions import db
+from backend.models import AuditLog
+
+logger = logging.getLogger(__name__)
+
+
+class SlidingWindowCounter:
+    """
+    Per-key event timestamps kept for a fixed window.
+
+    Counts are process-local: each worker sees the events it handled, which
+    is what the threat heuristics need to spot bursts cheaply.
+    """
+
+    MAX_EVENTS_PER_KEY = 1000
+
+    def __init__(self, window_seconds: float):
+        self.window_seconds = window_seconds
+        self._events: Dict[tuple, deque] = {}
+        self._lock = threading.Lock()
+        self._last_sweep = time.monotonic()
+
+    def hit(self, key: tuple, now: Optional[float] = None) -> int:
+        """
+        Record an event for key.
+
+        Returns:
+            Number of earlier events for key still inside the window
+        """
+        now = time.monotonic() if now is None else now
+        cutoff = now - self.window_seconds
+
+        with self._lock:
+            events = self._events.get(key)
+            if events is None:
+                events = self._events[key] = deque(maxlen=self.MAX_EVENTS_PER_KEY)
+            while events and events[0] <= cutoff:
+                events.popleft()
+            previous = len(events)
+            events.append(now)
+
+            if now - self._last_sweep > self.window_seconds:
+                self._sweep(cutoff)
+                self._last_sweep = now
+
+        return previous
+
+    def _sweep(self, cutoff: float) -> None:
+        """Drop keys whose newest event has left the window."""
+        stale = [key for key, events in self._events.items() if not events or events[-1] <= cutoff]
+        for key in stale:
+            del self._events[key]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._events.clear()
+
+
+class AuditWriter:
+    """
+    Background writer for audit rows.
+
+    Rows are queued as AuditLog column mappings and written in batches of up
+    to BATCH_SIZE with one bulk insert per batch. When the queue is full the
+    producer waits up to ENQUEUE_TIMEOUT_SECONDS; after that high-risk rows
+    are written synchronously and everything else is dropped and counted.
+    """
+
+    QUEUE_SIZE = 10000
+    BATCH_SIZE = 500
+    IDLE_WAIT_SECONDS = 1.0
+    ENQUEUE_TIMEOUT_SECONDS = 0.05
+    SYNC_FALLBACK_RISK_LEVELS = ('HIGH', 'CRITICAL')
+
+    _queue: queue.Queue = queue.Queue(maxsize=QUEUE_SIZE)
+    _lock = threading.Lock()
+    _write_lock = threading.Lock()
+    _app = None
+    _thread: Optional[threading.Thread] = None
+    _stop = threading.Event()
+    _exit_registered = False
+    _stats = {
+        'enqueued': 0,
+        'written': 0,
+        'dropped': 0,
+        'sync_fallbacks': 0,
+        'batches': 0,
+        'failed_batches': 0,
+        'failed_rows': 0,
+        'queue_high_water': 0,
+        'last_batch_size': 0,
+        'last_batch_ms': 0.0
+    }
+
+    @classmethod
+    def start(cls, app) -> None:
+        """Start the writer thread for app (idempotent)."""
+        with cls._lock:
+            cls._app = app
+            if cls._thread is not None and cls._thread.is_alive():
+                return
+            cls._stop.clear()
+            cls._thread = threading.Thread(target=cls._run, name='audit-writer', daemon=True)
+            cls._thread.start()
+            if not cls._exit_registered:
+                atexit.register(cls.shutdown)
+                cls._exit_registered = True
+
+    @classmethod
+    def enqueue(cls, row: Dict) -> bool:
+        """
+        Queue one AuditLog mapping without touching the database.
+
+        Returns:
+            True if the row was queued or written, False if it was dropped
+        """
+        if cls._thread is None or not cls._thread.is_alive():
+            try:
+                from flask import current_app
+                cls.start(current_app._get_current_object())
+            except RuntimeError:
+                return cls._write_sync(row)
+
+        try:
+            cls._queue.put(row, timeout=cls.ENQUEUE_TIMEOUT_SECONDS)
+        except queue.Full:
+            if row.get('risk_level') in cls.SYNC_FALLBACK_RISK_LEVELS or row.get('threat_flag'):
+                with cls._lock:
+                    cls._stats['sync_fallbacks'] += 1
+                return cls._write_sync(row)
+
+            with cls._lock:
+                cls._stats['dropped'] += 1
+                dropped = cls._stats['dropped']
+            if dropped == 1 or dropped % 1000 == 0:
+                logger.warning(f"Audit queue full, {dropped} audit rows dropped so far")
+            return False
+
+        with cls._lock:
+            cls._stats['enqueued'] += 1
+            depth = cls._queue.qsize()
+            if depth > cls._stats['queue_high_water']:
+                cls._stats['queue_high_water'] = depth
+        return True
+
+    @classmethod
+    def _drain(cls, first: Optional[Dict] = None) -> List[Dict]:
+        batch = [first] if first is not None else []
+        while len(batch) < cls.BATCH_SIZE:
+            try:
+                batch.append(cls._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    @classmethod
+    def _run(cls) -> None:
+        while not cls._stop.is_set():
+            try:
+                first = cls._queue.get(timeout=cls.IDLE_WAIT_SECONDS)
+            except queue.Empty:
+                continue
+            batch = cls._drain(first)
+            try:
+                with cls._app.app_context():
+                    cls._write_batch(batch)
+                    db.session.remove()
+            except Exception as e:
+                logger.error(f"Audit writer failed to open app context: {e}")
+
+    @classmethod
+    def _write_batch(cls, batch: List[Dict]) -> int:
+        """
+        Bulk insert one batch and commit; failures are counted, not raised.
+
+        If the bulk insert fails, the rows are inserted one by one so a
+        single bad row only loses itself.
+        """
+        if not batch:
+            return 0
+
+        started = time.perf_counter()
+        with cls._write_lock:
+            try:
+                db.session.bulk_insert_mappings(AuditLog, batch)
+                db.session.commit()
+                written = len(batch)
+            except Exception as e:
+                db.session.rollback()
+                with cls._lock:
+                    cls._stats['failed_batches'] += 1
+                logger.warning(f"Audit batch of {len(batch)} rows failed, retrying row by row: {e}")
+                written = cls._write_rows(batch)
+
+        with cls._lock:
+            cls._stats['written'] += written
+            cls._stats['batches'] += 1
+            cls._stats['last_batch_size'] = len(batch)
+            cls._stats['last_batch_ms'] = round((time.perf_counter() - started) * 1000, 2)
+        return written
+
+    @classmethod
+    def _write_rows(cls, batch: List[Dict]) -> int:
+        """Insert rows one at a time; call with _write_lock held."""
+        written = 0
+        for row in batch:
+            try:
+                db.session.bulk_insert_mappings(AuditLog, [row])
+                db.session.commit()
+                written += 1
+            except Exception as e:
+                db.session.rollback()
+                with cls._lock:
+                    cls._stats['failed_rows'] += 1
+                logger.error(f"Audit row for action {row.get('action')!r} failed: {e}")
+        return written
+
+    @classmethod
+    def _write_sync(cls, row: Dict) -> bool:
+        """Write a single row on the caller's session (no writer available)."""
+        try:
+            db.session.add(AuditLog(**row))
+            db.session.commit()
+            with cls._lock:
+                cls._stats['written'] += 1
+            return True
+        except Exception as e:
+            db.session.rollback()
+            with cls._lock:
+                cls._stats['failed_rows'] += 1
+            logger.error(f"Synchronous audit write failed: {e}")
+            return False
+
+    @classmethod
+    def flush(cls) -> int:
+        """
+        Write everything currently queued from the calling thread.
+
+        Requires an app context. Returns the number of rows written.
+        """
+        written = 0
+        while True:
+            batch = cls._drain()
+            if not batch:
+                return written
+            written += cls._write_batch(batch)
+
+    @classmethod
+    def shutdown(cls, timeout: float = 10.0) -> int:
+        """Stop the writer thread and flush whatever is still queued."""
+        cls._stop.set()
+        thread = cls._thread
+        if thread is not None and thread.is_alive():
+            thread.join(timeout)
+
+        if cls._app is None or cls._queue.empty():
+            return 0
+
+        with cls._app.app_context():
+            written = cls.flush()
+        logger.info(f"Audit writer flushed {written} rows on shutdown")
+        return written
+
+    @classmethod
+    def stats(cls) -> Dict:
+        with cls._lock:
+            return {
+                **cls._stats,
+                'queue_depth': cls._queue.qsize(),
+                'queue_capacity': cls.QUEUE_SIZE,
+                'writer_alive': cls._thread is not None and cls._thread.is_alive()
+            }
@@ -1,10 +1,11 @@
 import json
 import logging
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any, List
-from flask import request, g
+from typing import Optional, Dict, Any, List, Tuple
+from flask import request, g, has_request_context
 from backend.extensions import db
 from backend.models import AuditLog, UserSession, User
+from backend.services.audit_pipeline import AuditWriter, SlidingWindowCounter
 from backend.utils.logger import logger
 
 class AuditService:
@@ -13,6 +14,12 @@ class AuditService:
     Includes threat detection and session management logic.
     """
 
+    SENSITIVE_ACTIONS = ('DELETE_USER', 'EXPORT_DATA', 'CHANGE_PERMISSIONS')
+
+    # Sliding windows replacing per-request COUNT queries over AuditLog
+    _sensitive_action_window = SlidingWindowCounter(window_seconds=5 * 60)
+    _failed_login_window = SlidingWindowCounter(window_seconds=15 * 60)
+
     @staticmethod
     def log_action(
         action: str,
@@ -28,53 +35,17 @@ class AuditService:
         Extracts request context and persists an audit entry.
         """
         try:
-            # Capture request context if available
-            ip_address = request.remote_addr if request else None
-            user_agent = request.user_agent.string if request and request.user_agent else None
-            method = request.method if request else None
-            url = request.url if request else None
-            
-            # Use g.user if user_id is not provided
-            if not user_id and hasattr(g, 'user') and g.user:
-                user_id = g.user.id
-
-            # Threat detection logic
-            is_threat, threat_reason = AuditService._detect_threat(action, user_id, ip_address, url)
-            if is_threat:
-                risk_level = 'CRITICAL'
-                if not meta_data: meta_data = {}
-                meta_data['threat_reason'] = threat_reason
-
-            log = AuditLog(
-                user_id=user_id,
-                action=action,
-                resource_type=resource_type,
-                resource_id=resource_id,
-                old_values=json.dumps(old_values) if old_values else None,
-                new_values=json.dumps(new_values) if new_values else None,
-                ip_address=ip_address,
-                user_agent=user_agent,
-                method=method,
-                url=url,
-                risk_level=risk_level,
-                threat_flag=is_threat,
-                meta_data=json.dumps(meta_data) if meta_data else None
+            row, threat_reason = AuditService._build_entry(
+                action, user_id, resource_type, resource_id,
+                old_values, new_values, meta_data, risk_level
             )
 
+            log = AuditLog(**row)
             db.session.add(log)
             db.session.commit()
             
-            if is_threat:
-                logger.warning(f"SECURITY THREAT DETECTED: {threat_reason} | Action: {action} | User: {user_id}")
-                # Potentially trigger an alert via CUNAR here
-                from backend.services.alert_registry import AlertRegistry
-                AlertRegistry.register_alert(
-                    title="Security Threat Detected",
-                    message=f"Suspicious activity: {threat_reason} for action '{action}'",
-                    category="SECURITY",
-                    priority="CRITICAL",
-                    user_id=None # Admin broadcast
-                )
+            if threat_reason:
+                AuditService._raise_threat_alert(action, row['user_id'], threat_reason)
 
             return log
         except Exception as e:
@@ -82,18 +53,100 @@ class AuditService:
             db.session.rollback()
             return None
 
+    @staticmethod
+    def enqueue_action(
+        action: str,
+        user_id: Optional[int] = None,
+        resource_type: Optional[str] = None,
+        resource_id: Optional[str] = None,
+        old_values: Optional[Dict] = None,
+        new_values: Optional[Dict] = None,
+        meta_data: Optional[Dict] = None,
+        risk_level: str = 'LOW'
+    ) -> bool:
+        """
+        Same as log_action, but hands the entry to the background AuditWriter
+        instead of committing inside the request.
+
+        Returns:
+            True if the entry was queued (or written), False if it was dropped
+        """
+        try:
+            row, threat_reason = AuditService._build_entry(
+                action, user_id, resource_type, resource_id,
+                old_values, new_values, meta_data, risk_level
+            )
+            queued = AuditWriter.enqueue(row)
+
+            if threat_reason:
+                AuditService._raise_threat_alert(action, row['user_id'], threat_reason)
+
+            return queued
+        except Exception as e:
+            logger.error(f"Audit enqueue failed: {str(e)}", exc_info=True)
+            return False
+
+    @staticmethod
+    def _build_entry(action, user_id, resource_type, resource_id,
+                     old_values, new_values, meta_data, risk_level) -> Tuple[Dict, str]:
+        """Builds an AuditLog column mapping from the request context."""
+        # Capture request context if available
+        in_request = has_request_context()
+        ip_address = request.remote_addr if in_request else None
+        user_agent = request.user_agent.string if in_request and request.user_agent else None
+        method = request.method if in_request else None
+        url = request.url if in_request else None
+        
+        # Use g.user if user_id is not provided
+        if not user_id and in_request and hasattr(g, 'user') and g.user:
+            user_id = g.user.id
+
+        # Threat detection logic
+        is_threat, threat_reason = AuditService._detect_threat(action, user_id, ip_address, url)
+        if is_threat:
+            risk_level = 'CRITICAL'
+            if not meta_data: meta_data = {}
+            meta_data['threat_reason'] = threat_reason
+
+        row = {
+            'user_id': user_id,
+            'action': action,
+            'resource_type': resource_type,
+            'resource_id': resource_id,
+            'old_values': json.dumps(old_values) if old_values else None,
+            'new_values': json.dumps(new_values) if new_values else None,
+            'ip_address': ip_address,
+            'user_agent': user_agent,
+            'method': method,
+            'url': url,
+            'risk_level': risk_level,
+            'threat_flag': is_threat,
+            'meta_data': json.dumps(meta_data) if meta_data else None,
+            'timestamp': datetime.utcnow()
+        }
+        return row, threat_reason if is_threat else ''
+
+    @staticmethod
+    def _raise_threat_alert(action: str, user_id: Optional[int], threat_reason: str):
+        logger.warning(f"SECURITY THREAT DETECTED: {threat_reason} | Action: {action} | User: {user_id}")
+        # Potentially trigger an alert via CUNAR here
+        from backend.services.alert_registry import AlertRegistry
+        AlertRegistry.register_alert(
+            title="Security Threat Detected",
+            message=f"Suspicious activity: {threat_reason} for action '{action}'",
+            category="SECURITY",
+            priority="CRITICAL",
+            user_id=None # Admin broadcast
+        )
+
     @staticmethod
     def _detect_threat(action: str, user_id: Optional[int], ip: str, url: str) -> (bool, str):
         """
         Internal heuristic for detecting suspicious patterns.
         """
         # 1. Check for rapid sequence of sensitive actions
-        if action in ['DELETE_USER', 'EXPORT_DATA', 'CHANGE_PERMISSIONS']:
-            recent_count = AuditLog.query.filter(
-                AuditLog.user_id == user_id,
-                AuditLog.action == action,
-                AuditLog.timestamp >= datetime.utcnow() - timedelta(minutes=5)
-            ).count()
+        if action in AuditService.SENSITIVE_ACTIONS:
+            recent_count = AuditService._sensitive_action_window.hit((user_id, action))
             if recent_count > 5:
                 return True, "Potential automated bulk sensitive operation"
 
@@ -103,11 +156,7 @@ class AuditService:
 
         # 3. Check for multiple failed logins from same IP
         if action == 'LOGIN_FAILED':
-            recent_fails = AuditLog.query.filter(
-                AuditLog.ip_address == ip,
-                AuditLog.action == 'LOGIN_FAILED',
-                AuditLog.timestamp >= datetime.utcnow() - timedelta(minutes=15)
-            ).count()
+            recent_fails = AuditService._failed_login_window.hit((ip,))
             if recent_fails > 10:
                 return True, "Brute force login attempt suspected"
 
@@ -0,0 +1,335 @@
+"""
+Cost Basis Service: Lot-level cost basis for vault currency positions.
+
+This service handles:
+- Opening acquisition lots on deposit
+- Consuming lots on withdrawal (FIFO, LIFO, HIFO, specific identification
+  or weighted average)
+- Carrying lots across vault transfers
+- Realized-gain totals over date ranges from the disposal index
+"""
+
+from datetime import datetime
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Dict, List, Optional
+import logging
+
+from flask import current_app
+from sqlalchemy import func
+
+from backend.extensions import db
+from backend.models.ledger import VaultCurrencyPosition, CostBasisLot, CostBasisDisposal
+from backend.utils.financial_math import Lot, LotBook
+
+logger = logging.getLogger(__name__)
+
+
+class CostBasisService:
+    """Service for per-position acquisition lots and realized gains."""
+
+    # AVERAGE keeps the weighted average rate on the position as the cost of
+    # every sale (lots are still drawn FIFO so quantities stay accurate)
+    METHODS = ('AVERAGE', 'FIFO', 'LIFO', 'HIFO', 'SPECIFIC')
+    DEFAULT_METHOD = 'AVERAGE'
+
+    # Open lots fetched per query while consuming
+    LOT_PAGE_SIZE = 100
+
+    PRECISION = Decimal('0.000001')
+
+    @staticmethod
+    def open_lot(
+        position: VaultCurrencyPosition,
+        amount: Decimal,
+        rate: Decimal,
+        acquired_at: datetime = None,
+        reference: str = None
+    ) -> CostBasisLot:
+        """
+        Open an acquisition lot. The caller commits.
+
+        Args:
+            position: Position receiving the amount
+            amount: Amount acquired
+            rate: Acquisition rate to the vault base currency
+            acquired_at: Acquisition time (defaults to now)
+            reference: External reference or ledger transaction ID
+
+        Returns:
+            The new lot
+        """
+        amount = Decimal(str(amount))
+        lot = CostBasisLot(
+            position_id=position.id,
+            acquired_at=acquired_at or datetime.utcnow(),
+            amount=amount,
+            remaining_amount=amount,
+            rate=Decimal(str(rate)),
+            reference=reference
+        )
+        db.session.add(lot)
+        db.session.flush()
+        return lot
+
+    @staticmethod
+    def dispose(
+        position: VaultCurrencyPosition,
+        amount: Decimal,
+        proceeds_rate: Decimal,
+        method: str = None,
+        lot_ids: List[int] = None,
+        disposed_at: datetime = None,
+        reference: str = None
+    ) -> Dict:
+        """
+        Consume lots for a sale and record the realized gain. The caller commits.
+
+        Only the lots that are actually touched are read: open lots are
+        fetched a page at a time in method order from the open-lot index.
+        Any amount not covered by lots (balances that predate lot tracking)
+        is costed at the position's weighted average rate.
+
+        Args:
+            position: Position being sold from
+            amount: Amount sold
+            proceeds_rate: Sale rate to the vault base currency
+            method: Cost basis method (defaults to VAULT_COST_BASIS_METHOD)
+            lot_ids: Lots to sell, in order (SPECIFIC only)
+            disposed_at: Disposal time (defaults to now)
+            reference: External reference
+
+        Returns:
+            Dict with method, cost_basis, proceeds, realized_gain and the
+            consumed lots
+
+        Raises:
+            ValueError: For an unknown method or unusable lot_ids
+        """
+        method = CostBasisService.resolve_method(method)
+        amount = Decimal(str(amount))
+        proceeds_rate = Decimal(str(proceeds_rate))
+        disposed_at = disposed_at or datetime.utcnow()
+        average_rate = Decimal(str(position.cost_basis_rate)) if position.cost_basis_rate else None
+
+        if method == 'SPECIFIC':
+            lots = CostBasisService._specific_lots(position, lot_ids, amount)
+        else:
+            lots = CostBasisService._iter_open_lots(position, method)
+
+        consumed = []
+        outstanding = amount
+        for lot in lots:
+            remaining = Decimal(str(lot.remaining_amount))
+            take = min(remaining, outstanding)
+            lot.remaining_amount = remaining - take
+            lot.is_closed = lot.remaining_amount <= 0
+            outstanding -= take
+
+            cost_rate = average_rate if method == 'AVERAGE' and average_rate else Decimal(str(lot.rate))
+            consumed.append((lot.id, take, cost_rate))
+            if outstanding <= 0:
+                break
+
+        if outstanding > 0:
+            consumed.append((None, outstanding, average_rate or proceeds_rate))
+
+        disposals = []
+        cost_basis = Decimal('0')
+        for lot_id, take, cost_rate in consumed:
+            gain = (take * (proceeds_rate - cost_rate)).quantize(
+                CostBasisService.PRECISION, rounding=ROUND_HALF_UP
+            )
+            cost_basis += take * cost_rate
+            disposals.append(CostBasisDisposal(
+                position_id=position.id,
+                lot_id=lot_id,
+                disposed_at=disposed_at,
+                amount=take,
+                cost_rate=cost_rate,
+                proceeds_rate=proceeds_rate,
+                realized_gain=gain,
+                method=method,
+                reference=reference
+            ))
+        db.session.add_all(disposals)
+        db.session.flush()
+
+        cost_basis = cost_basis.quantize(CostBasisService.PRECISION, rounding=ROUND_HALF_UP)
+        proceeds = (amount * proceeds_rate).quantize(CostBasisService.PRECISION, rounding=ROUND_HALF_UP)
+
+        return {
+            'method': method,
+            'amount': amount,
+            'cost_basis': cost_basis,
+            'proceeds': proceeds,
+            'realized_gain': sum((d.realized_gain for d in disposals), Decimal('0')),
+            'unlotted_amount': outstanding,
+            'lots': [
+                {'lot_id': lot_id, 'amount': float(take), 'cost_rate': float(cost_rate)}
+                for lot_id, take, cost_rate in consumed if lot_id is not None
+            ]
+        }
+
+    @staticmethod
+    def transfer_lots(
+        source: VaultCurrencyPosition,
+        dest: Optional[VaultCurrencyPosition],
+        amount: Decimal,
+        rate: Decimal = None,
+        method: str = None
+    ) -> int:
+        """
+        Move lots between positions without realizing a gain. The caller commits.
+
+        Lots keep their acquisition time; they also keep their rate unless
+        ``rate`` is given (vaults with different base currencies). With no
+        ``dest`` (the currency is the destination's base currency) the source
+        lots are only drawn down.
+
+        Returns:
+            Number of lots opened on the destination
+        """
+        method = CostBasisService.resolve_method(method)
+        if method in ('AVERAGE', 'SPECIFIC'):
+            method = 'FIFO'
+
+        outstanding = Decimal(str(amount))
+        moved = []
+        for lot in CostBasisService._iter_open_lots(source, method):
+            remaining = Decimal(str(lot.remaining_amount))
+            take = min(remaining, outstanding)
+            lot.remaining_amount = remaining - take
+            lot.is_closed = lot.remaining_amount <= 0
+            outstanding -= take
+            if dest is not None:
+                moved.append(CostBasisLot(
+                    position_id=dest.id,
+                    acquired_at=lot.acquired_at,
+                    amount=take,
+                    remaining_amount=take,
+                    rate=Decimal(str(rate)) if rate is not None else lot.rate,
+                    reference=lot.reference
+                ))
+            if outstanding <= 0:
+                break
+
+        if dest is None:
+            db.session.flush()
+            return 0
+
+        if outstanding > 0:
+            fallback = rate or source.cost_basis_rate
+            if fallback is not None:
+                moved.append(CostBasisLot(
+                    position_id=dest.id,
+                    amount=outstanding,
+                    remaining_amount=outstanding,
+                    rate=Decimal(str(fallback))
+                ))
+
+        db.session.add_all(moved)
+        db.session.flush()
+        return len(moved)
+
+    @staticmethod
+    def get_open_lots(position: VaultCurrencyPosition) -> List[CostBasisLot]:
+        """Open lots of a position in acquisition order."""
+        return CostBasisLot.query.filter_by(
+            position_id=position.id, is_closed=False
+        ).order_by(CostBasisLot.acquired_at, CostBasisLot.id).all()
+
+    @staticmethod
+    def load_book(position: VaultCurrencyPosition) -> LotBook:
+        """In-memory LotBook of a position's open lots, for what-if calculations."""
+        return LotBook([
+            Lot(lot.id, Decimal(str(lot.amount)), Decimal(str(lot.rate)), lot.acquired_at,
+                remaining=Decimal(str(lot.remaining_amount)))
+            for lot in CostBasisService.get_open_lots(position)
+        ])
+
+    @staticmethod
+    def realized_gain(
+        position_ids: List[int],
+        start: datetime = None,
+        end: datetime = None
+    ) -> Dict[int, Decimal]:
+        """
+        Realized gain per position for disposals in [start, end].
+
+        One grouped aggregate over the (position_id, disposed_at) index.
+
+        Returns:
+            Dict of position_id -> realized gain (positions without
+            disposals in the range are omitted)
+        """
+        query = db.session.query(
+            CostBasisDisposal.position_id,
+            func.sum(CostBasisDisposal.realized_gain)
+        ).filter(CostBasisDisposal.position_id.in_(position_ids))
+
+        if start:
+            query = query.filter(CostBasisDisposal.disposed_at >= start)
+        if end:
+            query = query.filter(CostBasisDisposal.disposed_at <= end)
+
+        return {
+            position_id: Decimal(str(total))
+            for position_id, total in query.group_by(CostBasisDisposal.position_id)
+        }
+
+    @staticmethod
+    def resolve_method(method: Optional[str]) -> str:
+        """Validate a method name, falling back to VAULT_COST_BASIS_METHOD."""
+        method = (method or current_app.config.get(
+            'VAULT_COST_BASIS_METHOD', CostBasisService.DEFAULT_METHOD
+        )).upper()
+        if method not in CostBasisService.METHODS:
+            raise ValueError(f"Unknown cost basis method: {method}")
+        return method
+
+    @staticmethod
+    def _iter_open_lots(position: VaultCurrencyPosition, method: str):
+        """Yield open lots in consumption order, one page per query."""
+        ordering = {
+            'FIFO': (CostBasisLot.acquired_at, CostBasisLot.id),
+            'AVERAGE': (CostBasisLot.acquired_at, CostBasisLot.id),
+            'LIFO': (CostBasisLot.acquired_at.desc(), CostBasisLot.id.desc()),
+            'HIFO': (CostBasisLot.rate.desc(), CostBasisLot.acquired_at, CostBasisLot.id),
+        }[method]
+
+        while True:
+            # Lots consumed from the previous page are flushed as closed first
+            page = CostBasisLot.query.filter_by(
+                position_id=position.id, is_closed=False
+            ).order_by(*ordering).limit(CostBasisService.LOT_PAGE_SIZE).all()
+            if not page:
+                return
+            for lot in page:
+                yield lot
+
+    @staticmethod
+    def _specific_lots(
+        position: VaultCurrencyPosition,
+        lot_ids: List[int],
+        amount: Decimal
+    ) -> List[CostBasisLot]:
+        """Load the requested lots in the given order and check they cover the sale."""
+        if not lot_ids:
+            raise ValueError("Specific identification requires lot_ids")
+
+        found = {
+            lot.id: lot for lot in CostBasisLot.query.filter(
+                CostBasisLot.id.in_(lot_ids),
+                CostBasisLot.position_id == position.id,
+                CostBasisLot.is_closed == False
+            )
+        }
+        missing = [lot_id for lot_id in lot_ids if lot_id not in found]
+        if missing:
+            raise ValueError(f"Lots not open on this position: {missing}")
+
+        lots = [found[lot_id] for lot_id in dict.fromkeys(lot_ids)]
+        available = sum((Decimal(str(lot.remaining_amount)) for lot in lots), Decimal('0'))
+        if available < amount:
+            raise ValueError(f"Selected lots hold {available}, {amount} requested")
+        return lots
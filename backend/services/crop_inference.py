@@ -0,0 +1,283 @@
+"""
+Crop Inference: Micro-batched predictions for the crop RandomForest.
+
+This module provides:
+- A request batcher that gathers concurrent predictions for a few
+  milliseconds and scores them with one predict_proba call
+- A direct bulk path for scoring thousands of soil samples at once
+- Top-k crops with probabilities instead of a single label
+- Batch size and latency metrics
+"""
+
+from typing import Dict, List, Optional, Sequence
+import queue
+import threading
+import time
+import warnings
+import logging
+
+import numpy as np
+
+from backend.monitoring import metrics
+from backend.services.model_registry import ModelRegistry, CROP_MODEL_PATH
+
+logger = logging.getLogger(__name__)
+
+# Column order the model was trained on
+FEATURES = ('N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall')
+
+metrics.describe('agritech_crop_inference_batch_size', 'Rows scored per crop model call',
+                 buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096))
+metrics.describe('agritech_crop_inference_model_seconds', 'Time spent in crop model predict_proba per batch')
+metrics.describe('agritech_crop_inference_latency_seconds', 'Queue wait plus inference time per prediction request')
+
+
+class _PendingPrediction:
+    __slots__ = ('rows', 'enqueued_at', 'done', 'proba', 'error')
+
+    def __init__(self, rows: np.ndarray):
+        self.rows = rows
+        self.enqueued_at = time.perf_counter()
+        self.done = threading.Event()
+        self.proba = None
+        self.error = None
+
+
+class CropInferenceBatcher:
+    """
+    Process-local micro-batcher around the crop RandomForest.
+
+    predict() queues the caller's rows and waits. A single worker thread
+    takes the first waiting request, keeps collecting for up to
+    MAX_WAIT_SECONDS (or until MAX_BATCH_SIZE rows), stacks everything into
+    one matrix and runs predict_proba once. A forest costs about the same
+    for one row as for a few hundred, so concurrent requests share the cost.
+    """
+
+    MAX_BATCH_SIZE = 256
+    MAX_WAIT_SECONDS = 0.005
+    REQUEST_TIMEOUT_SECONDS = 10.0
+    BULK_CHUNK_SIZE = 5000
+    DEFAULT_TOP_K = 3
+
+    _lock = threading.Lock()
+    _queue: queue.Queue = queue.Queue()
+    _thread: Optional[threading.Thread] = None
+    _model = None
+    _encoder = None
+    _managed = False
+    _labels: Optional[np.ndarray] = None
+    _stats = {
+        'requests': 0,
+        'rows': 0,
+        'batches': 0,
+        'bulk_rows': 0,
+        'errors': 0,
+        'max_batch_size': 0,
+        'last_batch_size': 0,
+        'last_batch_ms': 0.0
+    }
+
+    @classmethod
+    def configure(cls, model, encoder, managed: bool = False) -> None:
+        """
+        Use an already loaded model and label encoder.
+
+        Models configured here stay in use; with managed=True (models
+        obtained from the ModelRegistry) later registry reloads replace them.
+        """
+        with cls._lock:
+            cls._managed = managed
+            if model is cls._model and encoder is cls._encoder:
+                return
+            cls._model = model
+            cls._encoder = encoder
+            cls._labels = np.asarray(encoder.inverse_transform(model.classes_))
+
+    @classmethod
+    def _ensure_model(cls) -> bool:
+        """Pick up the registry's current model, including hot reloads."""
+        if cls._model is not None and not cls._managed:
+            return True
+        if not (ModelRegistry.is_available('crop_model') and ModelRegistry.is_available('crop_encoder')):
+            if cls._model is None:
+                logger.warning(f"Crop models not found at {CROP_MODEL_PATH}. Prediction disabled.")
+            return cls._model is not None
+        model, encoder = ModelRegistry.get('crop_model'), ModelRegistry.get('crop_encoder')
+        if model is None or encoder is None:
+            return cls._model is not None
+        cls.configure(model, encoder, managed=True)
+        return True
+
+    @classmethod
+    def is_available(cls) -> bool:
+        return cls._ensure_model()
+
+    @staticmethod
+    def to_matrix(samples: Sequence) -> np.ndarray:
+        """
+        Stack samples into an (n, 7) float matrix in FEATURES order.
+
+        Samples may be dicts keyed by feature name or sequences of 7 values.
+        """
+        if len(samples) and isinstance(samples[0], dict):
+            samples = [[sample[name] for name in FEATURES] for sample in samples]
+        matrix = np.asarray(samples, dtype=np.float64).reshape(-1, len(FEATURES))
+        return matrix
+
+    @classmethod
+    def _predict_proba(cls, matrix: np.ndarray) -> np.ndarray:
+        with warnings.catch_warnings():
+            # The forest was fitted on a DataFrame; a bare array is fine here
+            warnings.filterwarnings('ignore', message='X does not have valid feature names')
+            return cls._model.predict_proba(matrix)
+
+    @classmethod
+    def top_k(cls, proba: np.ndarray, k: int = DEFAULT_TOP_K) -> List[List[Dict]]:
+        """
+        Rank classes per row by probability.
+
+        The stable sort keeps the model's tie-breaking, so the first entry
+        always equals what model.predict would return.
+        """
+        k = max(1, min(k, proba.shape[1]))
+        order = np.argsort(-proba, axis=1, kind='stable')[:, :k]
+        probabilities = np.take_along_axis(proba, order, axis=1).round(4).tolist()
+        labels = cls._labels[order].tolist()
+        return [
+            [{'crop': crop, 'probability': p} for crop, p in zip(row_labels, row_probs)]
+            for row_labels, row_probs in zip(labels, probabilities)
+        ]
+
+    @classmethod
+    def predict(cls, samples: Sequence, top_k: int = DEFAULT_TOP_K) -> List[List[Dict]]:
+        """
+        Score samples through the shared micro-batch.
+
+        Args:
+            samples: Dicts keyed by FEATURES, or rows of 7 values
+            top_k: Number of ranked crops per sample
+
+        Returns:
+            One list of {'crop', 'probability'} dicts per sample
+        """
+        if not cls._ensure_model():
+            raise RuntimeError("Crop prediction model is unavailable")
+
+        pending = _PendingPrediction(cls.to_matrix(samples))
+        cls._ensure_worker()
+        cls._queue.put(pending)
+
+        if not pending.done.wait(cls.REQUEST_TIMEOUT_SECONDS):
+            raise TimeoutError("Crop prediction timed out")
+        if pending.error is not None:
+            raise pending.error
+
+        metrics.observe('agritech_crop_inference_latency_seconds', time.perf_counter() - pending.enqueued_at)
+        with cls._lock:
+            cls._stats['requests'] += 1
+        return cls.top_k(pending.proba, top_k)
+
+    @classmethod
+    def predict_many(cls, samples: Sequence, top_k: int = DEFAULT_TOP_K) -> List[List[Dict]]:
+        """
+        Score a large set of samples directly, BULK_CHUNK_SIZE rows per call.
+
+        Bypasses the request queue so a bulk upload does not hold up
+        interactive predictions waiting in the same batch.
+        """
+        if not cls._ensure_model():
+            raise RuntimeError("Crop prediction model is unavailable")
+
+        matrix = cls.to_matrix(samples)
+        results = []
+        for start in range(0, len(matrix), cls.BULK_CHUNK_SIZE):
+            chunk = matrix[start:start + cls.BULK_CHUNK_SIZE]
+            started = time.perf_counter()
+            proba = cls._predict_proba(chunk)
+            cls._record_batch(len(chunk), time.perf_counter() - started)
+            results.extend(cls.top_k(proba, top_k))
+
+        with cls._lock:
+            cls._stats['bulk_rows'] += len(matrix)
+        return results
+
+    @classmethod
+    def _ensure_worker(cls) -> None:
+        if cls._thread is not None and cls._thread.is_alive():
+            return
+        with cls._lock:
+            if cls._thread is not None and cls._thread.is_alive():
+                return
+            cls._thread = threading.Thread(target=cls._run, name='crop-inference-batcher', daemon=True)
+            cls._thread.start()
+
+    @classmethod
+    def _collect(cls, first: _PendingPrediction) -> List[_PendingPrediction]:
+        """Gather waiting requests until the batch is full or the window closes."""
+        batch = [first]
+        rows = len(first.rows)
+        deadline = time.perf_counter() + cls.MAX_WAIT_SECONDS
+        while rows < cls.MAX_BATCH_SIZE:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                pending = cls._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(pending)
+            rows += len(pending.rows)
+        return batch
+
+    @classmethod
+    def _run(cls) -> None:
+        while True:
+            batch = cls._collect(cls._queue.get())
+            try:
+                matrix = np.vstack([pending.rows for pending in batch])
+                started = time.perf_counter()
+                proba = cls._predict_proba(matrix)
+                cls._record_batch(len(matrix), time.perf_counter() - started)
+
+                offset = 0
+                for pending in batch:
+                    pending.proba = proba[offset:offset + len(pending.rows)]
+                    offset += len(pending.rows)
+            except Exception as e:
+                logger.error(f"Crop inference batch of {len(batch)} requests failed: {e}")
+                with cls._lock:
+                    cls._stats['errors'] += 1
+                for pending in batch:
+                    pending.error = e
+            finally:
+                for pending in batch:
+                    pending.done.set()
+
+    @classmethod
+    def _record_batch(cls, size: int, seconds: float) -> None:
+        metrics.observe('agritech_crop_inference_batch_size', size)
+        metrics.observe('agritech_crop_inference_model_seconds', seconds)
+        ModelRegistry.observe_inference('crop_model', seconds, size)
+        with cls._lock:
+            cls._stats['batches'] += 1
+            cls._stats['rows'] += size
+            cls._stats['last_batch_size'] = size
+            cls._stats['last_batch_ms'] = round(seconds * 1000, 3)
+            if size > cls._stats['max_batch_size']:
+                cls._stats['max_batch_size'] = size
+
+    @classmethod
+    def stats(cls) -> Dict:
+        with cls._lock:
+            stats = dict(cls._stats)
+        stats['avg_batch_size'] = round(stats['rows'] / stats['batches'], 2) if stats['batches'] else 0.0
+        stats['queue_depth'] = cls._queue.qsize()
+        stats['latency_p50_ms'] = _ms(metrics.quantile('agritech_crop_inference_latency_seconds', 0.5))
+        stats['latency_p99_ms'] = _ms(metrics.quantile('agritech_crop_inference_latency_seconds', 0.99))
+        stats['model_loaded'] = cls._model is not None
+        return stats
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds * 1000, 3) if seconds is not None else None
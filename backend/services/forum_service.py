@@ -1,10 +1,11 @@
 from datetime import datetime
-from sqlalchemy import or_, func
+from sqlalchemy import func
 from backend.models import (
     ForumCategory, ForumThread, PostComment, Upvote, UserReputation, User
 )
 from backend.extensions import db
-from backend.services.ai_moderator import ai_moderator
+from backend.services.moderation_pipeline import ModerationPipeline
+from backend.services.search_index import search_index
 from backend.utils.logger import logger
 
 
@@ -13,6 +14,9 @@ class ForumService:
     Core service for forum operations including search, reputation, and thread management
     """
     
+    # Most text matches considered before SQL filters and sorting
+    SEARCH_CANDIDATE_LIMIT = 2000
+    
     @staticmethod
     def create_category(name, description, icon=None):
         """Create a new forum category"""
@@ -43,28 +47,15 @@ class ForumService:
             )
             db.session.add(thread)
             db.session.flush()  # Get thread ID before moderation
+            search_index.index_thread(thread)
+            db.session.commit()
             
-            # AI Moderation
-            moderation_result = ai_moderator.moderate_thread(thread)
+            # AI Moderation (batched; also posts any FAQ auto-answer)
+            ModerationPipeline.submit(threads=[thread])
             
             # Update user reputation
             ForumService.update_reputation(user_id, 'thread_created')
             
-            db.session.commit()
-            
-            # Check if AI generated an auto-answer
-            if moderation_result and isinstance(moderation_result, dict) and moderation_result.get('is_ai_generated'):
-                # Create AI answer as a comment
-                ai_comment = PostComment(
-                    thread_id=thread.id,
-                    user_id=0,  # System user
-                    content=moderation_result['content'],
-                    is_ai_generated=True,
-                    is_ai_approved=True
-                )
-                db.session.add(ai_comment)
-                db.session.commit()
-            
             return thread, None
             
         except Exception as e:
@@ -84,19 +75,20 @@ class ForumService:
             )
             db.session.add(comment)
             db.session.flush()
-            
-            # AI Moderation
-            ai_moderator.moderate_comment(comment)
+            search_index.index_comment(comment)
             
             # Update thread last_activity
             thread = ForumThread.query.get(thread_id)
             if thread:
                 thread.last_activity = datetime.utcnow()
             
+            db.session.commit()
+            
+            # AI Moderation (batched)
+            ModerationPipeline.submit(comments=[comment])
+            
             # Update user reputation
             ForumService.update_reputation(user_id, 'comment_posted')
-            
-            db.session.commit()
             return comment, None
             
         except Exception as e:
@@ -152,10 +144,13 @@ class ForumService:
             return None, str(e)
     
     @staticmethod
-    def search_threads(query, category_id=None, tags=None, sort_by='relevance', limit=20):
+    def search_threads(query=None, category_id=None, tags=None, sort_by='relevance', limit=20):
         """
         Search threads with multiple filters
         sort_by: 'relevance', 'recent', 'popular', 'unanswered'
+        
+        Text and tag matching go through the full-text index; with a query,
+        'relevance' ranks by BM25 score (comment matches count for their thread).
         """
         try:
             # Base query
@@ -166,18 +161,20 @@ class ForumService:
                 threads_query = threads_query.filter_by(category_id=category_id)
             
             # Text search
-            if query:
-                search_filter = or_(
-                    ForumThread.title.ilike(f'%{query}%'),
-                    ForumThread.content.ilike(f'%{query}%'),
-                    ForumThread.tags.ilike(f'%{query}%')
-                )
-                threads_query = threads_query.filter(search_filter)
+            scores = None
+            if query and query.strip():
+                scores = search_index.thread_scores(query, limit=ForumService.SEARCH_CANDIDATE_LIMIT)
+                if not scores:
+                    return [], None
+                threads_query = threads_query.filter(ForumThread.id.in_(list(scores)))
             
             # Tag filter
+            tags = [t for t in (tags or []) if t and t.strip()]
             if tags:
-                for tag in tags:
-                    threads_query = threads_query.filter(ForumThread.tags.ilike(f'%{tag}%'))
+                tagged_ids = search_index.tagged_threads(tags)
+                if not tagged_ids:
+                    return [], None
+                threads_query = threads_query.filter(ForumThread.id.in_(list(tagged_ids)))
             
             # Sorting
             if sort_by == 'recent':
@@ -189,6 +186,10 @@ class ForumService:
                 threads_query = threads_query.outerjoin(PostComment).group_by(ForumThread.id).having(
                     func.count(PostComment.id) == 0
                 ).order_by(ForumThread.created_at.desc())
+            elif scores is not None:  # relevance with a text query
+                threads = threads_query.all()
+                threads.sort(key=lambda t: (scores[t.id], t.view_count or 0, t.upvote_count or 0), reverse=True)
+                return [t.to_dict() for t in threads[:limit]], None
             else:  # relevance (default)
                 threads_query = threads_query.order_by(ForumThread.view_count.desc(), ForumThread.upvote_count.desc())
             
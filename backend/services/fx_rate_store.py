@@ -0,0 +1,374 @@
+"""
+FX Rate Store: In-process FX rate graph backed by the FXRate table.
+
+This module provides:
+- A current-rate graph loaded once per rate version
+- Inverse and cross rates resolved by shortest-path search
+- Point-in-time lookups from sorted per-pair rate arrays (bisect)
+- Version-counter invalidation, shared across workers via the cache,
+  reloading only the currency pairs that were written
+"""
+
+from bisect import bisect_right
+from collections import OrderedDict, deque
+from datetime import date, datetime
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+import threading
+import time
+import uuid
+import logging
+
+from sqlalchemy import tuple_
+
+from backend.extensions import db
+from backend.models.ledger import FXRate
+
+logger = logging.getLogger(__name__)
+
+
+class FXRateStore:
+    """
+    Process-local cache of FX rates.
+
+    Rates are loaded from the database once and kept until the version
+    counter moves. Every write through FXService bumps the local counter
+    for the pair it wrote, which is reloaded on its own on the next lookup,
+    and publishes a new token to the shared cache, so other workers reload
+    in full on their next lookup after SHARED_VERSION_CHECK_SECONDS.
+    """
+
+    RATE_PRECISION = Decimal('0.00000001')
+    SHARED_VERSION_KEY = 'fx_rate_store_version'
+    SHARED_VERSION_CHECK_SECONDS = 5
+    MAX_HISTORICAL_GRAPHS = 64
+    MAX_RESOLVED_RATES = 10000
+
+    _lock = threading.RLock()
+    _version = 0
+    _loaded_version = -1
+    _shared_token = None
+    _shared_checked_at = 0.0
+    # Pairs to reload on the next lookup; None means reload everything
+    _stale_pairs: Optional[Set[Tuple[str, str]]] = None
+
+    _current_edges: Dict[Tuple[str, str], Decimal] = {}
+    _current_graph: Dict[str, Dict[str, Decimal]] = {}
+    _history: Dict[Tuple[str, str], Tuple[List[date], List[Decimal]]] = {}
+    # (from, to, date) -> (rate, currency pairs on the path), least recently used first
+    _resolved: 'OrderedDict[Tuple[str, str, Optional[date]], Tuple[Optional[Decimal], FrozenSet[FrozenSet[str]]]]' = \
+        OrderedDict()
+    _historical_graphs: Dict[date, Dict[str, Dict[str, Decimal]]] = {}
+
+    @classmethod
+    def invalidate(cls, pairs: Optional[Iterable[Tuple[str, str]]] = None) -> int:
+        """
+        Mark cached rates as stale after a rate write.
+
+        Args:
+            pairs: (from_currency, to_currency) pairs that were written; only
+                these are reloaded locally. Defaults to every pair.
+
+        Returns:
+            The new local version number
+        """
+        with cls._lock:
+            if pairs is None:
+                cls._stale_pairs = None
+            elif cls._stale_pairs is not None:
+                cls._stale_pairs.update(pairs)
+            cls._version += 1
+            token = uuid.uuid4().hex
+            cls._shared_token = token
+
+        try:
+            from backend.extensions.cache import cache
+            cache.set(cls.SHARED_VERSION_KEY, token, timeout=0)
+        except Exception as e:
+            logger.debug(f"FX rate store could not publish version: {e}")
+
+        return cls._version
+
+    @classmethod
+    def version(cls) -> int:
+        return cls._version
+
+    @classmethod
+    def _check_shared_version(cls) -> None:
+        """Pick up invalidations published by other workers."""
+        now = time.monotonic()
+        if now - cls._shared_checked_at < cls.SHARED_VERSION_CHECK_SECONDS:
+            return
+        cls._shared_checked_at = now
+
+        try:
+            from backend.extensions.cache import cache
+            token = cache.get(cls.SHARED_VERSION_KEY)
+        except Exception:
+            return
+
+        if token and token != cls._shared_token:
+            # Other workers do not say which pairs they wrote
+            cls._shared_token = token
+            cls._stale_pairs = None
+            cls._version += 1
+
+    @classmethod
+    def _ensure_loaded(cls) -> None:
+        with cls._lock:
+            cls._check_shared_version()
+            if cls._loaded_version == cls._version:
+                return
+
+            version = cls._version
+            if cls._loaded_version < 0 or cls._stale_pairs is None:
+                cls._load_all(version)
+            else:
+                cls._reload_pairs(cls._stale_pairs)
+            cls._stale_pairs = set()
+            cls._loaded_version = version
+
+    @classmethod
+    def _load_rates(cls, pairs: Optional[List[Tuple[str, str]]] = None) -> Tuple[
+        Dict[Tuple[str, str], Decimal], Dict[Tuple[str, str], Tuple[List[date], List[Decimal]]], int
+    ]:
+        """
+        Read rates ordered by date, for the given pairs or all of them.
+
+        Returns:
+            (current rate per pair, (dates, rates) history per pair, rows read)
+        """
+        query = db.session.query(
+            FXRate.from_currency,
+            FXRate.to_currency,
+            FXRate.rate,
+            FXRate.rate_date,
+            FXRate.is_current
+        )
+        if pairs is not None:
+            query = query.filter(tuple_(FXRate.from_currency, FXRate.to_currency).in_(pairs))
+        rows = query.order_by(FXRate.rate_date).all()
+
+        current_edges = {}
+        history = {}
+        for from_currency, to_currency, rate, rate_date, is_current in rows:
+            rate = Decimal(str(rate))
+            dates, rates = history.setdefault((from_currency, to_currency), ([], []))
+            dates.append(rate_date)
+            rates.append(rate)
+            if is_current:
+                current_edges[(from_currency, to_currency)] = rate
+        return current_edges, history, len(rows)
+
+    @classmethod
+    def _load_all(cls, version: int) -> None:
+        current_edges, history, row_count = cls._load_rates()
+
+        cls._current_edges = current_edges
+        cls._current_graph = cls._build_graph(current_edges)
+        cls._history = history
+        cls._resolved = OrderedDict()
+        cls._historical_graphs = {}
+
+        logger.info(
+            f"Loaded FX rate store v{version}: {len(current_edges)} current pairs, "
+            f"{row_count} historical rates"
+        )
+
+    @classmethod
+    def _reload_pairs(cls, pairs: Set[Tuple[str, str]]) -> None:
+        """
+        Reload the history of written pairs and evict only what they affect.
+
+        Point-in-time graphs and lookups are evicted from the first date at
+        which a pair's history changed. Current-rate lookups are evicted when
+        the pair's current rate changed and their path uses the pair, or for
+        all of them when the pair gained or lost its current rate.
+        """
+        pairs = sorted(pairs)
+        if not pairs:
+            return
+        current_edges, history, row_count = cls._load_rates(pairs)
+
+        since = None
+        current_changed = topology_changed = False
+        for pair in pairs:
+            old_dates, old_rates = cls._history.pop(pair, ([], []))
+            if pair in history:
+                cls._history[pair] = history[pair]
+            new_dates, new_rates = history.get(pair, ([], []))
+            changed_at = cls._first_difference(list(zip(old_dates, old_rates)), list(zip(new_dates, new_rates)))
+            if changed_at is not None and (since is None or changed_at < since):
+                since = changed_at
+
+            old_rate = cls._current_edges.pop(pair, None)
+            new_rate = current_edges.get(pair)
+            if new_rate is not None:
+                cls._current_edges[pair] = new_rate
+            if old_rate != new_rate:
+                current_changed = True
+                topology_changed = topology_changed or old_rate is None or new_rate is None
+
+        if current_changed:
+            cls._current_graph = cls._build_graph(cls._current_edges)
+
+        touched = {frozenset(pair) for pair in pairs}
+        evicted = 0
+        for key, (_, path) in list(cls._resolved.items()):
+            if key[2] is None:
+                stale = current_changed and (topology_changed or not path.isdisjoint(touched))
+            else:
+                stale = since is not None and key[2] >= since
+            if stale:
+                del cls._resolved[key]
+                evicted += 1
+        if since is not None:
+            for rate_date in [d for d in cls._historical_graphs if d >= since]:
+                del cls._historical_graphs[rate_date]
+
+        logger.debug(
+            f"Reloaded {len(pairs)} FX pairs ({row_count} rates), evicted {evicted} resolved rates"
+        )
+
+    @staticmethod
+    def _first_difference(old: List[Tuple[date, Decimal]], new: List[Tuple[date, Decimal]]) -> Optional[date]:
+        """Earliest date at which two date-ordered (date, rate) histories differ."""
+        for old_point, new_point in zip(old, new):
+            if old_point != new_point:
+                return min(old_point[0], new_point[0])
+        if len(old) != len(new):
+            return max(old, new, key=len)[min(len(old), len(new))][0]
+        return None
+
+    @classmethod
+    def _build_graph(cls, edges: Dict[Tuple[str, str], Decimal]) -> Dict[str, Dict[str, Decimal]]:
+        """Build an adjacency map with inverse edges where no direct quote exists."""
+        graph = {}
+        for (from_currency, to_currency), rate in edges.items():
+            graph.setdefault(from_currency, {})[to_currency] = rate
+
+        for (from_currency, to_currency), rate in edges.items():
+            if rate > 0 and (to_currency, from_currency) not in edges:
+                graph.setdefault(to_currency, {})[from_currency] = (
+                    Decimal('1') / rate
+                ).quantize(cls.RATE_PRECISION, rounding=ROUND_HALF_UP)
+
+        return graph
+
+    @classmethod
+    def _graph_as_of(cls, rate_date: date) -> Dict[str, Dict[str, Decimal]]:
+        """Graph of the latest rate on or before rate_date for every pair."""
+        graph = cls._historical_graphs.get(rate_date)
+        if graph is not None:
+            return graph
+
+        edges = {}
+        for pair, (dates, rates) in cls._history.items():
+            index = bisect_right(dates, rate_date) - 1
+            if index >= 0:
+                edges[pair] = rates[index]
+
+        graph = cls._build_graph(edges)
+        if len(cls._historical_graphs) >= cls.MAX_HISTORICAL_GRAPHS:
+            cls._historical_graphs.pop(next(iter(cls._historical_graphs)))
+        cls._historical_graphs[rate_date] = graph
+        return graph
+
+    @classmethod
+    def _find_path_rate(
+        cls,
+        graph: Dict[str, Dict[str, Decimal]],
+        from_currency: str,
+        to_currency: str
+    ) -> Tuple[Optional[Decimal], FrozenSet[FrozenSet[str]]]:
+        """
+        Breadth-first search for the fewest-hop conversion path.
+
+        Returns:
+            (rate or None, the currency pairs along the path)
+        """
+        direct = graph.get(from_currency, {}).get(to_currency)
+        if direct is not None:
+            return direct, frozenset([frozenset((from_currency, to_currency))])
+
+        previous = {from_currency: None}
+        queue = deque([from_currency])
+        while queue:
+            currency = queue.popleft()
+            for neighbour in graph.get(currency, {}):
+                if neighbour in previous:
+                    continue
+                previous[neighbour] = currency
+                if neighbour == to_currency:
+                    queue.clear()
+                    break
+                queue.append(neighbour)
+
+        if to_currency not in previous:
+            return None, frozenset()
+
+        rate = Decimal('1')
+        path = set()
+        node = to_currency
+        while previous[node] is not None:
+            rate *= graph[previous[node]][node]
+            path.add(frozenset((previous[node], node)))
+            node = previous[node]
+
+        return rate.quantize(cls.RATE_PRECISION, rounding=ROUND_HALF_UP), frozenset(path)
+
+    @classmethod
+    def get_rate(
+        cls,
+        from_currency: str,
+        to_currency: str,
+        rate_date: date = None
+    ) -> Optional[Decimal]:
+        """
+        Resolve an FX rate from the in-memory graph.
+
+        Args:
+            from_currency: Source currency
+            to_currency: Target currency
+            rate_date: Point-in-time date (latest rate on or before it);
+                defaults to current rates
+
+        Returns:
+            Exchange rate or None if no conversion path exists
+        """
+        if from_currency == to_currency:
+            return Decimal('1')
+
+        if isinstance(rate_date, datetime):
+            rate_date = rate_date.date()
+
+        cls._ensure_loaded()
+
+        key = (from_currency, to_currency, rate_date)
+        with cls._lock:
+            cached = cls._resolved.get(key)
+            if cached is not None:
+                cls._resolved.move_to_end(key)
+                return cached[0]
+
+            graph = cls._current_graph if rate_date is None else cls._graph_as_of(rate_date)
+            rate, path = cls._find_path_rate(graph, from_currency, to_currency)
+            cls._resolved[key] = (rate, path)
+            while len(cls._resolved) > cls.MAX_RESOLVED_RATES:
+                cls._resolved.popitem(last=False)
+            return rate
+
+    @classmethod
+    def get_rates(
+        cls,
+        currencies: List[str],
+        to_currency: str,
+        rate_date: date = None
+    ) -> Dict[str, Decimal]:
+        """Resolve many currencies against one target; missing ones are omitted."""
+        rates = {}
+        for currency in currencies:
+            rate = cls.get_rate(currency, to_currency, rate_date)
+            if rate is not None:
+                rates[currency] = rate
+        return rates
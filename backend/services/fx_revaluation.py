@@ -0,0 +1,421 @@
+"""
+FX Revaluation Engine: Batched unrealized FX gain/loss across vaults.
+
+Revalues every foreign-currency position of many vaults in one pass:
+- Position balances are resolved with grouped ledger queries
+- Rates are resolved once per (currency, base currency) pair
+- Deltas are computed over Decimal object arrays, so no float rounding
+  reaches the books; float64 is only used for the rate-move threshold
+- Snapshots and position updates are written with bulk mappings
+- Unrealized gains are posted as one ledger transaction per vault, all
+  in a single commit; if that batch fails, vaults can be retried one by
+  one so a single bad vault does not block the others
+"""
+
+from datetime import datetime
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Dict, List, Optional
+import logging
+
+import numpy as np
+from flask import current_app
+
+from backend.extensions import db
+from backend.models.ledger import (
+    Vault, VaultCurrencyPosition, FXValuationSnapshot, LedgerAccount,
+    AccountType, TransactionType
+)
+from backend.services.fx_rate_store import FXRateStore
+from backend.services.ledger_service import LedgerService
+
+logger = logging.getLogger(__name__)
+
+
+class FXRevaluationEngine:
+    """Vectorized revaluation of vault currency positions."""
+
+    # Relative rate move below which a position keeps its last rate
+    # (overridable via FX_REVALUATION_MIN_RATE_CHANGE). Skipped moves are not
+    # lost: the next revaluation measures from the last rate actually booked.
+    MIN_RATE_CHANGE = Decimal('0.0001')
+
+    PRECISION = LedgerService.PRECISION
+
+    # One unrealized gain account per base currency, e.g. 6100-FX-UNRL-USD
+    UNREALIZED_GAIN_ACCOUNT_PREFIX = '6100-FX-UNRL-'
+
+    @staticmethod
+    def unrealized_gain_account_code(currency: str) -> str:
+        """Account code of the unrealized FX gain/loss account for a base currency."""
+        return f"{FXRevaluationEngine.UNREALIZED_GAIN_ACCOUNT_PREFIX}{currency}"
+
+    @staticmethod
+    def revalue(
+        vaults: List[Vault] = None,
+        current_rates: Dict[str, Decimal] = None,
+        rates_base: str = None,
+        min_rate_change: Decimal = None,
+        created_by: int = None,
+        isolate_failures: bool = False
+    ) -> Dict:
+        """
+        Revalue the non-base currency positions of many vaults at once.
+
+        Args:
+            vaults: Vaults to revalue (defaults to every active vault with
+                auto_fx_revaluation enabled)
+            current_rates: Dict of currency -> rate; missing pairs are
+                resolved from the FXRateStore
+            rates_base: Currency current_rates are quoted against; vaults
+                with another base currency ignore them. None means the
+                rates apply to every vault's own base currency.
+            min_rate_change: Minimum relative rate move to revalue a
+                position (defaults to FX_REVALUATION_MIN_RATE_CHANGE)
+            created_by: User ID recorded on the ledger transactions
+            isolate_failures: If the batch fails, retry each vault on its
+                own and skip (and log) the ones that still fail instead of
+                raising
+
+        Returns:
+            Dict with run counters, the total unrealized gain, the
+            per-position results keyed by vault primary key and the
+            vault_id of every vault that failed
+        """
+        if min_rate_change is None:
+            min_rate_change = current_app.config.get(
+                'FX_REVALUATION_MIN_RATE_CHANGE', FXRevaluationEngine.MIN_RATE_CHANGE
+            )
+        min_rate_change = float(min_rate_change)
+
+        if vaults is None:
+            vaults = Vault.query.filter_by(auto_fx_revaluation=True, is_active=True).all()
+        vaults = list({vault.id: vault for vault in vaults}.values())
+
+        try:
+            return FXRevaluationEngine._revalue_batch(
+                vaults, current_rates, rates_base, min_rate_change, created_by
+            )
+        except Exception as e:
+            db.session.rollback()
+            if not isolate_failures:
+                raise
+            logger.warning(f"Batched FX revaluation of {len(vaults)} vaults failed, retrying per vault: {e}")
+
+        summary = FXRevaluationEngine._empty_summary([])
+        for vault in vaults:
+            vault_code = vault.vault_id
+            try:
+                part = FXRevaluationEngine._revalue_batch(
+                    [vault], current_rates, rates_base, min_rate_change, created_by
+                )
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Failed to revalue vault {vault_code}: {e}")
+                summary['failed_vaults'].append(vault_code)
+                continue
+
+            for key in ('vaults_processed', 'positions_checked', 'positions_revalued',
+                        'positions_below_threshold', 'positions_without_rate',
+                        'transactions_posted', 'total_unrealized_gain'):
+                summary[key] += part[key]
+            summary['by_vault'].update(part['by_vault'])
+
+        return summary
+
+    @staticmethod
+    def _empty_summary(vault_ids: List[int]) -> Dict:
+        return {
+            'vaults_processed': len(vault_ids),
+            'positions_checked': 0,
+            'positions_revalued': 0,
+            'positions_below_threshold': 0,
+            'positions_without_rate': 0,
+            'transactions_posted': 0,
+            'total_unrealized_gain': Decimal('0'),
+            'by_vault': {vault_id: [] for vault_id in vault_ids},
+            'failed_vaults': []
+        }
+
+    @staticmethod
+    def _revalue_batch(
+        vaults: List[Vault],
+        current_rates: Optional[Dict[str, Decimal]],
+        rates_base: Optional[str],
+        min_rate_change: float,
+        created_by: Optional[int]
+    ) -> Dict:
+        """Revalue a batch of vaults in one commit; rolls back and raises on failure."""
+        vaults_by_id = {vault.id: vault for vault in vaults}
+        summary = FXRevaluationEngine._empty_summary(list(vaults_by_id))
+        if not vaults_by_id:
+            return summary
+
+        positions = []
+        vault_ids = list(vaults_by_id)
+        for start in range(0, len(vault_ids), LedgerService.BALANCE_CHUNK_SIZE):
+            positions.extend(VaultCurrencyPosition.query.filter(
+                VaultCurrencyPosition.vault_id.in_(vault_ids[start:start + LedgerService.BALANCE_CHUNK_SIZE]),
+                VaultCurrencyPosition.ledger_account_id.isnot(None)
+            ).all())
+        positions = [
+            p for p in positions if p.currency != vaults_by_id[p.vault_id].base_currency
+        ]
+        summary['positions_checked'] = len(positions)
+        if not positions:
+            return summary
+
+        balances = LedgerService.get_account_balances([p.ledger_account_id for p in positions])
+        rates = FXRevaluationEngine._resolve_rates(
+            positions, vaults_by_id, current_rates, rates_base
+        )
+
+        bases = [vaults_by_id[p.vault_id].base_currency for p in positions]
+        new_rates = [rates.get((p.currency, base)) for p, base in zip(positions, bases)]
+        has_rate = np.array([rate is not None for rate in new_rates], dtype=bool)
+        summary['positions_without_rate'] = int((~has_rate).sum())
+
+        balance = np.array(
+            [balances.get(p.ledger_account_id, Decimal('0')) for p in positions], dtype=object
+        )
+        new_rate = np.array(
+            [rate if rate is not None else Decimal('0') for rate in new_rates], dtype=object
+        )
+        old_rate = np.array([
+            Decimal(str(p.last_fx_rate or p.cost_basis_rate or rate or 0))
+            for p, rate in zip(positions, new_rates)
+        ], dtype=object)
+
+        # Threshold on float64 copies; everything booked stays in Decimal
+        old_float = old_rate.astype(np.float64)
+        new_float = new_rate.astype(np.float64)
+        moved = (old_rate != new_rate).astype(bool)
+        large_enough = np.abs(new_float - old_float) >= min_rate_change * np.abs(old_float)
+        eligible = has_rate & (balance > 0).astype(bool) & moved
+        selected = np.flatnonzero(eligible & large_enough)
+        summary['positions_below_threshold'] = int((eligible & ~large_enough).sum())
+
+        if not len(selected):
+            return summary
+
+        balance = balance[selected]
+        old_rate = old_rate[selected]
+        new_rate = new_rate[selected]
+        old_value = balance * old_rate
+        new_value = balance * new_rate
+        delta = FXRevaluationEngine._quantize(new_value - old_value)
+        delta_pct = np.array([
+            d / o * 100 if o > 0 else Decimal('0') for d, o in zip(delta, old_value)
+        ], dtype=object)
+
+        now = datetime.utcnow()
+        snapshot_rows = []
+        position_rows = []
+        deltas_by_vault = {}
+        for i, index in enumerate(selected):
+            position = positions[index]
+            vault = vaults_by_id[position.vault_id]
+            cumulative = Decimal(str(position.cumulative_unrealized_fx_gain or 0)) + delta[i]
+
+            snapshot_rows.append({
+                'entity_type': 'vault_position',
+                'entity_id': position.id,
+                'snapshot_date': now,
+                'currency': position.currency,
+                'position_amount': balance[i],
+                'original_fx_rate': old_rate[i],
+                'current_fx_rate': new_rate[i],
+                'base_currency': vault.base_currency,
+                'original_base_value': old_value[i],
+                'current_base_value': new_value[i],
+                'unrealized_gain_loss': delta[i],
+                'unrealized_gain_loss_pct': delta_pct[i],
+                'cumulative_realized_gain': position.cumulative_realized_fx_gain or Decimal('0'),
+                'cumulative_unrealized_gain': cumulative
+            })
+            position_rows.append({
+                'id': position.id,
+                'last_fx_rate': new_rate[i],
+                'last_revaluation_date': now,
+                'cumulative_unrealized_fx_gain': cumulative,
+                'updated_at': now
+            })
+            deltas_by_vault.setdefault(vault.id, []).append((position, old_rate[i], new_rate[i], delta[i]))
+
+            summary['by_vault'][vault.id].append({
+                'currency': position.currency,
+                'balance': float(balance[i]),
+                'old_rate': float(old_rate[i]),
+                'new_rate': float(new_rate[i]),
+                'old_value': float(old_value[i]),
+                'new_value': float(new_value[i]),
+                'delta': float(delta[i]),
+                'delta_pct': float(delta_pct[i])
+            })
+
+        try:
+            db.session.bulk_insert_mappings(FXValuationSnapshot, snapshot_rows)
+            db.session.bulk_update_mappings(VaultCurrencyPosition, position_rows)
+
+            transactions = FXRevaluationEngine._build_transactions(
+                [vaults_by_id[vault_id] for vault_id in deltas_by_vault], deltas_by_vault
+            )
+            if transactions:
+                # Commits the snapshots and position updates along with the entries
+                posted = LedgerService.create_transactions_bulk(transactions, created_by=created_by)
+                summary['transactions_posted'] = posted['transaction_count']
+            else:
+                db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        summary['positions_revalued'] = len(selected)
+        summary['total_unrealized_gain'] = sum(delta, Decimal('0'))
+
+        logger.info(
+            f"FX revaluation: {summary['positions_revalued']} of {summary['positions_checked']} "
+            f"positions revalued across {len(deltas_by_vault)} vaults "
+            f"({summary['positions_below_threshold']} below threshold, "
+            f"{summary['positions_without_rate']} without rate), "
+            f"total delta={summary['total_unrealized_gain']}"
+        )
+
+        return summary
+
+    @staticmethod
+    def _resolve_rates(
+        positions: List[VaultCurrencyPosition],
+        vaults_by_id: Dict[int, Vault],
+        current_rates: Optional[Dict[str, Decimal]],
+        rates_base: Optional[str]
+    ) -> Dict[tuple, Decimal]:
+        """Resolve each distinct (currency, base currency) pair once."""
+        needed = {}
+        for position in positions:
+            base = vaults_by_id[position.vault_id].base_currency
+            needed.setdefault(base, set()).add(position.currency)
+
+        rates = {}
+        for base, currencies in needed.items():
+            if current_rates and rates_base in (None, base):
+                for currency in currencies:
+                    if current_rates.get(currency) is not None:
+                        rates[(currency, base)] = Decimal(str(current_rates[currency]))
+
+            missing = [currency for currency in currencies if (currency, base) not in rates]
+            for currency, rate in FXRateStore.get_rates(missing, base).items():
+                rates[(currency, base)] = Decimal(str(rate))
+
+        return rates
+
+    @staticmethod
+    def _quantize(values: np.ndarray) -> np.ndarray:
+        """Round a Decimal object array to ledger precision."""
+        quantize = np.frompyfunc(
+            lambda value: value.quantize(FXRevaluationEngine.PRECISION, rounding=ROUND_HALF_UP), 1, 1
+        )
+        return quantize(values).astype(object)
+
+    @staticmethod
+    def _build_transactions(vaults: List[Vault], deltas_by_vault: Dict[int, list]) -> List[Dict]:
+        """
+        One balanced transaction per vault.
+
+        Each revalued position becomes an entry on the vault's FX revaluation
+        account (base currency, so position balances stay in their own
+        currency); the net lands on the unrealized gain account of the
+        vault's base currency.
+        """
+        reval_accounts = FXRevaluationEngine._revaluation_accounts(vaults)
+        gain_accounts = {}
+
+        transactions = []
+        for vault in vaults:
+            reval_account = reval_accounts[vault.id]
+            entries = []
+            net = Decimal('0')
+            for position, old_rate, new_rate, delta in deltas_by_vault[vault.id]:
+                if delta == 0:
+                    continue
+                net += delta
+                entries.append({
+                    'account_id': reval_account.id,
+                    'entry_type': 'DEBIT' if delta > 0 else 'CREDIT',
+                    'amount': abs(delta),
+                    'currency': vault.base_currency,
+                    'fx_rate': 1.0,
+                    'memo': f"FX revaluation {position.currency}: {old_rate} -> {new_rate}"
+                })
+
+            if net != 0:
+                if vault.base_currency not in gain_accounts:
+                    gain_accounts[vault.base_currency] = \
+                        FXRevaluationEngine._unrealized_gain_account(vault.base_currency)
+                entries.append({
+                    'account_id': gain_accounts[vault.base_currency].id,
+                    'entry_type': 'CREDIT' if net > 0 else 'DEBIT',
+                    'amount': abs(net),
+                    'currency': vault.base_currency,
+                    'fx_rate': 1.0,
+                    'memo': f"Unrealized FX {'gain' if net > 0 else 'loss'} on vault {vault.name}"
+                })
+
+            if len(entries) < 2:
+                continue
+
+            transactions.append({
+                'transaction_type': TransactionType.FX_UNREALIZED_GAIN,
+                'entries': entries,
+                'description': f"FX revaluation for vault {vault.name}",
+                'source_type': 'vault',
+                'source_id': vault.id,
+                'base_currency': vault.base_currency
+            })
+
+        return transactions
+
+    @staticmethod
+    def _revaluation_accounts(vaults: List[Vault]) -> Dict[int, LedgerAccount]:
+        """Fetch or stage the per-vault FX revaluation accounts without committing."""
+        codes = {vault.id: f"VAULT-{vault.vault_id[:8].upper()}-FXREVAL" for vault in vaults}
+        existing = {
+            account.account_code: account
+            for account in LedgerAccount.query.filter(LedgerAccount.account_code.in_(codes.values()))
+        }
+
+        accounts = {}
+        for vault in vaults:
+            account = existing.get(codes[vault.id])
+            if account is None:
+                account = LedgerAccount(
+                    account_code=codes[vault.id],
+                    name=f"{vault.name} - FX Revaluation",
+                    account_type=AccountType.ASSET,
+                    currency=vault.base_currency,
+                    parent_id=vault.ledger_account_id,
+                    entity_type='vault_fx_revaluation',
+                    entity_id=vault.id,
+                    is_system=True
+                )
+                db.session.add(account)
+            accounts[vault.id] = account
+
+        db.session.flush()
+        return accounts
+
+    @staticmethod
+    def _unrealized_gain_account(currency: str) -> LedgerAccount:
+        """Fetch or stage the system unrealized FX gain/loss account of a base currency."""
+        account_code = FXRevaluationEngine.unrealized_gain_account_code(currency)
+        account = LedgerAccount.query.filter_by(account_code=account_code).first()
+        if account is None:
+            account = LedgerAccount(
+                account_code=account_code,
+                name=f'Unrealized FX Gain/Loss ({currency})',
+                account_type=AccountType.INCOME,
+                currency=currency,
+                is_system=True
+            )
+            db.session.add(account)
+            db.session.flush()
+        return account
@@ -5,7 +5,7 @@ This service handles:
 - FX rate storage and retrieval
 - Real-time rate updates
 - FX delta calculations on asset movement
-- Cross-rate computation
+- Cross-rate computation (via the in-memory FXRateStore)
 - Historical rate lookups
 """
 
@@ -19,6 +19,7 @@ from backend.models.ledger import (
     FXRate, FXValuationSnapshot, Vault, VaultCurrencyPosition,
     LedgerAccount, TransactionType
 )
+from backend.services.fx_rate_store import FXRateStore
 
 logger = logging.getLogger(__name__)
 
@@ -93,6 +94,7 @@ class FXService:
             fx_rate.is_current = True
         
         db.session.commit()
+        FXRateStore.invalidate([(from_currency, to_currency)])
         
         logger.info(
             f"Stored FX rate: {from_currency}/{to_currency} = {rate} "
@@ -138,89 +140,19 @@ class FXService:
         """
         Get FX rate for currency pair.
         
+        Direct, inverse and cross rates are resolved from the in-memory
+        FXRateStore graph instead of querying FXRate per lookup.
+        
         Args:
             from_currency: Source currency
             to_currency: Target currency
-            rate_date: Specific date (defaults to current)
+            rate_date: Specific date (latest rate on or before it;
+                defaults to current)
             
         Returns:
             Exchange rate or None
         """
-        if from_currency == to_currency:
-            return Decimal('1')
-        
-        if rate_date:
-            fx_rate = FXRate.query.filter_by(
-                from_currency=from_currency,
-                to_currency=to_currency,
-                rate_date=rate_date
-            ).first()
-        else:
-            fx_rate = FXRate.query.filter_by(
-                from_currency=from_currency,
-                to_currency=to_currency,
-                is_current=True
-            ).first()
-        
-        if fx_rate:
-            return Decimal(str(fx_rate.rate))
-        
-        # Try inverse
-        inverse = FXService._get_inverse_rate(from_currency, to_currency, rate_date)
-        if inverse:
-            return inverse
-        
-        # Try cross rate through USD if not direct
-        if from_currency != 'USD' and to_currency != 'USD':
-            cross = FXService._get_cross_rate(from_currency, to_currency, rate_date)
-            if cross:
-                return cross
-        
-        return None
-    
-    @staticmethod
-    def _get_inverse_rate(
-        from_currency: str,
-        to_currency: str,
-        rate_date: date = None
-    ) -> Optional[Decimal]:
-        """Calculate rate from inverse pair."""
-        if rate_date:
-            inverse = FXRate.query.filter_by(
-                from_currency=to_currency,
-                to_currency=from_currency,
-                rate_date=rate_date
-            ).first()
-        else:
-            inverse = FXRate.query.filter_by(
-                from_currency=to_currency,
-                to_currency=from_currency,
-                is_current=True
-            ).first()
-        
-        if inverse and inverse.rate > 0:
-            return (Decimal('1') / Decimal(str(inverse.rate))).quantize(
-                FXService.RATE_PRECISION, rounding=ROUND_HALF_UP
-            )
-        
-        return None
-    
-    @staticmethod
-    def _get_cross_rate(
-        from_currency: str,
-        to_currency: str,
-        rate_date: date = None
-    ) -> Optional[Decimal]:
-        """Calculate cross rate through USD."""
-        from_usd = FXService.get_rate(from_currency, 'USD', rate_date)
-        usd_to = FXService.get_rate('USD', to_currency, rate_date)
-        
-        if from_usd and usd_to:
-            return (from_usd * usd_to).quantize(
-                FXService.RATE_PRECISION, rounding=ROUND_HALF_UP
-            )
-        
-        return None
+        return FXRateStore.get_rate(from_currency, to_currency, rate_date)
     
     @staticmethod
     def get_all_current_rates(base_currency: str = 'USD') -> Dict[str, Decimal]:
@@ -230,17 +162,7 @@ class FXService:
         Returns:
             Dict of currency -> rate
         """
-        rates = {}
-        
-        for currency in FXService.SUPPORTED_CURRENCIES:
-            if currency == base_currency:
-                rates[currency] = Decimal('1')
-            else:
-                rate = FXService.get_rate(currency, base_currency)
-                if rate:
-                    rates[currency] = rate
-        
-        return rates
+        return FXRateStore.get_rates(FXService.SUPPORTED_CURRENCIES, base_currency)
     
     @staticmethod
     def get_rate_history(
@@ -374,7 +296,7 @@ class FXService:
         Returns:
             Summary of revaluations
         """
-        from backend.services.vault_service import VaultService
+        from backend.services.fx_revaluation import FXRevaluationEngine
         
         # Get current rates if not provided
         if not current_rates:
@@ -386,33 +308,32 @@ class FXService:
             is_active=True
         ).all()
         
+        # One batched pass; vaults in another base currency resolve their own rates.
+        # If the batch fails each vault is retried alone, so one bad vault
+        # does not abort the revaluation of the others.
+        summary = FXRevaluationEngine.revalue(
+            vaults, current_rates, rates_base=base_currency, isolate_failures=True
+        )
+        
         results = {
-            'vaults_processed': 0,
-            'positions_revalued': 0,
-            'total_unrealized_gain': Decimal('0'),
+            'vaults_processed': summary['vaults_processed'],
+            'positions_revalued': summary['positions_revalued'],
+            'positions_below_threshold': summary['positions_below_threshold'],
+            'total_unrealized_gain': summary['total_unrealized_gain'],
+            'failed_vaults': summary['failed_vaults'],
             'vault_details': []
         }
         
         for vault in vaults:
-            try:
-                revaluations = VaultService.revalue_positions(vault, current_rates)
-                
-                vault_gain = sum(r['delta'] for r in revaluations)
-                
-                results['vaults_processed'] += 1
-                results['positions_revalued'] += len(revaluations)
-                results['total_unrealized_gain'] += Decimal(str(vault_gain))
-                
-                if revaluations:
-                    results['vault_details'].append({
-                        'vault_id': vault.vault_id,
-                        'vault_name': vault.name,
-                        'positions_revalued': len(revaluations),
-                        'total_delta': vault_gain,
-                        'revaluations': revaluations
-                    })
-            except Exception as e:
-                logger.error(f"Failed to revalue vault {vault.vault_id}: {e}")
+            revaluations = summary['by_vault'].get(vault.id)
+            if revaluations:
+                results['vault_details'].append({
+                    'vault_id': vault.vault_id,
+                    'vault_name': vault.name,
+                    'positions_revalued': len(revaluations),
+                    'total_delta': sum(r['delta'] for r in revaluations),
+                    'revaluations': revaluations
+                })
         
         results['total_unrealized_gain'] = float(results['total_unrealized_gain'])
         
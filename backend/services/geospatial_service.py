@@ -9,12 +9,16 @@ import uuid
 from datetime import datetime, timedelta
 from typing import List, Tuple, Dict, Optional
 from collections import defaultdict
+import numpy as np
 
 from sqlalchemy import func, and_, or_
 from geoalchemy2.functions import ST_DWithin, ST_Distance, ST_MakePoint, ST_AsText
 from backend.extensions import db
 from backend.models import DiseaseIncident, OutbreakZone, User, OutbreakAlert
 from backend.utils.logger import logger
+from backend.utils.spatial_index import (
+    KM_PER_DEGREE_LAT, bounding_box, dbscan_haversine, group_by_label, haversine_km
+)
 
 
 class GeospatialService:
@@ -23,7 +27,9 @@ class GeospatialService:
     # Constants
     OUTBREAK_THRESHOLD = 3  # Minimum incidents to declare outbreak
     CLUSTERING_RADIUS_KM = 50  # Default clustering radius
+    ACTIVE_INCIDENT_STATUSES = ['pending', 'verified']  # Incidents not rejected by review
     EARTH_RADIUS_KM = 6371  # Earth's radius in kilometers
+    WARNING_RADIUS_MULTIPLIER = 1.5  # Early-warning reach beyond a zone's radius
     
     @staticmethod
     def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
@@ -86,7 +92,7 @@ class GeospatialService:
                         True  # Use spheroid for accurate distance
                     ),
                     DiseaseIncident.reported_at >= cutoff_date,
-                    DiseaseIncident.status.in_(['reported', 'verified'])
+                    DiseaseIncident.verification_status.in_(GeospatialService.ACTIVE_INCIDENT_STATUSES)
                 )
             )
             
@@ -127,7 +133,7 @@ class GeospatialService:
         query = DiseaseIncident.query.filter(
             and_(
                 DiseaseIncident.reported_at >= cutoff_date,
-                DiseaseIncident.status.in_(['reported', 'verified'])
+                DiseaseIncident.verification_status.in_(GeospatialService.ACTIVE_INCIDENT_STATUSES)
             )
         )
         
@@ -137,19 +143,44 @@ class GeospatialService:
         if crop_affected:
             query = query.filter(DiseaseIncident.crop_affected == crop_affected)
         
-        all_incidents = query.all()
+        query = query.filter(GeospatialService._bounding_box_filter(
+            DiseaseIncident.latitude, DiseaseIncident.longitude,
+            center_lat, center_lon, radius_km
+        ))
+        candidates = query.all()
+        if not candidates:
+            return []
         
-        # Filter by distance using Haversine
-        nearby_incidents = []
-        for incident in all_incidents:
-            distance = GeospatialService.calculate_distance(
-                center_lat, center_lon,
-                incident.latitude, incident.longitude
-            )
-            if distance <= radius_km:
-                nearby_incidents.append(incident)
+        # Exact distance check over the prefiltered rows in one pass
+        distances = haversine_km(
+            center_lat, center_lon,
+            [incident.latitude for incident in candidates],
+            [incident.longitude for incident in candidates]
+        )
+        return [incident for incident, keep in zip(candidates, distances <= radius_km) if keep]
+    
+    @staticmethod
+    def _bounding_box_filter(lat_column, lon_column, center_lat: float,
+                             center_lon: float, radius_km: float):
+        """
+        SQL condition selecting rows inside the lat/lon box around a circle.
         
-        return nearby_incidents
+        The box is a superset of the circle, so callers still apply the exact
+        haversine check; it only keeps far-away rows out of the result set.
+        """
+        min_lat, max_lat, min_lon, max_lon = bounding_box(center_lat, center_lon, radius_km)
+        lat_condition = lat_column.between(min_lat, max_lat)
+        
+        if min_lon <= -180 or max_lon >= 180:
+            if max_lon - min_lon >= 360:
+                return lat_condition
+            # Box crosses the antimeridian
+            return and_(lat_condition, or_(
+                lon_column >= (min_lon + 360 if min_lon < -180 else min_lon),
+                lon_column <= (max_lon - 360 if max_lon > 180 else max_lon)
+            ))
+        
+        return and_(lat_condition, lon_column.between(min_lon, max_lon))
     
     @staticmethod
     def detect_outbreak_clusters(radius_km: float = CLUSTERING_RADIUS_KM,
@@ -172,7 +203,7 @@ class GeospatialService:
         incidents = DiseaseIncident.query.filter(
             and_(
                 DiseaseIncident.reported_at >= cutoff_date,
-                DiseaseIncident.status.in_(['reported', 'verified']),
+                DiseaseIncident.verification_status.in_(GeospatialService.ACTIVE_INCIDENT_STATUSES),
                 DiseaseIncident.outbreak_zone_id.is_(None)  # Not yet assigned to outbreak
             )
         ).order_by(DiseaseIncident.reported_at.desc()).all()
@@ -200,13 +231,18 @@ class GeospatialService:
             
             for cluster in cluster_candidates:
                 # Calculate cluster center (centroid)
-                center_lat = sum(inc.latitude for inc in cluster) / len(cluster)
-                center_lon = sum(inc.longitude for inc in cluster) / len(cluster)
+                lats = np.array([inc.latitude for inc in cluster], dtype=np.float64)
+                lons = np.array([inc.longitude for inc in cluster], dtype=np.float64)
+                center_lat = float(lats.mean())
+                center_lon = float(lons.mean())
+
+                # Transitive clusters can reach past radius_km from the centroid
+                cluster_radius = max(radius_km, float(haversine_km(center_lat, center_lon, lats, lons).max()))
                 
                 # Calculate severity level
                 severity_counts = defaultdict(int)
                 for inc in cluster:
-                    severity_counts[inc.severity] += 1
+                    severity_counts[inc.severity_level] += 1
                 
                 # Determine overall severity
                 if severity_counts.get('critical', 0) > 0:
@@ -223,11 +259,11 @@ class GeospatialService:
                     'crop_affected': crop_affected,
                     'center_lat': center_lat,
                     'center_lon': center_lon,
-                    'radius_km': radius_km,
+                    'radius_km': cluster_radius,
                     'incident_count': len(cluster),
                     'incidents': cluster,
                     'severity_level': severity_level,
-                    'total_affected_area': sum(inc.affected_area_hectares or 0 for inc in cluster)
+                    'total_affected_area': sum(inc.affected_area or 0 for inc in cluster)
                 })
         
         return clusters
@@ -237,40 +273,23 @@ class GeospatialService:
                             radius_km: float, 
                             min_incidents: int) -> List[List[DiseaseIncident]]:
         """
-        Find dense clusters using a simplified DBSCAN approach.
+        Find dense clusters with DBSCAN over a grid spatial index.
+
+        Clusters expand transitively through core incidents (those with at
+        least min_incidents reports within radius_km, themselves included),
+        and every incident belongs to at most one cluster.
         """
-        visited = set()
-        clusters = []
-        
-        for incident in incidents:
-            if incident.id in visited:
-                continue
-            
-            # Find all neighbors within radius
-            neighbors = []
-            for other in incidents:
-                if other.id == incident.id:
-                    continue
-                
-                distance = GeospatialService.calculate_distance(
-                    incident.latitude, incident.longitude,
-                    other.latitude, other.longitude
-                )
-                
-                if distance <= radius_km:
-                    neighbors.append(other)
-            
-            # If enough neighbors, create cluster
-            if len(neighbors) + 1 >= min_incidents:
-                cluster = [incident] + neighbors
-                clusters.append(cluster)
-                
-                # Mark as visited
-                visited.add(incident.id)
-                for neighbor in neighbors:
-                    visited.add(neighbor.id)
-        
-        return clusters
+        if len(incidents) < min_incidents:
+            return []
+
+        lats = np.fromiter((inc.latitude for inc in incidents), dtype=np.float64, count=len(incidents))
+        lons = np.fromiter((inc.longitude for inc in incidents), dtype=np.float64, count=len(incidents))
+        labels = dbscan_haversine(lats, lons, radius_km, min_incidents)
+
+        return [
+            [incidents[i] for i in members.tolist()]
+            for members in group_by_label(labels)
+        ]
     
     @staticmethod
     def create_outbreak_zone(cluster_data: Dict) -> OutbreakZone:
@@ -322,7 +341,7 @@ class GeospatialService:
     
     @staticmethod
     def find_farmers_at_risk(outbreak_zone: OutbreakZone, 
-                            radius_multiplier: float = 1.5) -> List[Tuple[User, float]]:
+                            radius_multiplier: float = WARNING_RADIUS_MULTIPLIER) -> List[Tuple[User, float]]:
         """
         Find farmers whose farms are within risk radius of an outbreak zone.
         
@@ -335,32 +354,35 @@ class GeospatialService:
         """
         warning_radius = outbreak_zone.radius_km * radius_multiplier
         
-        # Get farmers with registered farm locations
+        # Get farmers with registered farm locations near the zone
         farmers = User.query.filter(
             and_(
                 User.role == 'farmer',
                 User.farm_latitude.isnot(None),
-                User.farm_longitude.isnot(None)
+                User.farm_longitude.isnot(None),
+                GeospatialService._bounding_box_filter(
+                    User.farm_latitude, User.farm_longitude,
+                    outbreak_zone.center_latitude, outbreak_zone.center_longitude,
+                    warning_radius
+                )
             )
         ).all()
         
-        at_risk_farmers = []
+        if not farmers:
+            return []
         
-        for farmer in farmers:
-            distance = GeospatialService.calculate_distance(
-                outbreak_zone.center_latitude,
-                outbreak_zone.center_longitude,
-                farmer.farm_latitude,
-                farmer.farm_longitude
-            )
-            
-            if distance <= warning_radius:
-                at_risk_farmers.append((farmer, distance))
+        distances = haversine_km(
+            outbreak_zone.center_latitude,
+            outbreak_zone.center_longitude,
+            [farmer.farm_latitude for farmer in farmers],
+            [farmer.farm_longitude for farmer in farmers]
+        )
         
         # Sort by distance (closest first)
-        at_risk_farmers.sort(key=lambda x: x[1])
+        at_risk = np.nonzero(distances <= warning_radius)[0]
+        at_risk = at_risk[np.argsort(distances[at_risk], kind='stable')]
         
-        return at_risk_farmers
+        return [(farmers[i], float(distances[i])) for i in at_risk.tolist()]
     
     @staticmethod
     def check_user_in_outbreak_zones(user_id: int) -> List[Tuple[OutbreakZone, float]]:
@@ -368,41 +390,162 @@ class GeospatialService:
         Check if a user's farm location is within any active outbreak zones.
         
         Args:
-            user_id: User ID to check
+            user_id: User ID (or User) to check
             
         Returns:
             List of tuples (OutbreakZone, distance_km) for zones within risk radius
         """
-        user = User.query.get(user_id)
+        user = user_id if isinstance(user_id, User) else User.query.get(user_id)
         
         if not user or not user.farm_latitude or not user.farm_longitude:
             return []
         
-        # Get active outbreak zones
+        # Zone radii differ, so only the latitude band can be pushed into SQL:
+        # include zones within 1.5x radius for early warning
+        lat_reach = OutbreakZone.radius_km * (GeospatialService.WARNING_RADIUS_MULTIPLIER / KM_PER_DEGREE_LAT)
         active_zones = OutbreakZone.query.filter(
-            OutbreakZone.status == 'active'
+            and_(
+                OutbreakZone.status == 'active',
+                OutbreakZone.center_latitude >= user.farm_latitude - lat_reach,
+                OutbreakZone.center_latitude <= user.farm_latitude + lat_reach
+            )
         ).all()
         
-        nearby_zones = []
+        if not active_zones:
+            return []
         
-        for zone in active_zones:
-            distance = GeospatialService.calculate_distance(
-                user.farm_latitude,
-                user.farm_longitude,
-                zone.center_latitude,
-                zone.center_longitude
-            )
+        distances = haversine_km(
+            user.farm_latitude,
+            user.farm_longitude,
+            [zone.center_latitude for zone in active_zones],
+            [zone.center_longitude for zone in active_zones]
+        )
+        warning_radii = np.array([zone.radius_km for zone in active_zones], dtype=np.float64)
+        warning_radii *= GeospatialService.WARNING_RADIUS_MULTIPLIER
+        
+        # Sort by distance (closest first)
+        nearby = np.nonzero(distances <= warning_radii)[0]
+        nearby = nearby[np.argsort(distances[nearby], kind='stable')]
+        
+        return [(active_zones[i], float(distances[i])) for i in nearby.tolist()]
+    
+    @staticmethod
+    def match_farmers_to_zones(zones: Optional[List[OutbreakZone]] = None,
+                               radius_multiplier: float = WARNING_RADIUS_MULTIPLIER,
+                               chunk_size: int = 2000) -> Dict[int, List[Tuple[User, float]]]:
+        """
+        Match every farmer against many outbreak zones in one pass.
+        
+        Used by send_outbreak_alerts: farmers inside the overall latitude band
+        of the zones are loaded once and compared against all zones with a
+        chunked (farmers x zones) distance matrix.
+        
+        Args:
+            zones: Zones to match; defaults to all active zones
+            radius_multiplier: Multiplier for warning radius (default 1.5x)
+            chunk_size: Farmers per distance-matrix chunk
             
-            # Include zones within 1.5x radius for early warning
-            warning_radius = zone.radius_km * 1.5
+        Returns:
+            Dict of zone id -> list of (User, distance_km), closest first
+        """
+        if zones is None:
+            zones = OutbreakZone.query.filter(OutbreakZone.status == 'active').all()
+        
+        matches = {zone.id: [] for zone in zones}
+        if not zones:
+            return matches
+        
+        zone_lats = np.array([zone.center_latitude for zone in zones], dtype=np.float64)
+        zone_lons = np.array([zone.center_longitude for zone in zones], dtype=np.float64)
+        warning_radii = np.array([zone.radius_km for zone in zones], dtype=np.float64) * radius_multiplier
+        
+        lat_reach = warning_radii / KM_PER_DEGREE_LAT
+        farmers = User.query.filter(
+            and_(
+                User.role == 'farmer',
+                User.farm_latitude.isnot(None),
+                User.farm_longitude.isnot(None),
+                User.farm_latitude >= float((zone_lats - lat_reach).min()),
+                User.farm_latitude <= float((zone_lats + lat_reach).max())
+            )
+        ).all()
+        
+        zone_ids = [zone.id for zone in zones]
+        for start in range(0, len(farmers), chunk_size):
+            chunk = farmers[start:start + chunk_size]
+            distances = haversine_km(
+                np.array([farmer.farm_latitude for farmer in chunk], dtype=np.float64)[:, None],
+                np.array([farmer.farm_longitude for farmer in chunk], dtype=np.float64)[:, None],
+                zone_lats[None, :],
+                zone_lons[None, :]
+            )
+            for farmer_pos, zone_pos in zip(*np.nonzero(distances <= warning_radii[None, :])):
+                matches[zone_ids[zone_pos]].append((chunk[farmer_pos], float(distances[farmer_pos, zone_pos])))
+        
+        for zone_matches in matches.values():
+            zone_matches.sort(key=lambda x: x[1])
+        
+        return matches
+    
+    @staticmethod
+    def send_outbreak_alerts(zones: Optional[List[OutbreakZone]] = None,
+                             radius_multiplier: float = WARNING_RADIUS_MULTIPLIER) -> Dict:
+        """
+        Create an OutbreakAlert for every farmer within reach of the zones.
+        
+        Farmers are matched with match_farmers_to_zones in one pass; farmers
+        already alerted for a zone are skipped, and the new alerts are
+        written with one bulk insert.
+        
+        Args:
+            zones: Zones to alert for; defaults to all active zones
+            radius_multiplier: Multiplier for warning radius (default 1.5x)
             
-            if distance <= warning_radius:
-                nearby_zones.append((zone, distance))
+        Returns:
+            Dict with zones checked, alerts created and farmers skipped
+        """
+        if zones is None:
+            zones = OutbreakZone.query.filter(OutbreakZone.status == 'active').all()
+        
+        summary = {'zones': len(zones), 'alerts_created': 0, 'already_alerted': 0}
+        if not zones:
+            return summary
+        
+        matches = GeospatialService.match_farmers_to_zones(zones, radius_multiplier)
+        alerted = set(
+            db.session.query(OutbreakAlert.user_id, OutbreakAlert.zone_id)
+            .filter(OutbreakAlert.zone_id.in_(list(matches)))
+            .all()
+        )
         
-        # Sort by distance (closest first)
-        nearby_zones.sort(key=lambda x: x[1])
+        rows = []
+        for zone in zones:
+            priority = 'critical' if zone.risk_level == 'extreme' else (zone.risk_level or 'medium')
+            for farmer, distance in matches[zone.id]:
+                if (farmer.id, zone.id) in alerted:
+                    summary['already_alerted'] += 1
+                    continue
+                rows.append({
+                    'alert_id': f"ALERT-{uuid.uuid4().hex[:12].upper()}",
+                    'user_id': farmer.id,
+                    'zone_id': zone.id,
+                    'status': 'active',
+                    'priority': priority,
+                    'message': (
+                        f"{zone.disease_name} outbreak on {zone.crop_affected} reported "
+                        f"{distance:.1f} km from your farm. Inspect your crop and follow containment advice."
+                    ),
+                    'created_at': datetime.utcnow()
+                })
+        
+        if rows:
+            db.session.bulk_insert_mappings(OutbreakAlert, rows)
+            db.session.commit()
+        
+        summary['alerts_created'] = len(rows)
+        logger.info(f"Sent {len(rows)} outbreak alerts for {len(zones)} zones")
         
-        return nearby_zones
+        return summary
     
     @staticmethod
     def _generate_zone_id(disease_name: str, lat: float, lon: float) -> str:
@@ -0,0 +1,323 @@
+"""
+GPS Ingestion: Buffered telemetry writes and cached escrow geo-fences.
+
+This module provides:
+- A process-local ping buffer flushed by size or age with one bulk insert,
+  a row-by-row retry that dead-letters bad pings, and a flush on shutdown
+- An in-memory cache of HELD freight escrow geo-fences keyed by route
+- Vectorized geo-fence evaluation for a batch of pings
+"""
+
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional
+import atexit
+import threading
+import time
+import logging
+
+import numpy as np
+from sqlalchemy.exc import OperationalError
+
+from backend.extensions import db
+from backend.models.logistics_v2 import FreightEscrow, GPSTelemetry
+from backend.utils.spatial_index import haversine_km
+
+logger = logging.getLogger(__name__)
+
+
+class GPSTelemetryBuffer:
+    """
+    Buffers GPSTelemetry rows and writes them in bulk.
+
+    A flush happens when MAX_BATCH_SIZE pings are pending, or when the
+    oldest pending ping is older than MAX_BUFFER_SECONDS. The age check runs
+    on every add and in a background flusher thread, so a quiet fleet still
+    gets its last pings written, and once more at interpreter shutdown.
+
+    If the bulk insert fails the batch is retried one row at a time: rows
+    that still fail are kept in a bounded dead-letter list, while a lost
+    database connection puts the rest back in the buffer. The buffer holds
+    at most MAX_PENDING pings; beyond that the oldest are dropped.
+
+    Writes run on their own connection and transaction (db.engine.begin()),
+    never on the scoped db.session: a flush triggered from add() inside a
+    request must not commit or roll back the caller's pending work.
+    """
+
+    MAX_BATCH_SIZE = 500
+    MAX_BUFFER_SECONDS = 2.0
+    MAX_PENDING = 50000
+    DEAD_LETTER_SIZE = 1000
+
+    _lock = threading.Lock()
+    _pending: List[Dict] = []
+    _oldest_at: Optional[float] = None
+    _dead_letters: deque = deque(maxlen=DEAD_LETTER_SIZE)
+    _app = None
+    _flusher: Optional[threading.Thread] = None
+    _exit_registered = False
+    _stats = {'received': 0, 'written': 0, 'flushes': 0, 'failed_flushes': 0, 'dropped': 0, 'dead_lettered': 0}
+
+    @classmethod
+    def add(cls, rows: List[Dict]) -> int:
+        """
+        Queue telemetry rows (GPSTelemetry column mappings).
+
+        Returns:
+            Number of rows written by a flush this call triggered (0 if none)
+        """
+        if not rows:
+            return 0
+
+        cls._ensure_flusher()
+        with cls._lock:
+            if cls._oldest_at is None:
+                cls._oldest_at = time.monotonic()
+            cls._pending.extend(rows)
+            cls._stats['received'] += len(rows)
+            dropped = cls._trim()
+            due = cls._is_due()
+
+        if dropped:
+            logger.warning(f"GPS telemetry buffer full, dropped {dropped} oldest pings")
+        return cls.flush() if due else 0
+
+    @classmethod
+    def _trim(cls) -> int:
+        """Drop the oldest pending rows beyond MAX_PENDING; call with the lock held."""
+        overflow = len(cls._pending) - cls.MAX_PENDING
+        if overflow <= 0:
+            return 0
+        del cls._pending[:overflow]
+        cls._stats['dropped'] += overflow
+        return overflow
+
+    @classmethod
+    def _is_due(cls) -> bool:
+        return len(cls._pending) >= cls.MAX_BATCH_SIZE or (
+            cls._oldest_at is not None
+            and time.monotonic() - cls._oldest_at >= cls.MAX_BUFFER_SECONDS
+        )
+
+    @classmethod
+    def flush(cls) -> int:
+        """
+        Write all pending rows with one bulk insert in their own transaction.
+
+        If the batch fails it is retried row by row (see _flush_rows).
+
+        Returns:
+            Number of rows written
+        """
+        with cls._lock:
+            rows, cls._pending = cls._pending, []
+            cls._oldest_at = None
+
+        if not rows:
+            return 0
+
+        try:
+            cls._insert(rows)
+        except Exception as e:
+            with cls._lock:
+                cls._stats['failed_flushes'] += 1
+            logger.warning(f"GPS telemetry flush of {len(rows)} pings failed, retrying row by row: {e}")
+            return cls._flush_rows(rows)
+
+        with cls._lock:
+            cls._stats['written'] += len(rows)
+            cls._stats['flushes'] += 1
+        return len(rows)
+
+    @staticmethod
+    def _insert(rows: List[Dict]) -> None:
+        """Insert rows and commit on a dedicated connection; rolls back on error."""
+        with db.engine.begin() as connection:
+            connection.execute(GPSTelemetry.__table__.insert(), rows)
+
+    @classmethod
+    def _flush_rows(cls, rows: List[Dict]) -> int:
+        """
+        Insert rows one at a time after a failed batch.
+
+        A row that fails on its own is moved to the dead-letter list. An
+        OperationalError (database unreachable, locked) is not the row's
+        fault, so it and the remaining rows go back in the buffer instead.
+        """
+        written = 0
+        for position, row in enumerate(rows):
+            try:
+                cls._insert([row])
+            except OperationalError as e:
+                with cls._lock:
+                    cls._pending = rows[position:] + cls._pending
+                    cls._oldest_at = time.monotonic()
+                    dropped = cls._trim()
+                logger.error(f"GPS telemetry database unavailable, {len(rows) - position} pings requeued "
+                             f"({dropped} oldest dropped): {e}")
+                break
+            except Exception as e:
+                with cls._lock:
+                    cls._dead_letters.append(row)
+                    cls._stats['dead_lettered'] += 1
+                logger.error(f"GPS ping for route {row.get('route_id')} rejected, moved to dead letters: {e}")
+                continue
+            written += 1
+
+        with cls._lock:
+            cls._stats['written'] += written
+        return written
+
+    @classmethod
+    def dead_letters(cls) -> List[Dict]:
+        """Most recent rows that could not be written, oldest first."""
+        with cls._lock:
+            return list(cls._dead_letters)
+
+    @classmethod
+    def shutdown(cls) -> int:
+        """Flush whatever is still buffered; registered with atexit."""
+        if cls._app is None or not cls._pending:
+            return 0
+        with cls._app.app_context():
+            written = cls.flush()
+        logger.info(f"GPS telemetry buffer flushed {written} pings on shutdown")
+        return written
+
+    @classmethod
+    def pending_count(cls) -> int:
+        return len(cls._pending)
+
+    @classmethod
+    def stats(cls) -> Dict:
+        with cls._lock:
+            return {**cls._stats, 'pending': len(cls._pending)}
+
+    @classmethod
+    def _ensure_flusher(cls) -> None:
+        """Start the age-based flusher thread bound to the current app."""
+        if cls._flusher is not None and cls._flusher.is_alive():
+            return
+
+        try:
+            from flask import current_app
+            cls._app = current_app._get_current_object()
+        except RuntimeError:
+            return
+
+        cls._flusher = threading.Thread(
+            target=cls._flush_loop, name='gps-telemetry-flusher', daemon=True
+        )
+        cls._flusher.start()
+        if not cls._exit_registered:
+            atexit.register(cls.shutdown)
+            cls._exit_registered = True
+
+    @classmethod
+    def _flush_loop(cls) -> None:
+        while True:
+            time.sleep(cls.MAX_BUFFER_SECONDS / 2)
+            with cls._lock:
+                due = bool(cls._pending) and cls._is_due()
+            if not due:
+                continue
+            try:
+                with cls._app.app_context():
+                    cls.flush()
+            except Exception as e:
+                logger.error(f"GPS telemetry background flush failed: {e}")
+
+
+class EscrowGeofenceCache:
+    """
+    Geo-fences of HELD freight escrows, keyed by route.
+
+    Loaded with one query and refreshed after REFRESH_SECONDS or when
+    invalidated by an escrow lock/release. Only the first HELD escrow of a
+    route is tracked, matching the per-ping lookup it replaces.
+    """
+
+    REFRESH_SECONDS = 30.0
+
+    _lock = threading.Lock()
+    _loaded_at: Optional[float] = None
+    _fences: Dict[int, tuple] = {}
+
+    @classmethod
+    def invalidate(cls) -> None:
+        with cls._lock:
+            cls._loaded_at = None
+
+    @classmethod
+    def _ensure_loaded(cls) -> None:
+        with cls._lock:
+            if cls._loaded_at is not None and time.monotonic() - cls._loaded_at < cls.REFRESH_SECONDS:
+                return
+
+            rows = db.session.query(
+                FreightEscrow.id,
+                FreightEscrow.route_id,
+                FreightEscrow.destination_lat,
+                FreightEscrow.destination_lng,
+                FreightEscrow.geo_fence_radius_meters
+            ).filter(FreightEscrow.status == 'HELD').order_by(FreightEscrow.id).all()
+
+            fences = {}
+            for escrow_id, route_id, lat, lng, radius in rows:
+                fences.setdefault(route_id, (escrow_id, lat, lng, radius if radius is not None else 200.0))
+
+            cls._fences = fences
+            cls._loaded_at = time.monotonic()
+
+    @classmethod
+    def evaluate(cls, route_ids, lats, lngs) -> Dict[int, tuple]:
+        """
+        Find routes whose escrow geo-fence contains at least one ping.
+
+        Args:
+            route_ids, lats, lngs: Parallel sequences describing the pings
+
+        Returns:
+            Dict of route_id -> (escrow_id, ping_position) for the first
+            ping inside each route's fence
+        """
+        cls._ensure_loaded()
+        fences = cls._fences
+
+        positions = [i for i, route_id in enumerate(route_ids) if route_id in fences]
+        if not positions:
+            return {}
+
+        fence_rows = np.array([fences[route_ids[i]][1:] for i in positions], dtype=np.float64)
+        distances_m = haversine_km(
+            np.asarray(lats, dtype=np.float64)[positions],
+            np.asarray(lngs, dtype=np.float64)[positions],
+            fence_rows[:, 0],
+            fence_rows[:, 1]
+        ) * 1000.0
+
+        passed = {}
+        for pos in np.nonzero(distances_m <= fence_rows[:, 2])[0].tolist():
+            route_id = route_ids[positions[pos]]
+            if route_id not in passed:
+                passed[route_id] = (fences[route_id][0], positions[pos])
+        return passed
+
+
+def telemetry_row(ping: Dict) -> Dict:
+    """Normalize an incoming ping payload into a GPSTelemetry mapping."""
+    recorded_at = ping.get('recorded_at')
+    if isinstance(recorded_at, str):
+        recorded_at = datetime.fromisoformat(recorded_at)
+
+    return {
+        'route_id': int(ping['route_id']),
+        'vehicle_id': int(ping['vehicle_id']),
+        'latitude': float(ping['lat']),
+        'longitude': float(ping['lng']),
+        'speed_kmh': float(ping.get('speed', 0.0)),
+        'heading_degrees': ping.get('heading'),
+        'fuel_price_per_liter': float(ping.get('fuel_price', 1.10)),
+        'recorded_at': recorded_at or datetime.utcnow()
+    }
@@ -2,11 +2,16 @@ from datetime import datetime
 from backend.extensions import db
 from backend.models.knowledge import Question, Answer, KnowledgeVote, UserExpertise
 from backend.services.reputation_service import ReputationService
+from backend.services.search_index import search_index
+from backend.services.semantic_index import semantic_index
 import logging
 
 logger = logging.getLogger(__name__)
 
 class KnowledgeService:
+    # Most text matches considered before filters and sorting
+    SEARCH_CANDIDATE_LIMIT = 2000
+
     @staticmethod
     def create_question(user_id, title, content, category):
         """Create a new farming question"""
@@ -18,6 +23,8 @@ class KnowledgeService:
                 category=category
             )
             db.session.add(question)
+            db.session.flush()
+            search_index.index_question(question)
             db.session.commit()
             
             # Award reputation for asking
@@ -30,19 +37,28 @@ class KnowledgeService:
 
     @staticmethod
     def get_questions(category=None, search=None, sort='newest'):
-        """Query questions with filters and sorting"""
+        """
+        Query questions with filters and sorting.
+        sort: 'newest', 'popular', 'trending', or 'relevance' (with search;
+        answers that match count for their question)
+        """
         query = Question.query
         
         if category:
             query = query.filter(Question.category == category)
             
-        if search:
-            query = query.filter(
-                (Question.title.ilike(f"%{search}%")) | 
-                (Question.content.ilike(f"%{search}%"))
-            )
+        scores = None
+        if search and search.strip():
+            scores = search_index.question_scores(search, limit=KnowledgeService.SEARCH_CANDIDATE_LIMIT)
+            if not scores:
+                return []
+            query = query.filter(Question.id.in_(list(scores)))
             
-        if sort == 'popular':
+        if sort == 'relevance' and scores is not None:
+            questions = query.all()
+            questions.sort(key=lambda q: (scores[q.id], q.created_at), reverse=True)
+            return questions[:50]
+        elif sort == 'popular':
             query = query.order_by(Question.upvote_count.desc())
         elif sort == 'trending':
             # Simplified trending: high views + votes in recent time
@@ -66,11 +82,14 @@ class KnowledgeService:
                 content=content
             )
             db.session.add(answer)
+            db.session.flush()
+            search_index.index_answer(answer)
             
             # Increment answer count
             question.answer_count += 1
             
             db.session.commit()
+            semantic_index.add_answer(answer)
             
             # Award reputation for answering
             ReputationService.update_reputation(user_id, 'give_answer')
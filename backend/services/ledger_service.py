@@ -6,23 +6,31 @@ This service handles:
 - Double-entry validation
 - Account balance reconstruction
 - Transaction reversal
+- Incremental balance checkpoints (rebuild and verification)
 - Ledger auditing and reporting
 """
 
-from datetime import datetime
+from datetime import datetime, date
 from decimal import Decimal, ROUND_HALF_UP
 from typing import List, Dict, Optional, Tuple
 import uuid
 import logging
 
+from sqlalchemy import bindparam, func
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
 from backend.extensions import db
 from backend.models.ledger import (
-    LedgerAccount, LedgerTransaction, LedgerEntry,
+    LedgerAccount, LedgerTransaction, LedgerEntry, LedgerBalanceCheckpoint,
     AccountType, EntryType, TransactionType, FXRate
 )
 
 logger = logging.getLogger(__name__)
 
+# Dialects whose INSERT supports ON CONFLICT DO NOTHING
+UPSERT_INSERTS = {'postgresql': postgresql_insert, 'sqlite': sqlite_insert}
+
 
 class LedgerService:
     """Service for managing double-entry ledger transactions."""
@@ -31,6 +39,18 @@ class LedgerService:
     PRECISION = Decimal('0.000001')
     DISPLAY_PRECISION = Decimal('0.01')
     
+    # Accounts per IN (...) list when resolving balances in bulk
+    BALANCE_CHUNK_SIZE = 5000
+    
+    # Trial balance section for each account type
+    TRIAL_BALANCE_CATEGORIES = {
+        AccountType.ASSET: 'assets',
+        AccountType.LIABILITY: 'liabilities',
+        AccountType.EQUITY: 'equity',
+        AccountType.INCOME: 'income',
+        AccountType.EXPENSE: 'expenses',
+    }
+    
     @staticmethod
     def create_account(
         account_code: str,
@@ -142,18 +162,178 @@ class LedgerService:
         Raises:
             ValueError: If transaction is not balanced
         """
-        if not entries or len(entries) < 2:
-            raise ValueError("Transaction requires at least 2 entries (debit and credit)")
-        
         # Generate transaction ID
         transaction_id = str(uuid.uuid4())
         
+        entry_date = entry_date or datetime.utcnow()
+        
+        prepared_entries, total_debit_base = LedgerService._prepare_entries(
+            entries, base_currency, entry_date
+        )
+        
+        # Create transaction
+        transaction = LedgerTransaction(
+            transaction_id=transaction_id,
+            transaction_type=transaction_type,
+            source_type=source_type,
+            source_id=source_id,
+            description=description,
+            reference_number=reference_number,
+            base_currency=base_currency,
+            base_amount=total_debit_base,
+            created_by=created_by,
+            created_at=datetime.utcnow()
+        )
+        
+        db.session.add(transaction)
+        db.session.flush()  # Get transaction ID
+        
+        # Create entries
+        for entry_data in prepared_entries:
+            entry = LedgerEntry(
+                transaction_id=transaction.id,
+                **entry_data
+            )
+            db.session.add(entry)
+        
+        # Checkpoints are updated by the LedgerEntry after_flush listener
+        db.session.commit()
+        
+        logger.info(
+            f"Created ledger transaction {transaction_id}: {transaction_type.value} "
+            f"with {len(entries)} entries, base_amount={total_debit_base}"
+        )
+        
+        return transaction
+    
+    @staticmethod
+    def create_transactions_bulk(
+        transactions: List[Dict],
+        base_currency: str = 'USD',
+        created_by: int = None
+    ) -> Dict:
+        """
+        Post many balanced transactions in a single database commit.
+        
+        Every transaction is validated before anything is written; if any
+        of them is unbalanced the whole batch is rejected. Transactions and
+        entries are then written with bulk inserts.
+        
+        Args:
+            transactions: List of dicts accepting the same keys as
+                create_transaction (transaction_type, entries, description,
+                reference_number, source_type, source_id, base_currency,
+                created_by, entry_date)
+            base_currency: Default base currency for the batch
+            created_by: Default user ID for the batch
+            
+        Returns:
+            Dict with transaction/entry counts and the created IDs
+            
+        Raises:
+            ValueError: If any transaction in the batch is invalid
+        """
+        now = datetime.utcnow()
+        
+        # Validate the whole batch up front
+        transaction_rows = []
+        batch_entries = []
+        errors = []
+        for index, txn_data in enumerate(transactions):
+            txn_currency = txn_data.get('base_currency', base_currency)
+            entry_date = txn_data.get('entry_date') or now
+            
+            try:
+                transaction_type = txn_data['transaction_type']
+                if isinstance(transaction_type, str):
+                    transaction_type = TransactionType[transaction_type]
+                
+                prepared_entries, total_debit_base = LedgerService._prepare_entries(
+                    txn_data.get('entries'), txn_currency, entry_date
+                )
+            except (ValueError, KeyError, ArithmeticError) as e:
+                errors.append(f"#{index}: {e}")
+                continue
+            
+            transaction_rows.append({
+                'transaction_id': str(uuid.uuid4()),
+                'transaction_type': transaction_type,
+                'source_type': txn_data.get('source_type'),
+                'source_id': txn_data.get('source_id'),
+                'description': txn_data.get('description'),
+                'reference_number': txn_data.get('reference_number'),
+                'base_currency': txn_currency,
+                'base_amount': total_debit_base,
+                'created_by': txn_data.get('created_by', created_by),
+                'created_at': now,
+                'is_reversed': False
+            })
+            batch_entries.append(prepared_entries)
+        
+        if errors:
+            raise ValueError(
+                f"Batch rejected, {len(errors)} of {len(transactions)} transactions invalid: "
+                + "; ".join(errors[:10])
+            )
+        
+        if not transaction_rows:
+            return {'transaction_count': 0, 'entry_count': 0, 'ids': [], 'transaction_ids': []}
+        
+        try:
+            db.session.bulk_insert_mappings(
+                LedgerTransaction, transaction_rows, return_defaults=True
+            )
+            
+            entry_rows = [
+                {'transaction_id': txn_row['id'], 'created_at': now, **entry_data}
+                for txn_row, prepared_entries in zip(transaction_rows, batch_entries)
+                for entry_data in prepared_entries
+            ]
+            db.session.bulk_insert_mappings(LedgerEntry, entry_rows)
+            
+            LedgerService._update_balance_checkpoints(
+                [entry_data for prepared_entries in batch_entries for entry_data in prepared_entries]
+            )
+            
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        
+        logger.info(
+            f"Bulk posted {len(transaction_rows)} ledger transactions "
+            f"with {len(entry_rows)} entries"
+        )
+        
+        return {
+            'transaction_count': len(transaction_rows),
+            'entry_count': len(entry_rows),
+            'ids': [row['id'] for row in transaction_rows],
+            'transaction_ids': [row['transaction_id'] for row in transaction_rows]
+        }
+    
+    @staticmethod
+    def _prepare_entries(
+        entries: List[Dict],
+        base_currency: str,
+        entry_date: datetime
+    ) -> Tuple[List[Dict], Decimal]:
+        """
+        Normalize entry dicts and validate that they balance.
+        
+        Returns:
+            Tuple of (prepared entry dicts, total debit in base currency)
+            
+        Raises:
+            ValueError: If there are fewer than 2 entries or they don't balance
+        """
+        if not entries or len(entries) < 2:
+            raise ValueError("Transaction requires at least 2 entries (debit and credit)")
+        
         # Calculate total base amount
         total_debit_base = Decimal('0')
         total_credit_base = Decimal('0')
         
-        entry_date = entry_date or datetime.utcnow()
-        
         # Validate and prepare entries
         prepared_entries = []
         for entry_data in entries:
@@ -198,39 +378,324 @@ class LedgerService:
                 f"Credits={total_credit_base}, Diff={total_debit_base - total_credit_base}"
             )
         
-        # Create transaction
-        transaction = LedgerTransaction(
-            transaction_id=transaction_id,
-            transaction_type=transaction_type,
-            source_type=source_type,
-            source_id=source_id,
-            description=description,
-            reference_number=reference_number,
-            base_currency=base_currency,
-            base_amount=total_debit_base,
-            created_by=created_by,
-            created_at=datetime.utcnow()
+        return prepared_entries, total_debit_base
+    
+    @staticmethod
+    def _update_balance_checkpoints(entries: List[Dict], session=None) -> None:
+        """
+        Fold newly written entries into the daily balance checkpoints.
+        
+        Each (account, day) delta is added to every checkpoint on or after
+        that day, so backdated entries stay consistent. Accounts without any
+        checkpoint are rebuilt from their raw entries instead, which picks
+        up history posted before checkpointing existed.
+        
+        Existing checkpoints are incremented in SQL (``col = col + delta``)
+        rather than read and written back, so concurrent postings to the
+        same account cannot overwrite each other's totals. A day without a
+        checkpoint yet is first inserted as a copy of the one before it.
+        Does not commit; the caller owns the database transaction. Writes go
+        through ``session`` (defaults to db.session), so a flush listener
+        can pass the session being flushed.
+        """
+        session = session or db.session
+        deltas = {}
+        for entry_data in entries:
+            account_deltas = deltas.setdefault(entry_data['account_id'], {})
+            day = entry_data['entry_date'].date()
+            debit, credit, count = account_deltas.get(day, (Decimal('0'), Decimal('0'), 0))
+            
+            if entry_data['entry_type'] == EntryType.DEBIT:
+                debit += entry_data['amount']
+            else:
+                credit += entry_data['amount']
+            
+            account_deltas[day] = (debit, credit, count + 1)
+        
+        if not deltas:
+            return
+        
+        first_day = min(day for account_deltas in deltas.values() for day in account_deltas)
+        columns = (
+            LedgerBalanceCheckpoint.account_id,
+            LedgerBalanceCheckpoint.checkpoint_date,
+            LedgerBalanceCheckpoint.debit_total,
+            LedgerBalanceCheckpoint.credit_total,
+            LedgerBalanceCheckpoint.entry_count
         )
         
-        db.session.add(transaction)
-        db.session.flush()  # Get transaction ID
+        # Checkpoints that may change, plus the last one before the batch per account
+        affected = session.query(*columns).filter(
+            LedgerBalanceCheckpoint.account_id.in_(deltas),
+            LedgerBalanceCheckpoint.checkpoint_date >= first_day
+        ).all()
+        
+        latest_before = session.query(
+            LedgerBalanceCheckpoint.account_id,
+            func.max(LedgerBalanceCheckpoint.checkpoint_date).label('checkpoint_date')
+        ).filter(
+            LedgerBalanceCheckpoint.account_id.in_(deltas),
+            LedgerBalanceCheckpoint.checkpoint_date < first_day
+        ).group_by(LedgerBalanceCheckpoint.account_id).subquery()
+        
+        preceding = session.query(*columns).join(
+            latest_before,
+            (LedgerBalanceCheckpoint.account_id == latest_before.c.account_id)
+            & (LedgerBalanceCheckpoint.checkpoint_date == latest_before.c.checkpoint_date)
+        ).all()
+        
+        stored = {}
+        for row in sorted(preceding + affected, key=lambda r: r.checkpoint_date):
+            stored.setdefault(row.account_id, []).append(row)
+        
+        untracked_ids = set(deltas) - set(stored)
+        if untracked_ids:
+            LedgerService._rebuild_checkpoints(untracked_ids, session=session)
+        
+        inserts = []
+        increments = []
+        now = datetime.utcnow()
+        for account_id, rows in stored.items():
+            existing = {row.checkpoint_date for row in rows}
+            for day, (debit, credit, count) in sorted(deltas[account_id].items()):
+                increments.append({
+                    'b_account_id': account_id, 'b_day': day,
+                    'b_debit': debit, 'b_credit': credit, 'b_count': count, 'b_now': now
+                })
+                if day in existing:
+                    continue
+                
+                # Totals as of the previous day; the increments below add this batch
+                before = [row for row in rows if row.checkpoint_date < day]
+                base = before[-1] if before else None
+                inserts.append({
+                    'account_id': account_id,
+                    'checkpoint_date': day,
+                    'debit_total': base.debit_total if base else Decimal('0'),
+                    'credit_total': base.credit_total if base else Decimal('0'),
+                    'entry_count': base.entry_count if base else 0,
+                    'updated_at': now
+                })
+        
+        if inserts:
+            LedgerService._insert_checkpoints(inserts, session=session)
+        if increments:
+            table = LedgerBalanceCheckpoint.__table__
+            session.execute(
+                table.update()
+                .where(table.c.account_id == bindparam('b_account_id'),
+                       table.c.checkpoint_date >= bindparam('b_day'))
+                .values(debit_total=table.c.debit_total + bindparam('b_debit'),
+                        credit_total=table.c.credit_total + bindparam('b_credit'),
+                        entry_count=table.c.entry_count + bindparam('b_count'),
+                        updated_at=bindparam('b_now')),
+                increments
+            )
+    
+    @staticmethod
+    def _compute_checkpoints(account_ids=None, session=None) -> Dict[int, List[Tuple[date, Decimal, Decimal, int]]]:
+        """
+        Recompute cumulative daily checkpoints from raw ledger entries.
         
-        # Create entries
-        for entry_data in prepared_entries:
-            entry = LedgerEntry(
-                transaction_id=transaction.id,
-                **entry_data
+        Returns:
+            Dict of account_id -> [(day, debit_total, credit_total, entry_count)]
+            ordered by day
+        """
+        session = session or db.session
+        day = func.date(LedgerEntry.entry_date)
+        
+        query = session.query(
+            LedgerEntry.account_id,
+            day,
+            LedgerEntry.entry_type,
+            func.sum(LedgerEntry.amount),
+            func.count(LedgerEntry.id)
+        )
+        
+        if account_ids is not None:
+            query = query.filter(LedgerEntry.account_id.in_(account_ids))
+        
+        rows = query.group_by(
+            LedgerEntry.account_id, day, LedgerEntry.entry_type
+        ).order_by(LedgerEntry.account_id, day).all()
+        
+        daily = {}
+        for account_id, entry_day, entry_type, amount, count in rows:
+            if isinstance(entry_day, str):
+                entry_day = date.fromisoformat(entry_day)
+            
+            key = (account_id, entry_day)
+            debit, credit, total_count = daily.get(key, (Decimal('0'), Decimal('0'), 0))
+            
+            if entry_type == EntryType.DEBIT:
+                debit += Decimal(str(amount))
+            else:
+                credit += Decimal(str(amount))
+            
+            daily[key] = (debit, credit, total_count + count)
+        
+        checkpoints = {}
+        running = {}
+        for (account_id, entry_day), (debit, credit, count) in sorted(daily.items()):
+            prev_debit, prev_credit, prev_count = running.get(
+                account_id, (Decimal('0'), Decimal('0'), 0)
             )
-            db.session.add(entry)
+            running[account_id] = (prev_debit + debit, prev_credit + credit, prev_count + count)
+            checkpoints.setdefault(account_id, []).append((entry_day, *running[account_id]))
         
-        db.session.commit()
+        return checkpoints
+    
+    @staticmethod
+    def _rebuild_checkpoints(account_ids=None, session=None) -> int:
+        """Replace stored checkpoints with ones recomputed from raw entries."""
+        session = session or db.session
+        checkpoints = LedgerService._compute_checkpoints(account_ids, session=session)
         
-        logger.info(
-            f"Created ledger transaction {transaction_id}: {transaction_type.value} "
-            f"with {len(entries)} entries, base_amount={total_debit_base}"
+        delete_query = session.query(LedgerBalanceCheckpoint)
+        if account_ids is not None:
+            delete_query = delete_query.filter(LedgerBalanceCheckpoint.account_id.in_(account_ids))
+        delete_query.delete(synchronize_session=False)
+        
+        rows = [
+            {
+                'account_id': account_id,
+                'checkpoint_date': day,
+                'debit_total': debit,
+                'credit_total': credit,
+                'entry_count': count,
+                'updated_at': datetime.utcnow()
+            }
+            for account_id, days in checkpoints.items()
+            for day, debit, credit, count in days
+        ]
+        
+        if rows:
+            LedgerService._insert_checkpoints(rows, session=session)
+        
+        return len(rows)
+    
+    @staticmethod
+    def _insert_checkpoints(rows: List[Dict], session=None) -> None:
+        """
+        Insert checkpoint rows, skipping (account, day) pairs that already exist.
+        
+        Two postings can both find a day without a checkpoint and race to
+        create it; the loser's insert is dropped by ON CONFLICT DO NOTHING
+        (instead of failing on uq_ledger_checkpoint_day) and its deltas are
+        then applied to the winner's row by the increments that follow.
+        """
+        session = session or db.session
+        table = LedgerBalanceCheckpoint.__table__
+        insert = UPSERT_INSERTS.get(session.get_bind().dialect.name)
+        if insert is None:
+            session.execute(table.insert(), rows)
+            return
+        session.execute(
+            insert(table).on_conflict_do_nothing(index_elements=['account_id', 'checkpoint_date']),
+            rows
         )
+    
+    @staticmethod
+    def rebuild_balance_checkpoints(account_ids: List[int] = None) -> Dict:
+        """
+        Recompute balance checkpoints from the raw ledger entries.
         
-        return transaction
+        Args:
+            account_ids: Accounts to rebuild (defaults to every account)
+            
+        Returns:
+            Dict with the number of accounts and checkpoints written
+        """
+        try:
+            written = LedgerService._rebuild_checkpoints(account_ids)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        
+        accounts = db.session.query(
+            func.count(func.distinct(LedgerBalanceCheckpoint.account_id))
+        )
+        if account_ids is not None:
+            accounts = accounts.filter(LedgerBalanceCheckpoint.account_id.in_(account_ids))
+        
+        logger.info(f"Rebuilt {written} ledger balance checkpoints")
+        
+        return {
+            'accounts_rebuilt': accounts.scalar() or 0,
+            'checkpoints_written': written
+        }
+    
+    @staticmethod
+    def verify_balance_checkpoints(account_ids: List[int] = None) -> Dict:
+        """
+        Compare stored balance checkpoints against the raw ledger entries.
+        
+        Args:
+            account_ids: Accounts to verify (defaults to every account)
+            
+        Returns:
+            Dict with counts and a list of mismatching checkpoints
+        """
+        expected = {
+            (account_id, day): (debit, credit, count)
+            for account_id, days in LedgerService._compute_checkpoints(account_ids).items()
+            for day, debit, credit, count in days
+        }
+        
+        query = db.session.query(
+            LedgerBalanceCheckpoint.account_id,
+            LedgerBalanceCheckpoint.checkpoint_date,
+            LedgerBalanceCheckpoint.debit_total,
+            LedgerBalanceCheckpoint.credit_total,
+            LedgerBalanceCheckpoint.entry_count
+        )
+        if account_ids is not None:
+            query = query.filter(LedgerBalanceCheckpoint.account_id.in_(account_ids))
+        
+        stored = {
+            (account_id, day): (Decimal(str(debit)), Decimal(str(credit)), count)
+            for account_id, day, debit, credit, count in query.all()
+        }
+        
+        # Accounts that were never checkpointed still read raw entries, so
+        # only accounts with stored checkpoints can drift.
+        tracked_ids = {account_id for account_id, _ in stored}
+        
+        mismatches = []
+        for key in sorted(set(expected) | set(stored)):
+            account_id, day = key
+            if account_id not in tracked_ids:
+                continue
+            
+            exp = expected.get(key, (Decimal('0'), Decimal('0'), 0))
+            got = stored.get(key)
+            
+            if (
+                got is None
+                or abs(exp[0] - got[0]) > LedgerService.PRECISION
+                or abs(exp[1] - got[1]) > LedgerService.PRECISION
+                or exp[2] != got[2]
+            ):
+                mismatches.append({
+                    'account_id': account_id,
+                    'checkpoint_date': day.isoformat(),
+                    'expected': {'debit_total': float(exp[0]), 'credit_total': float(exp[1]), 'entry_count': exp[2]},
+                    'stored': {
+                        'debit_total': float(got[0]), 'credit_total': float(got[1]), 'entry_count': got[2]
+                    } if got else None
+                })
+        
+        if mismatches:
+            logger.warning(f"Ledger checkpoint verification found {len(mismatches)} mismatches")
+        
+        return {
+            'accounts_checked': len(tracked_ids),
+            'checkpoints_checked': len(stored),
+            'mismatch_count': len(mismatches),
+            'mismatches': mismatches,
+            'is_consistent': not mismatches
+        }
     
     @staticmethod
     def get_account_balance(
@@ -253,15 +718,145 @@ class LedgerService:
         if not account:
             raise ValueError(f"Account {account_id} not found")
         
-        balance = account.get_balance(as_of_date)
+        if not include_children:
+            return account.get_balance(as_of_date)
         
-        if include_children:
-            for child in account.children:
-                balance += LedgerService.get_account_balance(
-                    child.id, as_of_date, include_children=True
+        # Resolve the whole subtree in memory, then aggregate it in one query
+        children_of = {}
+        for child_id, parent_id in db.session.query(LedgerAccount.id, LedgerAccount.parent_id).filter(
+            LedgerAccount.parent_id.isnot(None)
+        ):
+            children_of.setdefault(parent_id, []).append(child_id)
+        
+        subtree_ids = [account_id]
+        for current_id in subtree_ids:
+            subtree_ids.extend(children_of.get(current_id, []))
+        
+        accounts = LedgerAccount.query.filter(LedgerAccount.id.in_(subtree_ids)).all()
+        totals = LedgerService._aggregate_entry_totals(
+            account_ids=subtree_ids, as_of_date=as_of_date
+        )
+        
+        return sum(
+            (LedgerService._signed_balance(a.account_type, totals.get(a.id, {})) for a in accounts),
+            Decimal('0')
+        )
+    
+    @staticmethod
+    def get_account_balances(account_ids: List[int]) -> Dict[int, Decimal]:
+        """
+        Current balances for many accounts without a query per account.
+
+        Reads the latest checkpoint of every account in one grouped query
+        and falls back to a grouped entry aggregate for accounts that have
+        no checkpoints yet.
+
+        Args:
+            account_ids: Accounts to resolve
+
+        Returns:
+            Dict of account_id -> balance; unknown accounts are omitted
+        """
+        balances = {}
+        account_ids = list(dict.fromkeys(account_ids))
+
+        for start in range(0, len(account_ids), LedgerService.BALANCE_CHUNK_SIZE):
+            chunk = account_ids[start:start + LedgerService.BALANCE_CHUNK_SIZE]
+            account_types = dict(
+                db.session.query(LedgerAccount.id, LedgerAccount.account_type).filter(
+                    LedgerAccount.id.in_(chunk)
                 )
+            )
+
+            latest = db.session.query(
+                LedgerBalanceCheckpoint.account_id,
+                func.max(LedgerBalanceCheckpoint.checkpoint_date).label('checkpoint_date')
+            ).filter(
+                LedgerBalanceCheckpoint.account_id.in_(chunk)
+            ).group_by(LedgerBalanceCheckpoint.account_id).subquery()
+
+            checkpoints = db.session.query(
+                LedgerBalanceCheckpoint.account_id,
+                LedgerBalanceCheckpoint.debit_total,
+                LedgerBalanceCheckpoint.credit_total
+            ).join(
+                latest,
+                (LedgerBalanceCheckpoint.account_id == latest.c.account_id)
+                & (LedgerBalanceCheckpoint.checkpoint_date == latest.c.checkpoint_date)
+            )
+
+            for account_id, debit_total, credit_total in checkpoints:
+                totals = {None: (Decimal(str(debit_total)), Decimal(str(credit_total)))}
+                balances[account_id] = LedgerService._signed_balance(account_types[account_id], totals)
+
+            missing = [account_id for account_id in account_types if account_id not in balances]
+            if missing:
+                totals = LedgerService._aggregate_entry_totals(account_ids=missing)
+                for account_id in missing:
+                    balances[account_id] = LedgerService._signed_balance(
+                        account_types[account_id], totals.get(account_id, {})
+                    )
+
+        return balances
+
+    @staticmethod
+    def _aggregate_entry_totals(
+        account_ids: List[int] = None,
+        as_of_date: datetime = None,
+        entity_type: str = None,
+        entity_id: int = None
+    ) -> Dict[int, Dict[str, Tuple[Decimal, Decimal]]]:
+        """
+        Sum debits and credits for many accounts in a single grouped query.
+        
+        Returns:
+            Dict of account_id -> {currency: (debit_total, credit_total)}
+        """
+        query = db.session.query(
+            LedgerEntry.account_id,
+            LedgerEntry.currency,
+            LedgerEntry.entry_type,
+            func.sum(LedgerEntry.amount)
+        )
         
-        return balance
+        if account_ids is not None:
+            query = query.filter(LedgerEntry.account_id.in_(account_ids))
+        if entity_type or entity_id:
+            query = query.join(LedgerAccount, LedgerEntry.account_id == LedgerAccount.id).filter(
+                LedgerAccount.is_active == True
+            )
+            if entity_type:
+                query = query.filter(LedgerAccount.entity_type == entity_type)
+            if entity_id:
+                query = query.filter(LedgerAccount.entity_id == entity_id)
+        if as_of_date:
+            query = query.filter(LedgerEntry.entry_date <= as_of_date)
+        
+        totals = {}
+        for account_id, currency, entry_type, amount in query.group_by(
+            LedgerEntry.account_id, LedgerEntry.currency, LedgerEntry.entry_type
+        ):
+            by_currency = totals.setdefault(account_id, {})
+            debit, credit = by_currency.get(currency, (Decimal('0'), Decimal('0')))
+            
+            if entry_type == EntryType.DEBIT:
+                debit += Decimal(str(amount))
+            else:
+                credit += Decimal(str(amount))
+            
+            by_currency[currency] = (debit, credit)
+        
+        return totals
+    
+    @staticmethod
+    def _signed_balance(account_type: AccountType, totals: Dict[str, Tuple[Decimal, Decimal]]) -> Decimal:
+        """Apply the account's normal balance side to aggregated totals."""
+        debits = sum((debit for debit, _ in totals.values()), Decimal('0'))
+        credits = sum((credit for _, credit in totals.values()), Decimal('0'))
+        
+        if account_type in [AccountType.ASSET, AccountType.EXPENSE]:
+            return debits - credits
+        return credits - debits
     
     @staticmethod
     def get_account_statement(
@@ -547,11 +1142,24 @@ class LedgerService:
     def get_trial_balance(
         entity_type: str = None,
         entity_id: int = None,
-        as_of_date: datetime = None
+        as_of_date: datetime = None,
+        include_children: bool = False,
+        currency_breakdown: bool = False
     ) -> Dict:
         """
         Generate trial balance report.
         
+        Balances for every account come from one grouped aggregate over
+        the ledger entries; parent/child roll-ups are computed in memory.
+        
+        Args:
+            entity_type: Only include accounts for this entity type
+            entity_id: Only include accounts for this entity
+            as_of_date: Optional cutoff date
+            include_children: Add a 'rolled_up_balance' per account that
+                includes its descendants within the report
+            currency_breakdown: Add per-currency balances per account
+            
         Returns:
             Dict with account balances grouped by type
         """
@@ -562,7 +1170,13 @@ class LedgerService:
         if entity_id:
             query = query.filter_by(entity_id=entity_id)
         
-        accounts = query.all()
+        accounts = query.order_by(LedgerAccount.account_code).all()
+        
+        totals_by_account = LedgerService._aggregate_entry_totals(
+            as_of_date=as_of_date,
+            entity_type=entity_type,
+            entity_id=entity_id
+        )
         
         trial_balance = {
             'assets': [],
@@ -576,8 +1190,33 @@ class LedgerService:
             }
         }
         
+        balances = {
+            account.id: LedgerService._signed_balance(
+                account.account_type, totals_by_account.get(account.id, {})
+            )
+            for account in accounts
+        }
+        
+        rolled_up = {}
+        if include_children:
+            children_of = {}
+            for account in accounts:
+                if account.parent_id in balances:
+                    children_of.setdefault(account.parent_id, []).append(account.id)
+            
+            def roll_up(account_id):
+                if account_id not in rolled_up:
+                    rolled_up[account_id] = balances[account_id] + sum(
+                        (roll_up(child_id) for child_id in children_of.get(account_id, [])),
+                        Decimal('0')
+                    )
+                return rolled_up[account_id]
+            
+            for account in accounts:
+                roll_up(account.id)
+        
         for account in accounts:
-            balance = account.get_balance(as_of_date)
+            balance = balances[account.id]
             
             entry = {
                 'account_code': account.account_code,
@@ -588,12 +1227,17 @@ class LedgerService:
                 'credit': float(abs(balance)) if balance < 0 else 0
             }
             
-            category = account.account_type.value.lower() + 's'
-            if category == 'expensess':
-                category = 'expenses'
+            if include_children:
+                entry['parent_id'] = account.parent_id
+                entry['rolled_up_balance'] = float(rolled_up[account.id])
+            
+            if currency_breakdown:
+                entry['currencies'] = {
+                    currency: float(LedgerService._signed_balance(account.account_type, {currency: sides}))
+                    for currency, sides in sorted(totals_by_account.get(account.id, {}).items())
+                }
             
-            if category in trial_balance:
-                trial_balance[category].append(entry)
+            trial_balance[LedgerService.TRIAL_BALANCE_CATEGORIES[account.account_type]].append(entry)
             
             if balance > 0:
                 trial_balance['totals']['total_debits'] += balance
@@ -0,0 +1,434 @@
+"""
+LLM Gateway: Shared entry point for Gemini calls.
+
+This module provides:
+- Cache keys built from canonicalized prompts, so key order and whitespace
+  in embedded JSON or user text do not defeat the cache
+- Per-feature TTL tiers (config key LLM_CACHE_TTLS overrides them), with a
+  process-local cache in front of the Flask-Caching backend
+- Request coalescing: concurrent identical calls share one API call
+- Global and per-feature concurrency limits on calls to the API
+- Hit-rate, latency and token-usage metrics per feature
+- StubLLM, a local stand-in model for tests and development
+  (LLM_BACKEND=stub)
+"""
+
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+import hashlib
+import json
+import os
+import threading
+import time
+import logging
+
+from flask import current_app, has_app_context
+
+from backend.monitoring import metrics
+
+logger = logging.getLogger(__name__)
+
+metrics.describe('agritech_llm_requests_total', 'LLM gateway calls, by feature and outcome (hit, miss, coalesced, error)')
+metrics.describe('agritech_llm_latency_seconds', 'Latency of LLM API calls made by the gateway, by feature')
+metrics.describe('agritech_llm_tokens_total', 'Tokens used by LLM API calls, by feature and kind (prompt, completion)')
+
+
+class LLMGatewayError(Exception):
+    """The LLM call failed, returned no text or could not be scheduled."""
+
+
+@dataclass
+class LLMResult:
+    text: str
+    feature: str
+    model: str
+    cached: bool = False
+    coalesced: bool = False
+    latency_ms: float = 0.0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+
+def canonicalize(value: Any) -> Any:
+    """
+    Normal form of prompt inputs: dict keys sorted (by json.dumps), runs of
+    whitespace in strings collapsed, integral floats turned into ints.
+    """
+    if isinstance(value, str):
+        return ' '.join(value.split())
+    if isinstance(value, dict):
+        return {str(key).strip(): canonicalize(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [canonicalize(item) for item in value]
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def canonical_json(value: Any) -> str:
+    """Deterministic JSON for embedding structured inputs in a prompt."""
+    return json.dumps(canonicalize(value), sort_keys=True, ensure_ascii=False, default=str)
+
+
+class StubLLM:
+    """
+    Local stand-in for a Gemini GenerativeModel.
+
+    Replies are deterministic: `responder(prompt)` when given, otherwise a
+    short digest of the prompt. Every prompt is recorded in `calls`.
+    """
+
+    class Response:
+        def __init__(self, text: str, prompt_tokens: int, completion_tokens: int):
+            self.text = text
+            self.usage_metadata = type('UsageMetadata', (), {
+                'prompt_token_count': prompt_tokens,
+                'candidates_token_count': completion_tokens
+            })()
+
+    def __init__(self, responder: Optional[Callable[[str], str]] = None, delay: float = 0.0,
+                 model_name: str = 'stub'):
+        self.responder = responder
+        self.delay = delay
+        self.model_name = model_name
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt: str):
+        with self._lock:
+            self.calls.append(prompt)
+        if self.delay:
+            time.sleep(self.delay)
+        if self.responder:
+            text = self.responder(prompt)
+        else:
+            text = f"stub reply {hashlib.sha1(prompt.encode()).hexdigest()[:12]}"
+        return StubLLM.Response(text, len(prompt.split()), len(text.split()))
+
+
+class LLMGateway:
+    """
+    Cached, coalesced and rate-limited LLM calls.
+
+    Callers name a feature, which selects the cache TTL and concurrency
+    limit, and pass the final prompt. Structured data should be embedded
+    with canonical_json() so equivalent inputs produce the same prompt.
+    """
+
+    DEFAULT_MODEL_ID = 'gemini-2.5-flash'
+
+    # Cache lifetime per feature, in seconds; 0 disables caching
+    FEATURE_TTLS = {
+        'loan_eligibility': 86400,
+        'forum_moderation': 7 * 86400,
+        'forum_auto_answer': 86400,
+        'knowledge_rerank': 3600,
+        'crop_advisory': 6 * 3600,
+        'market_trends': 6 * 3600,
+    }
+    DEFAULT_TTL_SECONDS = 3600
+    MAX_LOCAL_ENTRIES = 2000
+    # Entries read from the shared cache are kept locally this long
+    LOCAL_REFILL_SECONDS = 300
+
+    # Concurrent API calls, across all features and per feature
+    MAX_CONCURRENCY = 8
+    FEATURE_CONCURRENCY = {'forum_moderation': 4, 'knowledge_rerank': 4}
+    # How long a call may wait for a concurrency slot or a coalesced result
+    WAIT_TIMEOUT_SECONDS = 60
+
+    _lock = threading.Lock()
+    _entries: Dict[str, tuple] = {}
+    _inflight: Dict[str, Future] = {}
+    _stats: Dict[str, Dict[str, int]] = {}
+    _semaphores: Dict[str, threading.BoundedSemaphore] = {}
+    _clients: Dict[str, Any] = {}
+    _client_override = None
+
+    @classmethod
+    def generate(cls, feature: str, prompt: str, client=None, model_id: Optional[str] = None,
+                 ttl: Optional[float] = None) -> LLMResult:
+        """
+        Answer a prompt, from cache when an equivalent prompt was answered
+        within the feature's TTL.
+
+        Args:
+            feature: Calling feature, e.g. 'loan_eligibility'
+            prompt: Final prompt text
+            client: Object with generate_content(prompt); defaults to the
+                configured Gemini model (or the stub)
+            model_id: Gemini model id for the default client
+            ttl: Cache lifetime override in seconds; 0 disables caching
+
+        Raises:
+            LLMGatewayError: The call failed or returned no text
+        """
+        client = client or cls.client(model_id)
+        model = str(getattr(client, 'model_name', None) or type(client).__name__)
+        ttl = cls.ttl_for(feature) if ttl is None else ttl
+        key = cls.cache_key(feature, model, prompt)
+
+        if ttl > 0:
+            cached = cls._cache_get(key)
+            if cached is not None:
+                cls._count(feature, 'hit')
+                return LLMResult(cached['text'], feature, model, cached=True,
+                                 prompt_tokens=cached.get('prompt_tokens', 0),
+                                 completion_tokens=cached.get('completion_tokens', 0))
+
+        with cls._lock:
+            future = cls._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = cls._inflight[key] = Future()
+
+        if not leader:
+            cls._count(feature, 'coalesced')
+            try:
+                result = future.result(timeout=cls.WAIT_TIMEOUT_SECONDS)
+            except LLMGatewayError:
+                raise
+            except Exception as e:
+                raise LLMGatewayError(f"Shared {feature} call failed: {e}") from e
+            return LLMResult(result.text, feature, model, coalesced=True,
+                             prompt_tokens=result.prompt_tokens, completion_tokens=result.completion_tokens)
+
+        try:
+            result = cls._call(feature, model, client, prompt)
+            if ttl > 0:
+                cls._cache_set(key, {
+                    'text': result.text,
+                    'prompt_tokens': result.prompt_tokens,
+                    'completion_tokens': result.completion_tokens
+                }, ttl)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with cls._lock:
+                cls._inflight.pop(key, None)
+
+    @classmethod
+    def generate_text(cls, feature: str, prompt: str, **kwargs) -> str:
+        """Shortcut for generate(...).text."""
+        return cls.generate(feature, prompt, **kwargs).text
+
+    @staticmethod
+    def cache_key(feature: str, model: str, prompt: str) -> str:
+        digest = hashlib.sha256(canonical_json([feature, model, prompt]).encode('utf-8')).hexdigest()
+        return f"llm:{feature}:{digest}"
+
+    @classmethod
+    def ttl_for(cls, feature: str) -> float:
+        ttls = (current_app.config.get('LLM_CACHE_TTLS') or {}) if has_app_context() else {}
+        if feature in ttls:
+            return float(ttls[feature])
+        return float(cls.FEATURE_TTLS.get(feature, cls.DEFAULT_TTL_SECONDS))
+
+    # ==================== CLIENTS ====================
+
+    @classmethod
+    def client(cls, model_id: Optional[str] = None):
+        """
+        The model object used when callers pass none: the override set with
+        set_client(), a StubLLM when LLM_BACKEND is 'stub', or a Gemini
+        GenerativeModel.
+        """
+        if cls._client_override is not None:
+            return cls._client_override
+
+        backend = cls._setting('LLM_BACKEND', 'gemini')
+        model_id = model_id or cls._setting('GEMINI_MODEL_ID', cls.DEFAULT_MODEL_ID)
+        name = f"{backend}:{model_id}"
+        client = cls._clients.get(name)
+        if client is not None:
+            return client
+
+        if backend == 'stub':
+            client = StubLLM(model_name=f"stub-{model_id}")
+        else:
+            api_key = cls._setting('GEMINI_API_KEY')
+            if not api_key:
+                raise LLMGatewayError("GEMINI_API_KEY not configured")
+            import google.generativeai as genai
+            genai.configure(api_key=api_key)
+            client = genai.GenerativeModel(model_id)
+        cls._clients[name] = client
+        return client
+
+    @classmethod
+    def set_client(cls, client) -> None:
+        """Route every default-client call to `client` (None restores the default)."""
+        cls._client_override = client
+
+    @staticmethod
+    def _setting(name: str, default=None):
+        if has_app_context() and current_app.config.get(name):
+            return current_app.config[name]
+        return os.environ.get(name, default)
+
+    # ==================== CALLS ====================
+
+    @classmethod
+    def _call(cls, feature: str, model: str, client, prompt: str) -> LLMResult:
+        global_slot = cls._semaphore('*', cls.MAX_CONCURRENCY)
+        feature_limit = cls.FEATURE_CONCURRENCY.get(feature)
+        feature_slot = cls._semaphore(feature, feature_limit) if feature_limit else None
+
+        if not global_slot.acquire(timeout=cls.WAIT_TIMEOUT_SECONDS):
+            cls._count(feature, 'error')
+            raise LLMGatewayError(f"No LLM capacity for {feature} within {cls.WAIT_TIMEOUT_SECONDS}s")
+        try:
+            if feature_slot and not feature_slot.acquire(timeout=cls.WAIT_TIMEOUT_SECONDS):
+                cls._count(feature, 'error')
+                raise LLMGatewayError(f"No LLM capacity for {feature} within {cls.WAIT_TIMEOUT_SECONDS}s")
+            try:
+                started = time.perf_counter()
+                try:
+                    response = client.generate_content(prompt)
+                    text = response.text
+                except Exception as e:
+                    cls._count(feature, 'error')
+                    raise LLMGatewayError(f"{feature} call to {model} failed: {e}") from e
+                latency = time.perf_counter() - started
+            finally:
+                if feature_slot:
+                    feature_slot.release()
+        finally:
+            global_slot.release()
+
+        if not isinstance(text, str) or not text.strip():
+            cls._count(feature, 'error')
+            raise LLMGatewayError(f"{feature} call to {model} returned no text")
+
+        usage = getattr(response, 'usage_metadata', None)
+        prompt_tokens = getattr(usage, 'prompt_token_count', 0)
+        completion_tokens = getattr(usage, 'candidates_token_count', 0)
+        prompt_tokens = prompt_tokens if isinstance(prompt_tokens, int) else 0
+        completion_tokens = completion_tokens if isinstance(completion_tokens, int) else 0
+
+        labels = {'feature': feature}
+        metrics.observe('agritech_llm_latency_seconds', latency, labels=labels)
+        metrics.increment('agritech_llm_tokens_total', prompt_tokens, labels={**labels, 'kind': 'prompt'})
+        metrics.increment('agritech_llm_tokens_total', completion_tokens, labels={**labels, 'kind': 'completion'})
+        cls._count(feature, 'miss', prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+
+        return LLMResult(text, feature, model, latency_ms=round(latency * 1000, 2),
+                         prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+
+    @classmethod
+    def _semaphore(cls, name: str, size: int) -> threading.BoundedSemaphore:
+        with cls._lock:
+            semaphore = cls._semaphores.get(name)
+            if semaphore is None:
+                if name == '*':
+                    size = int(cls._setting('LLM_MAX_CONCURRENCY', size))
+                semaphore = cls._semaphores[name] = threading.BoundedSemaphore(size)
+            return semaphore
+
+    # ==================== CACHE ====================
+
+    @classmethod
+    def _cache_get(cls, key: str) -> Optional[Dict]:
+        now = time.monotonic()
+        with cls._lock:
+            entry = cls._entries.get(key)
+            if entry and entry[0] > now:
+                return entry[1]
+            if entry:
+                del cls._entries[key]
+
+        shared = cls._shared_cache()
+        if shared is None:
+            return None
+        try:
+            value = shared.get(key)
+        except Exception as e:
+            logger.debug(f"LLM cache read failed: {e}")
+            return None
+        if isinstance(value, dict) and 'text' in value:
+            with cls._lock:
+                cls._entries[key] = (now + cls.LOCAL_REFILL_SECONDS, value)
+            return value
+        return None
+
+    @classmethod
+    def _cache_set(cls, key: str, value: Dict, ttl: float) -> None:
+        now = time.monotonic()
+        with cls._lock:
+            cls._entries.pop(key, None)
+            cls._entries[key] = (now + ttl, value)
+            if len(cls._entries) > cls.MAX_LOCAL_ENTRIES:
+                for stale in [k for k, (expires_at, _) in cls._entries.items() if expires_at <= now]:
+                    del cls._entries[stale]
+                while len(cls._entries) > cls.MAX_LOCAL_ENTRIES:
+                    del cls._entries[next(iter(cls._entries))]
+
+        shared = cls._shared_cache()
+        if shared is not None:
+            try:
+                shared.set(key, value, timeout=int(ttl))
+            except Exception as e:
+                logger.debug(f"LLM cache write failed: {e}")
+
+    @staticmethod
+    def _shared_cache():
+        """The app's Flask-Caching cache, when one is initialized."""
+        if not has_app_context():
+            return None
+        from backend.extensions.cache import cache
+        if cache not in current_app.extensions.get('cache', {}):
+            return None
+        return cache
+
+    @classmethod
+    def invalidate(cls) -> None:
+        """Drop the process-local cache (the shared cache expires by TTL)."""
+        with cls._lock:
+            cls._entries.clear()
+
+    # ==================== STATS ====================
+
+    @classmethod
+    def _count(cls, feature: str, outcome: str, prompt_tokens: int = 0, completion_tokens: int = 0) -> None:
+        metrics.increment('agritech_llm_requests_total', labels={'feature': feature, 'outcome': outcome})
+        with cls._lock:
+            stats = cls._stats.setdefault(feature, {
+                'hit': 0, 'miss': 0, 'coalesced': 0, 'error': 0, 'prompt_tokens': 0, 'completion_tokens': 0
+            })
+            stats[outcome] += 1
+            stats['prompt_tokens'] += prompt_tokens
+            stats['completion_tokens'] += completion_tokens
+
+    @classmethod
+    def stats(cls) -> Dict[str, Dict[str, Any]]:
+        """Per-feature calls, hit rate, tokens and API latency of this process."""
+        with cls._lock:
+            snapshot = {feature: dict(stats) for feature, stats in cls._stats.items()}
+
+        for feature, stats in snapshot.items():
+            served = stats['hit'] + stats['coalesced']
+            requests = served + stats['miss'] + stats['error']
+            labels = {'feature': feature}
+            p50 = metrics.quantile('agritech_llm_latency_seconds', 0.5, labels=labels)
+            p95 = metrics.quantile('agritech_llm_latency_seconds', 0.95, labels=labels)
+            stats.update({
+                'requests': requests,
+                'hit_rate': round(served / requests, 4) if requests else 0.0,
+                'latency_p50_ms': round(p50 * 1000, 2) if p50 is not None else None,
+                'latency_p95_ms': round(p95 * 1000, 2) if p95 is not None else None
+            })
+        return snapshot
+
+    @classmethod
+    def reset(cls) -> None:
+        """Clear caches, counters and clients (tests)."""
+        with cls._lock:
+            cls._entries.clear()
+            cls._stats.clear()
+            cls._semaphores.clear()
+            cls._clients.clear()
+        cls._client_override = None
@@ -18,7 +18,7 @@ from datetime import datetime, timedelta
 from backend.extensions import db
 from backend.models.logistics_v2 import (
     TransportRoute, PhytoSanitaryCertificate, FreightEscrow,
-    CustomsCheckpoint, GPSTelemetry, DriverProfile
+    CustomsCheckpoint, DriverProfile
 )
 from backend.models.traceability import SupplyBatch, CustodyLog
 from backend.models.ledger import (
@@ -26,6 +26,7 @@ from backend.models.ledger import (
     TransactionType, EntryType, AccountType
 )
 from backend.models.audit_log import AuditLog
+from backend.services.gps_ingestion import EscrowGeofenceCache, GPSTelemetryBuffer, telemetry_row
 import logging
 
 logger = logging.getLogger(__name__)
@@ -176,6 +177,7 @@ class LogisticsOrchestrator:
         )
 
         db.session.commit()
+        EscrowGeofenceCache.invalidate()
         logger.info(f"[Orchestrator] Escrow locked: ${total:.2f} for Route {route_id}")
         return escrow, None
 
@@ -186,49 +188,100 @@ class LogisticsOrchestrator:
     def ingest_gps_ping(route_id: int, vehicle_id: int, lat: float, lng: float,
                          speed: float = 0.0, fuel_price: float = 1.10) -> dict:
         """
-        Persists a GPS telemetry ping and evaluates the geo-fence for the
+        Buffers a GPS telemetry ping and evaluates the geo-fence for the
         linked FreightEscrow. Triggers smart-contract release if inside the fence.
         """
-        ping = GPSTelemetry(
-            route_id=route_id,
-            vehicle_id=vehicle_id,
-            latitude=lat,
-            longitude=lng,
-            speed_kmh=speed,
-            fuel_price_per_liter=fuel_price
-        )
-        db.session.add(ping)
+        batch = LogisticsOrchestrator.ingest_gps_batch([{
+            "route_id": route_id, "vehicle_id": vehicle_id, "lat": lat, "lng": lng,
+            "speed": speed, "fuel_price": fuel_price
+        }])
 
-        # Check geo-fence
-        escrow = FreightEscrow.query.filter_by(route_id=route_id, status='HELD').first()
         result = {"geo_fence_passed": False, "escrow_released": False}
+        if batch["releases"]:
+            release = batch["releases"][0]
+            result["geo_fence_passed"] = True
+            result["escrow_released"] = release["released"]
+            if release["released"]:
+                result["final_amount"] = release["final_amount"]
+        return result
 
-        if escrow:
-            dist = haversine_distance(lat, lng, escrow.destination_lat, escrow.destination_lng)
-            if dist <= escrow.geo_fence_radius_meters:
-                escrow.confirmed_delivery_lat = lat
-                escrow.confirmed_delivery_lng = lng
-                escrow.geo_fence_passed = True
-
-                # Compute customs delay penalties
-                delay_penalty = LogisticsOrchestrator._calculate_customs_penalty(route_id)
-                if delay_penalty > 0:
-                    escrow.customs_delay_penalty = delay_penalty
-                    escrow.final_amount = escrow.total_freight_amount - delay_penalty
-
-                # Generate delivery proof hash
-                proof_raw = f"{route_id}:{lat}:{lng}:{datetime.utcnow().isoformat()}"
-                escrow.delivery_proof_hash = hashlib.sha256(proof_raw.encode()).hexdigest()
-
-                # Release funds
-                LogisticsOrchestrator._release_escrow(escrow)
-                result["geo_fence_passed"] = True
-                result["escrow_released"] = True
-                result["final_amount"] = escrow.final_amount
-                logger.info(f"[Orchestrator] GEO-FENCE PASSED — Route {route_id}, Escrow released ${escrow.final_amount:.2f}")
+    @staticmethod
+    def ingest_gps_batch(pings: list) -> dict:
+        """
+        Ingests an array of GPS pings.
 
-        db.session.commit()
-        return result
+        Telemetry rows go to the shared buffer and are bulk-inserted on a
+        size/age flush. All pings are checked against the cached HELD escrow
+        geo-fences in one vectorized pass; only escrow release runs as a
+        synchronous transaction, once per route whose fence was entered.
+        """
+        rows = [telemetry_row(ping) for ping in pings]
+        if not rows:
+            return {"accepted": 0, "flushed": 0, "releases": []}
+
+        passed = EscrowGeofenceCache.evaluate(
+            [row["route_id"] for row in rows],
+            [row["latitude"] for row in rows],
+            [row["longitude"] for row in rows]
+        )
+        flushed = GPSTelemetryBuffer.add(rows)
+
+        releases = []
+        for route_id, (escrow_id, position) in passed.items():
+            row = rows[position]
+            final_amount = LogisticsOrchestrator._release_escrow_on_geofence(
+                escrow_id, row["latitude"], row["longitude"]
+            )
+            releases.append({
+                "route_id": route_id,
+                "escrow_id": escrow_id,
+                "released": final_amount is not None,
+                "final_amount": final_amount
+            })
+
+        return {"accepted": len(rows), "flushed": flushed, "releases": releases}
+
+    @staticmethod
+    def _release_escrow_on_geofence(escrow_id: int, lat: float, lng: float):
+        """
+        Releases a HELD escrow whose geo-fence was entered, in one transaction.
+        Returns the released amount, or None if the escrow was already settled.
+        """
+        try:
+            escrow = FreightEscrow.query.filter_by(
+                id=escrow_id, status='HELD'
+            ).with_for_update().first()
+            if not escrow:
+                EscrowGeofenceCache.invalidate()
+                return None
+
+            route_id = escrow.route_id
+            escrow.confirmed_delivery_lat = lat
+            escrow.confirmed_delivery_lng = lng
+            escrow.geo_fence_passed = True
+
+            # Compute customs delay penalties
+            delay_penalty = LogisticsOrchestrator._calculate_customs_penalty(route_id)
+            if delay_penalty > 0:
+                escrow.customs_delay_penalty = delay_penalty
+                escrow.final_amount = escrow.total_freight_amount - delay_penalty
+
+            # Generate delivery proof hash
+            proof_raw = f"{route_id}:{lat}:{lng}:{datetime.utcnow().isoformat()}"
+            escrow.delivery_proof_hash = hashlib.sha256(proof_raw.encode()).hexdigest()
+
+            # Release funds
+            LogisticsOrchestrator._release_escrow(escrow)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"[Orchestrator] Escrow release failed for escrow {escrow_id}: {e}", exc_info=True)
+            return None
+        finally:
+            EscrowGeofenceCache.invalidate()
+
+        logger.info(f"[Orchestrator] GEO-FENCE PASSED — Route {route_id}, Escrow released ${escrow.final_amount:.2f}")
+        return escrow.final_amount
 
     # ──────────────────────────────────────────────────────────────────────────
     # 4. Customs Checkpoint Management
@@ -3,7 +3,8 @@ import random
 from backend.extensions import db
 from backend.models import MarketPrice, PriceWatchlist, User
 from backend.services.notification_service import NotificationService
-import google.generativeai as genai
+from backend.services.llm_gateway import LLMGateway
+from backend.services.watchlist_index import watchlist_index
 import os
 
 class MarketIntelligenceService:
@@ -32,7 +33,8 @@ class MarketIntelligenceService:
                 price_record = MarketPrice.query.filter_by(crop_name=crop, district=district).first()
                 
                 # Dynamic price simulation (+/- 5% movement)
-                base_price = price_record.modal_price if price_record else random.randint(1000, 5000)
+                previous_price = price_record.modal_price if price_record else None
+                base_price = previous_price or random.randint(1000, 5000)
                 change = base_price * random.uniform(-0.05, 0.05)
                 new_price = round(base_price + change, 2)
                 
@@ -52,10 +54,10 @@ class MarketIntelligenceService:
                     price_record.min_price = round(new_price * 0.9, 2)
                     price_record.max_price = round(new_price * 1.1, 2)
                 
-                updated_data.append(price_record.to_dict())
+                updated_data.append((price_record, previous_price))
         
         db.session.commit()
-        return updated_data
+        return [dict(record.to_dict(), previous_price=previous) for record, previous in updated_data]
 
     @staticmethod
     def analyze_price_trends(crop_name, district):
@@ -71,9 +73,6 @@ class MarketIntelligenceService:
         if not api_key:
             return {"error": "AI Service not configured"}
 
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel("gemini-2.5-flash")
-
         prompt = f"""
         Analyze the market trend for {crop_name} in {district}.
         Current Price: ₹{current_price.modal_price} per {current_price.unit}.
@@ -88,11 +87,11 @@ class MarketIntelligenceService:
         """
 
         try:
-            response = model.generate_content(prompt)
+            analysis = LLMGateway.generate_text('market_trends', prompt, model_id="gemini-2.5-flash")
             return {
                 "crop": crop_name,
                 "district": district,
-                "analysis": response.text,
+                "analysis": analysis,
                 "timestamp": datetime.utcnow().isoformat()
             }
         except Exception as e:
@@ -101,32 +100,81 @@ class MarketIntelligenceService:
     @staticmethod
     def check_watchlist_alerts(updated_prices):
         """
-        Check if updated prices cross target thresholds for users.
+        Alert users whose watchlist target was crossed by updated prices.
+
+        Updates are matched against the in-memory watchlist index (one
+        bisect per price and book) and the alerts are registered in bulk.
+
+        Args:
+            updated_prices: Dicts with crop_name, district and modal_price,
+                and optionally previous_price
+
+        Returns:
+            List of {'user_id', 'watch_id', 'msg'} for the alerts triggered
         """
-        alerts_triggered = []
-        for price_data in updated_prices:
-            watchers = PriceWatchlist.query.filter_by(
-                crop_name=price_data['crop_name'], 
-                alert_enabled=True
-            ).all()
-            
-            for watcher in watchers:
-                # Trigger alert if current price is higher than target (Profit opportunity)
-                if price_data['modal_price'] >= watcher.target_price:
-                    msg = f"Profit Opportunity! {watcher.crop_name} price in {price_data['district']} reached ₹{price_data['modal_price']}, crossing your target of ₹{watcher.target_price}."
-                    
-                    from backend.services.alert_registry import AlertRegistry
-                    AlertRegistry.register_alert(
-                        user_id=watcher.user_id,
-                        title="Market Price Alert",
-                        message=msg,
-                        category="MARKET",
-                        priority="HIGH",
-                        action_url=f"/market?crop={watcher.crop_name}",
-                        group_key=f"price_{watcher.crop_name}_{price_data['district']}"
-                    )
-                    alerts_triggered.append({
-                        "user_id": watcher.user_id,
-                        "msg": msg
-                    })
+        alerts, alerts_triggered = [], []
+        for match in watchlist_index.match(updated_prices):
+            # Trigger alert if current price is higher than target (Profit opportunity)
+            msg = (f"Profit Opportunity! {match.crop_name} price in {match.district} reached ₹{match.price}, "
+                   f"crossing your target of ₹{match.target_price}.")
+            alerts.append({
+                'user_id': match.user_id,
+                'title': "Market Price Alert",
+                'message': msg,
+                'action_url': f"/market?crop={match.crop_name}",
+                'group_key': f"price_{match.crop_name}_{match.district}",
+                'metadata': {'watch_id': match.watch_id, 'price': match.price, 'target_price': match.target_price}
+            })
+            alerts_triggered.append({
+                "user_id": match.user_id,
+                "watch_id": match.watch_id,
+                "msg": msg
+            })
+
+        if alerts:
+            from backend.services.alert_registry import AlertRegistry
+            AlertRegistry.register_alerts_batch(alerts, category="MARKET", priority="HIGH")
         return alerts_triggered
+
+    @staticmethod
+    def add_watch(user_id, crop_name, target_price, district=None):
+        """Create a watchlist entry and index it."""
+        watch = PriceWatchlist(
+            user_id=user_id,
+            crop_name=crop_name,
+            district=district,
+            target_price=float(target_price)
+        )
+        db.session.add(watch)
+        db.session.commit()
+        watchlist_index.upsert(watch)
+        return watch
+
+    @staticmethod
+    def update_watch(watch_id, user_id, **changes):
+        """
+        Change a user's watchlist entry (target_price, district,
+        alert_enabled) and re-index it. Returns None if not found.
+        """
+        watch = PriceWatchlist.query.filter_by(id=watch_id, user_id=user_id).first()
+        if not watch:
+            return None
+        for field in ('target_price', 'district', 'alert_enabled'):
+            if field in changes:
+                setattr(watch, field, changes[field])
+        if watch.target_price is not None:
+            watch.target_price = float(watch.target_price)
+        db.session.commit()
+        watchlist_index.upsert(watch)
+        return watch
+
+    @staticmethod
+    def remove_watch(watch_id, user_id):
+        """Delete a user's watchlist entry. Returns False if not found."""
+        watch = PriceWatchlist.query.filter_by(id=watch_id, user_id=user_id).first()
+        if not watch:
+            return False
+        db.session.delete(watch)
+        db.session.commit()
+        watchlist_index.remove(watch_id)
+        return True
@@ -0,0 +1,399 @@
+"""
+Model Registry: Process-wide loading, sharing and hot reload of ML models.
+
+This module provides:
+- One registration per model file with a lazy or preload policy
+- joblib loading with mmap_mode='r', so a model's NumPy arrays are backed by
+  the page cache and shared between forked gunicorn/celery workers
+- Content-hash versions and hot reload when a model file is replaced
+- Per-model load time, memory and inference latency metrics
+
+Model files should be replaced by renaming a new file over the old one: a
+memory-mapped model keeps reading the old inode until it is reloaded.
+"""
+
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import hashlib
+import os
+import threading
+import time
+import warnings
+import logging
+
+from flask import current_app, has_app_context
+
+from backend.monitoring import metrics
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+CROP_MODEL_PATH = os.path.join(BASE_DIR, "crop_recommendation", "model", "rf_model.pkl")
+CROP_ENCODER_PATH = os.path.join(BASE_DIR, "crop_recommendation", "model", "label_encoder.pkl")
+DISEASE_MODULE_PATH = os.path.join(BASE_DIR, "Disease prediction")
+DISEASE_MODEL_PATH = os.path.join(DISEASE_MODULE_PATH, "model.h5")
+
+metrics.describe('agritech_model_load_seconds', 'Time to load a model file, by model')
+metrics.describe('agritech_model_memory_bytes', 'Resident memory added by loading a model, by model')
+metrics.describe('agritech_model_inference_seconds', 'Model inference time per call, by model')
+metrics.describe('agritech_model_reloads_total', 'Hot reloads after a model file changed, by model')
+
+
+@dataclass
+class ModelSpec:
+    """How to load one model file."""
+    name: str
+    path: str
+    loader: Optional[Callable[[str], Any]] = None
+    mmap: bool = True
+    preload: bool = False
+    required: bool = False
+
+
+@dataclass
+class LoadedModel:
+    """A loaded model and what it cost to load."""
+    model: Any
+    version: str
+    stat: Tuple[int, int]
+    loaded_at: datetime
+    load_seconds: float
+    memory_bytes: Optional[int]
+    checked_at: float
+    inferences: int = 0
+    rows: int = 0
+
+
+class ModelRegistry:
+    """
+    Process-local registry of ML models.
+
+    get() loads a model on first use (or returns the preloaded one). Every
+    RELOAD_CHECK_SECONDS it stats the file; when size or mtime changed, the
+    file is hashed and reloaded if the content hash differs. Loads happen
+    under a per-model lock, so concurrent first callers share one load and
+    loading one model never blocks lookups of another.
+
+    With ML_MODEL_LOAD_POLICY = 'preload', warm() loads every registered
+    model; call it before workers fork (gunicorn --preload, celery
+    worker_init) so children inherit the loaded pages.
+    """
+
+    LOAD_POLICIES = ('lazy', 'preload')
+    DEFAULT_POLICY = 'lazy'
+    RELOAD_CHECK_SECONDS = 30.0
+    HASH_CHUNK_BYTES = 1 << 20
+
+    _lock = threading.Lock()
+    _specs: Dict[str, ModelSpec] = {}
+    _loaded: Dict[str, LoadedModel] = {}
+    _load_locks: Dict[str, threading.Lock] = {}
+
+    @classmethod
+    def register(
+        cls,
+        name: str,
+        path: str,
+        loader: Callable[[str], Any] = None,
+        mmap: bool = True,
+        preload: bool = False,
+        required: bool = False
+    ) -> ModelSpec:
+        """
+        Register a model file. Re-registering a name with a new path drops
+        the loaded model.
+
+        Args:
+            name: Registry name
+            path: Model file (also hashed for the version)
+            loader: Callable taking the path (defaults to joblib.load)
+            mmap: Memory-map NumPy arrays when using joblib.load
+            preload: Load in warm() even under the lazy policy
+            required: Report the registry unhealthy if the file is missing
+        """
+        spec = ModelSpec(name, path, loader, mmap, preload, required)
+        with cls._lock:
+            previous = cls._specs.get(name)
+            if previous is not None and previous.path != path:
+                cls._loaded.pop(name, None)
+            cls._specs[name] = spec
+            cls._load_locks.setdefault(name, threading.Lock())
+        return spec
+
+    @classmethod
+    def get(cls, name: str) -> Any:
+        """
+        The loaded model, loading or hot reloading it as needed.
+
+        Returns:
+            The model, or None if its file does not exist
+
+        Raises:
+            KeyError: For an unregistered name
+        """
+        spec = cls._spec(name)
+        entry = cls._loaded.get(name)
+        if entry is None:
+            entry = cls._load(spec)
+        elif time.monotonic() - entry.checked_at >= cls._reload_interval():
+            entry = cls._check_for_update(spec, entry)
+        return entry.model if entry else None
+
+    @classmethod
+    def is_available(cls, name: str) -> bool:
+        """Whether the model's file exists, without loading it."""
+        return os.path.exists(cls._spec(name).path)
+
+    @classmethod
+    def policy(cls) -> str:
+        if has_app_context():
+            policy = current_app.config.get('ML_MODEL_LOAD_POLICY', cls.DEFAULT_POLICY)
+        else:
+            policy = os.environ.get('ML_MODEL_LOAD_POLICY', cls.DEFAULT_POLICY)
+        policy = (policy or cls.DEFAULT_POLICY).lower()
+        return policy if policy in cls.LOAD_POLICIES else cls.DEFAULT_POLICY
+
+    @classmethod
+    def warm(cls, names: List[str] = None) -> Dict[str, bool]:
+        """
+        Load models ahead of the first request.
+
+        Args:
+            names: Models to load (defaults to every model under the
+                preload policy, or only those registered with preload=True)
+
+        Returns:
+            Dict of name -> whether the model is loaded
+        """
+        if names is None:
+            preload_all = cls.policy() == 'preload'
+            names = [name for name, spec in list(cls._specs.items()) if preload_all or spec.preload]
+
+        warmed = {}
+        for name in names:
+            try:
+                warmed[name] = cls.get(name) is not None
+            except Exception as e:
+                logger.error(f"Failed to preload model {name}: {e}")
+                warmed[name] = False
+        return warmed
+
+    @classmethod
+    def reload(cls, name: str = None, force: bool = False) -> List[str]:
+        """
+        Check loaded models for new versions now, ignoring the check interval.
+
+        Args:
+            name: One model (defaults to every loaded model)
+            force: Reload even if the content hash is unchanged
+
+        Returns:
+            Names of the models that were reloaded
+        """
+        names = [name] if name else list(cls._loaded)
+        reloaded = []
+        for model_name in names:
+            spec = cls._spec(model_name)
+            entry = cls._loaded.get(model_name)
+            if entry is None:
+                continue
+            updated = cls._load(spec, replace=entry) if force else cls._check_for_update(spec, entry)
+            if updated is not entry:
+                reloaded.append(model_name)
+        return reloaded
+
+    @classmethod
+    def unload(cls, name: str = None) -> None:
+        """Drop one loaded model, or all of them."""
+        with cls._lock:
+            if name is None:
+                cls._loaded.clear()
+            else:
+                cls._loaded.pop(name, None)
+
+    @classmethod
+    def observe_inference(cls, name: str, seconds: float, rows: int = 1) -> None:
+        """Record one inference call against a model."""
+        metrics.observe('agritech_model_inference_seconds', seconds, labels={'model': name})
+        entry = cls._loaded.get(name)
+        if entry is not None:
+            with cls._lock:
+                entry.inferences += 1
+                entry.rows += rows
+
+    @classmethod
+    @contextmanager
+    def track_inference(cls, name: str, rows: int = 1):
+        """Time the enclosed block as one inference call."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            cls.observe_inference(name, time.perf_counter() - started, rows)
+
+    @classmethod
+    def status(cls) -> Dict[str, Dict]:
+        """Per-model availability, version, load cost and inference latency."""
+        status = {}
+        for name, spec in list(cls._specs.items()):
+            entry = cls._loaded.get(name)
+            labels = {'model': name}
+            info = {
+                'path': spec.path,
+                'available': os.path.exists(spec.path),
+                'required': spec.required,
+                'loaded': entry is not None,
+                'memory_mapped': spec.mmap and spec.loader is None
+            }
+            if entry is not None:
+                info.update({
+                    'version': entry.version[:12],
+                    'loaded_at': entry.loaded_at.isoformat(),
+                    'load_ms': round(entry.load_seconds * 1000, 3),
+                    'file_bytes': entry.stat[0],
+                    'memory_bytes': entry.memory_bytes,
+                    'inferences': entry.inferences,
+                    'rows': entry.rows,
+                    'latency_p50_ms': _ms(metrics.quantile('agritech_model_inference_seconds', 0.5, labels=labels)),
+                    'latency_p95_ms': _ms(metrics.quantile('agritech_model_inference_seconds', 0.95, labels=labels))
+                })
+            status[name] = info
+        return status
+
+    @classmethod
+    def file_version(cls, path: str) -> str:
+        """SHA-1 of a model file's content."""
+        digest = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(cls.HASH_CHUNK_BYTES), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    @classmethod
+    def _spec(cls, name: str) -> ModelSpec:
+        spec = cls._specs.get(name)
+        if spec is None:
+            raise KeyError(f"Unknown model: {name}")
+        return spec
+
+    @classmethod
+    def _reload_interval(cls) -> float:
+        if has_app_context():
+            return float(current_app.config.get('ML_MODEL_RELOAD_CHECK_SECONDS', cls.RELOAD_CHECK_SECONDS))
+        return cls.RELOAD_CHECK_SECONDS
+
+    @classmethod
+    def _check_for_update(cls, spec: ModelSpec, entry: LoadedModel) -> LoadedModel:
+        """Reload if the file's content changed; otherwise keep the entry."""
+        try:
+            stat = _file_stat(spec.path)
+        except OSError:
+            # File removed: keep serving what is loaded
+            entry.checked_at = time.monotonic()
+            return entry
+
+        if stat != entry.stat:
+            version = cls.file_version(spec.path)
+            if version != entry.version:
+                return cls._load(spec, replace=entry)
+            entry.stat = stat
+        entry.checked_at = time.monotonic()
+        return entry
+
+    @classmethod
+    def _load(cls, spec: ModelSpec, replace: LoadedModel = None) -> Optional[LoadedModel]:
+        """Load a model under its lock; a failed reload keeps the old model."""
+        with cls._load_locks[spec.name]:
+            current = cls._loaded.get(spec.name)
+            if current is not replace:
+                # Another thread loaded or reloaded it while we waited
+                return current
+
+            if not os.path.exists(spec.path):
+                logger.warning(f"Model {spec.name} not found at {spec.path}")
+                return replace
+
+            stat = _file_stat(spec.path)
+            version = cls.file_version(spec.path)
+            rss_before = _rss_bytes()
+            started = time.perf_counter()
+            try:
+                model = cls._read(spec)
+            except Exception as e:
+                logger.error(f"Failed to load model {spec.name} from {spec.path}: {e}")
+                if replace is None:
+                    raise
+                replace.checked_at = time.monotonic()
+                return replace
+            load_seconds = time.perf_counter() - started
+            rss_after = _rss_bytes()
+            memory = rss_after - rss_before if rss_before is not None and rss_after is not None else None
+
+            entry = LoadedModel(
+                model=model,
+                version=version,
+                stat=stat,
+                loaded_at=datetime.utcnow(),
+                load_seconds=load_seconds,
+                memory_bytes=memory,
+                checked_at=time.monotonic()
+            )
+            with cls._lock:
+                cls._loaded[spec.name] = entry
+
+        labels = {'model': spec.name}
+        metrics.observe('agritech_model_load_seconds', load_seconds, labels=labels)
+        if memory is not None:
+            metrics.set_gauge('agritech_model_memory_bytes', memory, labels=labels)
+        if replace is not None:
+            metrics.increment('agritech_model_reloads_total', labels=labels)
+            logger.info(f"Reloaded model {spec.name}: {replace.version[:12]} -> {version[:12]}")
+        else:
+            logger.info(f"Loaded model {spec.name} {version[:12]} in {load_seconds * 1000:.1f}ms")
+        return entry
+
+    @staticmethod
+    def _read(spec: ModelSpec) -> Any:
+        if spec.loader is not None:
+            return spec.loader(spec.path)
+
+        import joblib
+        with warnings.catch_warnings():
+            # Compressed pickles cannot be memory-mapped; joblib falls back to
+            # a normal load and warns
+            warnings.filterwarnings('ignore', message='.*mmap_mode.*')
+            return joblib.load(spec.path, mmap_mode='r' if spec.mmap else None)
+
+
+def _file_stat(path: str) -> Tuple[int, int]:
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _rss_bytes() -> Optional[int]:
+    """Resident set size of this process (Linux), or None."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds * 1000, 3) if seconds is not None else None
+
+
+def _load_disease_model(path: str) -> Any:
+    """Keras models load through the Disease prediction module."""
+    import sys
+    if DISEASE_MODULE_PATH not in sys.path:
+        sys.path.append(DISEASE_MODULE_PATH)
+    from utils import load_keras_model
+    return load_keras_model(path)
+
+
+ModelRegistry.register('crop_model', CROP_MODEL_PATH, required=True)
+ModelRegistry.register('crop_encoder', CROP_ENCODER_PATH, required=True)
+ModelRegistry.register('disease_model', DISEASE_MODEL_PATH, loader=_load_disease_model, mmap=False)
@@ -0,0 +1,497 @@
+"""
+Moderation Pipeline: Batched, deduplicated AI moderation for forum posts.
+
+This module provides:
+- A local pre-screen (regex rules for spam and abuse, plus an online
+  classifier trained on earlier LLM verdicts) that settles clear cases
+  without an LLM call
+- Deduplication of near-identical posts by a hash of their normalized text
+- A verdict cache keyed by that hash, shared across workers
+- Several posts per Gemini prompt instead of one call per post
+- A Celery entry point that moderates queued posts outside the request
+"""
+
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence
+import hashlib
+import json
+import re
+import threading
+import time
+import logging
+
+import numpy as np
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import SGDClassifier
+
+from backend.extensions import db
+from backend.models import ForumThread, PostComment
+from backend.monitoring import metrics
+from backend.services.llm_gateway import LLMGateway
+from backend.services.search_index import search_index
+from backend.services.semantic_index import semantic_index
+
+logger = logging.getLogger(__name__)
+
+metrics.describe('agritech_moderation_posts_total', 'Forum posts moderated, by decision source')
+metrics.describe('agritech_moderation_llm_calls_total', 'Gemini calls made for moderation')
+metrics.describe('agritech_moderation_llm_calls_saved_total', 'Gemini calls avoided versus one call per post')
+
+_PUNCT_RE = re.compile(r'[^\w\s]+')
+_SPACE_RE = re.compile(r'\s+')
+
+# (pattern, reason): any match flags the post without an LLM call
+BLOCK_RULES = [
+    (re.compile(r'(whats\s?app|telegram|call)\s*(me|now|at)?\s*[:\-]?\s*\+?\d[\d\s\-]{8,}', re.I),
+     'Spam: contact number solicitation'),
+    (re.compile(r'(guaranteed|assured|double)\s+(returns?|profits?|income)', re.I),
+     'Scam: guaranteed returns'),
+    (re.compile(r'(send|transfer|pay)\s+(an?\s+)?(advance|processing|registration)\s+fee', re.I),
+     'Scam: advance fee request'),
+    (re.compile(r'(https?://\S+.*){4,}', re.I | re.S), 'Spam: link flooding'),
+    (re.compile(r'\b(kill|beat|rape)\s+(you|him|her|them)\b', re.I), 'Threat of violence'),
+    (re.compile(r'(.)\1{15,}'), 'Spam: repeated characters'),
+]
+
+APPROVED = {'sentiment_score': 0.0, 'toxicity_score': 0.0, 'is_approved': True, 'moderation_reason': ''}
+
+
+def normalize_text(text_value: Optional[str]) -> str:
+    """Lowercase, drop punctuation and collapse whitespace."""
+    return _SPACE_RE.sub(' ', _PUNCT_RE.sub(' ', (text_value or '').lower())).strip()
+
+
+def content_hash(text_value: Optional[str]) -> str:
+    return hashlib.sha1(normalize_text(text_value).encode('utf-8')).hexdigest()
+
+
+class LocalScreen:
+    """
+    Fast pre-screen run before any LLM call.
+
+    Rule matches are flagged outright. Posts without a rule match go to the
+    classifier, which learns from LLM verdicts (partial_fit); once it has
+    seen MIN_TRAINING_LABELS of them, posts it scores below ALLOW_BELOW
+    are approved locally. Everything else is left to the LLM.
+    """
+
+    MIN_TRAINING_LABELS = 200
+    ALLOW_BELOW = 0.02
+
+    _lock = threading.Lock()
+    _vectorizer = HashingVectorizer(n_features=2 ** 18, ngram_range=(1, 2), alternate_sign=False, norm='l2')
+    _model: Optional[SGDClassifier] = None
+    _labels_seen = 0
+
+    @classmethod
+    def reset(cls) -> None:
+        with cls._lock:
+            cls._model = None
+            cls._labels_seen = 0
+
+    @staticmethod
+    def check_rules(text_value: str) -> Optional[Dict]:
+        """Flagging verdict for the first matching rule, if any."""
+        for pattern, reason in BLOCK_RULES:
+            if pattern.search(text_value):
+                return {'sentiment_score': -0.5, 'toxicity_score': 0.9, 'is_approved': False, 'moderation_reason': reason}
+        return None
+
+    @classmethod
+    def toxicity(cls, texts: Sequence[str]) -> Optional[np.ndarray]:
+        """Classifier probability of rejection, or None until it is trained."""
+        with cls._lock:
+            if cls._model is None or cls._labels_seen < cls.MIN_TRAINING_LABELS:
+                return None
+            return cls._model.predict_proba(cls._vectorizer.transform(texts))[:, 1]
+
+    @classmethod
+    def learn(cls, texts: Sequence[str], rejected: Sequence[bool]) -> None:
+        if not texts:
+            return
+        features = cls._vectorizer.transform(texts)
+        with cls._lock:
+            if cls._model is None:
+                cls._model = SGDClassifier(loss='log_loss', alpha=1e-5, random_state=0)
+            cls._model.partial_fit(features, np.asarray(rejected, dtype=int), classes=[0, 1])
+            cls._labels_seen += len(texts)
+
+    @classmethod
+    def screen(cls, texts: Sequence[str]) -> List[Optional[Dict]]:
+        """Local verdict per text, or None where the LLM has to decide."""
+        verdicts = [cls.check_rules(text_value) for text_value in texts]
+
+        undecided = [i for i, verdict in enumerate(verdicts) if verdict is None]
+        scores = cls.toxicity([texts[i] for i in undecided]) if undecided else None
+        if scores is not None:
+            for i, score in zip(undecided, scores.tolist()):
+                if score < cls.ALLOW_BELOW:
+                    verdicts[i] = {**APPROVED, 'toxicity_score': round(score, 4)}
+        return verdicts
+
+
+class ModerationPipeline:
+    """
+    Moderates forum posts in batches.
+
+    Posts are reduced to unique normalized texts; each unique text is
+    resolved from the local cache, the shared cache, the local pre-screen
+    or, failing those, one slot in an LLM_BATCH_SIZE-item Gemini prompt.
+    Verdicts are cached for CACHE_TTL_SECONDS.
+
+    ForumService submits new posts here. Rule matches are applied at once;
+    the rest is moderated by a Celery task scheduled at most once per
+    BATCH_WINDOW_SECONDS, or inline when MODERATION_ASYNC is off (the
+    default under TESTING) or the broker is unreachable.
+    """
+
+    LLM_BATCH_SIZE = 10
+    MAX_POSTS_PER_RUN = 500
+    BATCH_WINDOW_SECONDS = 2
+    CACHE_TTL_SECONDS = 7 * 86400
+    LOCAL_CACHE_SIZE = 10000
+    CACHE_PREFIX = 'moderation:'
+    SCHEDULED_KEY = 'moderation:scheduled'
+    DISPATCH_RETRY_SECONDS = 60
+
+    _lock = threading.Lock()
+    _dispatch_failed_at: Optional[float] = None
+    _local_cache: 'OrderedDict[str, Dict]' = OrderedDict()
+    _stats = {
+        'runs': 0,
+        'posts': 0,
+        'unique_texts': 0,
+        'duplicates': 0,
+        'cache_hits': 0,
+        'screened_flagged': 0,
+        'screened_approved': 0,
+        'llm_calls': 0,
+        'llm_items': 0,
+        'auto_answers': 0,
+        'llm_calls_saved': 0,
+        'seconds': 0.0
+    }
+
+    # -- verdict cache -----------------------------------------------------
+
+    @classmethod
+    def _cached(cls, key: str) -> Optional[Dict]:
+        with cls._lock:
+            verdict = cls._local_cache.get(key)
+            if verdict is not None:
+                cls._local_cache.move_to_end(key)
+                return verdict
+        try:
+            from backend.extensions.cache import cache
+            verdict = cache.get(cls.CACHE_PREFIX + key)
+        except Exception:
+            return None
+        if verdict is not None:
+            cls._remember(key, verdict, shared=False)
+        return verdict
+
+    @classmethod
+    def _remember(cls, key: str, verdict: Dict, shared: bool = True) -> None:
+        with cls._lock:
+            cls._local_cache[key] = verdict
+            cls._local_cache.move_to_end(key)
+            while len(cls._local_cache) > cls.LOCAL_CACHE_SIZE:
+                cls._local_cache.popitem(last=False)
+        if shared:
+            try:
+                from backend.extensions.cache import cache
+                cache.set(cls.CACHE_PREFIX + key, verdict, timeout=cls.CACHE_TTL_SECONDS)
+            except Exception as e:
+                logger.debug(f"Moderation verdict not shared: {e}")
+
+    @classmethod
+    def clear_cache(cls) -> None:
+        with cls._lock:
+            cls._local_cache.clear()
+
+    # -- classification ----------------------------------------------------
+
+    @classmethod
+    def _count(cls, **deltas) -> None:
+        with cls._lock:
+            for name, delta in deltas.items():
+                cls._stats[name] += delta
+
+    @classmethod
+    def classify(cls, texts: Sequence[str]) -> List[Optional[Dict]]:
+        """
+        Moderation verdict for each text (same keys as
+        AIModerator.analyze_sentiment), deduplicating identical texts.
+
+        A text the LLM could not judge gets None: nothing is cached or
+        learned from it, so the next run asks again.
+        """
+        keys = [content_hash(t) for t in texts]
+        unique: Dict[str, str] = {}
+        for key, text_value in zip(keys, texts):
+            unique.setdefault(key, text_value)
+
+        verdicts: Dict[str, Dict] = {}
+        for key in unique:
+            verdict = cls._cached(key)
+            if verdict is not None:
+                verdicts[key] = verdict
+        cls._count(posts=len(texts), unique_texts=len(unique), duplicates=len(texts) - len(unique),
+                   cache_hits=len(verdicts))
+
+        pending = [key for key in unique if key not in verdicts]
+        screened = LocalScreen.screen([unique[key] for key in pending])
+        for key, verdict in zip(pending, screened):
+            if verdict is not None:
+                verdicts[key] = verdict
+                cls._remember(key, verdict)
+                source = 'screened_approved' if verdict['is_approved'] else 'screened_flagged'
+                cls._count(**{source: 1})
+                metrics.increment('agritech_moderation_posts_total', labels={'source': 'local'})
+
+        pending = [key for key in pending if key not in verdicts]
+        for start in range(0, len(pending), cls.LLM_BATCH_SIZE):
+            chunk = pending[start:start + cls.LLM_BATCH_SIZE]
+            results = cls._ask_llm([unique[key] for key in chunk])
+            judged = [(key, verdict) for key, verdict in zip(chunk, results) if verdict is not None]
+            for key, verdict in judged:
+                verdicts[key] = verdict
+                cls._remember(key, verdict)
+            LocalScreen.learn([unique[key] for key, _ in judged], [not v['is_approved'] for _, v in judged])
+            metrics.increment('agritech_moderation_posts_total', value=len(judged), labels={'source': 'llm'})
+
+        return [verdicts.get(key) for key in keys]
+
+    @classmethod
+    def _ask_llm(cls, texts: List[str]) -> List[Optional[Dict]]:
+        """One Gemini call for up to LLM_BATCH_SIZE texts; None where it gave no verdict."""
+        from backend.services.ai_moderator import ai_moderator
+
+        cls._count(llm_calls=1, llm_items=len(texts))
+        metrics.increment('agritech_moderation_llm_calls_total')
+        if len(texts) == 1:
+            verdict = ai_moderator.analyze_sentiment(texts[0])
+            return [None if verdict.get('fallback') else verdict]
+
+        posts = "\n".join(f"[{i}] {json.dumps(text_value[:2000])}" for i, text_value in enumerate(texts))
+        prompt = f"""
+        Analyze each of the following forum posts for sentiment and potential harmful content.
+
+        Posts:
+        {posts}
+
+        Provide your analysis as a JSON array with one object per post, in this exact format:
+        [{{
+            "id": <post number>,
+            "sentiment": <number between -1.0 (very negative) and 1.0 (very positive)>,
+            "toxicity": <number between 0.0 (safe) and 1.0 (toxic/harmful)>,
+            "is_appropriate": <true/false>,
+            "reason": "<brief explanation if inappropriate>"
+        }}]
+
+        Consider context specific to farming communities. Mild frustration about crops or weather is normal.
+        Only flag as toxic if it contains:
+        - Personal attacks or harassment
+        - Hate speech or discrimination
+        - Spam or scam attempts
+        - Misinformation that could harm farmers
+        """
+
+        results: List[Optional[Dict]] = [None] * len(texts)
+        try:
+            response_text = LLMGateway.generate_text('forum_moderation', prompt)
+            json_match = re.search(r'\[.*\]', response_text, re.DOTALL)
+            for item in json.loads(json_match.group()) if json_match else []:
+                index = item.get('id')
+                if isinstance(index, int) and 0 <= index < len(texts):
+                    results[index] = {
+                        'sentiment_score': float(item.get('sentiment', 0)),
+                        'toxicity_score': float(item.get('toxicity', 0)),
+                        'is_approved': bool(item.get('is_appropriate', True)),
+                        'moderation_reason': item.get('reason', '') or ''
+                    }
+        except Exception as e:
+            # Asking each post on its own would just hit the same outage
+            logger.error(f"Batched AI moderation failed for {len(texts)} posts: {str(e)}")
+            return results
+
+        # Anything the batch answer left out is checked on its own
+        for i, result in enumerate(results):
+            if result is None:
+                results[i] = cls._ask_llm([texts[i]])[0]
+        return results
+
+    # -- applying verdicts -------------------------------------------------
+
+    @staticmethod
+    def _apply(post, analysis: Dict) -> None:
+        post.sentiment_score = analysis['sentiment_score']
+        if isinstance(post, ForumThread):
+            post.toxicity_score = analysis['toxicity_score']
+        post.is_ai_approved = analysis['is_approved']
+        if not analysis['is_approved']:
+            post.is_flagged = True
+            post.flag_reason = f"AI Auto-flagged: {analysis['moderation_reason']}"[:255]
+
+    @classmethod
+    def _auto_answer(cls, thread) -> Optional[Dict]:
+        """FAQ auto-answer, shared between threads asking the same thing."""
+        from backend.services.ai_moderator import ai_moderator
+
+        key = 'answer:' + content_hash(f"{thread.title}\n\n{thread.content}")
+        answer = cls._cached(key)
+        if answer is None:
+            cls._count(llm_calls=1)
+            metrics.increment('agritech_moderation_llm_calls_total')
+            answer = ai_moderator.generate_auto_answer(thread.title, thread.content) or {}
+            if answer:
+                cls._remember(key, answer)
+        return answer or None
+
+    @classmethod
+    def moderate_posts(cls, threads: Sequence[ForumThread] = (), comments: Sequence[PostComment] = ()) -> Dict:
+        """Moderate the given posts, commit the verdicts and post FAQ auto-answers."""
+        started = time.perf_counter()
+        calls_before = cls._stats['llm_calls']
+        posts = list(threads) + list(comments)
+        texts = [f"{t.title}\n\n{t.content}" for t in threads] + [c.content for c in comments]
+
+        verdicts = cls.classify(texts)
+        for post, analysis in zip(posts, verdicts):
+            # Unjudged posts keep sentiment_score None and are picked up by the next run
+            if analysis is not None:
+                cls._apply(post, analysis)
+        db.session.commit()
+
+        # A thread submitted inline and picked up again by the task is answered once
+        answered = {thread_id for (thread_id,) in db.session.query(PostComment.thread_id).filter(
+            PostComment.thread_id.in_([t.id for t in threads]), PostComment.is_ai_generated.is_(True)
+        ).distinct()} if threads else set()
+
+        auto_answers = faq_threads = 0
+        for thread, analysis in zip(threads, verdicts):
+            semantic_index.update_thread(thread)
+            if thread.id in answered:
+                continue
+            if analysis is None or not (analysis['is_approved'] and analysis['toxicity_score'] < 0.3
+                                        and cls._is_faq(thread)):
+                continue
+            faq_threads += 1
+            answer = cls._auto_answer(thread)
+            if answer and answer.get('confidence', 0) > 0.7:
+                ai_comment = PostComment(
+                    thread_id=thread.id,
+                    user_id=0,  # System user
+                    content=answer['content'],
+                    is_ai_generated=True,
+                    is_ai_approved=True,
+                    sentiment_score=0.0
+                )
+                db.session.add(ai_comment)
+                db.session.flush()
+                search_index.index_comment(ai_comment)
+                auto_answers += 1
+        if auto_answers:
+            db.session.commit()
+
+        llm_calls = cls._stats['llm_calls'] - calls_before
+        # Previously one call per post plus one per approved FAQ thread
+        saved = max(len(posts) + faq_threads - llm_calls, 0)
+        metrics.increment('agritech_moderation_llm_calls_saved_total', value=saved)
+        elapsed = time.perf_counter() - started
+        cls._count(runs=1, auto_answers=auto_answers, llm_calls_saved=saved, seconds=elapsed)
+        return {
+            'moderated': sum(1 for v in verdicts if v is not None),
+            'flagged': sum(1 for v in verdicts if v is not None and not v['is_approved']),
+            'auto_answers': auto_answers,
+            'llm_calls': llm_calls,
+            'llm_calls_saved': saved,
+            'posts_per_sec': round(len(posts) / elapsed, 2) if elapsed > 0 else None
+        }
+
+    @staticmethod
+    def _is_faq(thread) -> bool:
+        from backend.services.ai_moderator import ai_moderator
+        return bool(ai_moderator.detect_faq(f"{thread.title} {thread.content}"))
+
+    @classmethod
+    def moderate_pending(cls, limit: Optional[int] = None) -> Dict:
+        """
+        Moderate posts that have not been through moderation yet.
+
+        Rows are claimed with FOR UPDATE SKIP LOCKED until the verdicts are
+        committed, so concurrent workers split the backlog instead of
+        moderating (and auto-answering) the same posts twice.
+        """
+        limit = limit or cls.MAX_POSTS_PER_RUN
+        threads = ForumThread.query.filter(ForumThread.sentiment_score.is_(None)) \
+            .order_by(ForumThread.id).limit(limit).with_for_update(skip_locked=True).all()
+        comments = PostComment.query.filter(
+            PostComment.sentiment_score.is_(None), PostComment.is_ai_generated.is_(False)
+        ).order_by(PostComment.id).limit(max(limit - len(threads), 0)).with_for_update(skip_locked=True).all()
+        if not threads and not comments:
+            return {'moderated': 0, 'flagged': 0, 'auto_answers': 0, 'llm_calls': 0, 'llm_calls_saved': 0}
+        return cls.moderate_posts(threads, comments)
+
+    # -- submission --------------------------------------------------------
+
+    @classmethod
+    def submit(cls, threads: Sequence[ForumThread] = (), comments: Sequence[PostComment] = ()) -> Optional[Dict]:
+        """
+        Queue newly created posts for moderation.
+
+        Rule matches are flagged immediately so clear spam and abuse never
+        show up; the rest is moderated asynchronously or, when async
+        moderation is off, right away (returning the run summary).
+        """
+        from flask import current_app
+
+        texts = [f"{t.title}\n\n{t.content}" for t in threads] + [c.content for c in comments]
+        for post, text_value in zip(list(threads) + list(comments), texts):
+            verdict = LocalScreen.check_rules(text_value)
+            if verdict:
+                cls._apply(post, verdict)
+                cls._count(posts=1, unique_texts=1, screened_flagged=1)
+        db.session.commit()
+
+        threads = [t for t in threads if t.sentiment_score is None]
+        comments = [c for c in comments if c.sentiment_score is None]
+        if not threads and not comments:
+            return None
+
+        if current_app.config.get('MODERATION_ASYNC', not current_app.testing) and cls._schedule():
+            return None
+        return cls.moderate_posts(threads, comments)
+
+    @classmethod
+    def _schedule(cls) -> bool:
+        """Dispatch the moderation task unless one is already due this window."""
+        failed_at = cls._dispatch_failed_at
+        if failed_at is not None and time.monotonic() - failed_at < cls.DISPATCH_RETRY_SECONDS:
+            return False  # Broker was unreachable moments ago; don't wait on it again
+        try:
+            from backend.extensions.cache import cache
+            if not cache.add(cls.SCHEDULED_KEY, 1, timeout=cls.BATCH_WINDOW_SECONDS):
+                return True
+        except Exception:
+            pass  # No shared cache: dispatch every time, the task drains whatever is pending
+        try:
+            from backend.tasks.forum_tasks import moderate_pending_posts_task
+            moderate_pending_posts_task.apply_async(countdown=cls.BATCH_WINDOW_SECONDS, retry=False)
+            cls._dispatch_failed_at = None
+            return True
+        except Exception as e:
+            cls._dispatch_failed_at = time.monotonic()
+            logger.warning(f"Moderation task dispatch failed, moderating inline: {e}")
+            return False
+
+    @classmethod
+    def stats(cls) -> Dict:
+        with cls._lock:
+            stats = dict(cls._stats)
+        stats['posts_per_sec'] = round(stats['posts'] / stats['seconds'], 2) if stats['seconds'] else None
+        stats['seconds'] = round(stats['seconds'], 3)
+        stats['classifier_labels'] = LocalScreen._labels_seen
+        stats['local_cache_size'] = len(cls._local_cache)
+        return stats
+
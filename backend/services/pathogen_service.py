@@ -1,5 +1,7 @@
-import math
+import hashlib
 from datetime import datetime, timedelta
+import numpy as np
+from sqlalchemy import func
 from backend.extensions import db, socketio
 from backend.models.gews import OutbreakZone, OutbreakProjection, DiseaseIncident
 from backend.models.weather import WeatherData
@@ -12,8 +14,29 @@ logger = logging.getLogger(__name__)
 class PathogenPropagationService:
     """
     Service for simulating pathogen spread and managing containment strategies.
+
+    Zones are simulated in batches: zones and their latest weather are loaded
+    in two queries, velocities, radii and projections are computed as NumPy
+    arrays, and only zones whose inputs changed since their last run are
+    written back.
     """
 
+    SEVERITY_RADIUS = {'low': 1.0, 'medium': 2.0, 'high': 5.0, 'critical': 10.0}
+    PROJECTION_HOURS = (24, 48, 72)
+    KM_PER_DEG_LAT = 111.0
+
+    # Fallbacks when a zone has no usable weather observation
+    DEFAULT_WIND_SPEED = 5.0
+    DEFAULT_WIND_DIRECTION = 0.0
+    DEFAULT_HUMIDITY = 50.0
+
+    # Weather older than this is ignored (the zone falls back to defaults)
+    WEATHER_MAX_AGE = timedelta(hours=6)
+
+    # Unchanged zones are still re-simulated this often so projection
+    # timestamps keep pointing 24/48/72h ahead
+    RESIMULATE_AFTER = timedelta(hours=6)
+
     @staticmethod
     def simulate_propagation(zone_id):
         """
@@ -23,112 +46,256 @@ class PathogenPropagationService:
         if not zone:
             return None
 
-        # 1. Fetch latest weather for wind vector
-        location = f"{zone.center_latitude},{zone.center_longitude}"
-        weather = WeatherService.get_latest_weather(location)
-        
-        # Base velocity (km/day) influenced by wind
-        # Pathogens travel faster with higher wind speeds and specific directions
-        wind_speed = weather.wind_speed if weather else 5.0
-        wind_dir = weather.wind_direction if weather else 0.0
-        
-        # Calculate Propagation Velocity (Heuristic)
-        # Higher humidity often aids pathogen survival, higher wind speed aids transport
-        humidity_factor = (weather.humidity / 100.0) if weather else 0.5
-        zone.propagation_velocity = (wind_speed * 0.2) * (1 + humidity_factor)
-        zone.wind_vector_deg = wind_dir
-        
-        # 2. Update Transmission Radius
-        # Influenced by soil connectivity (simulated) and severity
-        severity_map = {'low': 1.0, 'medium': 2.0, 'high': 5.0, 'critical': 10.0}
-        base_radius = severity_map.get(zone.severity_level.lower(), 2.0)
-        zone.transmission_radius = base_radius * (1 + zone.soil_connectivity_score)
-        
-        db.session.commit()
+        # Manual runs refresh the zone's weather first if it is stale
+        WeatherService.get_latest_weather(PathogenPropagationService._location(zone))
 
-        # 3. Generate Projections (Next 3 days)
-        PathogenPropagationService._generate_projections(zone)
-        
-        # 4. Check for Autonomous Containment Triggers
-        PathogenPropagationService._assess_containment_needs(zone)
-        
-        # 5. Emit real-time update for heatmap
-        socketio.emit('pathogen_update', zone.to_dict(), namespace='/crisis')
-        
+        PathogenPropagationService.simulate_batch([zone.id], force=True)
         return zone
 
     @staticmethod
-    def _generate_projections(zone):
+    def refresh_weather(zone_ids):
         """
-        Creates time-series risk points for the next 72 hours.
+        Fetches weather for the zone centres that have no observation newer
+        than WeatherService.STALE_AFTER, in one refresh_locations pass.
+
+        simulate_batch only reads stored weather, so scheduled runs call this
+        first; a failed refresh leaves the zones on whatever is stored. The
+        refresh is forced: WeatherCache keys by geohash cell, so a stale
+        centre next to a cached one would otherwise be skipped and never
+        get a row under its own location.
+
+        Returns:
+            The refresh_locations summary, or None if the refresh failed
         """
-        # Clear old projections for this zone
-        OutbreakProjection.query.filter_by(outbreak_zone_id=zone.id).delete()
-        
-        # Path pathogens generally move in the direction of the wind
-        # radians = math.radians(zone.wind_vector_deg)
-        # In meteorology, wind direction is where it's COMING FROM. 
-        # Pathogen moves TOWARDS (wind_dir + 180) % 360
-        travel_dir = (zone.wind_vector_deg + 180) % 360
-        rad = math.radians(travel_dir)
-        
-        # km to degrees (rough approximation)
-        KM_PER_DEG_LAT = 111.0
-        KM_PER_DEG_LON = 111.0 * math.cos(math.radians(zone.center_latitude))
-
-        for hours in [24, 48, 72]:
-            days = hours / 24.0
-            distance = zone.propagation_velocity * days
-            
-            d_lat = (distance * math.cos(rad)) / KM_PER_DEG_LAT
-            d_lon = (distance * math.sin(rad)) / KM_PER_DEG_LON
-            
-            projection = OutbreakProjection(
-                outbreak_zone_id=zone.id,
-                projection_time=datetime.utcnow() + timedelta(hours=hours),
-                projected_latitude=zone.center_latitude + d_lat,
-                projected_longitude=zone.center_longitude + d_lon,
-                expected_radius=zone.radius_km + (zone.propagation_velocity * days * 0.5),
-                confidence_score=max(0.1, 1.0 - (days * 0.2))
-            )
-            db.session.add(projection)
-        
-        db.session.commit()
+        locations = {
+            f"{lat},{lon}" for lat, lon in db.session.query(
+                OutbreakZone.center_latitude, OutbreakZone.center_longitude
+            ).filter(OutbreakZone.id.in_(zone_ids))
+        }
+        stale = locations - set(PathogenPropagationService._latest_weather(
+            locations, datetime.utcnow() - WeatherService.STALE_AFTER
+        ))
+        try:
+            return WeatherService.refresh_locations(stale, force=True)
+        except Exception as e:
+            db.session.rollback()
+            logger.warning(f"Weather refresh for {len(stale)} zone centres failed: {str(e)}")
+            return None
 
     @staticmethod
-    def _assess_containment_needs(zone):
+    def simulate_batch(zone_ids=None, force=False, emit=True):
         """
-        Logic for autonomous lockdown based on risk levels.
+        Re-simulates many outbreak zones in one vectorized pass.
+
+        Args:
+            zone_ids: Zone primary keys (defaults to every active zone)
+            force: Re-simulate even if the inputs are unchanged
+            emit: Emit 'pathogen_update' for every re-simulated zone
+
+        Returns:
+            Summary dict with checked/simulated/unchanged counts, the
+            containment changes and a per-zone summary
         """
-        # Threshold: Velocity > 5km/day OR Severity is High
-        high_spread = zone.propagation_velocity > 5.0
-        critical_severity = zone.severity_level.lower() in ['high', 'critical']
-        
-        new_status = 'NONE'
-        if high_spread and critical_severity:
-            new_status = 'FULL_QUARANTINE'
-        elif critical_severity:
-            new_status = 'ACCESS_RESTRICTED'
-        elif high_spread:
-            new_status = 'IRRIGATION_LOCKDOWN'
-
-        if new_status != zone.containment_status and new_status != 'NONE':
-            zone.containment_status = new_status
-            zone.containment_applied_at = datetime.utcnow()
-            
-            # Register Security & Operational Alerts
+        query = OutbreakZone.query
+        if zone_ids is None:
+            query = query.filter_by(status='active')
+        else:
+            query = query.filter(OutbreakZone.id.in_(zone_ids))
+        zones = query.all()
+
+        summary = {'checked': len(zones), 'simulated': 0, 'unchanged': 0, 'containment_changes': 0, 'zones': []}
+        if not zones:
+            return summary
+
+        now = datetime.utcnow()
+        locations = [PathogenPropagationService._location(zone) for zone in zones]
+        weather = PathogenPropagationService._latest_weather(
+            set(locations), now - PathogenPropagationService.WEATHER_MAX_AGE
+        )
+
+        # 1. Inputs as arrays (NaN marks missing weather)
+        observed = np.array([
+            (w.wind_speed, w.wind_direction, w.humidity) if w else (np.nan, np.nan, np.nan)
+            for w in (weather.get(location) for location in locations)
+        ], dtype=np.float64).reshape(len(zones), 3)
+        wind_speed = np.where(np.isnan(observed[:, 0]), PathogenPropagationService.DEFAULT_WIND_SPEED, observed[:, 0])
+        wind_dir = np.where(np.isnan(observed[:, 1]), PathogenPropagationService.DEFAULT_WIND_DIRECTION, observed[:, 1])
+        humidity = np.where(np.isnan(observed[:, 2]), PathogenPropagationService.DEFAULT_HUMIDITY, observed[:, 2])
+
+        severity = [(zone.severity_level or 'medium').lower() for zone in zones]
+        base_radius = np.array([PathogenPropagationService.SEVERITY_RADIUS.get(s, 2.0) for s in severity])
+        soil = np.array([zone.soil_connectivity_score or 0.0 for zone in zones], dtype=np.float64)
+        lat = np.array([zone.center_latitude for zone in zones], dtype=np.float64)
+        lon = np.array([zone.center_longitude for zone in zones], dtype=np.float64)
+        radius_km = np.array([zone.radius_km for zone in zones], dtype=np.float64)
+
+        # 2. Skip zones whose inputs are unchanged and recently simulated
+        fingerprints = [
+            hashlib.sha1(repr(row).encode()).hexdigest()
+            for row in zip(np.round(wind_speed, 3), np.round(wind_dir, 3), np.round(humidity, 3),
+                           severity, np.round(soil, 4), np.round(radius_km, 4), lat, lon)
+        ]
+        stale_before = now - PathogenPropagationService.RESIMULATE_AFTER
+        changed = np.array([
+            force or zone.propagation_inputs_hash != fingerprint
+            or zone.last_simulated_at is None or zone.last_simulated_at < stale_before
+            for zone, fingerprint in zip(zones, fingerprints)
+        ], dtype=bool)
+        summary['unchanged'] = int((~changed).sum())
+
+        selected = np.flatnonzero(changed)
+        if not len(selected):
+            return summary
+
+        # 3. Velocity (km/day) from wind transport and humidity-aided survival,
+        #    transmission radius from severity and soil connectivity
+        velocity = (wind_speed * 0.2) * (1 + humidity / 100.0)
+        transmission = base_radius * (1 + soil)
+
+        # 4. Projections: pathogens move downwind, i.e. towards (wind_dir + 180)
+        days = np.array(PathogenPropagationService.PROJECTION_HOURS, dtype=np.float64) / 24.0
+        travel = np.radians((wind_dir + 180) % 360)
+        distance = velocity[:, None] * days[None, :]
+        km_per_deg_lon = PathogenPropagationService.KM_PER_DEG_LAT * np.cos(np.radians(lat))
+        proj_lat = lat[:, None] + distance * np.cos(travel)[:, None] / PathogenPropagationService.KM_PER_DEG_LAT
+        proj_lon = lon[:, None] + distance * np.sin(travel)[:, None] / km_per_deg_lon[:, None]
+        proj_radius = radius_km[:, None] + distance * 0.5
+        confidence = np.maximum(0.1, 1.0 - days * 0.2)
+
+        # 5. Containment: velocity > 5km/day and/or high severity
+        high_spread = velocity > 5.0
+        critical = np.isin(severity, ['high', 'critical'])
+        status = np.select(
+            [high_spread & critical, critical, high_spread],
+            ['FULL_QUARANTINE', 'ACCESS_RESTRICTED', 'IRRIGATION_LOCKDOWN'],
+            default='NONE'
+        )
+
+        zone_rows = []
+        contained = []
+        for i in selected:
+            zone = zones[i]
+            row = {
+                'id': zone.id,
+                'propagation_velocity': float(velocity[i]),
+                'wind_vector_deg': float(wind_dir[i]),
+                'transmission_radius': float(transmission[i]),
+                'propagation_inputs_hash': fingerprints[i],
+                'last_simulated_at': now
+            }
+            if status[i] != 'NONE' and status[i] != zone.containment_status:
+                row['containment_status'] = str(status[i])
+                row['containment_applied_at'] = now
+                contained.append((zone.zone_id, zone.disease_name, str(status[i]), float(velocity[i])))
+            zone_rows.append(row)
+
+        PathogenPropagationService._upsert_projections(
+            [zones[i].id for i in selected], now, proj_lat[selected], proj_lon[selected],
+            proj_radius[selected], confidence
+        )
+        db.session.bulk_update_mappings(OutbreakZone, zone_rows)
+        db.session.commit()
+
+        for zone_code, disease_name, new_status, zone_velocity in contained:
             AlertRegistry.register_alert(
                 title=f"AUTONOMOUS CONTAINMENT: {new_status}",
-                message=f"System has triggered {new_status} for {zone.disease_name} in Zone {zone.zone_id}. Spread velocity: {zone.propagation_velocity:.2f} km/day.",
+                message=(
+                    f"System has triggered {new_status} for {disease_name} in Zone {zone_code}. "
+                    f"Spread velocity: {zone_velocity:.2f} km/day."
+                ),
                 category="SECURITY",
                 priority="CRITICAL",
-                group_key=f"containment_{zone.zone_id}"
+                group_key=f"containment_{zone_code}"
             )
-            
             # TODO: Call actual IoT/Physical controllers for irrigation shutoff
-            logger.info(f"Containment {new_status} applied to zone {zone.zone_id}")
-            
-            db.session.commit()
+            logger.info(f"Containment {new_status} applied to zone {zone_code}")
+
+        # bulk_update_mappings bypassed the loaded zones and the commit expired
+        # them, so read the new velocities and statuses back for the summary
+        simulated = OutbreakZone.query.filter(OutbreakZone.id.in_([row['id'] for row in zone_rows])).all()
+
+        for zone in simulated:
+            summary['zones'].append({
+                'zone_id': zone.zone_id,
+                'velocity': zone.propagation_velocity,
+                'status': zone.containment_status
+            })
+            if emit:
+                # Real-time update for the heatmap
+                socketio.emit('pathogen_update', zone.to_dict(), namespace='/crisis')
+
+        summary['simulated'] = len(selected)
+        summary['containment_changes'] = len(contained)
+        return summary
+
+    @staticmethod
+    def _location(zone):
+        """Weather location key used for a zone's centre."""
+        return f"{zone.center_latitude},{zone.center_longitude}"
+
+    @staticmethod
+    def _latest_weather(locations, since):
+        """
+        Latest weather observation per location since a cutoff, in one query.
+        """
+        if not locations:
+            return {}
+
+        latest = db.session.query(
+            WeatherData.location,
+            func.max(WeatherData.timestamp).label('timestamp')
+        ).filter(
+            WeatherData.location.in_(locations),
+            WeatherData.timestamp >= since
+        ).group_by(WeatherData.location).subquery()
+
+        rows = WeatherData.query.join(
+            latest,
+            (WeatherData.location == latest.c.location) & (WeatherData.timestamp == latest.c.timestamp)
+        ).all()
+        return {row.location: row for row in rows}
+
+    @staticmethod
+    def _upsert_projections(zone_ids, now, proj_lat, proj_lon, proj_radius, confidence):
+        """
+        Writes the 24/48/72h projections of many zones with bulk updates and
+        inserts, reusing each zone's existing rows by horizon.
+        """
+        existing = {}
+        stale_ids = []
+        for projection_id, zone_id, horizon in db.session.query(
+            OutbreakProjection.id, OutbreakProjection.outbreak_zone_id, OutbreakProjection.horizon_hours
+        ).filter(OutbreakProjection.outbreak_zone_id.in_(zone_ids)):
+            if horizon in PathogenPropagationService.PROJECTION_HOURS and (zone_id, horizon) not in existing:
+                existing[(zone_id, horizon)] = projection_id
+            else:
+                stale_ids.append(projection_id)
+
+        updates, inserts = [], []
+        for row, zone_id in enumerate(zone_ids):
+            for col, hours in enumerate(PathogenPropagationService.PROJECTION_HOURS):
+                values = {
+                    'outbreak_zone_id': zone_id,
+                    'horizon_hours': hours,
+                    'projection_time': now + timedelta(hours=hours),
+                    'projected_latitude': float(proj_lat[row, col]),
+                    'projected_longitude': float(proj_lon[row, col]),
+                    'expected_radius': float(proj_radius[row, col]),
+                    'confidence_score': float(confidence[col]),
+                    'created_at': now
+                }
+                projection_id = existing.get((zone_id, hours))
+                if projection_id is None:
+                    inserts.append(values)
+                else:
+                    updates.append({'id': projection_id, **values})
+
+        if stale_ids:
+            OutbreakProjection.query.filter(OutbreakProjection.id.in_(stale_ids)).delete(synchronize_session=False)
+        if updates:
+            db.session.bulk_update_mappings(OutbreakProjection, updates)
+        if inserts:
+            db.session.bulk_insert_mappings(OutbreakProjection, inserts)
 
     @staticmethod
     def get_risk_heatmap_data():
@@ -136,10 +303,16 @@ class PathogenPropagationService:
         Aggregates all active zones and their projections for frontend rendering.
         """
         zones = OutbreakZone.query.filter_by(status='active').all()
+        projections = {}
+        if zones:
+            for p in OutbreakProjection.query.filter(
+                OutbreakProjection.outbreak_zone_id.in_([z.id for z in zones])
+            ).order_by(OutbreakProjection.projection_time):
+                projections.setdefault(p.outbreak_zone_id, []).append(p.to_dict())
+
         heatmap = []
         for z in zones:
             z_data = z.to_dict()
-            projections = OutbreakProjection.query.filter_by(outbreak_zone_id=z.id).all()
-            z_data['projections'] = [p.to_dict() for p in projections]
+            z_data['projections'] = projections.get(z.id, [])
             heatmap.append(z_data)
         return heatmap
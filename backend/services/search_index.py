@@ -0,0 +1,626 @@
+"""
+Search Index: Full-text search over forum and knowledge content.
+
+This module provides:
+- Tokenization with stop words and a light suffix-stripping stemmer
+- One index covering forum threads, comments, questions and answers
+- BM25 ranking with title and tags weighted above body text
+- SQLite FTS5 or Postgres tsvector storage when the database supports it,
+  and an in-process inverted index as the fallback
+- Incremental updates from the services that create content
+"""
+
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Set
+import heapq
+import math
+import re
+import threading
+import time
+import logging
+
+from sqlalchemy import event, text
+from sqlalchemy.exc import SQLAlchemyError
+
+from backend.extensions import db
+from backend.models import ForumThread, PostComment
+from backend.models.knowledge import Answer, Question
+
+logger = logging.getLogger(__name__)
+
+THREAD, COMMENT, QUESTION, ANSWER = 'thread', 'comment', 'question', 'answer'
+DOC_TYPES = (THREAD, COMMENT, QUESTION, ANSWER)
+_TYPE_CODES = {doc_type: code for code, doc_type in enumerate(DOC_TYPES)}
+
+# Session.info key of documents waiting for their transaction to commit
+_PENDING_KEY = 'search_index_pending'
+
+# Child documents (comments, answers) count for their parent at this weight
+CHILD_SCORE_WEIGHT = 0.5
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+STOP_WORDS = frozenset("""
+a an and are as at be been but by can do does for from had has have how i if in into is it its
+me my no not of on or our so than that the their them then there these they this to was we were
+what when where which who why will with you your
+""".split())
+
+# (suffix, replacement), first match wins; the stem must keep 3+ letters
+_STEM_RULES = (
+    ('ational', 'ate'), ('tional', 'tion'), ('ization', 'ize'), ('fulness', 'ful'),
+    ('ousness', 'ous'), ('iveness', 'ive'), ('ements', ''), ('ement', ''), ('ments', ''),
+    ('ment', ''), ('ness', ''), ('ings', ''), ('ing', ''), ('edly', ''), ('ed', ''),
+    ('ies', 'y'), ('ied', 'y'), ('sses', 'ss'), ('oes', 'o'), ('xes', 'x'), ('ches', 'ch'),
+    ('shes', 'sh'), ('ly', ''), ('s', '')
+)
+_UNDOUBLE_AFTER = ('ing', 'ings', 'ed', 'edly')
+
+
+class SearchDocument(NamedTuple):
+    doc_type: str
+    doc_id: int
+    parent_id: Optional[int]
+    title: str
+    body: str
+    tags: str
+
+
+class SearchHit(NamedTuple):
+    doc_type: str
+    doc_id: int
+    parent_id: Optional[int]
+    score: float
+
+
+def tokenize(text_value: Optional[str]) -> List[str]:
+    """Lowercase alphanumeric tokens without stop words."""
+    if not text_value:
+        return []
+    return [t for t in _TOKEN_RE.findall(text_value.lower()) if t not in STOP_WORDS]
+
+
+@lru_cache(maxsize=65536)
+def stem(token: str) -> str:
+    """
+    Light English stemmer: strips common inflections so that e.g.
+    "pests"/"pest", "harvesting"/"harvested" and "diseases"/"disease" meet.
+    """
+    if len(token) <= 3 or token.isdigit():
+        return token
+
+    for suffix, replacement in _STEM_RULES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            if suffix == 's' and token[-2] in 'sui':
+                break
+            token = token[:-len(suffix)] + replacement
+            if suffix in _UNDOUBLE_AFTER and token[-1] == token[-2] and token[-1] not in 'lsz':
+                token = token[:-1]
+            break
+
+    if len(token) > 4 and token.endswith('e'):
+        token = token[:-1]
+    return token
+
+
+def analyze(text_value: Optional[str]) -> List[str]:
+    return [stem(t) for t in tokenize(text_value)]
+
+
+def _tag_text(tags: Optional[str]) -> str:
+    return (tags or '').replace(',', ' ')
+
+
+def thread_document(thread) -> SearchDocument:
+    return SearchDocument(THREAD, thread.id, None, thread.title or '', thread.content or '', _tag_text(thread.tags))
+
+
+def comment_document(comment) -> SearchDocument:
+    return SearchDocument(COMMENT, comment.id, comment.thread_id, '', comment.content or '', '')
+
+
+def question_document(question) -> SearchDocument:
+    return SearchDocument(QUESTION, question.id, None, question.title or '', question.content or '', question.category or '')
+
+
+def answer_document(answer) -> SearchDocument:
+    return SearchDocument(ANSWER, answer.id, answer.question_id, '', answer.content or '', '')
+
+
+class PythonSearchBackend:
+    """
+    In-process inverted index with BM25 scoring (k1=1.2, b=0.75).
+
+    Title and tag terms count TITLE_WEIGHT times toward term frequency, a
+    simple BM25F. Each process keeps its own copy, kept current by
+    SearchIndex's catch-up scan.
+    """
+
+    name = 'python'
+    K1 = 1.2
+    B = 0.75
+    TITLE_WEIGHT = 2
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._postings: Dict[str, Dict[tuple, int]] = defaultdict(dict)
+            self._doc_terms: Dict[tuple, Dict[str, int]] = {}
+            self._doc_lengths: Dict[tuple, int] = {}
+            self._parents: Dict[tuple, Optional[int]] = {}
+            self._tag_postings: Dict[str, Set[int]] = defaultdict(set)
+            self._doc_tags: Dict[int, Set[str]] = {}
+            self._total_length = 0
+
+    def _remove(self, key: tuple) -> None:
+        for term in self._doc_terms.pop(key, {}):
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(key, None)
+                if not postings:
+                    del self._postings[term]
+        self._total_length -= self._doc_lengths.pop(key, 0)
+        self._parents.pop(key, None)
+        if key[0] == THREAD:
+            for term in self._doc_tags.pop(key[1], ()):
+                self._tag_postings[term].discard(key[1])
+
+    def upsert(self, documents: Iterable[SearchDocument], executor=None) -> None:
+        with self._lock:
+            for doc in documents:
+                key = (doc.doc_type, doc.doc_id)
+                self._remove(key)
+
+                weighted = analyze(doc.title) * self.TITLE_WEIGHT + analyze(doc.tags) * self.TITLE_WEIGHT
+                terms: Dict[str, int] = defaultdict(int)
+                for term in weighted + analyze(doc.body):
+                    terms[term] += 1
+                for term, tf in terms.items():
+                    self._postings[term][key] = tf
+
+                self._doc_terms[key] = terms
+                self._doc_lengths[key] = sum(terms.values())
+                self._total_length += self._doc_lengths[key]
+                self._parents[key] = doc.parent_id
+
+                if doc.doc_type == THREAD:
+                    tag_terms = set(analyze(doc.tags))
+                    self._doc_tags[doc.doc_id] = tag_terms
+                    for term in tag_terms:
+                        self._tag_postings[term].add(doc.doc_id)
+
+    def search(self, tokens: Sequence[str], doc_types: Sequence[str], limit: Optional[int]) -> List[SearchHit]:
+        terms = set(stem(t) for t in tokens)
+        allowed = set(doc_types)
+
+        with self._lock:
+            doc_count = len(self._doc_lengths)
+            if not doc_count:
+                return []
+            avg_length = self._total_length / doc_count
+            scores: Dict[tuple, float] = defaultdict(float)
+
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for key, tf in postings.items():
+                    if key[0] not in allowed:
+                        continue
+                    norm = self.K1 * (1 - self.B + self.B * self._doc_lengths[key] / avg_length)
+                    scores[key] += idf * tf * (self.K1 + 1) / (tf + norm)
+
+            ranked = heapq.nlargest(limit, scores.items(), key=lambda item: item[1]) if limit \
+                else sorted(scores.items(), key=lambda item: item[1], reverse=True)
+            return [SearchHit(key[0], key[1], self._parents.get(key), score) for key, score in ranked]
+
+    def tagged(self, tags: Sequence[str]) -> Set[int]:
+        """Thread ids whose tags contain every term of every tag."""
+        with self._lock:
+            result = None
+            for tag in tags:
+                for term in analyze(tag):
+                    ids = self._tag_postings.get(term, set())
+                    result = set(ids) if result is None else result & ids
+            return result or set()
+
+
+class SQLiteFTSBackend:
+    """
+    SQLite FTS5 virtual table with the porter tokenizer and bm25() ranking.
+
+    The rowid encodes the document (doc_id * 4 + type code), so upserts and
+    type filters never scan the table.
+    """
+
+    name = 'sqlite_fts5'
+    TABLE = 'search_fts'
+
+    @classmethod
+    def exists(cls, connection) -> bool:
+        return connection.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (cls.TABLE,)
+        ).first() is not None
+
+    @classmethod
+    def create(cls, connection) -> None:
+        connection.exec_driver_sql(
+            f"CREATE VIRTUAL TABLE {cls.TABLE} USING fts5("
+            "parent_id UNINDEXED, title, body, tags, tokenize = 'porter unicode61')"
+        )
+
+    @classmethod
+    def drop(cls, connection) -> None:
+        connection.exec_driver_sql(f"DROP TABLE IF EXISTS {cls.TABLE}")
+
+    @staticmethod
+    def _rowid(doc_type: str, doc_id: int) -> int:
+        return doc_id * len(DOC_TYPES) + _TYPE_CODES[doc_type]
+
+    def upsert(self, documents: Iterable[SearchDocument], executor=None) -> None:
+        rows = [
+            {'rowid': self._rowid(d.doc_type, d.doc_id), 'parent_id': d.parent_id,
+             'title': d.title, 'body': d.body, 'tags': d.tags}
+            for d in documents
+        ]
+        if not rows:
+            return
+        executor = executor or db.session
+        executor.execute(text(f"DELETE FROM {self.TABLE} WHERE rowid = :rowid"), rows)
+        executor.execute(text(
+            f"INSERT INTO {self.TABLE} (rowid, parent_id, title, body, tags) "
+            "VALUES (:rowid, :parent_id, :title, :body, :tags)"
+        ), rows)
+
+    def search(self, tokens: Sequence[str], doc_types: Sequence[str], limit: Optional[int]) -> List[SearchHit]:
+        # Tokens are plain [a-z0-9]+ strings, so quoting them is enough
+        match = ' OR '.join(f'"{t}"' for t in dict.fromkeys(tokens))
+        codes = ', '.join(str(_TYPE_CODES[t]) for t in doc_types)
+        rows = db.session.execute(text(
+            f"SELECT rowid, parent_id, -bm25({self.TABLE}, 0.0, 2.0, 1.0, 2.0) AS score "
+            f"FROM {self.TABLE} WHERE {self.TABLE} MATCH :match AND rowid % {len(DOC_TYPES)} IN ({codes}) "
+            f"ORDER BY score DESC" + (" LIMIT :limit" if limit else "")
+        ), {'match': match, 'limit': limit}).all()
+        return [
+            SearchHit(DOC_TYPES[rowid % len(DOC_TYPES)], rowid // len(DOC_TYPES), parent_id, score)
+            for rowid, parent_id, score in rows
+        ]
+
+    def tagged(self, tags: Sequence[str]) -> Set[int]:
+        result = None
+        for tag in tags:
+            terms = tokenize(tag)
+            if not terms:
+                continue
+            match = 'tags : (' + ' AND '.join(f'"{t}"' for t in terms) + ')'
+            ids = {
+                rowid // len(DOC_TYPES) for (rowid,) in db.session.execute(text(
+                    f"SELECT rowid FROM {self.TABLE} WHERE {self.TABLE} MATCH :match "
+                    f"AND rowid % {len(DOC_TYPES)} = {_TYPE_CODES[THREAD]}"
+                ), {'match': match})
+            }
+            result = ids if result is None else result & ids
+        return result or set()
+
+
+class PostgresSearchBackend:
+    """
+    Postgres table with generated, GIN-indexed tsvector columns.
+
+    Titles and tags get weight A, body text weight B; ranking uses
+    ts_rank_cd, Postgres' closest built-in to BM25.
+    """
+
+    name = 'postgres_tsvector'
+    TABLE = 'search_documents'
+
+    @classmethod
+    def exists(cls, connection) -> bool:
+        return connection.exec_driver_sql(f"SELECT to_regclass('{cls.TABLE}')").scalar() is not None
+
+    @classmethod
+    def create(cls, connection) -> None:
+        connection.exec_driver_sql(f"""
+            CREATE TABLE {cls.TABLE} (
+                doc_type SMALLINT NOT NULL,
+                doc_id INTEGER NOT NULL,
+                parent_id INTEGER,
+                title TEXT NOT NULL DEFAULT '',
+                body TEXT NOT NULL DEFAULT '',
+                tags TEXT NOT NULL DEFAULT '',
+                document tsvector GENERATED ALWAYS AS (
+                    setweight(to_tsvector('english', title), 'A') ||
+                    setweight(to_tsvector('english', tags), 'A') ||
+                    setweight(to_tsvector('english', body), 'B')
+                ) STORED,
+                tag_vector tsvector GENERATED ALWAYS AS (to_tsvector('english', tags)) STORED,
+                PRIMARY KEY (doc_type, doc_id)
+            )
+        """)
+        connection.exec_driver_sql(f"CREATE INDEX ix_{cls.TABLE}_document ON {cls.TABLE} USING GIN (document)")
+        connection.exec_driver_sql(f"CREATE INDEX ix_{cls.TABLE}_tags ON {cls.TABLE} USING GIN (tag_vector)")
+
+    @classmethod
+    def drop(cls, connection) -> None:
+        connection.exec_driver_sql(f"DROP TABLE IF EXISTS {cls.TABLE}")
+
+    def upsert(self, documents: Iterable[SearchDocument], executor=None) -> None:
+        rows = [
+            {'doc_type': _TYPE_CODES[d.doc_type], 'doc_id': d.doc_id, 'parent_id': d.parent_id,
+             'title': d.title, 'body': d.body, 'tags': d.tags}
+            for d in documents
+        ]
+        if not rows:
+            return
+        (executor or db.session).execute(text(
+            f"INSERT INTO {self.TABLE} (doc_type, doc_id, parent_id, title, body, tags) "
+            "VALUES (:doc_type, :doc_id, :parent_id, :title, :body, :tags) "
+            "ON CONFLICT (doc_type, doc_id) DO UPDATE SET parent_id = EXCLUDED.parent_id, "
+            "title = EXCLUDED.title, body = EXCLUDED.body, tags = EXCLUDED.tags"
+        ), rows)
+
+    def search(self, tokens: Sequence[str], doc_types: Sequence[str], limit: Optional[int]) -> List[SearchHit]:
+        rows = db.session.execute(text(
+            f"SELECT doc_type, doc_id, parent_id, ts_rank_cd(document, query) AS score "
+            f"FROM {self.TABLE}, to_tsquery('english', :query) AS query "
+            "WHERE document @@ query AND doc_type = ANY(:codes) ORDER BY score DESC"
+            + (" LIMIT :limit" if limit else "")
+        ), {
+            'query': ' | '.join(dict.fromkeys(tokens)),
+            'codes': [_TYPE_CODES[t] for t in doc_types],
+            'limit': limit
+        }).all()
+        return [SearchHit(DOC_TYPES[code], doc_id, parent_id, score) for code, doc_id, parent_id, score in rows]
+
+    def tagged(self, tags: Sequence[str]) -> Set[int]:
+        result = None
+        for tag in tags:
+            terms = tokenize(tag)
+            if not terms:
+                continue
+            ids = {doc_id for (doc_id,) in db.session.execute(text(
+                f"SELECT doc_id FROM {self.TABLE} WHERE doc_type = :code "
+                "AND tag_vector @@ to_tsquery('english', :query)"
+            ), {'code': _TYPE_CODES[THREAD], 'query': ' & '.join(terms)})}
+            result = ids if result is None else result & ids
+        return result or set()
+
+
+# Source tables per document type: (model, columns, builder)
+def _sources():
+    return {
+        THREAD: (ForumThread, (ForumThread.id, ForumThread.title, ForumThread.content, ForumThread.tags),
+                 lambda r: SearchDocument(THREAD, r[0], None, r[1] or '', r[2] or '', _tag_text(r[3]))),
+        COMMENT: (PostComment, (PostComment.id, PostComment.thread_id, PostComment.content),
+                  lambda r: SearchDocument(COMMENT, r[0], r[1], '', r[2] or '', '')),
+        QUESTION: (Question, (Question.id, Question.title, Question.content, Question.category),
+                   lambda r: SearchDocument(QUESTION, r[0], None, r[1] or '', r[2] or '', r[3] or '')),
+        ANSWER: (Answer, (Answer.id, Answer.question_id, Answer.content),
+                 lambda r: SearchDocument(ANSWER, r[0], r[1], '', r[2] or '', ''))
+    }
+
+
+class SearchIndex:
+    """
+    Entry point used by the forum and knowledge services.
+
+    The backend is picked per database engine: FTS5 on SQLite builds that
+    have it, tsvector on Postgres, otherwise the Python index. Set
+    SEARCH_BACKEND = 'python' in the app config to force the fallback.
+
+    A database index table is created and backfilled on its own connection
+    the first time a search needs it; after that, creating services index
+    new content in their own transaction. The Python index is per process,
+    so it also picks up rows written by other processes with a scan of ids
+    above the last one seen, at most every CATCHUP_SECONDS.
+    """
+
+    CATCHUP_SECONDS = 5.0
+    CHUNK_SIZE = 1000
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._python = PythonSearchBackend()
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget the bound engine and in-memory state (e.g. after drop_all)."""
+        with self._lock:
+            self._engine = None
+            self._backend = None
+            self._python.reset()
+            self._last_ids = {doc_type: 0 for doc_type in DOC_TYPES}
+            self._last_catchup = None
+
+    def backend(self, create: bool = True):
+        """
+        Backend for the current engine.
+
+        With create=False, returns None instead of creating a database index
+        table, so callers inside a write transaction never run DDL.
+        """
+        engine = db.engine
+        with self._lock:
+            if self._backend is not None and self._engine is engine:
+                return self._backend
+            if self._engine is not None and self._engine is not engine:
+                self.reset()
+
+            backend = self._select_backend(engine, create)
+            if backend is not None:
+                self._engine = engine
+                self._backend = backend
+                logger.info(f"Search index using {backend.name} backend")
+            return backend
+
+    def _select_backend(self, engine, create: bool):
+        from flask import current_app
+        if current_app.config.get('SEARCH_BACKEND', 'auto') == 'python':
+            return self._python
+
+        dialect = engine.dialect.name
+        candidate = {'sqlite': SQLiteFTSBackend, 'postgresql': PostgresSearchBackend}.get(dialect)
+        if candidate is None:
+            return self._python
+        try:
+            with engine.begin() as connection:
+                if candidate.exists(connection):
+                    return candidate()
+                if not create:
+                    return None
+                candidate.create(connection)
+                indexed = self._scan(candidate(), connection, {doc_type: 0 for doc_type in DOC_TYPES})
+            logger.info(f"Created {candidate.TABLE} and indexed {indexed} documents")
+            return candidate()
+        except SQLAlchemyError as e:
+            logger.warning(f"Full-text search unavailable on {dialect} ({e}); using Python index")
+            return self._python
+
+    def _scan(self, backend, executor, last_ids: Dict[str, int]) -> int:
+        """Index source rows with ids above last_ids (updated in place)."""
+        indexed = 0
+        for doc_type, (model, columns, build) in _sources().items():
+            while True:
+                rows = executor.execute(
+                    db.select(*columns).where(model.id > last_ids[doc_type]).order_by(model.id).limit(self.CHUNK_SIZE)
+                ).all()
+                if not rows:
+                    break
+                backend.upsert([build(row) for row in rows], executor)
+                last_ids[doc_type] = rows[-1][0]
+                indexed += len(rows)
+        return indexed
+
+    def _ready(self):
+        backend = self.backend()
+        if backend is self._python:
+            now = time.monotonic()
+            with self._lock:
+                if self._last_catchup is None or now - self._last_catchup >= self.CATCHUP_SECONDS:
+                    self._scan(backend, db.session, self._last_ids)
+                    self._last_catchup = now
+        return backend
+
+    def index(self, documents: Sequence[SearchDocument]) -> None:
+        """
+        Add or replace documents. Called inside the creating transaction, so
+        database-backed entries commit or roll back with the content. The
+        Python index cannot roll back, so its documents are held on the
+        session and applied only once the transaction commits.
+        """
+        try:
+            backend = self.backend(create=False)
+            if backend is None:
+                return  # Index table not created yet; its backfill will include these
+            if backend is self._python:
+                db.session.info.setdefault(_PENDING_KEY, []).extend(documents)
+            else:
+                with db.session.begin_nested():
+                    backend.upsert(documents)
+        except Exception as e:
+            # rebuild() restores anything missed here
+            logger.error(f"Search indexing failed for {len(documents)} documents: {e}")
+
+    def _apply_pending(self, documents: Sequence[SearchDocument]) -> None:
+        """Write committed documents to the Python index."""
+        try:
+            self._python.upsert(documents)
+        except Exception as e:
+            logger.error(f"Search indexing failed for {len(documents)} documents: {e}")
+
+    def index_thread(self, thread) -> None:
+        self.index([thread_document(thread)])
+
+    def index_comment(self, comment) -> None:
+        self.index([comment_document(comment)])
+
+    def index_question(self, question) -> None:
+        self.index([question_document(question)])
+
+    def index_answer(self, answer) -> None:
+        self.index([answer_document(answer)])
+
+    def search(self, query: str, doc_types: Sequence[str] = DOC_TYPES, limit: Optional[int] = 100) -> List[SearchHit]:
+        """Rank documents of the given types against query (BM25, OR semantics)."""
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        return self._ready().search(tokens, doc_types, limit)
+
+    def _rolled_up(self, query: str, parent_type: str, child_type: str, limit: Optional[int]) -> Dict[int, float]:
+        scores: Dict[int, float] = {}
+        for hit in self.search(query, (parent_type, child_type), limit):
+            if hit.doc_type == parent_type:
+                doc_id, score = hit.doc_id, hit.score
+            else:
+                doc_id, score = hit.parent_id, hit.score * CHILD_SCORE_WEIGHT
+            if doc_id is not None and score > scores.get(doc_id, 0.0):
+                scores[doc_id] = score
+        return scores
+
+    def thread_scores(self, query: str, limit: Optional[int] = None) -> Dict[int, float]:
+        """Thread id -> best score from the thread itself or its comments."""
+        return self._rolled_up(query, THREAD, COMMENT, limit)
+
+    def question_scores(self, query: str, limit: Optional[int] = None) -> Dict[int, float]:
+        """Question id -> best score from the question itself or its answers."""
+        return self._rolled_up(query, QUESTION, ANSWER, limit)
+
+    def tagged_threads(self, tags: Sequence[str]) -> Set[int]:
+        return self._ready().tagged([t for t in tags if t])
+
+    def rebuild(self) -> int:
+        """Re-index every document from the source tables; returns the count."""
+        with self._lock:
+            backend = self.backend()
+            if backend is self._python:
+                backend.reset()
+                self._last_ids = {doc_type: 0 for doc_type in DOC_TYPES}
+                self._last_catchup = time.monotonic()
+                return self._scan(backend, db.session, self._last_ids)
+
+            with db.engine.begin() as connection:
+                type(backend).drop(connection)
+                type(backend).create(connection)
+                return self._scan(backend, connection, {doc_type: 0 for doc_type in DOC_TYPES})
+
+    def stats(self) -> Dict:
+        return {
+            'backend': self._backend.name if self._backend else None,
+            'python_documents': len(self._python._doc_lengths),
+            'python_last_ids': dict(self._last_ids)
+        }
+
+
+search_index = SearchIndex()
+
+
+@event.listens_for(db.metadata, 'before_drop')
+def _drop_search_tables(target, connection, **kw):
+    # The FTS/tsvector table is not part of the metadata; drop it alongside
+    backend = {'sqlite': SQLiteFTSBackend, 'postgresql': PostgresSearchBackend}.get(connection.dialect.name)
+    if backend is not None:
+        backend.drop(connection)
+    search_index.reset()
+
+
+@event.listens_for(db.metadata, 'after_create')
+def _reset_search_index(target, connection, **kw):
+    search_index.reset()
+
+
+@event.listens_for(db.session, 'after_commit')
+def _apply_pending_documents(session):
+    documents = session.info.pop(_PENDING_KEY, None)
+    if documents:
+        search_index._apply_pending(documents)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_pending_documents(session):
+    session.info.pop(_PENDING_KEY, None)
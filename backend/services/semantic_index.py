@@ -0,0 +1,404 @@
+"""
+Semantic Index: Local vector retrieval over approved forum threads and
+knowledge answers.
+
+This module provides:
+- Hashed TF-IDF vectors (stemmed unigrams plus bigrams), so no vocabulary
+  has to be fitted and documents can be added one at a time
+- Exact top-k cosine retrieval with NumPy/SciPy sparse products
+- An optional approximate mode that ranks dense random-projection sketches
+  first and rescores only the best candidates exactly
+- Incremental updates when content is approved, plus a periodic catch-up
+  scan for rows written, rejected or re-approved by other processes
+"""
+
+from datetime import datetime, timedelta
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+import threading
+import time
+import logging
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.random_projection import SparseRandomProjection
+from sqlalchemy import event
+
+from backend.extensions import db
+from backend.models import ForumThread
+from backend.models.knowledge import Answer, Question
+from backend.monitoring import metrics
+from backend.services.search_index import analyze
+
+logger = logging.getLogger(__name__)
+
+THREAD, ANSWER = 'thread', 'answer'
+DOC_TYPES = (THREAD, ANSWER)
+
+SNIPPET_CHARS = 300
+
+metrics.describe('agritech_semantic_search_seconds', 'Local vector retrieval time per knowledge base query')
+
+
+class SemanticHit(NamedTuple):
+    doc_type: str
+    doc_id: int
+    parent_id: Optional[int]  # question id for answers
+    title: str
+    snippet: str
+    score: float
+
+
+def _features(text_value: str) -> List[str]:
+    tokens = analyze(text_value)
+    return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+
+def thread_text(thread) -> Tuple[str, str]:
+    tags = (thread.tags or '').replace(',', ' ')
+    return thread.title or '', f"{thread.content or ''} {tags}".strip()
+
+
+def answer_text(answer, question_title: str) -> Tuple[str, str]:
+    return question_title or '', answer.content or ''
+
+
+class SemanticIndex:
+    """
+    In-process vector index for AIModerator.search_knowledge_base.
+
+    Rows hold raw term counts in a CSR matrix; IDF weights come from
+    document frequencies kept up to date as rows are added or removed, so
+    cosine scores always reflect the current corpus. New rows collect in a
+    small delta block that is merged into the main matrix every
+    COMPACT_ROWS additions.
+
+    The approximate mode (approximate=True, or SEMANTIC_SEARCH_APPROXIMATE
+    in the app config) is meant for large corpora: it avoids a full pass
+    over the sparse matrix by ranking SKETCH_DIM-wide sketches and
+    rescoring the top APPROXIMATE_CANDIDATES rows exactly.
+    """
+
+    N_FEATURES = 2 ** 18
+    SKETCH_DIM = 128
+    APPROXIMATE_CANDIDATES = 200
+    COMPACT_ROWS = 512
+    CATCHUP_SECONDS = 5.0
+    # Lookback on updated_at so moderation commits that land mid-scan are not missed
+    RECONCILE_OVERLAP_SECONDS = 60
+    CHUNK_SIZE = 1000
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._vectorizer = HashingVectorizer(
+            n_features=self.N_FEATURES, analyzer=_features, alternate_sign=False, norm=None, dtype=np.float32
+        )
+        self._projection = SparseRandomProjection(n_components=self.SKETCH_DIM, dense_output=True, random_state=0)
+        self._projection.fit(sp.csr_matrix((1, self.N_FEATURES), dtype=np.float32))
+        self.reset()
+
+    def reset(self) -> None:
+        """Drop all rows; the next search rebuilds from the database."""
+        with self._lock:
+            self._engine = None
+            self._loaded = False
+            self._keys: List[Tuple[str, int]] = []
+            self._meta: List[Tuple[Optional[int], str, str]] = []
+            self._row_of: Dict[Tuple[str, int], int] = {}
+            self._alive_buffer = np.zeros(0, dtype=bool)
+            self._main = sp.csr_matrix((0, self.N_FEATURES), dtype=np.float32)
+            self._main_sketches = np.zeros((0, self.SKETCH_DIM), dtype=np.float32)
+            self._delta: List[sp.csr_matrix] = []
+            self._delta_matrix: Optional[sp.csr_matrix] = None
+            self._df = np.zeros(self.N_FEATURES, dtype=np.int32)
+            self._live = 0
+            self._version = 0
+            self._norms_cache = (None, None)
+            self._last_ids = {doc_type: 0 for doc_type in DOC_TYPES}
+            self._last_catchup = None
+            self._reconciled_at: Optional[datetime] = None
+
+    # -- updates -----------------------------------------------------------
+
+    def _add(self, documents: Sequence[Tuple[str, int, Optional[int], str, str]], compact: bool = True) -> None:
+        """Add or replace (doc_type, doc_id, parent_id, title, body) documents."""
+        if not documents:
+            return
+        for doc_type, doc_id, _, _, _ in documents:
+            self._remove((doc_type, doc_id))
+        # Title repeated so its terms weigh double
+        block = self._vectorizer.transform([f"{title} {title} {body}" for _, _, _, title, body in documents]).tocsr()
+        block.sort_indices()
+
+        first = len(self._keys)
+        needed = first + len(documents)
+        if needed > len(self._alive_buffer):
+            grown = np.zeros(max(needed, 2 * len(self._alive_buffer), 1024), dtype=bool)
+            grown[:first] = self._alive_buffer[:first]
+            self._alive_buffer = grown
+        self._alive_buffer[first:needed] = True
+
+        for offset, (doc_type, doc_id, parent_id, title, body) in enumerate(documents):
+            self._row_of[(doc_type, doc_id)] = first + offset
+            self._keys.append((doc_type, doc_id))
+            self._meta.append((parent_id, title, body[:SNIPPET_CHARS]))
+        self._delta.append(block)
+        self._delta_matrix = None
+        np.add.at(self._df, block.indices, 1)
+        self._live += len(documents)
+        self._version += 1
+
+        if compact and self._delta_rows() >= self.COMPACT_ROWS:
+            self._compact()
+
+    @property
+    def _alive(self) -> np.ndarray:
+        return self._alive_buffer[:len(self._keys)]
+
+    def _remove(self, key: Tuple[str, int]) -> None:
+        row = self._row_of.pop(key, None)
+        if row is None:
+            return
+        self._alive_buffer[row] = False
+        self._df[self._row(row).indices] -= 1
+        self._live -= 1
+        self._version += 1
+
+    def _delta_rows(self) -> int:
+        return len(self._keys) - self._main.shape[0]
+
+    def _delta_block(self) -> sp.csr_matrix:
+        if self._delta_matrix is None:
+            self._delta_matrix = sp.vstack(self._delta, format='csr') if self._delta else \
+                sp.csr_matrix((0, self.N_FEATURES), dtype=np.float32)
+        return self._delta_matrix
+
+    def _row(self, row: int) -> sp.csr_matrix:
+        main_rows = self._main.shape[0]
+        return self._main[row] if row < main_rows else self._delta_block()[row - main_rows]
+
+    def _compact(self) -> None:
+        if not self._delta:
+            return
+        delta = self._delta_block()
+        self._main = sp.vstack([self._main, delta], format='csr')
+        self._main_sketches = np.vstack([self._main_sketches, self._sketch(delta)])
+        self._delta = []
+        self._delta_matrix = None
+
+    def _sketch(self, matrix: sp.csr_matrix) -> np.ndarray:
+        """Unit-length random projection of log-scaled term counts."""
+        scaled = matrix.copy()
+        scaled.data = 1.0 + np.log(scaled.data)
+        sketches = self._projection.transform(scaled).astype(np.float32)
+        norms = np.linalg.norm(sketches, axis=1, keepdims=True)
+        return sketches / np.where(norms > 0, norms, 1.0)
+
+    def update_thread(self, thread) -> None:
+        """Index an approved thread, or drop it once it is no longer approved."""
+        try:
+            with self._lock:
+                if not self._loaded:
+                    return  # The initial scan will pick it up
+                if thread.is_ai_approved:
+                    self._add([(THREAD, thread.id, None, *thread_text(thread))])
+                else:
+                    self._remove((THREAD, thread.id))
+        except Exception as e:
+            logger.error(f"Semantic indexing failed for thread {thread.id}: {e}")
+
+    def add_answer(self, answer) -> None:
+        try:
+            with self._lock:
+                if not self._loaded:
+                    return
+                question_title = answer.question.title if answer.question else ''
+                self._add([(ANSWER, answer.id, answer.question_id, *answer_text(answer, question_title))])
+        except Exception as e:
+            logger.error(f"Semantic indexing failed for answer {answer.id}: {e}")
+
+    # -- loading -----------------------------------------------------------
+
+    def _reconcile_threads(self) -> None:
+        """
+        Re-check indexed-range threads updated since the last catch-up, so a
+        rejection (or re-approval) committed by another process takes effect
+        here too.
+        """
+        since = self._reconciled_at
+        self._reconciled_at = datetime.utcnow() - timedelta(seconds=self.RECONCILE_OVERLAP_SECONDS)
+        if since is None:
+            return  # Initial load: the scan below only picks up approved threads
+        rows = db.session.execute(
+            db.select(ForumThread.id, ForumThread.is_ai_approved, ForumThread.title, ForumThread.content, ForumThread.tags)
+            .where(ForumThread.id <= self._last_ids[THREAD], ForumThread.updated_at >= since)
+        ).all()
+        restored = []
+        for thread_id, approved, title, content, tags in rows:
+            if not approved:
+                self._remove((THREAD, thread_id))
+            elif (THREAD, thread_id) not in self._row_of:
+                body = f"{content or ''} {(tags or '').replace(',', ' ')}".strip()
+                restored.append((THREAD, thread_id, None, title or '', body))
+        self._add(restored, compact=False)
+
+    def _scan(self) -> int:
+        """Index approved threads and answers with ids above the last ones seen."""
+        self._reconcile_threads()
+        indexed = 0
+        while True:
+            rows = db.session.execute(
+                db.select(ForumThread.id, ForumThread.title, ForumThread.content, ForumThread.tags)
+                .where(ForumThread.id > self._last_ids[THREAD], ForumThread.is_ai_approved.is_(True))
+                .order_by(ForumThread.id).limit(self.CHUNK_SIZE)
+            ).all()
+            if not rows:
+                break
+            self._add([(THREAD, thread_id, None, title or '', f"{content or ''} {(tags or '').replace(',', ' ')}".strip())
+                       for thread_id, title, content, tags in rows], compact=False)
+            self._last_ids[THREAD] = rows[-1][0]
+            indexed += len(rows)
+
+        while True:
+            rows = db.session.execute(
+                db.select(Answer.id, Answer.question_id, Answer.content, Question.title)
+                .join(Question, Question.id == Answer.question_id)
+                .where(Answer.id > self._last_ids[ANSWER])
+                .order_by(Answer.id).limit(self.CHUNK_SIZE)
+            ).all()
+            if not rows:
+                break
+            self._add([(ANSWER, answer_id, question_id, title or '', content or '')
+                       for answer_id, question_id, content, title in rows], compact=False)
+            self._last_ids[ANSWER] = rows[-1][0]
+            indexed += len(rows)
+
+        if self._delta_rows() >= self.COMPACT_ROWS:
+            self._compact()
+        return indexed
+
+    def _ready(self) -> None:
+        engine = db.engine
+        if self._engine is not engine:
+            self.reset()
+            self._engine = engine
+        now = time.monotonic()
+        if not self._loaded or now - self._last_catchup >= self.CATCHUP_SECONDS:
+            started = time.perf_counter()
+            indexed = self._scan()
+            if not self._loaded:
+                logger.info(f"Semantic index loaded {indexed} documents in {time.perf_counter() - started:.2f}s")
+            self._loaded = True
+            self._last_catchup = now
+
+    def rebuild(self) -> int:
+        """Re-index every approved thread and answer; returns the count."""
+        with self._lock:
+            self.reset()
+            self._ready()
+            return self._live
+
+    # -- retrieval ---------------------------------------------------------
+
+    def _idf(self) -> np.ndarray:
+        # Smoothed IDF, as in scikit-learn's TfidfTransformer
+        return (np.log((1.0 + self._live) / (1.0 + self._df)) + 1.0).astype(np.float32)
+
+    def _norms(self, matrix: sp.csr_matrix, idf_squared: np.ndarray) -> np.ndarray:
+        squared = matrix.copy()
+        squared.data **= 2
+        return np.sqrt(squared @ idf_squared)
+
+    def _all_norms(self, idf_squared: np.ndarray) -> np.ndarray:
+        version, norms = self._norms_cache
+        if version != self._version or norms is None or len(norms) != len(self._keys):
+            norms = np.concatenate([self._norms(self._main, idf_squared), self._norms(self._delta_block(), idf_squared)])
+            self._norms_cache = (self._version, norms)
+        return norms
+
+    def _scores(self, query_vector: sp.csr_matrix, approximate: bool) -> Tuple[np.ndarray, np.ndarray]:
+        """Candidate rows and their cosine similarity to the query."""
+        idf = self._idf()
+        cols = query_vector.indices
+        query_weights = query_vector.data * idf[cols]
+        query_norm = float(np.sqrt(np.dot(query_weights, query_weights)))
+        if query_norm == 0.0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+
+        weights = np.zeros(self.N_FEATURES, dtype=np.float32)
+        weights[cols] = query_weights * idf[cols]
+
+        if approximate and len(self._keys) > self.APPROXIMATE_CANDIDATES:
+            self._compact()
+            sketch_scores = self._main_sketches @ self._sketch(query_vector)[0]
+            sketch_scores[~self._alive] = -np.inf
+            rows = np.argpartition(-sketch_scores, self.APPROXIMATE_CANDIDATES)[:self.APPROXIMATE_CANDIDATES]
+            # With fewer live rows than candidates the partition pads with removed ones
+            rows = rows[self._alive[rows]]
+            candidates = self._main[rows]
+            norms = self._norms(candidates, idf * idf)
+            dots = candidates @ weights
+        else:
+            rows = np.flatnonzero(self._alive)
+            dots = np.concatenate([self._main @ weights, self._delta_block() @ weights])
+            norms = self._all_norms(idf * idf)
+            dots, norms = dots[rows], norms[rows]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scores = np.where(norms > 0, dots / (norms * query_norm), 0.0)
+        return rows, scores
+
+    def search(self, query: str, limit: int = 5, doc_types: Sequence[str] = DOC_TYPES,
+               approximate: Optional[bool] = None) -> List[SemanticHit]:
+        """Top `limit` documents by TF-IDF cosine similarity to `query`."""
+        if approximate is None:
+            from flask import current_app
+            approximate = bool(current_app.config.get('SEMANTIC_SEARCH_APPROXIMATE', False))
+
+        started = time.perf_counter()
+        query_vector = self._vectorizer.transform([query or '']).tocsr()
+        with self._lock:
+            self._ready()
+            if not query_vector.nnz or not self._live:
+                return []
+            rows, scores = self._scores(query_vector, approximate)
+
+            wanted = set(doc_types)
+            if len(wanted) < len(DOC_TYPES):
+                keep = np.fromiter((self._keys[r][0] in wanted for r in rows), dtype=bool, count=len(rows))
+                rows, scores = rows[keep], scores[keep]
+
+            positive = scores > 0
+            rows, scores = rows[positive], scores[positive]
+            if len(rows) > limit:
+                top = np.argpartition(-scores, limit)[:limit]
+                rows, scores = rows[top], scores[top]
+            order = np.argsort(-scores, kind='stable')
+
+            hits = []
+            for row, score in zip(rows[order].tolist(), scores[order].tolist()):
+                doc_type, doc_id = self._keys[row]
+                parent_id, title, snippet = self._meta[row]
+                hits.append(SemanticHit(doc_type, doc_id, parent_id, title, snippet, round(score, 4)))
+
+        metrics.observe('agritech_semantic_search_seconds', time.perf_counter() - started)
+        return hits
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'documents': self._live,
+                'rows': len(self._keys),
+                'delta_rows': len(self._delta),
+                'loaded': self._loaded,
+                'last_ids': dict(self._last_ids)
+            }
+
+
+semantic_index = SemanticIndex()
+
+
+@event.listens_for(db.metadata, 'after_create')
+@event.listens_for(db.metadata, 'before_drop')
+def _reset_semantic_index(target, connection, **kw):
+    semantic_index.reset()
@@ -0,0 +1,432 @@
+"""
+Task Progress: Push channel for Celery task state and progress.
+
+This module provides:
+- A publisher that workers use to broadcast state transitions (started,
+  retrying, completed, failed) and incremental progress over Redis pub/sub,
+  with the latest state of each task kept under a TTL'd key
+- Celery signal handlers that publish transitions for every task, so tasks
+  only call report_progress() for intermediate steps
+- A process-local store of the latest state per task that web processes
+  feed from a Redis subscriber thread, for the SocketIO task_events module
+  and for long-poll clients watching many task ids at once
+
+Without Redis (tests, eager tasks in development) events are delivered to
+the local store directly.
+"""
+
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional
+import json
+import os
+import threading
+import time
+import logging
+
+from celery.signals import task_prerun, task_postrun
+from flask import current_app, has_app_context
+
+from backend.monitoring import metrics
+
+logger = logging.getLogger(__name__)
+
+metrics.describe('agritech_task_events_total', 'Task state and progress events published, by status')
+
+STATUS_BY_STATE = {
+    'PENDING': 'pending',
+    'RECEIVED': 'pending',
+    'STARTED': 'processing',
+    'PROGRESS': 'processing',
+    'RETRY': 'retrying',
+    'SUCCESS': 'completed',
+    'FAILURE': 'failed',
+    'REVOKED': 'revoked',
+}
+TERMINAL_STATUSES = ('completed', 'failed', 'revoked')
+
+
+class TaskProgressHub:
+    """
+    Publishes task events and serves the latest state of watched tasks.
+
+    Every event carries a `cursor`, a sequence number local to the process
+    that stored it. Long-poll clients pass back the highest cursor they have
+    seen and only receive newer events.
+    """
+
+    CHANNEL = 'agritech:task_events'
+    STATE_KEY_PREFIX = 'agritech:task_state:'
+    STATE_TTL_SECONDS = 3600
+    MAX_TRACKED_TASKS = 5000
+    MAX_WAIT_SECONDS = 30
+    # Once a long-poll sees a change it lingers this long to batch others
+    BATCH_WINDOW_SECONDS = 0.1
+    # Intermediate progress is published at most this often per task
+    PROGRESS_INTERVAL_SECONDS = 0.25
+    # After a failed connection, Redis is not retried for this long
+    REDIS_RETRY_SECONDS = 30
+
+    _condition = threading.Condition()
+    _states: 'OrderedDict[str, dict]' = OrderedDict()
+    _sequence = 0
+    _listeners: List[Callable[[dict], None]] = []
+    _last_progress: Dict[str, float] = {}
+
+    _redis_lock = threading.Lock()
+    _redis = None
+    _redis_failed_at: Optional[float] = None
+    _subscriber: Optional[threading.Thread] = None
+
+    # ==================== PUBLISHING ====================
+
+    @classmethod
+    def publish(cls, task_id: str, state: str, progress: Optional[float] = None,
+                message: Optional[str] = None, result=None, error: Optional[str] = None,
+                task_name: Optional[str] = None) -> Optional[dict]:
+        """
+        Broadcast a state transition or progress update for one task.
+
+        Never raises: a task must not fail because its progress could not be
+        delivered.
+
+        Returns:
+            The published event, or None if it could not be serialized
+        """
+        status = STATUS_BY_STATE.get(state, state.lower())
+        if status in TERMINAL_STATUSES:
+            cls._last_progress.pop(task_id, None)
+        if status == 'completed':
+            progress = 100.0
+
+        event = {
+            'task_id': task_id,
+            'task_name': task_name,
+            'state': state,
+            'status': status,
+            'progress': round(float(progress), 2) if progress is not None else None,
+            'message': message,
+            'result': result,
+            'error': error,
+            'timestamp': datetime.utcnow().isoformat()
+        }
+        try:
+            payload = json.dumps(event, default=str)
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Task event for {task_id} is not serializable: {e}")
+            return None
+        metrics.increment('agritech_task_events_total', labels={'status': status})
+
+        client = cls._client()
+        if client is not None:
+            try:
+                pipe = client.pipeline(transaction=False)
+                pipe.set(cls.STATE_KEY_PREFIX + task_id, payload, ex=cls.STATE_TTL_SECONDS)
+                pipe.publish(cls.CHANNEL, payload)
+                pipe.execute()
+                return event
+            except Exception as e:
+                cls._mark_redis_failed(e)
+
+        cls._ingest(json.loads(payload))
+        return event
+
+    @classmethod
+    def report_progress(cls, task, current: float, total: Optional[float] = None,
+                        message: Optional[str] = None) -> bool:
+        """
+        Record intermediate progress from inside a bound task.
+
+        Also stores a PROGRESS state in the result backend, so AsyncResult
+        pollers see it. Updates closer together than PROGRESS_INTERVAL_SECONDS
+        are dropped, except the final one (current == total).
+
+        Args:
+            task: The bound task (`self` in a bind=True task)
+            current: Work done so far
+            total: Total work; when omitted `current` is a percentage
+            message: Optional description of the current step
+
+        Returns:
+            True if the update was published
+        """
+        request = getattr(task, 'request', None)
+        task_id = getattr(request, 'id', None)
+        if not task_id:
+            return False
+
+        percent = (100.0 * current / total) if total else float(current)
+        percent = max(0.0, min(100.0, percent))
+        now = time.monotonic()
+        if percent < 100.0 and now - cls._last_progress.get(task_id, 0.0) < cls.PROGRESS_INTERVAL_SECONDS:
+            return False
+        cls._last_progress[task_id] = now
+
+        if not getattr(request, 'is_eager', False):
+            try:
+                task.update_state(state='PROGRESS', meta={
+                    'current': current, 'total': total, 'progress': percent, 'message': message
+                })
+            except Exception as e:
+                logger.debug(f"Could not store progress for task {task_id}: {e}")
+
+        return cls.publish(task_id, 'PROGRESS', progress=percent, message=message,
+                           task_name=getattr(task, 'name', None)) is not None
+
+    # ==================== LOCAL STORE ====================
+
+    @classmethod
+    def _ingest(cls, event: dict):
+        with cls._condition:
+            cls._sequence += 1
+            event['cursor'] = cls._sequence
+            task_id = event['task_id']
+            previous = cls._states.pop(task_id, None)
+            if event.get('progress') is None and previous is not None and event['status'] == previous['status']:
+                event['progress'] = previous.get('progress')
+            cls._states[task_id] = event
+            while len(cls._states) > cls.MAX_TRACKED_TASKS:
+                cls._states.popitem(last=False)
+            cls._condition.notify_all()
+
+        for listener in list(cls._listeners):
+            try:
+                listener(event)
+            except Exception as e:
+                logger.error(f"Task event listener {getattr(listener, '__name__', listener)} failed: {e}")
+
+    @classmethod
+    def add_listener(cls, listener: Callable[[dict], None]):
+        """Call `listener(event)` for every event stored in this process."""
+        if listener not in cls._listeners:
+            cls._listeners.append(listener)
+
+    @classmethod
+    def remove_listener(cls, listener: Callable[[dict], None]):
+        if listener in cls._listeners:
+            cls._listeners.remove(listener)
+
+    @classmethod
+    def clear(cls):
+        """Forget all stored states (tests and maintenance)."""
+        with cls._condition:
+            cls._states.clear()
+            cls._last_progress.clear()
+
+    @classmethod
+    def snapshot(cls, task_ids: Iterable[str], fallback: bool = True) -> Dict[str, dict]:
+        """
+        Latest known state of each task.
+
+        Tasks missing from the local store are read from their Redis state
+        key, then from the Celery result backend. With fallback=False, or
+        when Redis is unreachable, unknown tasks are reported as pending,
+        which is also what Celery reports for them.
+        """
+        task_ids = list(dict.fromkeys(task_ids))
+        with cls._condition:
+            states = {task_id: cls._states[task_id] for task_id in task_ids if task_id in cls._states}
+
+        missing = [task_id for task_id in task_ids if task_id not in states]
+        client = cls._client() if fallback and missing else None
+        if client is not None:
+            try:
+                stored = client.mget([cls.STATE_KEY_PREFIX + task_id for task_id in missing])
+                for task_id, payload in zip(missing, stored):
+                    if payload:
+                        states[task_id] = dict(json.loads(payload), cursor=0)
+            except Exception as e:
+                cls._mark_redis_failed(e)
+            else:
+                for task_id in missing:
+                    if task_id not in states:
+                        states[task_id] = cls._from_result_backend(task_id)
+
+        for task_id in task_ids:
+            states.setdefault(task_id, cls._pending(task_id))
+        return {task_id: states[task_id] for task_id in task_ids}
+
+    @classmethod
+    def wait(cls, task_ids: Iterable[str], since: int = 0,
+             timeout: float = 25.0) -> Dict[str, object]:
+        """
+        Block until one of the tasks has an event newer than `since`.
+
+        Returns immediately when `since` is 0 or not a cursor of this
+        process (the client is new or was served by another process), and
+        when every task has already finished. Otherwise, after the first
+        change it waits BATCH_WINDOW_SECONDS more so that changes to other
+        watched tasks arrive in the same response.
+
+        Returns:
+            dict with the current `cursor` and the newer `events`
+        """
+        task_ids = list(dict.fromkeys(task_ids))
+        cls.ensure_subscriber()
+        deadline = time.monotonic() + max(0.0, min(float(timeout), cls.MAX_WAIT_SECONDS))
+
+        batched = False
+        with cls._condition:
+            while True:
+                events = [cls._states[task_id] for task_id in task_ids
+                          if task_id in cls._states and cls._states[task_id]['cursor'] > since]
+                finished = all(
+                    task_id in cls._states and cls._states[task_id]['status'] in TERMINAL_STATUSES
+                    for task_id in task_ids
+                )
+                remaining = deadline - time.monotonic()
+                if since <= 0 or since > cls._sequence or remaining <= 0 or (finished and not events):
+                    return {'cursor': cls._sequence, 'events': events}
+                if events:
+                    if batched or finished or len(events) == len(task_ids):
+                        return {'cursor': cls._sequence, 'events': events}
+                    batched = True
+                    cls._condition.wait_for(lambda: False, timeout=min(cls.BATCH_WINDOW_SECONDS, remaining))
+                    continue
+                cls._condition.wait(remaining)
+
+    @staticmethod
+    def summarize(states: Dict[str, dict]) -> Dict[str, object]:
+        """Aggregate counts and overall progress of a group of tasks."""
+        counts: Dict[str, int] = {}
+        progress = 0.0
+        for state in states.values():
+            counts[state['status']] = counts.get(state['status'], 0) + 1
+            if state['status'] in TERMINAL_STATUSES:
+                progress += 100.0
+            else:
+                progress += state.get('progress') or 0.0
+        total = len(states)
+        return {
+            'total': total,
+            'counts': counts,
+            'progress': round(progress / total, 2) if total else 0.0,
+            'done': all(state['status'] in TERMINAL_STATUSES for state in states.values())
+        }
+
+    @staticmethod
+    def _pending(task_id: str) -> dict:
+        return {'task_id': task_id, 'state': 'PENDING', 'status': 'pending', 'progress': None, 'cursor': 0}
+
+    @classmethod
+    def _from_result_backend(cls, task_id: str) -> dict:
+        try:
+            from backend.celery_app import celery_app
+            task = celery_app.AsyncResult(task_id)
+            state = task.state
+            info = task.info
+        except Exception as e:
+            logger.debug(f"Result backend lookup for {task_id} failed: {e}")
+            return cls._pending(task_id)
+
+        status = STATUS_BY_STATE.get(state, state.lower())
+        event = {'task_id': task_id, 'state': state, 'status': status, 'progress': None, 'cursor': 0}
+        if state == 'PROGRESS' and isinstance(info, dict):
+            event['progress'] = info.get('progress')
+            event['message'] = info.get('message')
+        elif state == 'SUCCESS':
+            event['progress'] = 100.0
+            event['result'] = info
+        elif state == 'FAILURE':
+            event['error'] = str(info)
+        return event
+
+    # ==================== REDIS ====================
+
+    @classmethod
+    def _redis_url(cls) -> str:
+        if has_app_context():
+            url = current_app.config.get('REDIS_URL')
+            if url:
+                return url
+        return os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
+
+    @classmethod
+    def _client(cls):
+        """Shared Redis client, or None while Redis is unreachable."""
+        if cls._redis is not None:
+            return cls._redis
+        with cls._redis_lock:
+            if cls._redis is not None:
+                return cls._redis
+            if cls._redis_failed_at and time.monotonic() - cls._redis_failed_at < cls.REDIS_RETRY_SECONDS:
+                return None
+            try:
+                import redis
+                client = redis.from_url(cls._redis_url(), socket_connect_timeout=0.5, socket_timeout=5)
+                client.ping()
+            except Exception as e:
+                cls._redis_failed_at = time.monotonic()
+                logger.info(f"Task events delivered in-process only, Redis unavailable: {e}")
+                return None
+            cls._redis = client
+            cls._redis_failed_at = None
+            return client
+
+    @classmethod
+    def _mark_redis_failed(cls, error: Exception):
+        logger.warning(f"Redis task event delivery failed: {error}")
+        with cls._redis_lock:
+            cls._redis = None
+            cls._redis_failed_at = time.monotonic()
+
+    @classmethod
+    def ensure_subscriber(cls) -> bool:
+        """
+        Start the thread that feeds the local store from Redis pub/sub, once
+        per process. Web processes call this on first use; workers never
+        need it.
+
+        Returns:
+            True if the subscriber is running
+        """
+        if cls._subscriber is not None and cls._subscriber.is_alive():
+            return True
+        if cls._client() is None:
+            return False
+        with cls._redis_lock:
+            if cls._subscriber is None or not cls._subscriber.is_alive():
+                cls._subscriber = threading.Thread(target=cls._subscribe_forever, name='task-events', daemon=True)
+                cls._subscriber.start()
+        return True
+
+    @classmethod
+    def _subscribe_forever(cls):
+        backoff = 1.0
+        while True:
+            client = cls._client()
+            if client is None:
+                time.sleep(cls.REDIS_RETRY_SECONDS)
+                continue
+            try:
+                pubsub = client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(cls.CHANNEL)
+                backoff = 1.0
+                for message in pubsub.listen():
+                    if message.get('type') == 'message':
+                        cls._ingest(json.loads(message['data']))
+            except Exception as e:
+                cls._mark_redis_failed(e)
+                time.sleep(backoff)
+                backoff = min(backoff * 2, cls.REDIS_RETRY_SECONDS)
+
+
+def report_progress(task, current: float, total: Optional[float] = None, message: Optional[str] = None) -> bool:
+    """Shortcut for TaskProgressHub.report_progress."""
+    return TaskProgressHub.report_progress(task, current, total, message)
+
+
+@task_prerun.connect
+def _publish_task_started(task_id=None, task=None, **kwargs):
+    TaskProgressHub.publish(task_id, 'STARTED', progress=0, task_name=getattr(task, 'name', None))
+
+
+@task_postrun.connect
+def _publish_task_finished(task_id=None, task=None, retval=None, state=None, **kwargs):
+    task_name = getattr(task, 'name', None)
+    if state == 'RETRY':
+        TaskProgressHub.publish(task_id, 'RETRY', message=str(retval), task_name=task_name)
+    elif state == 'FAILURE' or isinstance(retval, BaseException):
+        TaskProgressHub.publish(task_id, 'FAILURE', error=str(retval), task_name=task_name)
+    else:
+        TaskProgressHub.publish(task_id, state or 'SUCCESS', result=retval, task_name=task_name)
@@ -18,9 +18,10 @@ import logging
 from backend.extensions import db
 from backend.models.ledger import (
     Vault, VaultCurrencyPosition, LedgerAccount, LedgerEntry,
-    AccountType, EntryType, TransactionType, FXValuationSnapshot
+    AccountType, EntryType, TransactionType
 )
 from backend.services.ledger_service import LedgerService
+from backend.services.cost_basis_service import CostBasisService
 
 logger = logging.getLogger(__name__)
 
@@ -300,6 +301,10 @@ class VaultService:
         
         # Update cost basis
         VaultService._update_cost_basis(position, amount, fx_rate)
+        if currency != vault.base_currency:
+            CostBasisService.open_lot(
+                position, amount, fx_rate, reference=reference or transaction.transaction_id
+            )
         
         db.session.commit()
         
@@ -328,12 +333,20 @@ class VaultService:
         fx_rate: Decimal = None,
         destination_description: str = None,
         reference: str = None,
-        created_by: int = None
+        created_by: int = None,
+        cost_basis_method: str = None,
+        lot_ids: List[int] = None
     ) -> Dict:
         """
         Withdraw funds from vault.
         
-        Records realized FX gain/loss if selling foreign currency.
+        Records realized FX gain/loss if selling foreign currency, costed
+        from the position's acquisition lots.
+        
+        Args:
+            cost_basis_method: AVERAGE, FIFO, LIFO, HIFO or SPECIFIC
+                (defaults to VAULT_COST_BASIS_METHOD)
+            lot_ids: Lots to sell when using SPECIFIC
         """
         if vault.is_locked:
             raise ValueError(f"Vault is locked: {vault.locked_reason}")
@@ -362,14 +375,8 @@ class VaultService:
             from backend.services.fx_service import FXService
             fx_rate = FXService.get_rate(currency, vault.base_currency) or Decimal('1')
         
-        # Calculate realized FX gain/loss
-        realized_fx_gain = Decimal('0')
-        if position.cost_basis_rate and currency != vault.base_currency:
-            original_value = amount * position.cost_basis_rate
-            current_value = amount * fx_rate
-            realized_fx_gain = current_value - original_value
-        
-        # Get or create external destination account
+        # Resolve accounts before touching lots: creating an account commits,
+        # which would persist the lot consumption ahead of the posting
         dest_account, _ = LedgerService.get_or_create_account(
             account_code='3001-EXTERNAL-WITHDRAWALS',
             name='External Withdrawals',
@@ -378,6 +385,26 @@ class VaultService:
             is_system=True
         )
         
+        # Calculate realized FX gain/loss from the lots sold
+        realized_fx_gain = Decimal('0')
+        fx_gain_account = None
+        disposal = None
+        if currency != vault.base_currency:
+            fx_gain_account, _ = LedgerService.get_or_create_account(
+                account_code='6000-FX-REALIZED-GAIN',
+                name='Realized FX Gain/Loss',
+                account_type=AccountType.INCOME,
+                currency=vault.base_currency,
+                is_system=True
+            )
+            disposal = CostBasisService.dispose(
+                position, amount, fx_rate,
+                method=cost_basis_method,
+                lot_ids=lot_ids,
+                reference=reference
+            )
+            realized_fx_gain = disposal['realized_gain']
+        
         entries = [
             {
                 'account_id': position.ledger_account_id,
@@ -399,14 +426,6 @@ class VaultService:
         
         # Add FX gain/loss entry if applicable
         if realized_fx_gain != 0:
-            fx_gain_account, _ = LedgerService.get_or_create_account(
-                account_code='6000-FX-REALIZED-GAIN',
-                name='Realized FX Gain/Loss',
-                account_type=AccountType.INCOME,
-                currency=vault.base_currency,
-                is_system=True
-            )
-            
             # Adjust entries for FX gain/loss
             if realized_fx_gain > 0:
                 entries.append({
@@ -443,16 +462,21 @@ class VaultService:
                     'memo': 'Realized FX loss'
                 })
         
-        transaction = LedgerService.create_transaction(
-            transaction_type=TransactionType.WITHDRAWAL,
-            entries=entries,
-            description=destination_description or f"Withdrawal from {vault.name}",
-            reference_number=reference,
-            source_type='vault_withdrawal',
-            source_id=vault.id,
-            base_currency=vault.base_currency,
-            created_by=created_by
-        )
+        try:
+            # Commits the lot consumption along with the entries
+            transaction = LedgerService.create_transaction(
+                transaction_type=TransactionType.WITHDRAWAL,
+                entries=entries,
+                description=destination_description or f"Withdrawal from {vault.name}",
+                reference_number=reference,
+                source_type='vault_withdrawal',
+                source_id=vault.id,
+                base_currency=vault.base_currency,
+                created_by=created_by
+            )
+        except Exception:
+            db.session.rollback()
+            raise
         
         # Update realized FX gain tracking
         if realized_fx_gain != 0:
@@ -473,6 +497,8 @@ class VaultService:
             'fx_rate': float(fx_rate),
             'base_amount': float(Decimal(str(amount)) * fx_rate),
             'realized_fx_gain': float(realized_fx_gain),
+            'cost_basis_method': disposal['method'] if disposal else None,
+            'lots_consumed': disposal['lots'] if disposal else [],
             'new_balance': float(new_balance),
             'timestamp': datetime.utcnow().isoformat()
         }
@@ -515,6 +541,26 @@ class VaultService:
             from backend.services.fx_service import FXService
             fx_rate = FXService.get_rate(currency, base_currency) or Decimal('1')
         
+        # Cost rate of the currency in the destination vault's base currency
+        dest_base_currency = dest_vault.base_currency
+        if currency == dest_base_currency:
+            dest_rate = Decimal('1')
+        elif dest_base_currency == base_currency:
+            dest_rate = fx_rate
+        else:
+            from backend.services.fx_service import FXService
+            dest_rate = FXService.get_rate(currency, dest_base_currency) or Decimal('1')
+        
+        # Carry the source lots over before posting so both commit together
+        if currency != dest_base_currency:
+            CostBasisService.transfer_lots(
+                source_position, dest_position, amount,
+                rate=dest_rate if dest_base_currency != base_currency else None
+            )
+        elif currency != base_currency:
+            # Arrives as the destination's base currency: no lots to open there
+            CostBasisService.transfer_lots(source_position, None, amount)
+        
         # Create transfer transaction
         entries = [
             {
@@ -535,18 +581,22 @@ class VaultService:
             }
         ]
         
-        transaction = LedgerService.create_transaction(
-            transaction_type=TransactionType.TRANSFER,
-            entries=entries,
-            description=description or f"Transfer from {source_vault.name} to {dest_vault.name}",
-            source_type='vault_transfer',
-            source_id=source_vault.id,
-            base_currency=base_currency,
-            created_by=created_by
-        )
+        try:
+            transaction = LedgerService.create_transaction(
+                transaction_type=TransactionType.TRANSFER,
+                entries=entries,
+                description=description or f"Transfer from {source_vault.name} to {dest_vault.name}",
+                source_type='vault_transfer',
+                source_id=source_vault.id,
+                base_currency=base_currency,
+                created_by=created_by
+            )
+        except Exception:
+            db.session.rollback()
+            raise
         
         # Update cost basis for destination
-        VaultService._update_cost_basis(dest_position, amount, fx_rate)
+        VaultService._update_cost_basis(dest_position, amount, dest_rate)
         
         db.session.commit()
         
@@ -603,7 +653,8 @@ class VaultService:
         """
         Revalue all currency positions at current FX rates.
         
-        Creates FX valuation snapshots and unrealized gain entries.
+        Creates FX valuation snapshots and unrealized gain entries through
+        the batched FXRevaluationEngine.
         
         Args:
             vault: Vault to revalue
@@ -612,74 +663,10 @@ class VaultService:
         Returns:
             List of revaluation results
         """
-        from backend.services.fx_service import FXService
-        
-        positions = vault.currency_positions.all()
-        results = []
+        from backend.services.fx_revaluation import FXRevaluationEngine
         
-        for position in positions:
-            if position.currency == vault.base_currency:
-                continue
-            
-            balance = VaultService.get_position_balance(position)
-            if balance <= 0:
-                continue
-            
-            # Get current rate
-            if current_rates and position.currency in current_rates:
-                new_rate = current_rates[position.currency]
-            else:
-                new_rate = FXService.get_rate(
-                    position.currency,
-                    vault.base_currency
-                ) or Decimal('1')
-            
-            old_rate = position.last_fx_rate or position.cost_basis_rate or new_rate
-            
-            if old_rate == new_rate:
-                continue
-            
-            # Calculate delta
-            old_value = balance * old_rate
-            new_value = balance * new_rate
-            delta = new_value - old_value
-            
-            # Create snapshot
-            snapshot = FXValuationSnapshot(
-                entity_type='vault_position',
-                entity_id=position.id,
-                currency=position.currency,
-                position_amount=balance,
-                original_fx_rate=old_rate,
-                current_fx_rate=new_rate,
-                base_currency=vault.base_currency,
-                original_base_value=old_value,
-                current_base_value=new_value,
-                unrealized_gain_loss=delta,
-                unrealized_gain_loss_pct=(delta / old_value * 100) if old_value > 0 else 0,
-                cumulative_realized_gain=position.cumulative_realized_fx_gain,
-                cumulative_unrealized_gain=position.cumulative_unrealized_fx_gain + delta
-            )
-            
-            db.session.add(snapshot)
-            
-            # Update position
-            position.last_fx_rate = new_rate
-            position.last_revaluation_date = datetime.utcnow()
-            position.cumulative_unrealized_fx_gain += delta
-            
-            results.append({
-                'currency': position.currency,
-                'balance': float(balance),
-                'old_rate': float(old_rate),
-                'new_rate': float(new_rate),
-                'old_value': float(old_value),
-                'new_value': float(new_value),
-                'delta': float(delta),
-                'delta_pct': float((delta / old_value * 100) if old_value > 0 else 0)
-            })
-        
-        db.session.commit()
+        summary = FXRevaluationEngine.revalue([vault], current_rates)
+        results = summary['by_vault'][vault.id]
         
         logger.info(
             f"Revalued {len(results)} positions in vault {vault.vault_id}"
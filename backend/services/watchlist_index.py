@@ -0,0 +1,286 @@
+"""
+Watchlist Index: In-memory price thresholds for market watchlist alerts.
+
+This module provides:
+- One book per (crop, district) holding the enabled watchlist target
+  prices in a sorted array, with district-wide watches under
+  (crop, None)
+- Matching of a price update against a book with bisect: the watches
+  crossed are the slice of targets between the previous and the new price
+- Incremental updates on watchlist create/update/delete, plus a catch-up
+  scan of rows changed by other processes
+"""
+
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+import threading
+import time
+import logging
+
+from sqlalchemy import event, func
+
+from backend.extensions import db
+from backend.models import PriceWatchlist
+from backend.monitoring import metrics
+
+logger = logging.getLogger(__name__)
+
+metrics.describe('agritech_watchlist_match_seconds', 'Time to match a batch of price updates against the watchlist index')
+
+BookKey = Tuple[str, Optional[str]]
+
+
+def normalize(name: Optional[str]) -> Optional[str]:
+    """Case- and whitespace-insensitive crop/district key."""
+    if name is None:
+        return None
+    name = ' '.join(str(name).split()).casefold()
+    return name or None
+
+
+class WatchMatch(NamedTuple):
+    watch_id: int
+    user_id: int
+    target_price: float
+    crop_name: str
+    district: str
+    price: float
+
+
+class _Book:
+    """Enabled watches of one (crop, district), sorted by target price."""
+
+    __slots__ = ('targets', 'watch_ids', 'user_ids', 'fresh')
+
+    def __init__(self):
+        self.targets: List[float] = []
+        self.watch_ids: List[int] = []
+        self.user_ids: List[int] = []
+        # Watches added since the book last saw a price
+        self.fresh: Set[int] = set()
+
+    def insert(self, watch_id: int, user_id: int, target: float) -> None:
+        i = bisect_right(self.targets, target)
+        self.targets.insert(i, target)
+        self.watch_ids.insert(i, watch_id)
+        self.user_ids.insert(i, user_id)
+
+    def remove(self, watch_id: int, target: float) -> None:
+        i = bisect_left(self.targets, target)
+        while i < len(self.targets) and self.targets[i] == target:
+            if self.watch_ids[i] == watch_id:
+                del self.targets[i], self.watch_ids[i], self.user_ids[i]
+                break
+            i += 1
+        self.fresh.discard(watch_id)
+
+
+class WatchlistIndex:
+    """
+    In-process index behind MarketIntelligenceService.check_watchlist_alerts.
+
+    A watch is triggered when a price update for its crop and district
+    moves from below its target to at or above it. When the previous price
+    is unknown (first update this process sees for the pair), every target
+    at or below the new price is triggered, as is a watch created or
+    changed since its book last saw a price.
+    """
+
+    CATCHUP_SECONDS = 60.0
+    CHUNK_SIZE = 5000
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Drop all books; the next use reloads from the database."""
+        with self._lock:
+            self._engine = None
+            self._loaded = False
+            self._books: Dict[BookKey, _Book] = {}
+            self._where: Dict[int, Tuple[BookKey, float]] = {}
+            self._last_prices: Dict[Tuple[str, str], float] = {}
+            self._watermark: Optional[datetime] = None
+            self._last_catchup = None
+
+    # -- updates -----------------------------------------------------------
+
+    def _put(self, watch_id: int, user_id: int, crop_name: str, district: Optional[str],
+             target: float, enabled: bool, fresh: bool = True) -> None:
+        self._drop(watch_id)
+        if not enabled or target is None:
+            return
+        key = (normalize(crop_name), normalize(district))
+        book = self._books.get(key)
+        if book is None:
+            book = self._books[key] = _Book()
+        book.insert(watch_id, user_id, float(target))
+        if fresh:
+            book.fresh.add(watch_id)
+        self._where[watch_id] = (key, float(target))
+
+    def _drop(self, watch_id: int) -> None:
+        located = self._where.pop(watch_id, None)
+        if located is None:
+            return
+        key, target = located
+        book = self._books[key]
+        book.remove(watch_id, target)
+        if not book.targets:
+            del self._books[key]
+
+    def upsert(self, watch) -> None:
+        """Index a created or edited watch (or drop it once disabled)."""
+        try:
+            with self._lock:
+                if not self._loaded:
+                    return  # The initial load will pick it up
+                self._put(watch.id, watch.user_id, watch.crop_name, watch.district,
+                          watch.target_price, watch.alert_enabled is not False)
+        except Exception as e:
+            logger.error(f"Watchlist indexing failed for watch {watch.id}: {e}")
+
+    def remove(self, watch_id: int) -> None:
+        with self._lock:
+            self._drop(watch_id)
+
+    # -- loading -----------------------------------------------------------
+
+    def _scan(self, since: Optional[datetime]) -> int:
+        """Index watches changed at or after `since` (all when None)."""
+        query = db.select(
+            PriceWatchlist.id, PriceWatchlist.user_id, PriceWatchlist.crop_name, PriceWatchlist.district,
+            PriceWatchlist.target_price, PriceWatchlist.alert_enabled, PriceWatchlist.updated_at
+        )
+        if since is not None:
+            query = query.where(PriceWatchlist.updated_at >= since)
+
+        scanned, last_id = 0, 0
+        while True:
+            rows = db.session.execute(
+                query.where(PriceWatchlist.id > last_id).order_by(PriceWatchlist.id).limit(self.CHUNK_SIZE)
+            ).all()
+            if not rows:
+                break
+            for watch_id, user_id, crop_name, district, target, enabled, updated_at in rows:
+                enabled = enabled is not False
+                # Rows already indexed as they are (our own writes, or seen at the watermark) are skipped
+                if enabled:
+                    unchanged = self._where.get(watch_id) == ((normalize(crop_name), normalize(district)), float(target))
+                else:
+                    unchanged = watch_id not in self._where
+                if not unchanged:
+                    self._put(watch_id, user_id, crop_name, district, target, enabled, fresh=since is not None)
+                if updated_at and (self._watermark is None or updated_at > self._watermark):
+                    self._watermark = updated_at
+            last_id = rows[-1][0]
+            scanned += len(rows)
+        return scanned
+
+    def _ready(self) -> None:
+        engine = db.engine
+        if self._engine is not engine:
+            self.reset()
+            self._engine = engine
+        now = time.monotonic()
+        if self._loaded and now - self._last_catchup < self.CATCHUP_SECONDS:
+            return
+
+        started = time.perf_counter()
+        if not self._loaded:
+            self._scan(None)
+            logger.info(f"Watchlist index loaded {len(self._where)} watches into {len(self._books)} books "
+                        f"in {time.perf_counter() - started:.2f}s")
+        else:
+            self._scan(self._watermark)
+            # Rows deleted by another process leave no trace to scan for
+            enabled = db.session.execute(
+                db.select(func.count(PriceWatchlist.id)).where(PriceWatchlist.alert_enabled.isnot(False))
+            ).scalar()
+            if enabled != len(self._where):
+                last_prices = self._last_prices
+                self.reset()
+                self._engine = engine
+                self._last_prices = last_prices
+                self._scan(None)
+        self._loaded = True
+        self._last_catchup = now
+
+    def rebuild(self) -> int:
+        """Reload every watch; returns the number indexed."""
+        with self._lock:
+            self.reset()
+            self._ready()
+            return len(self._where)
+
+    # -- matching ----------------------------------------------------------
+
+    def match(self, updates: Iterable[Dict]) -> List[WatchMatch]:
+        """
+        Watches crossed by a batch of price updates.
+
+        Args:
+            updates: Dicts with crop_name, district and modal_price, and
+                optionally previous_price
+
+        Returns:
+            One WatchMatch per crossed watch and update
+        """
+        started = time.perf_counter()
+        matches: List[WatchMatch] = []
+        with self._lock:
+            self._ready()
+            for update in updates:
+                crop, district = normalize(update.get('crop_name')), normalize(update.get('district'))
+                price = update.get('modal_price')
+                if crop is None or price is None:
+                    continue
+                price = float(price)
+                previous = update.get('previous_price')
+                if previous is None:
+                    previous = self._last_prices.get((crop, district))
+                self._last_prices[(crop, district)] = price
+
+                for key in ((crop, district), (crop, None)):
+                    book = self._books.get(key)
+                    if book is None:
+                        continue
+                    high = bisect_right(book.targets, price)
+                    if previous is None:
+                        low = 0
+                    else:
+                        low = min(bisect_right(book.targets, float(previous)), high)
+                    crossed = range(low, high)
+                    if book.fresh:
+                        # New watches whose target the price was already above
+                        crossed = list(crossed) + [
+                            i for i in range(low) if book.watch_ids[i] in book.fresh
+                        ]
+                        book.fresh.clear()
+                    for i in crossed:
+                        matches.append(WatchMatch(book.watch_ids[i], book.user_ids[i], book.targets[i],
+                                                  update.get('crop_name'), update.get('district'), price))
+
+        metrics.observe('agritech_watchlist_match_seconds', time.perf_counter() - started)
+        return matches
+
+    def stats(self) -> Dict:
+        with self._lock:
+            self._ready()
+            return {
+                'watches': len(self._where),
+                'books': len(self._books),
+                'prices_seen': len(self._last_prices),
+                'loaded': self._loaded
+            }
+
+
+watchlist_index = WatchlistIndex()
+
+
+@event.listens_for(db.metadata, 'after_create')
+@event.listens_for(db.metadata, 'before_drop')
+def _reset_watchlist_index(target, connection, **kw):
+    watchlist_index.reset()
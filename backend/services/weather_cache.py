@@ -0,0 +1,197 @@
+"""
+Weather Cache: Process-local TTL cache and request coalescing for weather.
+
+This module provides:
+- Cache keys that collapse "lat,lon" locations onto a geohash cell, so
+  nearby points share one observation
+- A TTL cache of the latest WeatherData row id per key
+- Request coalescing: concurrent fetches for the same key share one API call
+"""
+
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional
+import threading
+import time
+import logging
+
+from flask import current_app, has_app_context
+
+from backend.utils.spatial_index import geohash
+
+logger = logging.getLogger(__name__)
+
+
+class WeatherCache:
+    """
+    Maps locations to the id of their latest stored observation.
+
+    Entries expire TTL_SECONDS after the observation was taken (config key
+    WEATHER_CACHE_TTL_SECONDS). Only ids are cached, never ORM objects, so
+    entries stay valid across sessions and requests.
+    """
+
+    TTL_SECONDS = 1800
+    GEOHASH_PRECISION = 5
+    MAX_ENTRIES = 10000
+
+    # How long a coalesced caller waits for the leader's fetch
+    FETCH_TIMEOUT_SECONDS = 30
+
+    _lock = threading.Lock()
+    _entries: Dict[str, tuple] = {}
+    _inflight: Dict[str, Future] = {}
+    _stats = {'hits': 0, 'misses': 0, 'fetches': 0, 'coalesced': 0}
+
+    @staticmethod
+    def key_for(location: str) -> str:
+        """
+        Cache key of a location: the geohash cell for "lat,lon" strings,
+        the normalized name otherwise.
+        """
+        parts = location.split(',')
+        if len(parts) == 2:
+            try:
+                lat, lon = float(parts[0]), float(parts[1])
+            except ValueError:
+                pass
+            else:
+                if -90.0 <= lat <= 90.0 and -180.0 <= lon <= 180.0:
+                    return 'gh:' + geohash(lat, lon, WeatherCache.GEOHASH_PRECISION)
+        return 'loc:' + ' '.join(location.lower().split())
+
+    @classmethod
+    def ttl_seconds(cls) -> float:
+        if has_app_context():
+            return float(current_app.config.get('WEATHER_CACHE_TTL_SECONDS', cls.TTL_SECONDS))
+        return float(cls.TTL_SECONDS)
+
+    @classmethod
+    def get(cls, location: str) -> Optional[int]:
+        """Id of the cached observation for a location, if still fresh."""
+        key = cls.key_for(location)
+        with cls._lock:
+            entry = cls._entries.get(key)
+            if entry and entry[0] > time.monotonic():
+                cls._stats['hits'] += 1
+                return entry[1]
+            if entry:
+                del cls._entries[key]
+            cls._stats['misses'] += 1
+            return None
+
+    @classmethod
+    def put(cls, location: str, weather_id: int, observed_at: datetime = None) -> None:
+        """Cache an observation id until it is TTL_SECONDS old."""
+        age = (datetime.utcnow() - observed_at).total_seconds() if observed_at else 0.0
+        remaining = cls.ttl_seconds() - max(age, 0.0)
+        if remaining <= 0:
+            return
+
+        key = cls.key_for(location)
+        now = time.monotonic()
+        with cls._lock:
+            cls._entries.pop(key, None)
+            cls._entries[key] = (now + remaining, weather_id)
+            if len(cls._entries) > cls.MAX_ENTRIES:
+                cls._evict(now)
+
+    @classmethod
+    def invalidate(cls, location: str = None) -> None:
+        """Drop one location's entry, or every entry."""
+        with cls._lock:
+            if location is None:
+                cls._entries.clear()
+            else:
+                cls._entries.pop(cls.key_for(location), None)
+
+    @classmethod
+    def fetch(cls, location: str, fetcher: Callable[[str], Optional[Dict]]) -> Optional[Dict]:
+        """
+        Fetch a location's payload, sharing the call with concurrent callers.
+
+        Raises:
+            Whatever the fetcher raises, for the caller that ran it
+        """
+        return cls.fetch_many([location], lambda locations: {
+            location: fetcher(location) for location in locations
+        }, raise_errors=True)[location]
+
+    @classmethod
+    def fetch_many(
+        cls,
+        locations: Iterable[str],
+        fetcher: Callable[[List[str]], Dict[str, Optional[Dict]]],
+        raise_errors: bool = False
+    ) -> Dict[str, Optional[Dict]]:
+        """
+        Fetch payloads for many locations with one fetcher call.
+
+        Locations that share a cache key are fetched once. Keys already
+        being fetched by another thread are not requested again; their
+        callers wait for the in-flight result instead.
+
+        Args:
+            locations: Locations to fetch
+            fetcher: Takes a list of locations, returns location -> payload
+            raise_errors: Re-raise a failure of this call's own fetcher
+
+        Returns:
+            Dict of location -> payload (None when the fetch failed)
+        """
+        by_key: Dict[str, List[str]] = {}
+        for location in dict.fromkeys(locations):
+            by_key.setdefault(cls.key_for(location), []).append(location)
+
+        owned, waiting = {}, {}
+        with cls._lock:
+            for key in by_key:
+                future = cls._inflight.get(key)
+                if future is None:
+                    owned[key] = cls._inflight[key] = Future()
+                else:
+                    waiting[key] = future
+            cls._stats['fetches'] += len(owned)
+            cls._stats['coalesced'] += len(waiting)
+
+        try:
+            if owned:
+                fetched = fetcher([by_key[key][0] for key in owned])
+                for key, future in owned.items():
+                    future.set_result(fetched.get(by_key[key][0]))
+        except BaseException as e:
+            for future in owned.values():
+                if not future.done():
+                    future.set_exception(e)
+            if raise_errors:
+                raise
+            logger.error(f"Weather fetch failed for {len(owned)} locations: {e}")
+        finally:
+            with cls._lock:
+                for key in owned:
+                    cls._inflight.pop(key, None)
+
+        results = {}
+        for key, key_locations in by_key.items():
+            future = owned.get(key) or waiting[key]
+            try:
+                payload = future.result(timeout=cls.FETCH_TIMEOUT_SECONDS)
+            except Exception as e:
+                logger.warning(f"Shared weather fetch for {key} failed: {e}")
+                payload = None
+            for location in key_locations:
+                results[location] = payload
+        return results
+
+    @classmethod
+    def stats(cls) -> Dict[str, int]:
+        with cls._lock:
+            return {**cls._stats, 'entries': len(cls._entries), 'inflight': len(cls._inflight)}
+
+    @classmethod
+    def _evict(cls, now: float) -> None:
+        """Drop expired entries, then the oldest ones. Call with the lock held."""
+        for key in [key for key, (expires_at, _) in cls._entries.items() if expires_at <= now]:
+            del cls._entries[key]
+        while len(cls._entries) > cls.MAX_ENTRIES:
+            del cls._entries[next(iter(cls._entries))]
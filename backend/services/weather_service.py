@@ -1,107 +1,229 @@
 from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import or_, tuple_
 from backend.extensions import db
 from backend.models.weather import WeatherData, AdvisorySubscription
+from backend.services.weather_cache import WeatherCache
 from backend.utils.weather_api_client import WeatherAPIClient
 import logging
 
 logger = logging.getLogger(__name__)
 
 class WeatherService:
+    # Consider data stale after 30 minutes
+    STALE_AFTER = timedelta(minutes=30)
+
+    # Locations fetched concurrently by refresh_locations
+    FETCH_CONCURRENCY = 16
+
+    # Locations per OR / IN clause when matching zones and policies
+    RULE_CHUNK_SIZE = 200
+
     @staticmethod
     def update_weather_for_location(location):
         """Fetch latest weather and store in database"""
         client = WeatherAPIClient()
-        raw_data = client.get_current_weather(location)
+        # Concurrent callers for the same location share one API call
+        raw_data = WeatherCache.fetch(location, client.get_current_weather)
         
         if not raw_data:
             return None
-            
-        weather = WeatherData(
-            location=location,
-            temperature=raw_data['main']['temp'],
-            humidity=raw_data['main']['humidity'],
-            rainfall=raw_data.get('rain', {}).get('1h', 0) if 'rain' in raw_data else 0,
-            wind_speed=raw_data['wind']['speed'],
-            wind_direction=raw_data['wind'].get('deg', 0),
-            weather_condition=raw_data['weather'][0]['main']
+
+        return WeatherService._store_observations({location: raw_data})[location]
+
+    @staticmethod
+    def refresh_locations(locations, force=False):
+        """
+        Fetch and store weather for many locations in one pass.
+
+        Requests run concurrently (WEATHER_FETCH_CONCURRENCY at a time),
+        observations are committed together and the alert, fertigation and
+        insurance rules are evaluated once for the whole batch.
+
+        Args:
+            locations: Location names or "lat,lon" strings
+            force: Also refetch locations with a fresh cached observation
+
+        Returns:
+            Summary dict with requested/cached/fetched/failed counts
+        """
+        locations = list(dict.fromkeys(loc for loc in locations if loc))
+        summary = {'requested': len(locations), 'cached': 0, 'fetched': 0, 'failed': 0}
+
+        if not force:
+            pending = [loc for loc in locations if WeatherCache.get(loc) is None]
+            summary['cached'] = len(locations) - len(pending)
+            locations = pending
+        if not locations:
+            return summary
+
+        client = WeatherAPIClient()
+        concurrency = current_app.config.get('WEATHER_FETCH_CONCURRENCY', WeatherService.FETCH_CONCURRENCY)
+        payloads = WeatherCache.fetch_many(
+            locations,
+            lambda batch: client.get_current_weather_many(batch, concurrency=concurrency)
         )
-        
-        db.session.add(weather)
+
+        fetched = {loc: raw for loc, raw in payloads.items() if raw}
+        WeatherService._store_observations(fetched)
+        summary['fetched'] = len(fetched)
+        summary['failed'] = len(locations) - len(fetched)
+        return summary
+
+    @staticmethod
+    def _store_observations(payloads):
+        """
+        Store raw API payloads as WeatherData rows with one commit, cache
+        them and run the post-fetch rules over the batch.
+
+        Returns:
+            Dict of location -> WeatherData
+        """
+        observations = {
+            location: WeatherData(
+                location=location,
+                temperature=raw_data['main']['temp'],
+                humidity=raw_data['main']['humidity'],
+                rainfall=raw_data.get('rain', {}).get('1h', 0) if 'rain' in raw_data else 0,
+                wind_speed=raw_data['wind']['speed'],
+                wind_direction=raw_data['wind'].get('deg', 0),
+                weather_condition=raw_data['weather'][0]['main']
+            )
+            for location, raw_data in payloads.items()
+        }
+        if not observations:
+            return observations
+
+        db.session.add_all(observations.values())
+        db.session.flush()
+        # Read ids before the commit expires the rows
+        cached = [(location, weather.id, weather.timestamp) for location, weather in observations.items()]
         db.session.commit()
-        
+
+        for location, weather_id, observed_at in cached:
+            WeatherCache.put(location, weather_id, observed_at)
+
+        # The commit expired every observation; load them back together so the
+        # rules below do not trigger a refresh per row
+        WeatherData.query.filter(WeatherData.id.in_([weather_id for _, weather_id, _ in cached])).all()
+
+        WeatherService._evaluate_rules(list(observations.values()))
+        return observations
+
+    @staticmethod
+    def _evaluate_rules(observations):
+        """
+        Alert, fertigation and insurance rules for a batch of observations.
+
+        Irrigation zones, risk triggers and affected policies are each
+        loaded with one query per chunk of locations rather than per
+        location.
+        """
         # Trigger Alerts for Extreme Conditions
         # Note: In a real app we'd query users in this location
         from backend.services.alert_registry import AlertRegistry
-        
-        if weather.temperature > 40:
-            AlertRegistry.register_alert(
-                title="Extreme Heat Alert",
-                message=f"Location {location} is experiencing extreme heat ({weather.temperature}°C). Please protect your crops.",
-                category="WEATHER",
-                priority="HIGH",
-                group_key=f"heat_{location}"
-            )
-            
-        if weather.rainfall > 50:
-             # Critical: Auto-Stop Fertigation
-             from backend.services.fertigation_service import FertigationService
-             from backend.models.irrigation import IrrigationZone
-             
-             # Find all active zones in this location (simplified lookup)
-             zones = IrrigationZone.query.filter(IrrigationZone.name.contains(location)).all()
-             for z in zones:
-                 z.fertigation_enabled = False
-                 z.status = "closed"
-                 db.session.add(z)
-             db.session.commit()
-
-             AlertRegistry.register_alert(
-                title="Heavy Rainfall Warning - FERTIGATION PAUSED",
-                message=f"Intense rainfall ({weather.rainfall}mm) in {location}. Chemical injection halted to prevent leaching.",
-                category="WEATHER",
-                priority="CRITICAL",
-                group_key=f"rain_{location}"
-            )
-            
+
+        for weather in observations:
+            if weather.temperature > 40:
+                AlertRegistry.register_alert(
+                    title="Extreme Heat Alert",
+                    message=(
+                        f"Location {weather.location} is experiencing extreme heat ({weather.temperature}°C). "
+                        "Please protect your crops."
+                    ),
+                    category="WEATHER",
+                    priority="HIGH",
+                    group_key=f"heat_{weather.location}"
+                )
+
+        rainy = [weather for weather in observations if weather.rainfall > 50]
+        if rainy:
+            # Critical: Auto-Stop Fertigation
+            from backend.models.irrigation import IrrigationZone
+
+            # Find all active zones in these locations (simplified lookup)
+            for chunk in WeatherService._chunks(rainy):
+                zones = IrrigationZone.query.filter(
+                    or_(*[IrrigationZone.name.contains(weather.location) for weather in chunk])
+                ).all()
+                for z in zones:
+                    z.fertigation_enabled = False
+                    z.status = "closed"
+            db.session.commit()
+
+            for weather in rainy:
+                AlertRegistry.register_alert(
+                    title="Heavy Rainfall Warning - FERTIGATION PAUSED",
+                    message=(
+                        f"Intense rainfall ({weather.rainfall}mm) in {weather.location}. "
+                        "Chemical injection halted to prevent leaching."
+                    ),
+                    category="WEATHER",
+                    priority="CRITICAL",
+                    group_key=f"rain_{weather.location}"
+                )
+
         # Pest Breeding Vector Alerts (L3-1596)
-        if weather.humidity > 80.0 and weather.temperature > 25.0:
-            AlertRegistry.register_alert(
-                title="Pest Breeding Vector Detected",
-                message=f"High humidity ({weather.humidity}%) and temperature ({weather.temperature}°C) in {location} are optimal for pest proliferation. Triggering preventive scouting.",
-                category="BIO_SECURITY",
-                priority="HIGH",
-                group_key=f"vector_{location}"
-            )
-            
+        for weather in observations:
+            if weather.humidity > 80.0 and weather.temperature > 25.0:
+                AlertRegistry.register_alert(
+                    title="Pest Breeding Vector Detected",
+                    message=(
+                        f"High humidity ({weather.humidity}%) and temperature ({weather.temperature}°C) "
+                        f"in {weather.location} are optimal for pest proliferation. "
+                        "Triggering preventive scouting."
+                    ),
+                    category="BIO_SECURITY",
+                    priority="HIGH",
+                    group_key=f"vector_{weather.location}"
+                )
+
         # Insurance Risk Trigger (L3-1557)
         from backend.models.weather import RiskTrigger
         from backend.models.insurance import InsurancePolicy
         from backend.services.risk_adjustment_service import RiskAdjustmentService
-        
+
         # Check if weather exceeds any active risk triggers
         triggers = RiskTrigger.query.filter_by(is_active=True).all()
-        for t in triggers:
-            is_triggered = False
-            if t.max_temp_threshold and weather.temperature > t.max_temp_threshold: is_triggered = True
-            if t.max_rainfall_threshold and weather.rainfall > t.max_rainfall_threshold: is_triggered = True
-            
-            if is_triggered:
-                # Recalculate all policies for this specific crop/location
-                affected_policies = InsurancePolicy.query.filter_by(
-                    crop_type=t.crop_type, 
-                    farm_location=location,
-                    status='ACTIVE'
-                ).all()
-                for p in affected_policies:
-                    RiskAdjustmentService.calculate_actuarial_flux(p.id)
+        triggered = list({
+            (t.crop_type, weather.location)
+            for weather in observations
+            for t in triggers
+            if (t.max_temp_threshold and weather.temperature > t.max_temp_threshold)
+            or (t.max_rainfall_threshold and weather.rainfall > t.max_rainfall_threshold)
+        })
+        if not triggered:
+            return
 
-        return weather
+        # Recalculate all policies for the triggered crop/location pairs
+        policy_ids = set()
+        for chunk in WeatherService._chunks(triggered):
+            policy_ids.update(policy_id for (policy_id,) in db.session.query(InsurancePolicy.id).filter(
+                tuple_(InsurancePolicy.crop_type, InsurancePolicy.farm_location).in_(chunk),
+                InsurancePolicy.status == 'ACTIVE'
+            ))
+        for policy_id in sorted(policy_ids):
+            RiskAdjustmentService.calculate_actuarial_flux(policy_id)
+
+    @staticmethod
+    def _chunks(items):
+        size = WeatherService.RULE_CHUNK_SIZE
+        for start in range(0, len(items), size):
+            yield items[start:start + size]
 
     @staticmethod
     def get_latest_weather(location):
-        """Get most recent weather entry from DB or fetch new if stale"""
-        # Consider data stale after 30 minutes
-        threshold = datetime.utcnow() - timedelta(minutes=30)
+        """Get most recent weather entry from cache, DB or fetch new if stale"""
+        threshold = datetime.utcnow() - WeatherService.STALE_AFTER
+
+        weather_id = WeatherCache.get(location)
+        if weather_id is not None:
+            cached = db.session.get(WeatherData, weather_id)
+            # Guard against ids left over from another database
+            if cached and cached.timestamp >= threshold and \
+                    WeatherCache.key_for(cached.location) == WeatherCache.key_for(location):
+                return cached
+            WeatherCache.invalidate(location)
         
         latest = WeatherData.query.filter(
             WeatherData.location == location,
@@ -109,6 +231,7 @@ class WeatherService:
         ).order_by(WeatherData.timestamp.desc()).first()
         
         if latest:
+            WeatherCache.put(location, latest.id, latest.timestamp)
             return latest
             
         return WeatherService.update_weather_for_location(location)
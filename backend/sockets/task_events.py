@@ -1,5 +1,14 @@
+import threading
+from flask import request
 from flask_socketio import emit, join_room, leave_room
 from backend.extensions.socketio import socketio
+from backend.services.task_progress import TaskProgressHub
+
+# Multi-task subscriptions: sid -> task ids, task id -> sids
+MAX_SUBSCRIBED_TASKS = 200
+_subscriptions = {}
+_watchers = {}
+_subscriptions_lock = threading.Lock()
 
 
 @socketio.on('connect')
@@ -11,7 +20,7 @@ def handle_connect():
 @socketio.on('disconnect')
 def handle_disconnect():
     """Handle client disconnection."""
-    pass
+    _drop_subscriptions(request.sid)
 
 
 @socketio.on('join_task')
@@ -44,6 +53,88 @@ def handle_leave_task(data):
         })
 
 
+@socketio.on('subscribe_tasks')
+def handle_subscribe_tasks(data):
+    """
+    Client watches many tasks through one subscription.
+    Expected data: { 'task_ids': ['abc123', 'def456'] }
+
+    Replies with a 'task_snapshot' of every watched task, then sends a
+    'task_batch_update' with the changed task and the aggregate summary
+    whenever one of them changes.
+    """
+    task_ids = [str(task_id) for task_id in (data or {}).get('task_ids') or [] if task_id]
+    sid = request.sid
+    with _subscriptions_lock:
+        watched = _subscriptions.setdefault(sid, set())
+        if len(watched | set(task_ids)) > MAX_SUBSCRIBED_TASKS:
+            emit('task_error', {'message': f'At most {MAX_SUBSCRIBED_TASKS} tasks per subscription'})
+            return
+        for task_id in task_ids:
+            watched.add(task_id)
+            _watchers.setdefault(task_id, set()).add(sid)
+        watched = list(watched)
+
+    TaskProgressHub.ensure_subscriber()
+    states = TaskProgressHub.snapshot(watched)
+    emit('task_snapshot', {'tasks': states, 'summary': TaskProgressHub.summarize(states)})
+
+
+@socketio.on('unsubscribe_tasks')
+def handle_unsubscribe_tasks(data):
+    """
+    Client stops watching some tasks, or all of them when no ids are given.
+    Expected data: { 'task_ids': ['abc123'] }
+    """
+    task_ids = (data or {}).get('task_ids')
+    _drop_subscriptions(request.sid, task_ids)
+    emit('tasks_unsubscribed', {'task_ids': task_ids or []})
+
+
+def _drop_subscriptions(sid, task_ids=None):
+    with _subscriptions_lock:
+        watched = _subscriptions.get(sid, set())
+        for task_id in list(task_ids if task_ids else watched):
+            watched.discard(task_id)
+            sids = _watchers.get(task_id)
+            if sids is not None:
+                sids.discard(sid)
+                if not sids:
+                    del _watchers[task_id]
+        if not watched:
+            _subscriptions.pop(sid, None)
+
+
+def forward_task_event(event):
+    """
+    Push a TaskProgressHub event to SocketIO clients: 'task_progress' (and
+    the started/completed/failed events) to the task room, and an
+    aggregated 'task_batch_update' to each multi-task subscriber.
+    """
+    if socketio.server is None:
+        return
+    task_id = event['task_id']
+    socketio.emit('task_progress', event, room=task_id)
+    if event['state'] == 'STARTED':
+        emit_task_started(task_id)
+    elif event['state'] == 'SUCCESS':
+        emit_task_completed(task_id, event.get('result'))
+    elif event['state'] == 'FAILURE':
+        emit_task_failed(task_id, event.get('error'))
+
+    with _subscriptions_lock:
+        targets = [(sid, list(_subscriptions.get(sid, ()))) for sid in _watchers.get(task_id, ())]
+    for sid, watched in targets:
+        states = TaskProgressHub.snapshot(watched, fallback=False)
+        socketio.emit('task_batch_update', {
+            'event': event,
+            'summary': TaskProgressHub.summarize(states)
+        }, to=sid)
+
+
+TaskProgressHub.add_listener(forward_task_event)
+
+
 def emit_task_update(task_id, status, result=None, error=None):
     """
     Emit task update to all clients in the task room.
@@ -1,9 +1,12 @@
 """Backend tasks package"""
-from .core import predict_crop_task, process_loan_task, synthesize_loan_pdf_task, finalize_pool_cycle_task, simulate_batch_payouts_task, check_pool_target_reached_task
+from .core import (
+    predict_crop_task, predict_crop_bulk_task, process_loan_task, synthesize_loan_pdf_task,
+    finalize_pool_cycle_task, simulate_batch_payouts_task, check_pool_target_reached_task
+)
 from .report_tasks import generate_and_send_report, generate_pdf_report, send_email_report, batch_generate_reports
 from .traceability_tasks import generate_batch_certificate_task
 from .knowledge_tasks import calculate_trending_questions_task, expert_verification_audit_task
-from .weather_tasks import fetch_weather_updates_task, generate_bulk_advisories_task
+from .weather_tasks import fetch_weather_updates_task, refresh_weather_locations_task, generate_bulk_advisories_task
 from .rental_tasks import check_overdue_rentals_task, cleanup_expired_pending_bookings_task
 from .farm_tasks import monthly_farm_valuation_task, generate_farm_report_task
 from .sustainability_tasks import recalculate_all_offsets_task, stale_audit_check_task, annual_credit_revaluation_task
@@ -16,10 +19,10 @@ from .soil_tasks import generate_seasonal_soil_reports_task, fertilizer_applicat
 from .loan_tasks import daily_payment_reminders_task, overdue_escalation_task, monthly_risk_recalculation_task
 from .warehouse_tasks import daily_expiry_alerts_task, automated_reorder_notifications_task, monthly_reconciliation_reminder_task
 from .climate_tasks import check_sensor_health_task, generate_env_report_task, purge_old_telemetry_task
-from .pathogen_tasks import pathogen_propagation_run, analyze_new_incident
+from .pathogen_tasks import pathogen_propagation_run, pathogen_propagation_chunk, analyze_new_incident
 from .transparency_tasks import hourly_freshness_pricing_update, sync_reputation_feedback
 from .soil_sync import precision_fertigation_sync, update_nutrient_maps
-from .logistics_tasks import global_tracking_sync, run_compliance_audit
+from .logistics_tasks import global_tracking_sync, run_compliance_audit, ingest_gps_batch_task, flush_gps_buffer_task
 from .maintenance_tasks import fleet_reliability_audit, check_maintenance_cycles
 from .fx_tasks import (
     sync_fx_rates_task, trigger_ledger_revaluation_task,
@@ -27,3 +30,9 @@ from .fx_tasks import (
     backfill_historical_rates_task, cleanup_old_rates_task,
     compute_fx_exposure_alerts_task, daily_fx_rate_sync_task
 ) 
+from .ledger_tasks import rebuild_balance_checkpoints_task, verify_balance_checkpoints_task
+from .forum_tasks import moderate_pending_posts_task
+from .market_tasks import update_market_prices_task
+from .spatial_tasks import analyze_field_raster_task
+from .alert_tasks import send_alert_emails_task
+from .disease_tasks import detect_disease_outbreaks_task
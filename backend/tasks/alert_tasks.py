@@ -0,0 +1,36 @@
+"""
+Alert Delivery Tasks: Background delivery of alert notifications.
+
+This module provides:
+- SMTP delivery of alert emails off the request path, recording the
+  email_delivered flag of every alert that was sent
+"""
+
+from typing import List
+import logging
+
+from backend.celery_app import celery_app
+from backend.extensions import db
+
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task(bind=True, name='tasks.send_alert_emails', ignore_result=True)
+def send_alert_emails_task(self, emails: List[list]):
+    """
+    Sends [alert_id, email, title, message] alert emails, one SMTP session
+    per AlertRegistry.EMAIL_BATCH_SIZE messages, and flags the sent alerts.
+    """
+    try:
+        from backend.services.alert_registry import AlertRegistry
+
+        delivered = AlertRegistry._send_emails([tuple(email) for email in emails])
+        AlertRegistry._mark_delivered('email_delivered', delivered)
+        db.session.commit()
+        logger.info(f"Sent {len(delivered)} of {len(emails)} alert emails")
+        return {'status': 'success', 'sent': len(delivered), 'failed': len(emails) - len(delivered)}
+
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Alert email task failed: {str(e)}")
+        return {'status': 'error', 'message': str(e)}
@@ -1,4 +1,3 @@
-import joblib
 import os
 import numpy as np
 import tempfile
@@ -8,16 +7,14 @@ from backend.celery_app import celery_app
 from backend.services.pdf_service import PDFService
 from backend.services.file_service import FileService
 from backend.services.notification_service import NotificationService
+from backend.services.crop_inference import CropInferenceBatcher, CROP_MODEL_PATH
+from backend.services.model_registry import ModelRegistry
+from backend.services.task_progress import report_progress
+from backend.services.llm_gateway import LLMGateway, LLMGatewayError, canonical_json
 from backend.utils.logger import logger
 from backend.utils.i18n_utils import get_translated_string
 
-# Load models at worker startup
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
-CROP_MODEL_PATH = os.path.join(BASE_DIR, "crop_recommendation", "model", "rf_model.pkl")
-CROP_ENCODER_PATH = os.path.join(BASE_DIR, "crop_recommendation", "model", "label_encoder.pkl")
-
-# Global model references (loaded once per worker)
+# Global model references (shared through the model registry)
 crop_model = None
 crop_encoder = None
 
@@ -25,23 +22,22 @@ crop_encoder = None
 def load_crop_models():
     """Load crop prediction models."""
     global crop_model, crop_encoder
-    if crop_model is None:
-        if os.path.exists(CROP_MODEL_PATH) and os.path.exists(CROP_ENCODER_PATH):
-            crop_model = joblib.load(CROP_MODEL_PATH)
-            crop_encoder = joblib.load(CROP_ENCODER_PATH)
-        else:
-            logger.warning(f"Crop models not found at {CROP_MODEL_PATH}. Prediction task will fail.")
+    if CropInferenceBatcher.is_available():
+        crop_model = ModelRegistry.get('crop_model')
+        crop_encoder = ModelRegistry.get('crop_encoder')
+    else:
+        logger.warning(f"Crop models not found at {CROP_MODEL_PATH}. Prediction task will fail.")
     return crop_model, crop_encoder
 
 
 @celery_app.task(bind=True, name='tasks.predict_crop')
-def predict_crop_task(self, n, p, k, temperature, humidity, ph, rainfall, user_id=None, lang='en'):
+def predict_crop_task(self, n, p, k, temperature, humidity, ph, rainfall, user_id=None, lang='en', top_k=3):
     """
     Async task for crop prediction.
-    Returns the predicted crop name.
+    Returns the predicted crop name and the top-k crops with probabilities.
     """
     try:
-        model, encoder = load_crop_models()
+        load_crop_models()
         
         data = [
             float(n), float(p), float(k),
@@ -49,8 +45,9 @@ def predict_crop_task(self, n, p, k, temperature, humidity, ph, rainfall, user_i
             float(ph), float(rainfall),
         ]
         
-        prediction = model.predict([data])[0]
-        crop = encoder.inverse_transform([prediction])[0]
+        # Concurrent tasks in a threaded worker share one predict_proba call
+        ranked = CropInferenceBatcher.predict([data], top_k=top_k)[0]
+        crop = ranked[0]['crop']
         
         if user_id:
             NotificationService.create_notification(
@@ -63,6 +60,7 @@ def predict_crop_task(self, n, p, k, temperature, humidity, ph, rainfall, user_i
         return {
             'status': 'success',
             'prediction': crop,
+            'top_crops': ranked,
             'input_params': {
                 'N': n, 'P': p, 'K': k,
                 'temperature': temperature,
@@ -75,36 +73,56 @@ def predict_crop_task(self, n, p, k, temperature, humidity, ph, rainfall, user_i
         return {'status': 'error', 'message': str(e)}
 
 
+@celery_app.task(bind=True, name='tasks.predict_crop_bulk')
+def predict_crop_bulk_task(self, samples, top_k=3):
+    """
+    Score many soil samples in one task.
+    
+    Args:
+        samples: List of dicts keyed N, P, K, temperature, humidity, ph, rainfall
+        top_k: Number of ranked crops per sample
+    """
+    try:
+        load_crop_models()
+        started = datetime.utcnow()
+        ranked = CropInferenceBatcher.predict_many(samples, top_k=top_k)
+        
+        return {
+            'status': 'success',
+            'count': len(ranked),
+            'predictions': [
+                {'index': i, 'prediction': crops[0]['crop'], 'top_crops': crops}
+                for i, crops in enumerate(ranked)
+            ],
+            'duration_ms': round((datetime.utcnow() - started).total_seconds() * 1000, 2),
+            'timestamp': datetime.utcnow().isoformat()
+        }
+    except Exception as e:
+        return {'status': 'error', 'message': str(e)}
+
+
 @celery_app.task(bind=True, name='tasks.process_loan')
 def process_loan_task(self, json_data, user_id=None, lang='en'):
     """
     Async task for loan processing with Gemini API and PDF generation.
     """
     try:
-        import google.generativeai as genai
-        
-        api_key = os.environ.get('GEMINI_API_KEY')
-        if not api_key:
-            return {'status': 'error', 'message': 'GEMINI_API_KEY not configured'}
-        
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel("gemini-2.5-flash")
+        report_progress(self, 10, message="Preparing eligibility analysis")
         
         prompt = f"""
 You are a financial loan eligibility advisor specializing in agricultural loans for farmers in India.
-JSON Data = {json_data}
+JSON Data = {canonical_json(json_data)}
 Analyze the farmer's provided details and assess their loan eligibility.
 Respond in a structured format with labeled sections: Loan Type, Eligibility Status, Loan Range, Improvements, Schemes.
 IMPORTANT: You MUST respond in the following language: {lang}. 
 If the language code is 'hi', respond in Hindi. If 'mr', respond in Marathi. Default is English.
 """
         
-        response = model.generate_content(prompt)
-        
-        if not response.candidates:
-            return {'status': 'error', 'message': 'No response generated from Gemini API'}
-        
-        reply = response.candidates[0].content.parts[0].text
+        try:
+            reply = LLMGateway.generate_text('loan_eligibility', prompt, model_id="gemini-2.5-flash")
+        except LLMGatewayError as e:
+            return {'status': 'error', 'message': f'No response generated from Gemini API: {e}'}
+        report_progress(self, 80, message="Analysis complete, queueing PDF report")
         
         # Trigger PDF Synthesis Task
         synthesize_loan_pdf_task.delay(json_data, reply, user_id, lang=lang)
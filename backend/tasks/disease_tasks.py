@@ -0,0 +1,33 @@
+"""
+Outbreak detection and farmer alert fan-out for the Pest & Disease Early Warning System.
+"""
+from backend.celery_app import celery_app
+from backend.extensions import db
+import logging
+
+logger = logging.getLogger(__name__)
+
+@celery_app.task(bind=True, name='tasks.detect_disease_outbreaks')
+def detect_disease_outbreaks_task(self):
+    """
+    Clusters unassigned incidents into new outbreak zones and alerts the
+    farmers within reach of each new zone in one batched pass.
+    """
+    try:
+        from backend.services.geospatial_service import GeospatialService
+        
+        clusters = GeospatialService.detect_outbreak_clusters()
+        zones = [GeospatialService.create_outbreak_zone(cluster) for cluster in clusters]
+        alerts = GeospatialService.send_outbreak_alerts(zones) if zones else {'alerts_created': 0}
+        
+        logger.info(f"Outbreak detection created {len(zones)} zones and {alerts['alerts_created']} alerts")
+        return {
+            'status': 'success',
+            'zones_created': len(zones),
+            'alerts_created': alerts['alerts_created']
+        }
+        
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Outbreak detection task failed: {str(e)}")
+        return {'status': 'error', 'message': str(e)}
@@ -83,3 +83,22 @@ def reindex_forum_content_task(self):
     except Exception as e:
         logger.error(f"Forum indexing task failed: {str(e)}")
         return {'status': 'error', 'message': str(e)}
+
+
+@celery_app.task(bind=True, name='tasks.moderate_pending_posts', ignore_result=True)
+def moderate_pending_posts_task(self, limit=None):
+    """
+    Moderates queued forum posts in batches: deduplicated, pre-screened
+    locally and sent to Gemini several posts per prompt.
+    """
+    try:
+        from backend.services.moderation_pipeline import ModerationPipeline
+        
+        result = ModerationPipeline.moderate_pending(limit)
+        logger.info(f"Moderated {result['moderated']} forum posts with {result['llm_calls']} LLM calls "
+                    f"({result['llm_calls_saved']} saved)")
+        return {'status': 'success', **result}
+        
+    except Exception as e:
+        logger.error(f"Forum moderation task failed: {str(e)}")
+        return {'status': 'error', 'message': str(e)}
@@ -17,6 +17,7 @@ import requests
 from backend.celery_app import celery
 from backend.extensions import db
 from backend.services.fx_service import FXService
+from backend.services.fx_rate_store import FXRateStore
 from backend.services.vault_service import VaultService
 from backend.models.ledger import Vault, VaultCurrencyPosition, FXRate
 
@@ -371,6 +372,7 @@ def cleanup_old_rates_task(days_to_keep: int = 365) -> Dict:
         ).delete(synchronize_session=False)
         
         db.session.commit()
+        FXRateStore.invalidate()
         
         logger.info(f"Cleaned up {deleted} old FX rate records")
         
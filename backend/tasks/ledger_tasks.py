@@ -0,0 +1,81 @@
+"""
+Ledger Maintenance Tasks: Background jobs for ledger balance checkpoints.
+
+This module provides:
+- Full rebuild of balance checkpoints from raw ledger entries
+- Verification of stored checkpoints against raw ledger entries
+"""
+
+from datetime import datetime
+from typing import Dict, List
+import logging
+
+from backend.celery_app import celery_app
+from backend.extensions import db
+from backend.services.ledger_service import LedgerService
+
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task(name='ledger.rebuild_balance_checkpoints')
+def rebuild_balance_checkpoints_task(account_ids: List[int] = None) -> Dict:
+    """
+    Recompute balance checkpoints from the raw ledger entries.
+    
+    Run once after deploying checkpoints, and whenever verification
+    reports drift.
+    """
+    logger.info("Rebuilding ledger balance checkpoints")
+    
+    try:
+        result = LedgerService.rebuild_balance_checkpoints(account_ids)
+        
+        return {
+            'status': 'success',
+            **result,
+            'timestamp': datetime.utcnow().isoformat()
+        }
+        
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Checkpoint rebuild failed: {str(e)}")
+        return {
+            'status': 'error',
+            'error': str(e)
+        }
+
+
+@celery_app.task(name='ledger.verify_balance_checkpoints')
+def verify_balance_checkpoints_task(
+    account_ids: List[int] = None,
+    repair: bool = False
+) -> Dict:
+    """
+    Verify stored balance checkpoints against the raw ledger entries.
+    
+    Args:
+        account_ids: Accounts to verify (defaults to every account)
+        repair: If True, rebuild the accounts that drifted
+    """
+    logger.info("Verifying ledger balance checkpoints")
+    
+    try:
+        result = LedgerService.verify_balance_checkpoints(account_ids)
+        
+        if repair and result['mismatches']:
+            drifted = sorted({m['account_id'] for m in result['mismatches']})
+            result['repaired'] = LedgerService.rebuild_balance_checkpoints(drifted)
+        
+        return {
+            'status': 'success',
+            **result,
+            'timestamp': datetime.utcnow().isoformat()
+        }
+        
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Checkpoint verification failed: {str(e)}")
+        return {
+            'status': 'error',
+            'error': str(e)
+        }
@@ -1,5 +1,7 @@
 from datetime import datetime
 from backend.services.compliance_engine import ComplianceEngine
+from backend.services.logistics_orchestrator import LogisticsOrchestrator
+from backend.services.gps_ingestion import GPSTelemetryBuffer
 from backend.models.logistics_v2 import TransportRoute
 from backend.models.global_trade import CustomsManifest
 from backend.extensions import db
@@ -38,3 +40,18 @@ def run_compliance_audit(manifest_id):
     """
     result = ComplianceEngine.validate_shipment(manifest_id)
     return {'manifest_id': manifest_id, 'audit_passed': result}
+
+@celery_app.task(name='logistics.ingest_gps_batch')
+def ingest_gps_batch_task(pings):
+    """
+    Worker entry point for gateways that queue GPS pings instead of
+    calling the HTTP batch endpoint.
+    """
+    result = LogisticsOrchestrator.ingest_gps_batch(pings)
+    return {'status': 'completed', **result}
+
+@celery_app.task(name='logistics.flush_gps_buffer')
+def flush_gps_buffer_task():
+    """Writes any buffered GPS telemetry held by this worker."""
+    written = GPSTelemetryBuffer.flush()
+    return {'status': 'completed', 'written': written, **GPSTelemetryBuffer.stats()}
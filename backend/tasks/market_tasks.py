@@ -0,0 +1,23 @@
+"""
+Market price ingestion and watchlist alerting tasks.
+"""
+from backend.celery_app import celery_app
+from backend.services.market_service import MarketIntelligenceService
+import logging
+
+logger = logging.getLogger(__name__)
+
+@celery_app.task(name='tasks.update_market_prices')
+def update_market_prices_task():
+    """
+    Hourly task to refresh mandi prices and alert users whose
+    watchlist targets were crossed.
+    """
+    try:
+        updated = MarketIntelligenceService.fetch_live_prices()
+        alerts = MarketIntelligenceService.check_watchlist_alerts(updated)
+        logger.info(f"Market prices updated: {len(updated)} prices, {len(alerts)} watchlist alerts")
+        return {'status': 'success', 'updated': len(updated), 'alerts': len(alerts)}
+    except Exception as e:
+        logger.error(f"Market price update failed: {e}")
+        return {'status': 'error', 'message': str(e)}
@@ -6,32 +6,66 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# Zones per simulation batch; runs with more than one batch fan out to workers
+PROPAGATION_CHUNK_SIZE = 1000
+
 @celery_app.task(name='tasks.pathogen_propagation_run')
-def pathogen_propagation_run():
+def pathogen_propagation_run(force=False):
     """
     Periodic task to refresh all active outbreak zones with new environmental data.
+
+    Stale weather at the zone centres is refreshed first, then zones are
+    simulated in vectorized batches and skipped when their inputs are
+    unchanged. Large runs are split into chunk tasks.
     """
     logger.info("Starting global pathogen propagation simulation...")
-    active_zones = OutbreakZone.query.filter_by(status='active').all()
-    
+    zone_ids = [zone_id for (zone_id,) in db.session.query(OutbreakZone.id).filter_by(
+        status='active'
+    ).order_by(OutbreakZone.id)]
+    chunks = [zone_ids[i:i + PROPAGATION_CHUNK_SIZE] for i in range(0, len(zone_ids), PROPAGATION_CHUNK_SIZE)]
+
+    if len(chunks) > 1:
+        try:
+            for chunk in chunks:
+                pathogen_propagation_chunk.apply_async(args=[chunk, force], retry=False)
+            return {
+                'status': 'dispatched',
+                'active_zones': len(zone_ids),
+                'chunks': len(chunks)
+            }
+        except Exception as e:
+            logger.warning(f"Could not fan out propagation chunks, running inline: {str(e)}")
+
     results = []
-    for zone in active_zones:
+    unchanged = 0
+    for chunk in chunks:
         try:
-            updated_zone = PathogenPropagationService.simulate_propagation(zone.id)
-            results.append({
-                'zone_id': zone.zone_id,
-                'velocity': updated_zone.propagation_velocity,
-                'status': updated_zone.containment_status
-            })
+            PathogenPropagationService.refresh_weather(chunk)
+            summary = PathogenPropagationService.simulate_batch(chunk, force=force)
+            results.extend(summary['zones'])
+            unchanged += summary['unchanged']
         except Exception as e:
-            logger.error(f"Failed to simulate propagation for zone {zone.zone_id}: {str(e)}")
-            
+            db.session.rollback()
+            logger.error(f"Failed to simulate propagation for {len(chunk)} zones: {str(e)}")
+
     return {
         'status': 'success',
         'processed_zones': len(results),
+        'unchanged_zones': unchanged,
         'summary': results
     }
 
+@celery_app.task(name='tasks.pathogen_propagation_chunk')
+def pathogen_propagation_chunk(zone_ids, force=False):
+    """Simulates one batch of zones from a fanned-out propagation run."""
+    PathogenPropagationService.refresh_weather(zone_ids)
+    summary = PathogenPropagationService.simulate_batch(zone_ids, force=force)
+    return {
+        'status': 'success',
+        'processed_zones': summary['simulated'],
+        'unchanged_zones': summary['unchanged']
+    }
+
 @celery_app.task(name='tasks.analyze_new_incident')
 def analyze_new_incident(incident_id):
     """
@@ -80,21 +80,22 @@ def _process_disease_image(payload):
         sys.path.append(module_path)
         
     try:
-        from utils import load_keras_model, predict_image_keras
+        from utils import predict_image_keras
+        from backend.services.model_registry import ModelRegistry, DISEASE_MODEL_PATH
         
-        # Load model (caching strategy recommended in prod)
-        model_path = os.path.join(module_path, 'model.h5')
-        if not os.path.exists(model_path):
+        if not ModelRegistry.is_available('disease_model'):
              # Fallback for dev environment without model file
              return {
                  'prediction': 'Simulation: Bacterial Blight',
                  'confidence': 0.95,
                  'recommendation': 'Mock: Apply Copper Fungicide',
-                 'note': 'Real model not found at ' + model_path
+                 'note': 'Real model not found at ' + DISEASE_MODEL_PATH
              }
              
-        model = load_keras_model(model_path)
-        prediction, description = predict_image_keras(model, payload.file_path)
+        # Loaded once per worker by the registry instead of on every payload
+        model = ModelRegistry.get('disease_model')
+        with ModelRegistry.track_inference('disease_model'):
+            prediction, description = predict_image_keras(model, payload.file_path)
         
         return {
             'prediction': prediction,
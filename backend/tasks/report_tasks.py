@@ -6,6 +6,7 @@ Handles async PDF generation and email sending
 from backend.config.celery_config import celery_app
 from backend.services.pdf_service import PDFService
 from backend.services.email_service import send_loan_report_email
+from backend.services.task_progress import report_progress
 import os
 import traceback
 
@@ -30,6 +31,7 @@ def generate_and_send_report(self, farmer_data, assessment_result, farmer_email,
         
         # Step 1: Generate PDF
         print("📄 Generating PDF report...")
+        report_progress(self, 10, message="Generating PDF report")
         pdf_path = PDFService.generate_loan_report(farmer_data, assessment_result, farmer_email)
         
         if not os.path.exists(pdf_path):
@@ -39,6 +41,7 @@ def generate_and_send_report(self, farmer_data, assessment_result, farmer_email,
         
         # Step 2: Send Email
         print("📧 Sending email...")
+        report_progress(self, 60, message="Sending email")
         recipient_name = farmer_name or farmer_data.get('name', 'Valued Farmer')
         loan_type = farmer_data.get('loan_type', 'Agricultural Loan')
         
@@ -175,12 +178,13 @@ def send_email_report(self, recipient_email, recipient_name, pdf_path, loan_type
             }
 
 
-@celery_app.task(name='batch_generate_reports')
-def batch_generate_reports(applications_list):
+@celery_app.task(name='batch_generate_reports', bind=True)
+def batch_generate_reports(self, applications_list):
     """
     Generate and send reports for multiple applications
     
     Args:
+        self: Task instance (for progress reporting)
         applications_list: List of application dictionaries, each containing:
             - farmer_data
             - assessment_result
@@ -197,7 +201,7 @@ def batch_generate_reports(applications_list):
         'details': []
     }
     
-    for application in applications_list:
+    for index, application in enumerate(applications_list, start=1):
         try:
             result = generate_and_send_report.delay(
                 farmer_data=application['farmer_data'],
@@ -220,5 +224,6 @@ def batch_generate_reports(applications_list):
                 'status': 'failed',
                 'error': str(e)
             })
+        report_progress(self, index, len(applications_list), message=f"Queued {index} of {len(applications_list)} reports")
     
     return results
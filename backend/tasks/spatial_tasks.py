@@ -0,0 +1,68 @@
+"""
+Spatial Analytics Tasks: Background jobs for field imagery.
+
+This module provides:
+- Tiled NDVI analysis of an uploaded raster, clipped to a field boundary
+"""
+
+from datetime import datetime
+from typing import Dict, List, Optional
+import multiprocessing
+import logging
+
+from backend.celery_app import celery_app
+from backend.extensions import db
+
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task(bind=True, name='tasks.analyze_field_raster')
+def analyze_field_raster_task(self, field_id: int, red_path: str, nir_path: Optional[str], heatmap_dir: str,
+                              overlay_image_path: str, red_band: int = 1, nir_band: int = 1,
+                              transform: Optional[List[float]] = None) -> Dict:
+    """
+    Run the tiled NDVI engine over a raster and store a FieldAnalysis.
+
+    Paths are resolved and checked by the route before dispatch. Prefork
+    pool workers are daemonic and cannot start a process pool of their
+    own, so tiles are processed inline there.
+    """
+    from spatial_analytics.models import Field, FieldAnalysis
+    from spatial_analytics.utils import SpatialUtils
+
+    try:
+        field = db.session.get(Field, field_id)
+        if field is None:
+            return {'status': 'error', 'message': f"Field {field_id} not found"}
+
+        workers = 1 if multiprocessing.current_process().daemon else None
+        manifest = SpatialUtils.process_raster_ndvi(
+            red_path, nir_path,
+            boundary_geojson=field.boundary_geojson,
+            heatmap_dir=heatmap_dir,
+            red_band=red_band,
+            nir_band=nir_band,
+            transform=transform,
+            workers=workers
+        )
+
+        analysis = FieldAnalysis(
+            field_id=field.id,
+            analysis_type='NDVI',
+            result_data={**manifest['stats'], 'tile_count': len(manifest['tiles'])},
+            overlay_image_path=overlay_image_path
+        )
+        db.session.add(analysis)
+        db.session.commit()
+
+        logger.info(f"NDVI analysis {analysis.id} for field {field_id}: {len(manifest['tiles'])} tiles")
+        return {
+            'status': 'success',
+            'analysis': analysis.to_dict(),
+            'timestamp': datetime.utcnow().isoformat()
+        }
+
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"NDVI analysis for field {field_id} failed: {str(e)}")
+        raise
@@ -12,14 +12,24 @@ def fetch_weather_updates_task():
         subs = WeatherService.get_active_subscriptions()
         unique_locations = {sub.location for sub in subs}
         
-        for loc in unique_locations:
-            WeatherService.update_weather_for_location(loc)
+        # Concurrent fetch, one commit and one rule pass for all locations
+        summary = WeatherService.refresh_locations(unique_locations)
             
-        return {'status': 'success', 'locations_updated': len(unique_locations)}
+        return {'status': 'success', 'locations_updated': summary['fetched'], **summary}
     except Exception as e:
         logger.error(f"Weather update task failed: {str(e)}")
         return {'status': 'error', 'message': str(e)}
 
+@celery_app.task(name='tasks.refresh_weather_locations')
+def refresh_weather_locations_task(locations, force=False):
+    """Bulk refresh of arbitrary locations (e.g. outbreak zone centres)"""
+    try:
+        summary = WeatherService.refresh_locations(locations, force=force)
+        return {'status': 'success', **summary}
+    except Exception as e:
+        logger.error(f"Weather bulk refresh failed: {str(e)}")
+        return {'status': 'error', 'message': str(e)}
+
 @celery_app.task(name='tasks.generate_bulk_advisories')
 def generate_bulk_advisories_task():
     """Bulk AI advisory generation for all active subscribers"""
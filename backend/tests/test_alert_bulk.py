@@ -0,0 +1,114 @@
+import contextlib
+import pytest
+from app import app
+from backend.extensions import db, mail, socketio
+from backend.models import Alert, AlertPreference, User
+from backend.services.alert_registry import AlertRegistry
+
+@pytest.fixture
+def test_client():
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    if 'mail' not in app.extensions:
+        mail.init_app(app)
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+            yield client
+            db.drop_all()
+
+@pytest.fixture
+def channels(monkeypatch):
+    sent = {'emits': [], 'sessions': 0, 'emails': []}
+
+    def fake_emit(event, payload, room=None, **kwargs):
+        sent['emits'].append((room, payload))
+
+    class FakeConnection:
+        def send(self, msg):
+            sent['emails'].extend(msg.recipients)
+
+    @contextlib.contextmanager
+    def fake_connect():
+        sent['sessions'] += 1
+        yield FakeConnection()
+
+    monkeypatch.setattr(socketio, 'emit', fake_emit)
+    monkeypatch.setattr(mail, 'connect', fake_connect)
+    monkeypatch.setattr(AlertRegistry, 'EMAIL_BATCH_SIZE', 3)
+    monkeypatch.setattr(AlertRegistry, 'BULK_CHUNK_SIZE', 5)
+    return sent
+
+def _users(count):
+    users = []
+    for i in range(count):
+        user = User(username=f'farmer{i}', email=f'farmer{i}@example.com', phone=f'+9100000{i:04d}')
+        user.password_hash = 'x'
+        db.session.add(user)
+        users.append(user)
+    db.session.commit()
+    return users
+
+def test_bulk_alerts_respect_preferences_and_batch_channels(test_client, channels):
+    users = _users(10)
+    db.session.add_all([
+        AlertPreference(user_id=users[0].id, category='OUTBREAK', websocket_enabled=False, email_enabled=True),
+        AlertPreference(user_id=users[1].id, category='OUTBREAK', min_priority='CRITICAL'),
+        AlertPreference(user_id=users[2].id, category='OUTBREAK', email_enabled=False, sms_enabled=True),
+        AlertPreference(user_id=users[3].id, category='WEATHER', email_enabled=False),
+    ])
+    db.session.commit()
+
+    summary = AlertRegistry.register_alerts_bulk(
+        title='Blight outbreak nearby', message='Inspect your rice fields.',
+        category='OUTBREAK', user_ids=[u.id for u in users] + [users[4].id, 99999], priority='HIGH'
+    )
+
+    assert summary['alerts_created'] == 9
+    assert summary['skipped_by_priority'] == 1
+    assert summary['unknown_users'] == 1
+    assert summary['websocket_delivered'] == 8
+    assert summary['email_delivered'] == 8
+    assert summary['sms_delivered'] == 1
+
+    # One emit per room carrying that user's alert id, 8 emails over SMTP sessions of 3
+    alert_ids = {a.user_id: a.id for a in Alert.query.all()}
+    assert len(channels['emits']) == 8
+    assert all(payload['id'] == alert_ids[int(room[len('user_'):])] for room, payload in channels['emits'])
+    assert f'user_{users[0].id}' not in [room for room, _ in channels['emits']]
+    assert sorted(summary['alert_ids']) == sorted(alert_ids.values())
+    assert channels['sessions'] == 3
+    assert 'farmer2@example.com' not in channels['emails']
+
+    assert Alert.query.count() == 9
+    assert Alert.query.filter_by(user_id=users[1].id).count() == 0
+    assert Alert.query.filter_by(user_id=users[0].id).one().websocket_delivered is False
+    assert Alert.query.filter_by(user_id=users[2].id).one().sms_delivered is True
+    assert Alert.query.filter_by(email_delivered=True).count() == 8
+
+def test_bulk_alert_emails_are_queued_when_async(test_client, channels, monkeypatch):
+    from backend.tasks.alert_tasks import send_alert_emails_task
+    users = _users(7)
+    queued = []
+    monkeypatch.setattr(send_alert_emails_task, 'apply_async', lambda args, **kwargs: queued.append(args[0]))
+    app.config['ALERT_EMAIL_ASYNC'] = True
+    try:
+        summary = AlertRegistry.register_alerts_bulk(
+            title='Frost warning', message='Cover your seedlings.',
+            category='WEATHER', user_ids=[u.id for u in users]
+        )
+    finally:
+        app.config.pop('ALERT_EMAIL_ASYNC')
+
+    # Chunks of BULK_CHUNK_SIZE messages, nothing sent or flagged by the caller
+    assert [len(chunk) for chunk in queued] == [5, 2]
+    assert summary['email_queued'] == 7
+    assert summary['email_delivered'] == 0
+    assert summary['email_failed'] == 0
+    assert channels['sessions'] == 0
+    assert Alert.query.filter_by(email_delivered=True).count() == 0
+
+    # The task sends its chunk and flags the alerts it delivered
+    result = send_alert_emails_task.run(queued[0])
+    assert result['sent'] == 5
+    assert Alert.query.filter_by(email_delivered=True).count() == 5
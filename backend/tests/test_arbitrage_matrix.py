@@ -0,0 +1,103 @@
+import pytest
+from app import app
+from backend.extensions import db
+from backend.models.arbitrage import AlgorithmicTradeRecord, ArbitrageOpportunity
+from backend.models.spatial_yield import SpatialYieldGrid, TemporalYieldForex
+from backend.services.arbitrage_service import (
+    AlgorithmicArbitrageMatrix, PROFIT_MARGIN_TRIGGER_PCT, TRADE_VOLUME_KG
+)
+from backend.utils.spatial_index import wkt_centroid
+
+@pytest.fixture
+def test_client():
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+            yield client
+            db.drop_all()
+
+def _cell(lon, lat, size=0.1):
+    return (f"POLYGON(({lon} {lat}, {lon + size} {lat}, {lon + size} {lat + size}, "
+            f"{lon} {lat + size}, {lon} {lat}))")
+
+def _grids(cells):
+    """cells: (region_id, wkt, {crop: growth_acceleration_factor})"""
+    grids = []
+    for region_id, wkt, forecasts in cells:
+        grid = SpatialYieldGrid(region_id=region_id, bounding_box_wkt=wkt)
+        db.session.add(grid)
+        db.session.flush()
+        for crop, accel in forecasts.items():
+            db.session.add(TemporalYieldForex(grid_id=grid.id, crop_type=crop, base_yield_kg_per_hectare=3000,
+                                              growth_acceleration_factor=accel))
+        grids.append(grid)
+    db.session.commit()
+    return grids
+
+def _brute_force(grids, crops):
+    """The previous nested loop, with real centroids instead of random coordinates."""
+    expected = {}
+    for crop in crops:
+        for source in grids:
+            for target in grids:
+                source_point, target_point = wkt_centroid(source.bounding_box_wkt), wkt_centroid(target.bounding_box_wkt)
+                if source.id == target.id or not source_point or not target_point:
+                    continue
+                source_price = AlgorithmicArbitrageMatrix._estimate_dynamic_market_price(crop, source)
+                target_price = AlgorithmicArbitrageMatrix._estimate_dynamic_market_price(crop, target)
+                if target_price <= source_price:
+                    continue
+                freight = AlgorithmicArbitrageMatrix.calculate_freight_logistics_cost(
+                    *source_point, *target_point, TRADE_VOLUME_KG
+                )
+                cogs = source_price * TRADE_VOLUME_KG + freight
+                margin = (target_price * TRADE_VOLUME_KG - cogs) / cogs * 100.0
+                if margin >= PROFIT_MARGIN_TRIGGER_PCT:
+                    expected[(crop, source.id, target.id)] = round(margin, 2)
+    return expected
+
+def test_matrix_scan_matches_pairwise_loop(test_client):
+    grids = _grids([
+        ('A', _cell(77.0, 28.0), {'WHEAT': 1.3, 'RICE': 1.0}),   # Wheat glut
+        ('B', _cell(77.5, 28.5), {'WHEAT': 1.0, 'RICE': 0.7}),   # Rice scarcity
+        ('C', _cell(72.8, 19.0), {'WHEAT': 0.7}),                # Wheat scarcity, far away
+        ('D', _cell(-60.0, -30.0), {'WHEAT': 1.3}),              # Other side of the world
+        ('GRID-E', 'POLYGON EMPTY', {'WHEAT': 0.5}),             # No location: never traded
+    ])
+    expected = _brute_force(grids, ['WHEAT', 'RICE'])
+
+    stats = AlgorithmicArbitrageMatrix.identify_arbitrage_vectors()
+    found = {(o.commodity_type, o.source_grid_id, o.target_grid_id): o.gross_margin_pct
+             for o in ArbitrageOpportunity.query.all()}
+
+    assert found == expected and len(found) > 3
+    assert stats['vectors_detected'] == len(expected)
+    assert stats['grids_without_location'] == 1
+    # Margins above 25% are auto-executed
+    executing = ArbitrageOpportunity.query.filter_by(status='EXECUTING').count()
+    assert stats['trades_executed'] == executing == AlgorithmicTradeRecord.query.count() > 0
+    assert executing == sum(1 for margin in expected.values() if margin > 25.0)
+
+def test_open_opportunities_are_not_duplicated(test_client):
+    _grids([
+        ('A', _cell(77.0, 28.0), {'MAIZE': 1.0}),
+        ('B', _cell(77.2, 28.2), {'MAIZE': 0.7}),
+    ])
+    first = AlgorithmicArbitrageMatrix.identify_arbitrage_vectors()
+    assert first['vectors_detected'] == 1 and first['trades_executed'] == 1
+
+    # The only pair is EXECUTING, not IDENTIFIED, so it is found again
+    second = AlgorithmicArbitrageMatrix.identify_arbitrage_vectors()
+    assert second['vectors_detected'] == 1
+
+    ArbitrageOpportunity.query.update({'status': 'IDENTIFIED'})
+    db.session.commit()
+    assert AlgorithmicArbitrageMatrix.identify_arbitrage_vectors()['vectors_detected'] == 0
+
+def test_too_few_grids(test_client):
+    _grids([('A', _cell(77.0, 28.0), {})])
+    assert AlgorithmicArbitrageMatrix.identify_arbitrage_vectors() == {
+        'vectors_detected': 0, 'trades_executed': 0, 'grids_scanned': 1, 'grids_without_location': 0
+    }
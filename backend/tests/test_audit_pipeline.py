@@ -0,0 +1,85 @@
+import queue
+import threading
+import pytest
+from app import app
+from backend.extensions import db
+from backend.models import AuditLog
+from backend.services.audit_pipeline import AuditWriter, SlidingWindowCounter
+from backend.services.audit_service import AuditService
+
+@pytest.fixture
+def test_client(monkeypatch):
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    AuditWriter.shutdown()
+    # Pretend the writer is running so rows stay queued until flush()
+    monkeypatch.setattr(AuditWriter, '_thread', threading.current_thread())
+    monkeypatch.setattr(AuditWriter, '_queue', queue.Queue(maxsize=AuditWriter.QUEUE_SIZE))
+    AuditService._failed_login_window.reset()
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+            yield client
+            db.drop_all()
+
+def test_enqueued_actions_are_bulk_written_on_flush(test_client):
+    with app.test_request_context('/api/v1/farms', method='POST'):
+        for i in range(25):
+            assert AuditService.enqueue_action(action='POST_farms', meta_data={'i': i})
+
+    assert AuditLog.query.count() == 0
+    assert AuditWriter.flush() == 25
+
+    logs = AuditLog.query.all()
+    assert len(logs) == 25
+    assert {log.method for log in logs} == {'POST'}
+    assert AuditWriter.stats()['queue_depth'] == 0
+
+def test_bad_row_does_not_lose_its_batch(test_client):
+    failed_before = AuditWriter.stats()['failed_rows']
+    for action in ['GET_farms', None, 'GET_crops']:
+        assert AuditWriter.enqueue({'action': action, 'risk_level': 'LOW'})
+
+    assert AuditWriter.flush() == 2
+    assert sorted(log.action for log in AuditLog.query.all()) == ['GET_crops', 'GET_farms']
+    assert AuditWriter.stats()['failed_rows'] - failed_before == 1
+
+def test_full_queue_drops_low_risk_and_writes_high_risk(test_client, monkeypatch):
+    monkeypatch.setattr(AuditWriter, '_queue', queue.Queue(maxsize=2))
+    monkeypatch.setattr(AuditWriter, 'ENQUEUE_TIMEOUT_SECONDS', 0)
+    before = AuditWriter.stats()
+
+    assert AuditService.enqueue_action(action='A')
+    assert AuditService.enqueue_action(action='B')
+    assert AuditService.enqueue_action(action='C') is False
+    assert AuditService.enqueue_action(action='D', risk_level='CRITICAL')
+
+    after = AuditWriter.stats()
+    assert after['dropped'] - before['dropped'] == 1
+    assert after['sync_fallbacks'] - before['sync_fallbacks'] == 1
+    assert [log.action for log in AuditLog.query.all()] == ['D']
+
+    AuditWriter.flush()
+    assert sorted(log.action for log in AuditLog.query.all()) == ['A', 'B', 'D']
+
+def test_brute_force_detected_from_in_memory_window(test_client, monkeypatch):
+    alerts = []
+    monkeypatch.setattr(AuditService, '_raise_threat_alert', staticmethod(
+        lambda action, user_id, reason: alerts.append(reason)
+    ))
+
+    with app.test_request_context('/auth/login', method='POST', environ_base={'REMOTE_ADDR': '10.0.0.9'}):
+        for _ in range(12):
+            AuditService.enqueue_action(action='LOGIN_FAILED')
+    AuditWriter.flush()
+
+    flagged = AuditLog.query.filter_by(threat_flag=True).all()
+    assert len(flagged) == 1
+    assert flagged[0].risk_level == 'CRITICAL'
+    assert alerts == ['Brute force login attempt suspected']
+
+def test_sliding_window_counter_expires_events():
+    counter = SlidingWindowCounter(window_seconds=60)
+    assert [counter.hit(('k',), now=t) for t in (0, 10, 20)] == [0, 1, 2]
+    assert counter.hit(('k',), now=75) == 1
+    assert counter.hit(('other',), now=75) == 0
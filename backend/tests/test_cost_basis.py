@@ -0,0 +1,144 @@
+import pytest
+from app import app
+from backend.extensions import db
+from backend.models.ledger import CostBasisLot, CostBasisDisposal
+from backend.services.cost_basis_service import CostBasisService
+from backend.services.vault_service import VaultService
+from backend.utils.financial_math import CostBasisCalculator, LotBook
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+START = datetime(2024, 1, 1)
+
+def make_book():
+    book = LotBook()
+    for i, (amount, rate) in enumerate([(100, '1.10'), (50, '1.30'), (80, '1.05')]):
+        book.add(i + 1, amount, rate, START + timedelta(days=i))
+    return book
+
+def test_lot_book_matches_list_calculator():
+    lots = [{'amount': 100, 'rate': 1.10, 'date': START.date()},
+            {'amount': 50, 'rate': 1.30, 'date': (START + timedelta(days=1)).date()},
+            {'amount': 80, 'rate': 1.05, 'date': (START + timedelta(days=2)).date()}]
+    for method, calculate in [('FIFO', CostBasisCalculator.fifo_cost_basis), ('LIFO', CostBasisCalculator.lifo_cost_basis)]:
+        book = make_book()
+        expected, remaining = calculate(lots, Decimal('120'))
+        assert book.consume('120', method)['cost_basis'] == expected
+        assert book.remaining_amount == sum(Decimal(str(lot['amount'])) for lot in remaining)
+
+    book = make_book()
+    assert [lot_id for lot_id, _, _ in book.consume('60', 'HIFO')['lots']] == [2, 1]
+    assert book.consume('90', 'SPECIFIC', lot_ids=[3, 1])['lots'] == \
+        [(3, Decimal('80'), Decimal('1.05')), (1, Decimal('10'), Decimal('1.10'))]
+    assert [lot.lot_id for lot in book.open_lots()] == [1] and len(book) == 1
+    with pytest.raises(ValueError):
+        book.consume('500', 'FIFO')
+
+def test_lot_book_realized_gain_ranges():
+    book = make_book()
+    book.consume('100', 'FIFO', proceeds_rate='1.20', disposed=START + timedelta(days=10))
+    book.consume('50', 'FIFO', proceeds_rate='1.20', disposed=START + timedelta(days=20))
+    # Backdated disposal lands between the other two
+    book.consume('40', 'FIFO', proceeds_rate='1.00', disposed=START + timedelta(days=15))
+
+    assert book.realized_gain() == Decimal('10') - Decimal('5') - Decimal('2')
+    assert book.realized_gain(START + timedelta(days=11), START + timedelta(days=30)) == Decimal('-7')
+    assert book.realized_gain(end=START + timedelta(days=15)) == Decimal('8')
+    assert book.realized_gain(START + timedelta(days=21)) == Decimal('0')
+
+@pytest.fixture
+def vault():
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    with app.app_context():
+        db.create_all()
+        vault = VaultService.create_vault('Exports', 'farm', 1)
+        VaultService.deposit(vault, Decimal('100'), 'EUR', fx_rate=Decimal('1.10'))
+        VaultService.deposit(vault, Decimal('100'), 'EUR', fx_rate=Decimal('1.30'))
+        yield vault
+        db.drop_all()
+
+def test_withdrawals_consume_persistent_lots(vault):
+    result = VaultService.withdraw(vault, Decimal('150'), 'EUR', fx_rate=Decimal('1.20'), cost_basis_method='FIFO')
+    assert result['realized_fx_gain'] == pytest.approx(150 * 1.20 - (100 * 1.10 + 50 * 1.30))
+    assert [lot['amount'] for lot in result['lots_consumed']] == [100.0, 50.0]
+
+    lots = CostBasisLot.query.order_by(CostBasisLot.id).all()
+    assert [(lot.is_closed, float(lot.remaining_amount)) for lot in lots] == [(True, 0.0), (False, 50.0)]
+
+    # Weighted average (the default) costs at the position rate of 1.20
+    result = VaultService.withdraw(vault, Decimal('20'), 'EUR', fx_rate=Decimal('1.25'))
+    assert result['cost_basis_method'] == 'AVERAGE' and result['realized_fx_gain'] == pytest.approx(1.0)
+
+    position = VaultService.get_or_create_currency_position(vault, 'EUR')[0]
+    gains = CostBasisService.realized_gain([position.id], start=datetime.utcnow() - timedelta(hours=1))
+    assert gains[position.id] == pytest.approx(Decimal('6'))
+    assert position.cumulative_realized_fx_gain == pytest.approx(Decimal('6'))
+    assert CostBasisService.load_book(position).remaining_amount == Decimal('30')
+
+def test_failed_first_withdrawal_keeps_lots_open(vault, monkeypatch):
+    from backend.models.ledger import LedgerAccount
+    from backend.services.ledger_service import LedgerService
+
+    def failing_post(**kwargs):
+        raise RuntimeError("posting failed")
+
+    monkeypatch.setattr(LedgerService, 'create_transaction', failing_post)
+    assert LedgerAccount.query.filter_by(account_code='3001-EXTERNAL-WITHDRAWALS').count() == 0
+    with pytest.raises(RuntimeError):
+        VaultService.withdraw(vault, Decimal('150'), 'EUR', fx_rate=Decimal('1.20'), cost_basis_method='FIFO')
+
+    # The withdrawal accounts exist now, but no lot was consumed
+    db.session.expire_all()
+    assert CostBasisDisposal.query.count() == 0
+    assert [float(lot.remaining_amount) for lot in CostBasisLot.query.order_by(CostBasisLot.id)] == [100.0, 100.0]
+    assert LedgerAccount.query.filter_by(account_code='6000-FX-REALIZED-GAIN').count() == 1
+
+def test_specific_lots_and_transfers(vault):
+    other = VaultService.create_vault('Reserve', 'farm', 1)
+    high = CostBasisLot.query.filter_by(rate=Decimal('1.30')).one()
+
+    with pytest.raises(ValueError):
+        VaultService.withdraw(vault, Decimal('150'), 'EUR', fx_rate=Decimal('1.20'),
+                              cost_basis_method='SPECIFIC', lot_ids=[high.id])
+    assert CostBasisDisposal.query.count() == 0 and float(high.remaining_amount) == 100.0
+
+    result = VaultService.withdraw(vault, Decimal('40'), 'EUR', fx_rate=Decimal('1.20'),
+                                   cost_basis_method='SPECIFIC', lot_ids=[high.id])
+    assert result['realized_fx_gain'] == pytest.approx(-4.0)
+
+    # Transfers carry acquisition rates over instead of realizing a gain
+    VaultService.transfer_between_vaults(vault, other, Decimal('120'), 'EUR', fx_rate=Decimal('1.25'))
+    dest = VaultService.get_or_create_currency_position(other, 'EUR')[0]
+    assert [(float(lot.remaining_amount), float(lot.rate)) for lot in CostBasisService.get_open_lots(dest)] == \
+        [(100.0, 1.10), (20.0, 1.30)]
+    assert CostBasisDisposal.query.count() == 1
+
+def test_transfers_across_base_currencies_cost_in_destination_base(vault):
+    from backend.services.fx_rate_store import FXRateStore
+    from backend.services.fx_service import FXService
+    FXService.store_rate('EUR', 'INR', Decimal('90'))
+    FXService.store_rate('USD', 'INR', Decimal('83'))
+    FXRateStore.invalidate()
+    rupee_vault = VaultService.create_vault('Rupee', 'farm', 1, base_currency='INR')
+    euro_vault = VaultService.create_vault('Euro', 'farm', 1, base_currency='EUR')
+
+    # Foreign to both vaults: lots reopen at the EUR->INR rate, not the EUR->USD one
+    VaultService.transfer_between_vaults(vault, rupee_vault, Decimal('30'), 'EUR', fx_rate=Decimal('1.25'))
+    eur_in_inr = VaultService.get_or_create_currency_position(rupee_vault, 'EUR')[0]
+    lots = CostBasisService.get_open_lots(eur_in_inr)
+    assert [(float(lot.remaining_amount), float(lot.rate)) for lot in lots] == [(30.0, 90.0)]
+
+    # The source vault's base currency is foreign to the destination: a lot is opened
+    VaultService.deposit(vault, Decimal('50'), 'USD')
+    VaultService.transfer_between_vaults(vault, rupee_vault, Decimal('50'), 'USD')
+    usd_in_inr = VaultService.get_or_create_currency_position(rupee_vault, 'USD')[0]
+    lots = CostBasisService.get_open_lots(usd_in_inr)
+    assert [(float(lot.remaining_amount), float(lot.rate)) for lot in lots] == [(50.0, 83.0)]
+
+    # Arriving as the destination's base currency only draws the source lots down
+    VaultService.transfer_between_vaults(vault, euro_vault, Decimal('100'), 'EUR', fx_rate=Decimal('1.25'))
+    eur_in_eur = VaultService.get_or_create_currency_position(euro_vault, 'EUR')[0]
+    assert CostBasisService.get_open_lots(eur_in_eur) == []
+    source = VaultService.get_or_create_currency_position(vault, 'EUR')[0]
+    assert CostBasisService.load_book(source).remaining_amount == Decimal('70')
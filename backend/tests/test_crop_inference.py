@@ -0,0 +1,54 @@
+import threading
+import warnings
+import numpy as np
+import pytest
+from backend.services.crop_inference import CropInferenceBatcher, FEATURES
+
+pytestmark = pytest.mark.skipif(not CropInferenceBatcher.is_available(), reason="crop model files not present")
+
+def make_samples(count, seed=3):
+    rng = np.random.default_rng(seed)
+    return np.column_stack([
+        rng.uniform(0, 140, count), rng.uniform(5, 145, count), rng.uniform(5, 205, count),
+        rng.uniform(8, 44, count), rng.uniform(14, 100, count), rng.uniform(3.5, 9.9, count),
+        rng.uniform(20, 300, count)
+    ])
+
+def expected_labels(samples):
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        encoded = CropInferenceBatcher._model.predict(samples)
+    return CropInferenceBatcher._labels[np.searchsorted(CropInferenceBatcher._model.classes_, encoded)].tolist()
+
+def test_concurrent_requests_share_batches_and_match_predict():
+    samples = make_samples(64)
+    results = [None] * len(samples)
+    before = CropInferenceBatcher.stats()
+
+    def call(i):
+        results[i] = CropInferenceBatcher.predict([samples[i].tolist()], top_k=3)[0]
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(len(samples))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    after = CropInferenceBatcher.stats()
+    assert after['requests'] - before['requests'] == 64
+    assert after['batches'] - before['batches'] < 64
+    assert [r[0]['crop'] for r in results] == expected_labels(samples)
+    for ranked in results:
+        probs = [c['probability'] for c in ranked]
+        assert len(ranked) == 3 and probs == sorted(probs, reverse=True)
+
+def test_predict_many_accepts_dicts_and_chunks(monkeypatch):
+    monkeypatch.setattr(CropInferenceBatcher, 'BULK_CHUNK_SIZE', 100)
+    samples = make_samples(250, seed=9)
+    as_dicts = [dict(zip(FEATURES, row)) for row in samples.tolist()]
+
+    ranked = CropInferenceBatcher.predict_many(as_dicts, top_k=1)
+
+    assert len(ranked) == 250 and all(len(r) == 1 for r in ranked)
+    assert [r[0]['crop'] for r in ranked] == expected_labels(samples)
+    assert CropInferenceBatcher.stats()['last_batch_size'] == 50
@@ -0,0 +1,84 @@
+import pytest
+from app import app
+from backend.extensions import db
+from backend.services.fx_service import FXService
+from backend.services.fx_rate_store import FXRateStore
+from datetime import date
+from decimal import Decimal
+
+@pytest.fixture
+def test_client():
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+            FXRateStore.invalidate()
+            yield client
+            db.drop_all()
+
+def test_direct_inverse_and_cross_rates(test_client):
+    FXService.store_rate('EUR', 'USD', Decimal('1.10'), rate_date=date(2024, 1, 1))
+    FXService.store_rate('USD', 'INR', Decimal('83.00'), rate_date=date(2024, 1, 1))
+
+    assert FXService.get_rate('EUR', 'USD') == Decimal('1.10')
+    assert FXService.get_rate('USD', 'EUR') == Decimal('0.90909091')
+    assert FXService.get_rate('EUR', 'INR') == Decimal('91.30000000')
+    assert FXService.get_rate('EUR', 'JPY') is None
+
+    rates = FXService.get_all_current_rates('USD')
+    assert rates['USD'] == Decimal('1')
+    assert rates['INR'] == Decimal('0.01204819')
+
+def test_store_rate_invalidates_cache(test_client):
+    FXService.store_rate('EUR', 'USD', Decimal('1.10'), rate_date=date(2024, 1, 1))
+    version = FXRateStore.version()
+    assert FXService.get_rate('EUR', 'USD') == Decimal('1.10')
+
+    FXService.store_rate('EUR', 'USD', Decimal('1.20'), rate_date=date(2024, 1, 2))
+    assert FXRateStore.version() > version
+    assert FXService.get_rate('EUR', 'USD') == Decimal('1.20')
+
+def test_point_in_time_lookup_uses_latest_prior_rate(test_client):
+    FXService.store_rates_batch([
+        {'from_currency': 'EUR', 'to_currency': 'USD', 'rate': 1.05, 'rate_date': date(2024, 1, 1)},
+        {'from_currency': 'EUR', 'to_currency': 'USD', 'rate': 1.08, 'rate_date': date(2024, 1, 5)},
+        {'from_currency': 'EUR', 'to_currency': 'USD', 'rate': 1.12, 'rate_date': date(2024, 1, 9)},
+    ])
+
+    assert FXService.get_rate('EUR', 'USD', date(2023, 12, 31)) is None
+    assert FXService.get_rate('EUR', 'USD', date(2024, 1, 5)) == Decimal('1.08')
+    # Weekend/holiday gaps fall back to the most recent earlier fixing
+    assert FXService.get_rate('EUR', 'USD', date(2024, 1, 7)) == Decimal('1.08')
+    assert FXService.get_rate('USD', 'EUR', date(2024, 1, 2)) == Decimal('0.95238095')
+    assert FXService.get_rate('EUR', 'USD') == Decimal('1.12')
+
+def test_write_reloads_only_the_written_pair(test_client):
+    FXService.store_rate('EUR', 'USD', Decimal('1.10'), rate_date=date(2024, 1, 1))
+    FXService.store_rate('USD', 'INR', Decimal('83.00'), rate_date=date(2024, 1, 1))
+    FXService.store_rate('GBP', 'JPY', Decimal('180.00'), rate_date=date(2024, 1, 1))
+    assert FXService.get_rate('EUR', 'INR') == Decimal('91.30000000')
+    assert FXService.get_rate('GBP', 'JPY') == Decimal('180.00')
+    assert FXService.get_rate('EUR', 'USD', date(2024, 1, 1)) == Decimal('1.10')
+
+    FXService.store_rate('USD', 'INR', Decimal('84.00'), rate_date=date(2024, 1, 2))
+    assert FXService.get_rate('EUR', 'INR') == Decimal('92.40000000')
+    # Lookups that do not touch USD/INR, or predate the write, stay cached
+    assert ('GBP', 'JPY', None) in FXRateStore._resolved
+    assert ('EUR', 'USD', date(2024, 1, 1)) in FXRateStore._resolved
+
+    # A backdated fixing changes point-in-time lookups but not the current rate
+    FXService.store_rate('EUR', 'USD', Decimal('1.05'), rate_date=date(2023, 12, 1), mark_current=False)
+    assert FXService.get_rate('EUR', 'USD', date(2023, 12, 15)) == Decimal('1.05')
+    assert FXService.get_rate('EUR', 'USD') == Decimal('1.10')
+
+def test_resolved_rates_are_bounded(test_client, monkeypatch):
+    monkeypatch.setattr(FXRateStore, 'MAX_RESOLVED_RATES', 2)
+    FXService.store_rate('EUR', 'USD', Decimal('1.10'), rate_date=date(2024, 1, 1))
+    FXService.store_rate('USD', 'INR', Decimal('83.00'), rate_date=date(2024, 1, 1))
+
+    FXService.get_rate('EUR', 'USD')
+    FXService.get_rate('USD', 'INR')
+    FXService.get_rate('EUR', 'USD')
+    FXService.get_rate('EUR', 'INR')
+    assert list(FXRateStore._resolved) == [('EUR', 'USD', None), ('EUR', 'INR', None)]
@@ -0,0 +1,114 @@
+import pytest
+from app import app
+from backend.extensions import db
+from backend.models.ledger import (
+    FXValuationSnapshot, LedgerAccount, LedgerTransaction, TransactionType
+)
+from backend.services.fx_rate_store import FXRateStore
+from backend.services.fx_revaluation import FXRevaluationEngine
+from backend.services.fx_service import FXService
+from backend.services.ledger_service import LedgerService
+from backend.services.vault_service import VaultService
+from datetime import date
+from decimal import Decimal
+
+@pytest.fixture
+def vaults():
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    with app.app_context():
+        db.create_all()
+        FXRateStore.invalidate()
+        usd = VaultService.create_vault('Exports', 'farm', 1)
+        inr = VaultService.create_vault('Mandi', 'farm', 2, base_currency='INR')
+        VaultService.deposit(usd, Decimal('1000'), 'EUR', fx_rate=Decimal('1.10'))
+        VaultService.deposit(usd, Decimal('500'), 'GBP', fx_rate=Decimal('1.25'))
+        VaultService.deposit(inr, Decimal('200'), 'USD', fx_rate=Decimal('83'))
+        yield usd, inr
+        db.drop_all()
+
+def test_batch_balances_match_per_account(vaults):
+    usd, inr = vaults
+    account_ids = [a.id for a in LedgerAccount.query.all()]
+    balances = LedgerService.get_account_balances(account_ids)
+    assert balances == {
+        account_id: LedgerService.get_account_balance(account_id) for account_id in account_ids
+    }
+
+def test_revalues_all_vaults_in_their_own_base(vaults):
+    usd, inr = vaults
+    FXService.store_rate('USD', 'INR', Decimal('84'), rate_date=date(2024, 1, 1))
+
+    result = FXService.revalue_all_positions('USD', {'EUR': Decimal('1.12'), 'GBP': Decimal('1.25')})
+
+    # GBP is unchanged; the INR vault ignores the USD-quoted rates
+    assert result['vaults_processed'] == 2 and result['positions_revalued'] == 2
+    details = {d['vault_name']: d for d in result['vault_details']}
+    assert details['Exports']['revaluations'][0]['currency'] == 'EUR'
+    assert details['Exports']['total_delta'] == pytest.approx(20.0)
+    assert details['Mandi']['total_delta'] == pytest.approx(200.0)
+    assert result['total_unrealized_gain'] == pytest.approx(220.0)
+
+    snapshots = FXValuationSnapshot.query.order_by(FXValuationSnapshot.id).all()
+    assert [(s.currency, s.base_currency, float(s.unrealized_gain_loss)) for s in snapshots] == \
+        [('EUR', 'USD', 20.0), ('USD', 'INR', 200.0)]
+
+    # Gains are booked outside the position accounts, which keep their currency balance
+    transactions = LedgerTransaction.query.filter_by(transaction_type=TransactionType.FX_UNREALIZED_GAIN).all()
+    assert len(transactions) == 2 and all(t.is_balanced() for t in transactions)
+    assert LedgerService.verify_balance_checkpoints()['is_consistent']
+    reval = LedgerAccount.query.filter_by(account_code=f"VAULT-{usd.vault_id[:8].upper()}-FXREVAL").one()
+    assert LedgerService.get_account_balance(reval.id) == Decimal('20')
+
+    # Each base currency books its gain on its own account
+    gains = {
+        currency: LedgerAccount.query.filter_by(
+            account_code=FXRevaluationEngine.unrealized_gain_account_code(currency)
+        ).one()
+        for currency in ('USD', 'INR')
+    }
+    assert {currency: account.currency for currency, account in gains.items()} == {'USD': 'USD', 'INR': 'INR'}
+    assert LedgerService.get_account_balance(gains['USD'].id) == Decimal('20')
+    assert LedgerService.get_account_balance(gains['INR'].id) == Decimal('200')
+    eur = VaultService.get_or_create_currency_position(usd, 'EUR')[0]
+    assert VaultService.get_position_balance(eur) == Decimal('1000')
+    assert eur.last_fx_rate == Decimal('1.12') and eur.cumulative_unrealized_fx_gain == Decimal('20')
+
+def test_small_moves_accumulate_until_threshold(vaults):
+    usd, _ = vaults
+    app.config['FX_REVALUATION_MIN_RATE_CHANGE'] = Decimal('0.01')
+    try:
+        assert VaultService.revalue_positions(usd, {'EUR': Decimal('1.105'), 'GBP': Decimal('1.25')}) == []
+        assert FXValuationSnapshot.query.count() == 0
+
+        # Measured from the last booked rate (1.10), so the drift is not lost
+        results = VaultService.revalue_positions(usd, {'EUR': Decimal('1.112'), 'GBP': Decimal('1.25')})
+        assert [(r['currency'], r['old_rate'], r['delta']) for r in results] == [('EUR', 1.10, 12.0)]
+    finally:
+        app.config.pop('FX_REVALUATION_MIN_RATE_CHANGE')
+
+    summary = FXRevaluationEngine.revalue([usd], {'EUR': Decimal('1.112'), 'GBP': Decimal('1.3')}, min_rate_change=0)
+    assert summary['positions_revalued'] == 1 and summary['total_unrealized_gain'] == Decimal('25')
+    assert summary['positions_checked'] == 2
+
+def test_failing_vault_does_not_block_the_others(vaults, monkeypatch):
+    usd, inr = vaults
+    FXService.store_rate('USD', 'INR', Decimal('84'), rate_date=date(2024, 1, 1))
+    bulk = LedgerService.create_transactions_bulk
+
+    def failing_bulk(transactions, **kwargs):
+        if any(t['source_id'] == inr.id for t in transactions):
+            raise ValueError('ledger rejected the INR vault')
+        return bulk(transactions, **kwargs)
+
+    monkeypatch.setattr(LedgerService, 'create_transactions_bulk', failing_bulk)
+    result = FXService.revalue_all_positions('USD', {'EUR': Decimal('1.12'), 'GBP': Decimal('1.25')})
+
+    assert result['failed_vaults'] == [inr.vault_id]
+    assert result['vaults_processed'] == 1 and result['positions_revalued'] == 1
+    assert [d['vault_name'] for d in result['vault_details']] == ['Exports']
+    assert [s.currency for s in FXValuationSnapshot.query.all()] == ['EUR']
+
+    # Without isolation the batch still fails as a whole
+    with pytest.raises(ValueError):
+        FXRevaluationEngine.revalue([usd, inr], {'EUR': Decimal('1.2')}, rates_base='USD')
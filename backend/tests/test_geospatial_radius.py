@@ -0,0 +1,113 @@
+import pytest
+from app import app
+from backend.extensions import db
+from backend.models import DiseaseIncident, OutbreakAlert, OutbreakZone, User
+from backend.services.geospatial_service import GeospatialService
+from backend.tasks.disease_tasks import detect_disease_outbreaks_task
+
+@pytest.fixture
+def test_client():
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+            yield client
+            db.drop_all()
+
+def _farmer(name, lat, lon, role='farmer'):
+    user = User(username=name, email=f'{name}@example.com', role=role)
+    user.password_hash = 'x'
+    user.set_farm_location(lat, lon)
+    db.session.add(user)
+    return user
+
+def _zone(zone_id, lat, lon, radius_km, status='active'):
+    zone = OutbreakZone(zone_id=zone_id, disease_name='Blight', crop_affected='Rice',
+                        center_latitude=lat, center_longitude=lon, radius_km=radius_km, status=status)
+    db.session.add(zone)
+    return zone
+
+def _incident(incident_id, user, lat, lon, status='pending', disease='Blight'):
+    incident = DiseaseIncident(incident_id=incident_id, user_id=user.id, disease_name=disease,
+                               crop_affected='Rice', latitude=lat, longitude=lon,
+                               verification_status=status, severity_level='high')
+    db.session.add(incident)
+    return incident
+
+def test_find_incidents_in_radius_fallback(test_client):
+    reporter = _farmer('reporter', 20.0, 78.0)
+    db.session.commit()
+    _incident('NEAR', reporter, 20.1, 78.1)
+    _incident('VERIFIED', reporter, 19.9, 77.9, status='verified')
+    _incident('REJECTED', reporter, 20.0, 78.0, status='rejected')
+    _incident('FAR', reporter, 22.0, 78.0)
+    _incident('OTHER', reporter, 20.0, 78.05, disease='Rust')
+    db.session.commit()
+
+    # SQLite has no PostGIS, so this runs the Python fallback
+    found = GeospatialService.find_incidents_in_radius(20.0, 78.0, 50)
+    assert sorted(i.incident_id for i in found) == ['NEAR', 'OTHER', 'VERIFIED']
+    found = GeospatialService._find_incidents_in_radius_fallback(20.0, 78.0, 50, disease_name='Blight')
+    assert sorted(i.incident_id for i in found) == ['NEAR', 'VERIFIED']
+
+    clusters = GeospatialService.detect_outbreak_clusters(radius_km=50, min_incidents=2)
+    summary = [(c['disease_name'], c['incident_count'], c['severity_level']) for c in clusters]
+    assert summary == [('Blight', 2, 'high')]
+
+def test_find_farmers_at_risk_filters_and_sorts(test_client):
+    near = _farmer('near', 20.05, 78.0)      # ~5.6 km
+    edge = _farmer('edge', 20.0, 78.13)      # ~13.6 km, inside 1.5 x 10 km
+    _farmer('far', 20.5, 78.0)               # ~55 km
+    _farmer('trader', 20.0, 78.01, role='shopkeeper')
+    zone = _zone('Z1', 20.0, 78.0, 10)
+    db.session.commit()
+
+    at_risk = GeospatialService.find_farmers_at_risk(zone)
+    assert [user.id for user, _ in at_risk] == [near.id, edge.id]
+    assert at_risk[0][1] == pytest.approx(5.56, abs=0.05)
+
+def test_check_user_in_outbreak_zones(test_client):
+    farmer = _farmer('farmer', 20.0, 78.0)
+    _zone('SMALL', 20.1, 78.0, 5)             # 11 km away, reach 7.5 km
+    big = _zone('BIG', 20.3, 78.0, 30)         # 33 km away, reach 45 km
+    close = _zone('CLOSE', 20.02, 78.0, 2)     # 2.2 km away, reach 3 km
+    _zone('OLD', 20.0, 78.0, 50, status='contained')
+    db.session.commit()
+
+    zones = GeospatialService.check_user_in_outbreak_zones(farmer.id)
+    assert [zone.id for zone, _ in zones] == [close.id, big.id]
+    assert GeospatialService.check_user_in_outbreak_zones(farmer) == zones
+
+def test_match_farmers_to_zones_matches_per_zone_queries(test_client):
+    for i in range(30):
+        _farmer(f'f{i}', 19.0 + i * 0.1, 77.0 + (i % 5) * 0.2)
+    for i, (lat, lon, radius) in enumerate([(19.5, 77.2, 20), (21.0, 77.8, 35), (25.0, 80.0, 10)]):
+        _zone(f'Z{i}', lat, lon, radius)
+    db.session.commit()
+
+    matches = GeospatialService.match_farmers_to_zones(chunk_size=7)
+    for zone in OutbreakZone.query.all():
+        expected = GeospatialService.find_farmers_at_risk(zone)
+        assert [(u.id, round(d, 6)) for u, d in matches[zone.id]] == \
+            [(u.id, round(d, 6)) for u, d in expected]
+    assert any(matches.values())
+
+def test_outbreak_detection_alerts_nearby_farmers_once(test_client):
+    reporter = _farmer('reporter', 20.0, 78.0)
+    near = _farmer('near', 20.1, 78.0)
+    _farmer('far', 23.0, 78.0)
+    db.session.commit()
+    for i in range(3):
+        _incident(f'INC{i}', reporter, 20.0 + i * 0.05, 78.0)
+    db.session.commit()
+
+    result = detect_disease_outbreaks_task.run()
+    assert result == {'status': 'success', 'zones_created': 1, 'alerts_created': 2}
+    zone = OutbreakZone.query.one()
+    assert sorted(a.user_id for a in OutbreakAlert.query.filter_by(zone_id=zone.id)) == sorted([reporter.id, near.id])
+
+    # A repeated fan-out over the same zone does not alert anyone twice
+    again = GeospatialService.send_outbreak_alerts()
+    assert again == {'zones': 1, 'alerts_created': 0, 'already_alerted': 2}
+    assert OutbreakAlert.query.count() == 2
@@ -0,0 +1,115 @@
+import pytest
+from app import app
+from backend.extensions import db
+from backend.models.logistics_v2 import FreightEscrow, GPSTelemetry, TransportRoute
+from backend.services.gps_ingestion import EscrowGeofenceCache, GPSTelemetryBuffer
+from backend.services.logistics_orchestrator import LogisticsOrchestrator
+
+@pytest.fixture
+def test_client():
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+            EscrowGeofenceCache.invalidate()
+            GPSTelemetryBuffer.flush()
+            yield client
+            GPSTelemetryBuffer.flush()
+            db.drop_all()
+
+@pytest.fixture
+def routes(test_client):
+    route_ids = []
+    for i in range(3):
+        route = TransportRoute(origin=f'Depot {i}', destination=f'Warehouse {i}')
+        db.session.add(route)
+        db.session.flush()
+        route_ids.append(route.id)
+    db.session.commit()
+
+    for route_id in route_ids[:2]:
+        LogisticsOrchestrator.lock_freight_escrow(
+            route_id=route_id, driver_id=1, dest_lat=19.0 + route_id,
+            dest_lng=73.0, estimated_distance_km=100
+        )
+    return route_ids
+
+def test_batch_releases_only_routes_inside_fence(routes):
+    first, second, unescrowed = routes
+    pings = [
+        {'route_id': first, 'vehicle_id': 1, 'lat': 19.0 + first + 0.5, 'lng': 73.0},
+        {'route_id': first, 'vehicle_id': 1, 'lat': 19.0 + first + 0.0005, 'lng': 73.0},  # ~55 m
+        {'route_id': first, 'vehicle_id': 1, 'lat': 19.0 + first, 'lng': 73.0},
+        {'route_id': second, 'vehicle_id': 2, 'lat': 19.0 + second + 0.01, 'lng': 73.0},  # ~1.1 km
+        {'route_id': unescrowed, 'vehicle_id': 3, 'lat': 0.0, 'lng': 0.0},
+    ]
+    result = LogisticsOrchestrator.ingest_gps_batch(pings)
+
+    assert result['accepted'] == 5
+    assert [r['route_id'] for r in result['releases']] == [first]
+    assert result['releases'][0]['released'] is True
+
+    released = FreightEscrow.query.filter_by(route_id=first).one()
+    assert released.status == 'RELEASED'
+    assert released.confirmed_delivery_lat == pytest.approx(19.0 + first + 0.0005)
+    assert FreightEscrow.query.filter_by(route_id=second).one().status == 'HELD'
+
+    # Re-entering the fence does not release twice
+    again = LogisticsOrchestrator.ingest_gps_ping(first, 1, 19.0 + first, 73.0)
+    assert again == {'geo_fence_passed': False, 'escrow_released': False}
+
+def test_pings_are_buffered_until_size_flush(routes, monkeypatch):
+    monkeypatch.setattr(GPSTelemetryBuffer, 'MAX_BATCH_SIZE', 10)
+    monkeypatch.setattr(GPSTelemetryBuffer, 'MAX_BUFFER_SECONDS', 3600)
+    pings = [{'route_id': routes[2], 'vehicle_id': 1, 'lat': 10.0, 'lng': 70.0 + i * 0.01} for i in range(6)]
+
+    first = LogisticsOrchestrator.ingest_gps_batch(pings)
+    assert first['flushed'] == 0
+    assert GPSTelemetry.query.count() == 0
+
+    second = LogisticsOrchestrator.ingest_gps_batch(pings)
+    assert second['flushed'] == 12
+    assert GPSTelemetry.query.count() == 12
+    assert GPSTelemetryBuffer.pending_count() == 0
+
+def test_size_flush_leaves_the_callers_session_alone(routes, monkeypatch):
+    monkeypatch.setattr(GPSTelemetryBuffer, 'MAX_BATCH_SIZE', 2)
+    pending_route = TransportRoute(origin='Depot X', destination='Warehouse X')
+    db.session.add(pending_route)
+
+    pings = [{'route_id': routes[2], 'vehicle_id': 1, 'lat': 10.0, 'lng': 70.0 + i * 0.01} for i in range(2)]
+    assert LogisticsOrchestrator.ingest_gps_batch(pings)['flushed'] == 2
+
+    # The caller's unflushed work is neither committed nor rolled back
+    assert pending_route in db.session.new
+    assert GPSTelemetry.query.count() == 2
+    db.session.rollback()
+    assert TransportRoute.query.count() == 3
+
+def test_failed_batch_retries_rows_and_dead_letters_bad_pings(routes):
+    good = [
+        {'route_id': routes[2], 'vehicle_id': 1, 'latitude': 10.0, 'longitude': 70.0 + i * 0.01}
+        for i in range(3)
+    ]
+    bad = {'route_id': None, 'vehicle_id': 1, 'latitude': 10.0, 'longitude': 70.0}
+    GPSTelemetryBuffer._pending = good[:2] + [bad] + good[2:]
+
+    assert GPSTelemetryBuffer.flush() == 3
+    assert GPSTelemetry.query.count() == 3
+    assert GPSTelemetryBuffer.pending_count() == 0
+    assert GPSTelemetryBuffer.dead_letters()[-1] == bad
+
+def test_buffer_drops_oldest_pings_beyond_cap(routes, monkeypatch):
+    monkeypatch.setattr(GPSTelemetryBuffer, 'MAX_PENDING', 5)
+    monkeypatch.setattr(GPSTelemetryBuffer, 'MAX_BUFFER_SECONDS', 3600)
+    dropped_before = GPSTelemetryBuffer.stats()['dropped']
+    pings = [{'route_id': routes[2], 'vehicle_id': 1, 'lat': 10.0, 'lng': 70.0 + i * 0.01} for i in range(8)]
+
+    LogisticsOrchestrator.ingest_gps_batch(pings)
+
+    assert GPSTelemetryBuffer.pending_count() == 5
+    assert GPSTelemetryBuffer.stats()['dropped'] - dropped_before == 3
+    assert GPSTelemetryBuffer.flush() == 5
+    longitudes = sorted(t.longitude for t in GPSTelemetry.query.all())
+    assert longitudes == pytest.approx([70.03, 70.04, 70.05, 70.06, 70.07])
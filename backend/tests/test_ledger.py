@@ -0,0 +1,200 @@
+import pytest
+from app import app
+from backend.extensions import db
+from backend.models import LedgerAccount, LedgerEntry, LedgerTransaction, LedgerBalanceCheckpoint
+from backend.models.ledger import AccountType, EntryType, TransactionType
+from backend.services.ledger_service import LedgerService
+from datetime import datetime
+from decimal import Decimal
+
+@pytest.fixture
+def test_client():
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+            yield client
+            db.drop_all()
+
+@pytest.fixture
+def setup_accounts(test_client):
+    cash = LedgerService.create_account('1000-CASH', 'Cash', AccountType.ASSET)
+    equity = LedgerService.create_account('3000-EQUITY', 'Owner Equity', AccountType.EQUITY)
+    return cash.id, equity.id
+
+def _post(cash_id, equity_id, amount, when):
+    return LedgerService.create_transaction(
+        transaction_type=TransactionType.DEPOSIT,
+        entries=[
+            {'account_id': cash_id, 'entry_type': 'DEBIT', 'amount': amount},
+            {'account_id': equity_id, 'entry_type': 'CREDIT', 'amount': amount}
+        ],
+        entry_date=when
+    )
+
+def test_checkpoints_track_postings(setup_accounts):
+    cash_id, equity_id = setup_accounts
+    _post(cash_id, equity_id, 100, datetime(2024, 1, 1, 9))
+    _post(cash_id, equity_id, 50, datetime(2024, 1, 3, 9))
+    # Backdated posting must roll forward into later checkpoints
+    _post(cash_id, equity_id, 25, datetime(2024, 1, 2, 9))
+
+    cash = LedgerAccount.query.get(cash_id)
+    assert cash.get_balance() == Decimal('175')
+    assert cash.get_balance(datetime(2024, 1, 2, 12)) == Decimal('125')
+    assert cash.get_balance(datetime(2024, 1, 3, 8)) == Decimal('125')
+
+    latest = LedgerBalanceCheckpoint.query.filter_by(account_id=cash_id).order_by(
+        LedgerBalanceCheckpoint.checkpoint_date.desc()
+    ).first()
+    assert latest.entry_count == 3
+    assert LedgerService.verify_balance_checkpoints()['is_consistent']
+
+def test_reversal_updates_checkpoints(setup_accounts):
+    cash_id, equity_id = setup_accounts
+    txn = _post(cash_id, equity_id, 80, datetime(2024, 1, 1, 9))
+    LedgerService.reverse_transaction(txn.id, reason='duplicate')
+
+    assert LedgerAccount.query.get(cash_id).get_balance() == Decimal('0')
+    assert LedgerAccount.query.get(equity_id).get_balance() == Decimal('0')
+    assert LedgerService.verify_balance_checkpoints()['is_consistent']
+
+def test_direct_entries_update_checkpoints(setup_accounts):
+    cash_id, equity_id = setup_accounts
+    txn = _post(cash_id, equity_id, 40, datetime(2024, 1, 1, 9))
+
+    # Entries added straight to the session (as the minting services do) are picked up on flush
+    db.session.add(LedgerEntry(
+        transaction_id=txn.id, account_id=cash_id, entry_type=EntryType.DEBIT,
+        amount=10, currency='USD', base_amount=10, entry_date=datetime(2024, 1, 2, 10)
+    ))
+    db.session.add(LedgerEntry(
+        transaction_id=txn.id, account_id=equity_id, entry_type=EntryType.CREDIT,
+        amount=10, currency='USD', base_amount=10, entry_date=datetime(2024, 1, 2, 10)
+    ))
+    db.session.commit()
+
+    assert LedgerService.verify_balance_checkpoints()['is_consistent']
+    assert LedgerAccount.query.get(cash_id).get_balance() == Decimal('50')
+
+def test_other_sessions_do_not_touch_checkpoints(setup_accounts):
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+    cash_id, equity_id = setup_accounts
+    _post(cash_id, equity_id, 40, datetime(2024, 1, 1, 9))
+    before = LedgerBalanceCheckpoint.query.count()
+
+    # The flush listener belongs to the app's session, not every Session in the process
+    engine = create_engine('sqlite:///:memory:')
+    db.metadata.create_all(engine)
+    with Session(engine) as other:
+        other.add(LedgerEntry(
+            transaction_id=1, account_id=cash_id, entry_type=EntryType.DEBIT,
+            amount=10, currency='USD', base_amount=10, entry_date=datetime(2024, 1, 2, 10)
+        ))
+        other.commit()
+        assert other.query(LedgerBalanceCheckpoint).count() == 0
+
+    assert LedgerBalanceCheckpoint.query.count() == before
+    assert LedgerService.verify_balance_checkpoints()['is_consistent']
+
+def test_first_checkpoint_of_day_tolerates_concurrent_insert(setup_accounts):
+    cash_id, equity_id = setup_accounts
+    _post(cash_id, equity_id, 40, datetime(2024, 1, 1, 9))
+
+    # Another worker created the checkpoint for the day before ours did
+    LedgerService._insert_checkpoints([{
+        'account_id': cash_id, 'checkpoint_date': datetime(2024, 1, 1).date(),
+        'debit_total': 0, 'credit_total': 0, 'entry_count': 0, 'updated_at': datetime.utcnow()
+    }])
+    assert LedgerBalanceCheckpoint.query.filter_by(account_id=cash_id).count() == 1
+
+def test_rebuild_repairs_drift(setup_accounts):
+    cash_id, equity_id = setup_accounts
+    _post(cash_id, equity_id, 40, datetime(2024, 1, 1, 9))
+
+    # Checkpoint edited outside LedgerService
+    LedgerBalanceCheckpoint.query.filter_by(account_id=cash_id).update({'debit_total': 30})
+    db.session.commit()
+
+    report = LedgerService.verify_balance_checkpoints()
+    assert report['mismatch_count'] == 1
+    assert report['mismatches'][0]['account_id'] == cash_id
+
+    LedgerService.rebuild_balance_checkpoints()
+    assert LedgerService.verify_balance_checkpoints()['is_consistent']
+    assert LedgerAccount.query.get(cash_id).get_balance() == Decimal('40')
+
+def test_bulk_posting_single_commit(setup_accounts):
+    cash_id, equity_id = setup_accounts
+    batch = [
+        {
+            'transaction_type': TransactionType.DEPOSIT,
+            'entry_date': datetime(2024, 1, day, 9),
+            'entries': [
+                {'account_id': cash_id, 'entry_type': 'DEBIT', 'amount': 10 * day},
+                {'account_id': equity_id, 'entry_type': 'CREDIT', 'amount': 10 * day}
+            ]
+        }
+        for day in range(1, 6)
+    ]
+    result = LedgerService.create_transactions_bulk(batch)
+
+    assert result['transaction_count'] == 5
+    assert result['entry_count'] == 10
+    assert LedgerTransaction.query.count() == 5
+    assert LedgerAccount.query.get(cash_id).get_balance() == Decimal('150')
+    assert LedgerService.verify_balance_checkpoints()['is_consistent']
+
+def test_bulk_posting_rejects_whole_batch(setup_accounts):
+    cash_id, equity_id = setup_accounts
+    batch = [
+        {
+            'transaction_type': TransactionType.DEPOSIT,
+            'entries': [
+                {'account_id': cash_id, 'entry_type': 'DEBIT', 'amount': 100},
+                {'account_id': equity_id, 'entry_type': 'CREDIT', 'amount': 100}
+            ]
+        },
+        {
+            'transaction_type': TransactionType.DEPOSIT,
+            'entries': [
+                {'account_id': cash_id, 'entry_type': 'DEBIT', 'amount': 100},
+                {'account_id': equity_id, 'entry_type': 'CREDIT', 'amount': 90}
+            ]
+        }
+    ]
+    with pytest.raises(ValueError, match='#1'):
+        LedgerService.create_transactions_bulk(batch)
+
+    assert LedgerTransaction.query.count() == 0
+    assert LedgerEntry.query.count() == 0
+
+def test_trial_balance_rollup_and_currencies(setup_accounts):
+    cash_id, equity_id = setup_accounts
+    petty = LedgerService.create_account('1010-PETTY', 'Petty Cash', AccountType.ASSET, parent_id=cash_id)
+    _post(cash_id, equity_id, 100, datetime(2024, 1, 1, 9))
+    _post(petty.id, equity_id, 20, datetime(2024, 1, 2, 9))
+    LedgerService.create_transaction(
+        transaction_type=TransactionType.DEPOSIT,
+        entries=[
+            {'account_id': cash_id, 'entry_type': 'DEBIT', 'amount': 50, 'currency': 'EUR', 'fx_rate': 1.1},
+            {'account_id': equity_id, 'entry_type': 'CREDIT', 'amount': 55}
+        ],
+        entry_date=datetime(2024, 1, 3, 9)
+    )
+
+    report = LedgerService.get_trial_balance(include_children=True, currency_breakdown=True)
+    assets = {row['account_code']: row for row in report['assets']}
+
+    assert assets['1000-CASH']['balance'] == 150
+    assert assets['1000-CASH']['rolled_up_balance'] == 170
+    assert assets['1000-CASH']['currencies'] == {'EUR': 50, 'USD': 100}
+    assert report['equity'][0]['balance'] == 175
+
+    as_of = LedgerService.get_trial_balance(as_of_date=datetime(2024, 1, 1, 23))
+    assert {row['account_code']: row['balance'] for row in as_of['assets']} == {
+        '1000-CASH': 100, '1010-PETTY': 0
+    }
+    assert LedgerService.get_account_balance(cash_id, include_children=True) == Decimal('170')
@@ -0,0 +1,87 @@
+import threading
+import time
+import pytest
+from app import app
+from backend.services.ai_moderator import ai_moderator
+from backend.services.llm_gateway import LLMGateway, LLMGatewayError, StubLLM, canonical_json
+
+@pytest.fixture
+def stub():
+    app.config['TESTING'] = True
+    LLMGateway.reset()
+    stub = StubLLM()
+    LLMGateway.set_client(stub)
+    yield stub
+    LLMGateway.reset()
+    app.config.pop('LLM_CACHE_TTLS', None)
+
+def loan_prompt(data):
+    return f"Assess this application.\nJSON Data = {canonical_json(data)}"
+
+def test_equivalent_inputs_share_one_cached_call(stub):
+    first = {'loan_type': 'Crop Cultivation', 'land_size': 2.0, 'crops': ['Wheat', 'Paddy']}
+    reordered = {'crops': ['Wheat', '  Paddy'], 'land_size': 2, 'loan_type': 'Crop  Cultivation '}
+
+    a = LLMGateway.generate('loan_eligibility', loan_prompt(first))
+    b = LLMGateway.generate('loan_eligibility', loan_prompt(reordered))
+    assert len(stub.calls) == 1 and not a.cached and b.cached and b.text == a.text
+    assert b.prompt_tokens == a.prompt_tokens > 0
+
+    # Other features and models are cached separately
+    LLMGateway.generate('market_trends', loan_prompt(first))
+    LLMGateway.generate('loan_eligibility', loan_prompt(first), client=StubLLM(model_name='other'))
+    assert len(stub.calls) == 2
+
+    stats = LLMGateway.stats()['loan_eligibility']
+    assert (stats['hit'], stats['miss'], stats['hit_rate']) == (1, 2, 0.3333)
+    assert stats['completion_tokens'] > 0 and stats['latency_p50_ms'] is not None
+
+def test_feature_ttl_from_config(stub):
+    with app.app_context():
+        app.config['LLM_CACHE_TTLS'] = {'knowledge_rerank': 0}
+        assert LLMGateway.ttl_for('loan_eligibility') == 86400
+        LLMGateway.generate('knowledge_rerank', 'order these')
+        LLMGateway.generate('knowledge_rerank', 'order these')
+        assert len(stub.calls) == 2
+
+def test_concurrent_identical_calls_are_coalesced_and_limited(stub, monkeypatch):
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    def slow(prompt):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.1)
+        with lock:
+            active[0] -= 1
+        return f"answer to {prompt}"
+
+    stub.responder = slow
+    monkeypatch.setattr(LLMGateway, 'MAX_CONCURRENCY', 2)
+    prompts = ['same question'] * 6 + [f"question {i}" for i in range(4)]
+    results = []
+    threads = [threading.Thread(target=lambda p=p: results.append(LLMGateway.generate('advice', p))) for p in prompts]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(results) == 10 and len(stub.calls) == 5
+    assert peak[0] == 2
+    assert sum(r.coalesced for r in results if r.text == 'answer to same question') >= 1
+
+def test_failures_are_not_cached(stub):
+    stub.responder = lambda prompt: ''
+    with pytest.raises(LLMGatewayError):
+        LLMGateway.generate('advice', 'empty please')
+    stub.responder = None
+    assert LLMGateway.generate('advice', 'empty please').text.startswith('stub reply')
+    assert LLMGateway.stats()['advice']['error'] == 1
+
+def test_moderator_reuses_verdicts_for_repeated_text(stub):
+    stub.responder = lambda prompt: '{"sentiment": 0.4, "toxicity": 0.0, "is_appropriate": true, "reason": ""}'
+    first = ai_moderator.analyze_sentiment("When should I sow wheat?")
+    second = ai_moderator.analyze_sentiment("When  should I sow wheat?")
+    assert first == second and first['sentiment_score'] == 0.4
+    assert len(stub.calls) == 1
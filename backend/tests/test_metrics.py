@@ -0,0 +1,86 @@
+import os
+import random
+import threading
+from flask import Flask
+from backend.monitoring.metrics import MetricsCollector, QuantileSketch
+
+def test_histogram_buckets_and_quantiles():
+    collector = MetricsCollector()
+    rng = random.Random(1)
+    values = [rng.expovariate(10) for _ in range(20000)]
+    for value in values:
+        collector.observe('latency_seconds', value, labels={'endpoint': 'crop.predict'})
+
+    values.sort()
+    for q in (0.5, 0.9, 0.99):
+        exact = values[int(q * (len(values) - 1))]
+        assert abs(collector.quantile('latency_seconds', q, {'endpoint': 'crop.predict'}) - exact) <= 0.02 * exact
+
+    output = collector.to_prometheus()
+    assert '# TYPE latency_seconds histogram' in output
+    assert 'latency_seconds_bucket{endpoint="crop.predict",le="+Inf"} 20000' in output
+    assert 'latency_seconds_count{endpoint="crop.predict"} 20000' in output
+    assert 'latency_seconds_quantiles{endpoint="crop.predict",quantile="0.99"}' in output
+    assert output.count('# TYPE latency_seconds histogram') == 1
+
+def test_observe_is_thread_safe():
+    collector = MetricsCollector()
+
+    def work():
+        for _ in range(5000):
+            collector.observe('op_seconds', 0.01)
+            collector.increment('ops_total')
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert collector.counters[('ops_total', ())] == 40000
+    assert collector.histograms[('op_seconds', ())].count == 40000
+
+def test_request_hooks_label_by_endpoint():
+    app = Flask(__name__)
+    collector = MetricsCollector()
+    collector.init_app(app)
+
+    @app.route('/ping')
+    def ping():
+        return 'pong'
+
+    client = app.test_client()
+    for _ in range(3):
+        client.get('/ping')
+    client.get('/missing')
+
+    output = collector.to_prometheus()
+    assert 'agritech_http_requests_total{endpoint="ping",method="GET",status="200"} 3' in output
+    assert 'agritech_http_requests_total{endpoint="unmatched",method="GET",status="404"} 1' in output
+    assert 'agritech_http_request_duration_seconds_count{endpoint="ping",method="GET"} 3' in output
+
+def test_multiprocess_snapshots_are_merged(tmp_path):
+    worker = MetricsCollector(multiproc_dir=str(tmp_path))
+    exporter = MetricsCollector(multiproc_dir=str(tmp_path))
+
+    worker.increment('jobs_total', 2)
+    worker.observe('job_seconds', 0.2)
+    # Both collectors live in this process, so file the worker snapshot under another pid
+    worker.write_snapshot()
+    (tmp_path / f'metrics_{os.getpid()}.json').rename(tmp_path / 'metrics_999999.json')
+
+    exporter.increment('jobs_total', 3)
+    exporter.observe('job_seconds', 0.4)
+    output = exporter.to_prometheus()
+
+    assert 'jobs_total 5' in output
+    assert 'job_seconds_count 2' in output
+
+def test_sketch_merge_matches_single_stream():
+    a, b, combined = QuantileSketch(), QuantileSketch(), QuantileSketch()
+    for i in range(1, 1001):
+        (a if i % 2 else b).observe(i / 1000)
+        combined.observe(i / 1000)
+    a.merge(b)
+    assert a.count == combined.count
+    assert a.quantile(0.9) == combined.quantile(0.9)
@@ -0,0 +1,83 @@
+import os
+import threading
+import time
+import joblib
+import numpy as np
+import pytest
+from backend.monitoring import health_checker
+from backend.services.model_registry import ModelRegistry
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    monkeypatch.setattr(ModelRegistry, '_specs', {})
+    monkeypatch.setattr(ModelRegistry, '_loaded', {})
+    monkeypatch.setattr(ModelRegistry, '_load_locks', {})
+    monkeypatch.setattr(ModelRegistry, 'RELOAD_CHECK_SECONDS', 0.0)
+    return tmp_path
+
+def save(path, weights):
+    # Write then rename, the way model files are meant to be deployed
+    joblib.dump({'weights': np.asarray(weights, dtype=np.float64)}, str(path) + '.tmp')
+    os.replace(str(path) + '.tmp', path)
+
+def test_memory_mapped_load_and_hot_reload(registry):
+    path = registry / 'model.pkl'
+    save(path, np.arange(1000))
+    ModelRegistry.register('toy', str(path))
+
+    model = ModelRegistry.get('toy')
+    assert isinstance(model['weights'], np.memmap)
+    assert ModelRegistry.get('toy') is model
+    version = ModelRegistry.status()['toy']['version']
+
+    # Same content under a new mtime: hashed, not reloaded
+    save(path, np.arange(1000))
+    assert ModelRegistry.get('toy') is model and ModelRegistry.reload() == []
+
+    save(path, np.arange(1000) * 2)
+    reloaded = ModelRegistry.get('toy')
+    assert reloaded is not model and reloaded['weights'][1] == 2.0
+    assert ModelRegistry.status()['toy']['version'] != version
+    assert ModelRegistry.reload('toy', force=True) == ['toy']
+
+def test_concurrent_first_use_loads_once(registry):
+    path = registry / 'slow.pkl'
+    save(path, [1.0])
+    loads = []
+
+    def slow_loader(p):
+        loads.append(p)
+        time.sleep(0.05)
+        return joblib.load(p)
+
+    ModelRegistry.register('slow', str(path), loader=slow_loader)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(ModelRegistry.get('slow'))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(loads) == 1 and all(r is results[0] for r in results)
+
+def test_warm_policy_metrics_and_health(registry, monkeypatch):
+    save(registry / 'a.pkl', [1.0])
+    ModelRegistry.register('eager', str(registry / 'a.pkl'), preload=True)
+    ModelRegistry.register('lazy', str(registry / 'a.pkl'))
+    ModelRegistry.register('absent', str(registry / 'missing.pkl'), required=True)
+
+    assert ModelRegistry.warm() == {'eager': True}
+    monkeypatch.setenv('ML_MODEL_LOAD_POLICY', 'preload')
+    assert ModelRegistry.warm() == {'eager': True, 'lazy': True, 'absent': False}
+    assert ModelRegistry.get('absent') is None
+
+    with ModelRegistry.track_inference('eager', rows=4):
+        ModelRegistry.get('eager')['weights'].sum()
+    status = ModelRegistry.status()['eager']
+    assert status['inferences'] == 1 and status['rows'] == 4
+    assert status['load_ms'] >= 0 and status['latency_p50_ms'] is not None
+
+    check = health_checker.check_ml_models()
+    assert check['status'] == 'degraded' and 'absent' in check['message']
+    with pytest.raises(KeyError):
+        ModelRegistry.get('unknown')
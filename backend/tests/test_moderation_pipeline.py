@@ -0,0 +1,143 @@
+import json
+import re
+import pytest
+from app import app
+from backend.extensions import db
+from backend.models import User, ForumCategory, ForumThread, PostComment
+from backend.services.ai_moderator import ai_moderator
+from backend.services.forum_service import forum_service
+from backend.services.llm_gateway import LLMGateway, StubLLM
+from backend.services.moderation_pipeline import ModerationPipeline, LocalScreen, content_hash
+from backend.tasks.forum_tasks import moderate_pending_posts_task
+from unittest.mock import patch
+
+def fake_batch_response(prompt):
+    """StubLLM responder: flags posts that call someone an idiot."""
+    posts = re.findall(r'^\s*\[(\d+)\] (".*")$', prompt, re.M)
+    verdicts = [{'id': int(i), 'sentiment': 0.1, 'toxicity': 0.9 if 'idiot' in text else 0.05,
+                 'is_appropriate': 'idiot' not in text, 'reason': 'Insult' if 'idiot' in text else ''}
+                for i, text in posts]
+    return json.dumps(verdicts)
+
+@pytest.fixture
+def forum():
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    ModerationPipeline.clear_cache()
+    LocalScreen.reset()
+    LLMGateway.reset()
+    model = StubLLM(responder=fake_batch_response)
+    LLMGateway.set_client(model)
+    with app.app_context():
+        db.create_all()
+        user = User(username='mod', email='mod@test.com')
+        user.password_hash = 'x'
+        category = ForumCategory(name='General', description='General')
+        db.session.add_all([user, category])
+        db.session.commit()
+        thread = ForumThread(user_id=user.id, category_id=category.id, title='Paddy',
+                             content='Transplanting paddy', sentiment_score=0.0)
+        db.session.add(thread)
+        db.session.commit()
+        approved = {'sentiment_score': 0.2, 'toxicity_score': 0.0, 'is_approved': True, 'moderation_reason': ''}
+        with patch('backend.services.ai_moderator.AIModerator.analyze_sentiment', return_value=approved) as single:
+            yield user.id, thread.id, model, single
+        db.drop_all()
+    LLMGateway.reset()
+    app.config.pop('MODERATION_ASYNC', None)
+
+def add_comments(user_id, thread_id, texts):
+    comments = [PostComment(user_id=user_id, thread_id=thread_id, content=t) for t in texts]
+    db.session.add_all(comments)
+    db.session.commit()
+    return comments
+
+def test_pending_posts_are_deduplicated_and_batched(forum):
+    user_id, thread_id, model, single = forum
+    texts = [f"Seed rate for wheat plot {i}?" for i in range(11)] + ["You are an idiot"]
+    duplicates = ["seed RATE for wheat plot 0", "You are an IDIOT!!"]
+    comments = add_comments(user_id, thread_id, texts + duplicates)
+
+    result = moderate_pending_posts_task.run()
+
+    # 12 unique texts: one prompt of 10 and one of 2, instead of 14 calls
+    assert result['status'] == 'success' and result['moderated'] == 14
+    assert len(model.calls) == 2 and single.call_count == 0
+    assert result['llm_calls'] == 2 and result['llm_calls_saved'] == 12
+    flagged = {c.content for c in comments if c.is_flagged}
+    assert flagged == {"You are an idiot", "You are an IDIOT!!"}
+    assert all(c.sentiment_score is not None for c in comments)
+
+    # Same texts again are answered from the verdict cache
+    add_comments(user_id, thread_id, ["Seed rate for wheat plot 3?", "you are an idiot"])
+    again = ModerationPipeline.moderate_pending()
+    assert again['moderated'] == 2 and again['llm_calls'] == 0 and again['flagged'] == 1
+    assert ModerationPipeline.stats()['duplicates'] >= 2
+
+def test_rule_matches_are_flagged_without_llm(forum):
+    user_id, _, model, single = forum
+    category_id = ForumCategory.query.first().id
+
+    thread, error = forum_service.create_thread(
+        user_id, category_id, "Earn daily", "Guaranteed returns on urea trading, WhatsApp me at +91 98765 43210"
+    )
+
+    assert error is None and thread.is_flagged and not thread.is_ai_approved
+    assert thread.flag_reason == "AI Auto-flagged: Scam: guaranteed returns"
+    assert len(model.calls) == 0 and single.call_count == 0
+
+def test_async_mode_defers_to_celery_task(forum):
+    user_id, _, _, single = forum
+    category_id = ForumCategory.query.first().id
+    app.config['MODERATION_ASYNC'] = True
+
+    with patch.object(ModerationPipeline, '_schedule', return_value=True) as schedule:
+        thread, _ = forum_service.create_thread(user_id, category_id, "Drip kit", "Which drip kit for chilli?")
+    assert schedule.called and thread.sentiment_score is None and single.call_count == 0
+
+    assert moderate_pending_posts_task.run()['moderated'] == 1
+    assert single.call_count == 1 and thread.sentiment_score == 0.2
+
+def test_auto_answer_is_posted_once_per_thread(forum):
+    user_id, thread_id, _, _ = forum
+    thread = db.session.get(ForumThread, thread_id)
+    answer = {'content': 'Transplant 25 day old seedlings', 'confidence': 0.85}
+
+    with patch.object(ModerationPipeline, '_is_faq', return_value=True), \
+         patch.object(ai_moderator, 'generate_auto_answer', return_value=answer):
+        ModerationPipeline.moderate_posts([thread])
+        again = ModerationPipeline.moderate_posts([thread])
+
+    assert again['auto_answers'] == 0
+    assert PostComment.query.filter_by(thread_id=thread_id, is_ai_generated=True).count() == 1
+
+def test_trained_classifier_approves_clear_cases_locally(forum, monkeypatch):
+    monkeypatch.setattr(LocalScreen, 'MIN_TRAINING_LABELS', 40)
+    benign = [f"Best time to sow mustard in field {i}" for i in range(30)]
+    toxic = [f"You stupid idiot number {i}" for i in range(10)]
+    for _ in range(5):
+        LocalScreen.learn(benign + toxic, [False] * 30 + [True] * 10)
+
+    verdicts = LocalScreen.screen(["Best time to sow mustard in my field", "You stupid idiot"])
+    assert verdicts[0]['is_approved'] is True
+    assert verdicts[1] is None  # left to the LLM
+    assert content_hash("Hello,  World!") == content_hash("hello world")
+
+def test_llm_outage_leaves_posts_for_the_next_run(forum):
+    user_id, thread_id, model, single = forum
+    comments = add_comments(user_id, thread_id, ["Urea dose for maize?", "Neem oil for aphids?"])
+
+    def outage(prompt):
+        raise RuntimeError("quota exceeded")
+    model.responder = outage
+    result = ModerationPipeline.moderate_pending()
+
+    # One failed batch call, no per-post retries, nothing cached or learned
+    assert len(model.calls) == 1 and single.call_count == 0
+    assert result['moderated'] == 0 and result['flagged'] == 0
+    assert all(c.sentiment_score is None for c in comments)
+    assert ModerationPipeline.stats()['local_cache_size'] == 0 and LocalScreen._labels_seen == 0
+
+    model.responder = fake_batch_response
+    assert ModerationPipeline.moderate_pending()['moderated'] == 2
+    assert all(c.sentiment_score is not None for c in comments)
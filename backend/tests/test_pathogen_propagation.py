@@ -0,0 +1,130 @@
+import pytest
+from app import app
+from backend.extensions import db, socketio
+from backend.models import Alert
+from backend.models.gews import OutbreakZone, OutbreakProjection
+from backend.models.weather import WeatherData
+from backend.services.pathogen_service import PathogenPropagationService
+from backend.tasks import pathogen_tasks
+from datetime import datetime, timedelta
+
+@pytest.fixture
+def zones(monkeypatch):
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    emitted = []
+    monkeypatch.setattr(socketio, 'emit', lambda event, payload, **kwargs: emitted.append((event, payload)))
+    with app.app_context():
+        db.create_all()
+        zones = [
+            OutbreakZone(zone_id='Z-RUST', disease_name='Wheat rust', crop_affected='wheat', severity_level='medium',
+                         center_latitude=30.0, center_longitude=75.0, radius_km=4.0, soil_connectivity_score=0.5),
+            OutbreakZone(zone_id='Z-BLAST', disease_name='Rice blast', crop_affected='rice', severity_level='critical',
+                         center_latitude=20.0, center_longitude=85.0, radius_km=2.0, soil_connectivity_score=0.2),
+            OutbreakZone(zone_id='Z-OLD', disease_name='Blight', crop_affected='potato', status='contained',
+                         center_latitude=25.0, center_longitude=80.0, radius_km=1.0),
+        ]
+        db.session.add_all(zones)
+        db.session.add_all([
+            WeatherData(location='30.0,75.0', wind_speed=10.0, wind_direction=270.0, humidity=80.0,
+                        timestamp=datetime.utcnow() - timedelta(hours=2)),
+            WeatherData(location='30.0,75.0', wind_speed=20.0, wind_direction=270.0, humidity=60.0,
+                        timestamp=datetime.utcnow() - timedelta(minutes=10)),
+            WeatherData(location='20.0,85.0', wind_speed=30.0, wind_direction=0.0, humidity=90.0,
+                        timestamp=datetime.utcnow() - timedelta(days=2)),
+        ])
+        db.session.commit()
+        yield zones, emitted
+        db.drop_all()
+
+def test_batch_matches_model_and_upserts_projections(zones):
+    (rust, blast, _), emitted = zones
+    summary = PathogenPropagationService.simulate_batch()
+    assert summary['checked'] == 2 and summary['simulated'] == 2
+
+    # Latest weather wins; stale weather falls back to the defaults
+    assert rust.propagation_velocity == pytest.approx(20.0 * 0.2 * 1.6)
+    assert rust.transmission_radius == pytest.approx(2.0 * 1.5)
+    assert blast.propagation_velocity == pytest.approx(5.0 * 0.2 * 1.5)
+    assert blast.containment_status == 'ACCESS_RESTRICTED'
+    assert rust.containment_status == 'IRRIGATION_LOCKDOWN'
+    assert Alert.query.count() == 2 and summary['containment_changes'] == 2
+
+    # Wind from the west carries the rust east: 6.4 km/day
+    projections = OutbreakProjection.query.filter_by(outbreak_zone_id=rust.id).order_by(OutbreakProjection.horizon_hours).all()
+    assert [p.horizon_hours for p in projections] == [24, 48, 72]
+    assert projections[0].projected_latitude == pytest.approx(30.0)
+    assert projections[2].projected_longitude == pytest.approx(75.0 + 19.2 / (111.0 * 0.8660254), rel=1e-6)
+    assert projections[2].expected_radius == pytest.approx(4.0 + 9.6)
+    assert [p.confidence_score for p in projections] == pytest.approx([0.8, 0.6, 0.4])
+    assert [event for event, _ in emitted if event == 'pathogen_update'] == ['pathogen_update'] * 2
+
+    # Second run with the same inputs touches nothing
+    ids = [p.id for p in projections]
+    assert PathogenPropagationService.simulate_batch()['simulated'] == 0
+
+    # New weather for one zone: only that zone is re-simulated, rows updated in place
+    db.session.add(WeatherData(location='30.0,75.0', wind_speed=5.0, wind_direction=90.0, humidity=50.0))
+    db.session.commit()
+    summary = PathogenPropagationService.simulate_batch()
+    assert summary['simulated'] == 1 and summary['zones'][0]['zone_id'] == 'Z-RUST'
+    rows = OutbreakProjection.query.filter_by(outbreak_zone_id=rust.id).order_by(OutbreakProjection.horizon_hours)
+    assert [p.id for p in rows] == ids
+    assert OutbreakProjection.query.count() == 6 and Alert.query.count() == 2
+
+def test_run_fans_out_large_batches(zones, monkeypatch):
+    dispatched = []
+    monkeypatch.setattr(pathogen_tasks, 'PROPAGATION_CHUNK_SIZE', 1)
+    monkeypatch.setattr(pathogen_tasks.pathogen_propagation_chunk, 'apply_async',
+                        lambda args, **kwargs: dispatched.append(args))
+
+    result = pathogen_tasks.pathogen_propagation_run.run()
+    assert result == {'status': 'dispatched', 'active_zones': 2, 'chunks': 2}
+    assert dispatched == [[[zones[0][0].id], False], [[zones[0][1].id], False]]
+
+    assert pathogen_tasks.pathogen_propagation_chunk.run(*dispatched[0])['processed_zones'] == 1
+
+def test_scheduled_run_refreshes_stale_weather(zones, monkeypatch):
+    from backend.utils.weather_api_client import WeatherAPIClient
+    (rust, blast, _), _ = zones
+    requested = []
+
+    def fake_many(self, locations, **kwargs):
+        requested.extend(locations)
+        return {loc: {'main': {'temp': 25.0, 'humidity': 40.0}, 'wind': {'speed': 15.0, 'deg': 180.0},
+                      'weather': [{'main': 'Clear'}]} for loc in locations}
+
+    monkeypatch.setattr(WeatherAPIClient, 'get_current_weather_many', fake_many)
+    result = pathogen_tasks.pathogen_propagation_run.run()
+
+    # Only the blast zone's two-day-old weather is refetched and used
+    assert result['processed_zones'] == 2
+    assert requested == ['20.0,85.0']
+    assert blast.propagation_velocity == pytest.approx(15.0 * 0.2 * 1.4)
+    assert rust.propagation_velocity == pytest.approx(20.0 * 0.2 * 1.6)
+
+def test_refresh_fetches_stale_centre_sharing_a_cached_cell(zones, monkeypatch):
+    from backend.services.weather_cache import WeatherCache
+    from backend.utils.weather_api_client import WeatherAPIClient
+    (rust, _, _), _ = zones
+    neighbour = OutbreakZone(zone_id='Z-NEAR', disease_name='Wheat rust', crop_affected='wheat',
+                             center_latitude=30.001, center_longitude=75.001, radius_km=1.0)
+    db.session.add(neighbour)
+    db.session.commit()
+    assert WeatherCache.key_for('30.001,75.001') == WeatherCache.key_for('30.0,75.0')
+    WeatherCache.put('30.0,75.0', WeatherData.query.order_by(WeatherData.timestamp.desc()).first().id)
+
+    def fake_many(self, locations, **kwargs):
+        return {loc: {'main': {'temp': 25.0, 'humidity': 40.0}, 'wind': {'speed': 15.0, 'deg': 180.0},
+                      'weather': [{'main': 'Clear'}]} for loc in locations}
+
+    monkeypatch.setattr(WeatherAPIClient, 'get_current_weather_many', fake_many)
+    try:
+        summary = PathogenPropagationService.refresh_weather([rust.id, neighbour.id])
+    finally:
+        WeatherCache.invalidate()
+
+    # The neighbour gets a row under its own location despite the cached cell
+    assert summary['fetched'] == 1
+    latest = PathogenPropagationService._latest_weather({'30.0,75.0', '30.001,75.001'}, datetime.utcnow() - timedelta(hours=1))
+    assert set(latest) == {'30.0,75.0', '30.001,75.001'}
@@ -0,0 +1,94 @@
+import pytest
+from app import app
+from backend.extensions import db
+from backend.models import User, ForumCategory, ForumThread
+from backend.services.forum_service import forum_service
+from backend.services.knowledge_service import KnowledgeService
+from backend.services.search_index import search_index, analyze, SQLiteFTSBackend, PythonSearchBackend
+from unittest.mock import patch
+
+APPROVED = {'sentiment_score': 0.2, 'toxicity_score': 0.0, 'is_approved': True, 'moderation_reason': ''}
+
+@pytest.fixture(params=['auto', 'python'])
+def forum(request):
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['SEARCH_BACKEND'] = request.param
+    with app.app_context():
+        db.create_all()
+        user = User(username='searcher', email='s@test.com')
+        user.password_hash = 'x'
+        category = ForumCategory(name='Crops', description='Crop talk')
+        db.session.add_all([user, category])
+        db.session.commit()
+        with patch('backend.services.ai_moderator.AIModerator.analyze_sentiment', return_value=APPROVED), \
+             patch('backend.services.ai_moderator.AIModerator.generate_auto_answer', return_value=None):
+            yield user.id, category.id
+        db.drop_all()
+    app.config.pop('SEARCH_BACKEND', None)
+
+def test_analyzer():
+    assert analyze("The Irrigating of irrigated fields") == ["irrigat", "irrigat", "field"]
+    assert analyze("Diseases harvesting PESTS") == analyze("disease harvested pest")
+    assert analyze("how to and the") == []
+
+def test_thread_search_ranks_and_rolls_up_comments(forum):
+    user_id, category_id = forum
+    pests, _ = forum_service.create_thread(user_id, category_id, "Wheat pests in spring", "Aphids on wheat leaves",
+                                           tags=["pests", "wheat"])
+    soil, _ = forum_service.create_thread(user_id, category_id, "Soil testing", "Which lab for pH tests?", tags=["soil"])
+    forum_service.create_comment(user_id, soil.id, "My wheat field soil was acidic")
+    rice, _ = forum_service.create_thread(user_id, category_id, "Rice harvest", "When to cut paddy", tags=["rice"])
+
+    expected = SQLiteFTSBackend if app.config['SEARCH_BACKEND'] == 'auto' else PythonSearchBackend
+    results, error = forum_service.search_threads(query="wheat")
+    assert error is None
+    assert isinstance(search_index.backend(), expected)
+    assert [r['id'] for r in results] == [pests.id, soil.id]
+
+    # Index keeps up with content written after the table was created
+    later, _ = forum_service.create_thread(user_id, category_id, "Harvesting sorghum", "Sorghum harvested early",
+                                           tags=["sorghum"])
+    results, _ = forum_service.search_threads(query="harvests")
+    assert {r['id'] for r in results} == {later.id, rice.id}
+
+    results, _ = forum_service.search_threads(tags=["soil"])
+    assert [r['id'] for r in results] == [soil.id]
+    results, _ = forum_service.search_threads(query="wheat", tags=["pests"], sort_by='recent')
+    assert [r['id'] for r in results] == [pests.id]
+    assert forum_service.search_threads(query="barley")[0] == []
+
+def test_knowledge_questions_match_answers(forum):
+    user_id, _ = forum
+    locusts, _ = KnowledgeService.create_question(user_id, "How to stop locusts?", "Swarms in my field", "Pests")
+    neem, _ = KnowledgeService.create_question(user_id, "Organic sprays", "Is neem oil safe for bees?", "Pests")
+    KnowledgeService.add_answer(locusts.id, user_id, "Spray neem extract at dawn")
+
+    assert [q.id for q in KnowledgeService.get_questions(search="neem", sort='relevance')] == [neem.id, locusts.id]
+    assert [q.id for q in KnowledgeService.get_questions(search="locust")] == [locusts.id]
+    assert KnowledgeService.get_questions(search="fertilizer") == []
+
+    assert search_index.rebuild() == 3
+    assert {q.id for q in KnowledgeService.get_questions(search="spray")} == {neem.id, locusts.id}
+
+def test_python_index_only_applies_committed_documents(forum):
+    user_id, category_id = forum
+    if app.config['SEARCH_BACKEND'] != 'python':
+        pytest.skip('database backends roll back with the transaction')
+    assert search_index.search("millet") == []
+
+    def add_thread(title):
+        thread = ForumThread(user_id=user_id, category_id=category_id, title=title, content='Sowing notes')
+        db.session.add(thread)
+        db.session.flush()
+        search_index.index_thread(thread)
+        return thread
+
+    add_thread("Millet spacing")
+    assert search_index.search("millet") == []
+    db.session.rollback()
+    assert search_index.search("millet") == []
+
+    kept = add_thread("Millet seed rate")
+    db.session.commit()
+    assert [hit.doc_id for hit in search_index.search("millet")] == [kept.id]
@@ -0,0 +1,112 @@
+import pytest
+from app import app
+from backend.extensions import db
+from backend.models import User, ForumCategory, ForumThread
+from backend.services.ai_moderator import ai_moderator
+from backend.services.knowledge_service import KnowledgeService
+from backend.services.llm_gateway import LLMGateway, StubLLM
+from backend.services.semantic_index import semantic_index, SemanticIndex
+
+TOPICS = [
+    ("Drip irrigation for sugarcane", "Drip lines save water on sugarcane fields in summer"),
+    ("Locust swarm control", "Neem spray and early warning for locust swarms"),
+    ("Wheat rust disease", "Yellow rust spots on wheat leaves after rain"),
+    ("Tractor loan subsidy", "Which bank gives a subsidy on tractor loans?"),
+    ("Soil pH correction", "Lime application for acidic soil before sowing"),
+]
+
+@pytest.fixture
+def knowledge():
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    with app.app_context():
+        db.create_all()
+        user = User(username='grower', email='g@test.com')
+        user.password_hash = 'x'
+        category = ForumCategory(name='General', description='General')
+        db.session.add_all([user, category])
+        db.session.commit()
+        threads = [ForumThread(user_id=user.id, category_id=category.id, title=title, content=content)
+                   for title, content in TOPICS]
+        db.session.add_all(threads)
+        db.session.commit()
+        yield user.id, threads
+        db.drop_all()
+
+def test_search_ranks_by_cosine_and_skips_unapproved(knowledge):
+    _, threads = knowledge
+    hits = semantic_index.search("how do I stop locusts swarming", limit=3)
+    assert hits[0].doc_id == threads[1].id
+    assert 0 < hits[0].score <= 1
+    assert semantic_index.search("cryptocurrency", limit=3) == []
+
+    # Rejected after approval: removed without a rebuild
+    threads[2].is_ai_approved = False
+    semantic_index.update_thread(threads[2])
+    assert threads[2].id not in [h.doc_id for h in semantic_index.search("wheat rust", limit=5)]
+
+def test_catchup_drops_threads_rejected_elsewhere(knowledge, monkeypatch):
+    _, threads = knowledge
+    assert semantic_index.search("locust swarms", limit=1)[0].doc_id == threads[1].id
+
+    # Flagged by another process: this index never sees update_thread
+    db.session.execute(db.update(ForumThread).where(ForumThread.id == threads[1].id).values(is_ai_approved=False))
+    db.session.commit()
+    monkeypatch.setattr(SemanticIndex, 'CATCHUP_SECONDS', 0)
+    assert threads[1].id not in [h.doc_id for h in semantic_index.search("locust swarms", limit=5)]
+
+    db.session.execute(db.update(ForumThread).where(ForumThread.id == threads[1].id).values(is_ai_approved=True))
+    db.session.commit()
+    assert semantic_index.search("locust swarms", limit=1)[0].doc_id == threads[1].id
+
+def test_answers_are_indexed_incrementally(knowledge):
+    user_id, threads = knowledge
+    assert semantic_index.search("mulching tomatoes", limit=3) == []
+
+    question, _ = KnowledgeService.create_question(user_id, "Tomato plants wilting", "Leaves droop at noon", "Crops")
+    answer, _ = KnowledgeService.add_answer(question.id, user_id, "Mulching tomatoes keeps roots cool and moist")
+
+    hit = semantic_index.search("mulching tomatoes", limit=3)[0]
+    assert (hit.doc_type, hit.doc_id, hit.parent_id) == ('answer', answer.id, question.id)
+    assert semantic_index.stats()['documents'] == len(threads) + 1
+
+def test_approximate_mode_matches_exact_top_hit(knowledge, monkeypatch):
+    user_id, threads = knowledge
+    monkeypatch.setattr(SemanticIndex, 'APPROXIMATE_CANDIDATES', 3)
+    filler = [ForumThread(user_id=user_id, category_id=threads[0].category_id, title=f"Market update {i}",
+                          content=f"Mandi prices for onion and potato, week {i}") for i in range(40)]
+    db.session.add_all(filler)
+    db.session.commit()
+    semantic_index.rebuild()
+
+    exact = semantic_index.search("acidic soil lime", limit=1, approximate=False)
+    approximate = semantic_index.search("acidic soil lime", limit=1, approximate=True)
+    assert exact == approximate and exact[0].doc_id == threads[4].id
+
+def test_approximate_mode_skips_removed_documents(knowledge, monkeypatch):
+    user_id, threads = knowledge
+    monkeypatch.setattr(SemanticIndex, 'APPROXIMATE_CANDIDATES', 3)
+    semantic_index.rebuild()
+    for thread in threads[:4]:
+        thread.is_ai_approved = False
+        semantic_index.update_thread(thread)
+
+    hits = semantic_index.search("locust wheat tractor soil", limit=5, approximate=True)
+    assert [h.doc_id for h in hits] == [threads[4].id]
+
+def test_llm_only_reorders_local_candidates(knowledge):
+    _, threads = knowledge
+    model = StubLLM(responder=lambda prompt: "[1, 0]")
+    LLMGateway.reset()
+    LLMGateway.set_client(model)
+    try:
+        results = ai_moderator.search_knowledge_base("subsidy for tractor and drip irrigation", limit=2)
+        assert len(model.calls) == 1
+        assert [r['thread_id'] for r in results] == [threads[0].id, threads[3].id]
+        assert all(r['type'] == 'thread' for r in results)
+
+        local = ai_moderator.search_knowledge_base("subsidy for tractor and drip irrigation", limit=2, rerank=False)
+        assert len(model.calls) == 1
+    finally:
+        LLMGateway.reset()
+    assert [r['thread_id'] for r in local] == [threads[3].id, threads[0].id]
@@ -0,0 +1,67 @@
+import numpy as np
+from backend.utils.spatial_index import (
+    GeoGridIndex, bounding_box, dbscan_haversine, geohash, geohash_center, group_by_label,
+    haversine_km, wkt_centroid
+)
+
+def test_haversine_matches_known_distance():
+    # Delhi -> Mumbai is roughly 1150 km
+    distance = haversine_km(28.6139, 77.2090, 19.0760, 72.8777)
+    assert 1140 < float(distance) < 1160
+
+    matrix = haversine_km(np.array([[0.0], [1.0]]), 0.0, np.array([[0.0, 1.0]]), 0.0)
+    assert matrix.shape == (2, 2)
+    assert np.allclose(np.diag(matrix), 0.0)
+
+def test_dbscan_expands_transitively_without_double_counting():
+    # A chain of points 30 km apart: no point sees both ends within 50 km,
+    # but the chain is density-connected and must form a single cluster.
+    step = 30 / 111.195
+    lats = [20.0 + i * step for i in range(6)] + [10.0]
+    lons = [78.0] * 6 + [70.0]
+
+    labels = dbscan_haversine(lats, lons, radius_km=50, min_samples=3)
+    clusters = group_by_label(labels)
+
+    assert len(clusters) == 1
+    assert sorted(clusters[0].tolist()) == list(range(6))
+    assert labels[6] == -1
+
+def test_dbscan_matches_brute_force_core_points():
+    rng = np.random.default_rng(7)
+    lats = rng.uniform(10, 30, 400)
+    lons = rng.uniform(70, 90, 400)
+
+    labels = dbscan_haversine(lats, lons, radius_km=80, min_samples=4)
+
+    distances = haversine_km(lats[:, None], lons[:, None], lats[None, :], lons[None, :])
+    core = (distances <= 80).sum(axis=1) >= 4
+    assert np.all(labels[core] >= 0)
+    # Core points within radius of each other share a cluster
+    i, j = np.nonzero((distances <= 80) & core[:, None] & core[None, :])
+    assert np.all(labels[i] == labels[j])
+
+def test_grid_query_and_bounding_box_cover_radius():
+    rng = np.random.default_rng(3)
+    lats = rng.uniform(-60, 60, 2000)
+    lons = rng.uniform(-170, 170, 2000)
+    index = GeoGridIndex(lats, lons, cell_km=300)
+
+    found, distances = index.query_radius(45.0, 10.0, 300)
+    expected = np.nonzero(haversine_km(45.0, 10.0, lats, lons) <= 300)[0]
+    assert found.tolist() == expected.tolist()
+    assert np.all(distances <= 300)
+
+    min_lat, max_lat, min_lon, max_lon = bounding_box(45.0, 10.0, 300)
+    assert np.all((lats[expected] >= min_lat) & (lats[expected] <= max_lat))
+    assert np.all((lons[expected] >= min_lon) & (lons[expected] <= max_lon))
+
+def test_cell_centroids_from_geohash_and_wkt():
+    lat, lon = geohash_center(geohash(28.6139, 77.2090, precision=7))
+    assert abs(lat - 28.6139) < 0.001 and abs(lon - 77.2090) < 0.001
+    assert geohash_center('GRID-7') is None
+
+    # WKT is lon/lat; the repeated closing vertex is not double-counted
+    assert wkt_centroid('POLYGON((77 28, 78 28, 78 29, 77 29, 77 28))') == (28.5, 77.5)
+    assert wkt_centroid('POINT(-73.9857 40.7484)') == (40.7484, -73.9857)
+    assert wkt_centroid('POLYGON EMPTY') is None
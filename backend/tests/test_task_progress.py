@@ -0,0 +1,92 @@
+import threading
+import time
+import jwt
+import pytest
+from app import app
+from backend.celery_app import celery_app
+from backend.extensions import socketio
+from backend.services.task_progress import TaskProgressHub, report_progress
+from backend.sockets import task_events
+
+@celery_app.task(bind=True, name='tests.progress_steps')
+def progress_steps(self, steps):
+    for step in range(1, steps + 1):
+        report_progress(self, step, steps, message=f"step {step}")
+    return {'steps': steps}
+
+@pytest.fixture
+def hub(monkeypatch):
+    app.config['TESTING'] = True
+    monkeypatch.setattr(TaskProgressHub, '_client', classmethod(lambda cls: None))
+    monkeypatch.setattr(TaskProgressHub, 'PROGRESS_INTERVAL_SECONDS', 0.0)
+    TaskProgressHub.clear()
+    yield TaskProgressHub
+    TaskProgressHub.clear()
+
+@pytest.fixture
+def client(hub):
+    token = jwt.encode({'uid': 'u1'}, 'agritech_secret_key', algorithm='HS256')
+    client = app.test_client()
+    client.environ_base['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+    return client
+
+def test_task_signals_publish_transitions_and_progress(hub):
+    events = []
+    hub.add_listener(events.append)
+    try:
+        result = progress_steps.apply(args=(4,))
+    finally:
+        hub.remove_listener(events.append)
+
+    mine = [e for e in events if e['task_id'] == result.id]
+    assert [e['state'] for e in mine] == ['STARTED'] + ['PROGRESS'] * 4 + ['SUCCESS']
+    assert [e['progress'] for e in mine if e['state'] == 'PROGRESS'] == [25.0, 50.0, 75.0, 100.0]
+    state = hub.snapshot([result.id])[result.id]
+    assert state['status'] == 'completed' and state['result'] == {'steps': 4}
+
+def test_long_poll_waits_for_any_watched_task(client, hub):
+    hub.publish('a', 'STARTED')
+    hub.publish('b', 'STARTED')
+
+    first = client.get('/api/v1/tasks/updates?task_ids=a,b,c&since=0').get_json()
+    assert first['summary']['counts'] == {'processing': 2, 'pending': 1}
+    assert not first['summary']['done']
+
+    threading.Timer(0.2, lambda: hub.publish('b', 'PROGRESS', progress=40, message='halfway')).start()
+    started = time.monotonic()
+    second = client.get(f"/api/v1/tasks/updates?task_ids=a,b,c&since={first['cursor']}&timeout=5").get_json()
+    assert 0.1 < time.monotonic() - started < 4
+    assert [(e['task_id'], e['progress']) for e in second['events']] == [('b', 40.0)]
+    assert second['tasks']['b']['message'] == 'halfway'
+
+    # Nothing new: the poll times out with no events
+    third = client.get(f"/api/v1/tasks/updates?task_ids=a&since={second['cursor']}&timeout=0.2").get_json()
+    assert third['events'] == [] and third['cursor'] == second['cursor']
+
+    for task_id in ('a', 'b'):
+        hub.publish(task_id, 'SUCCESS', result={'ok': True})
+    hub.publish('c', 'FAILURE', error='boom')
+    final = client.get(f"/api/v1/tasks/updates?task_ids=a,b,c&since={second['cursor']}").get_json()
+    assert final['summary'] == {'total': 3, 'counts': {'completed': 2, 'failed': 1}, 'progress': 100.0, 'done': True}
+
+    assert client.get('/api/v1/tasks/updates').status_code == 400
+
+def test_socket_subscription_aggregates_many_tasks(hub):
+    socket_client = socketio.test_client(app)
+    socket_client.get_received()
+    socket_client.emit('subscribe_tasks', {'task_ids': ['x', 'y']})
+    snapshot = [m for m in socket_client.get_received() if m['name'] == 'task_snapshot']
+    assert snapshot[0]['args'][0]['summary']['counts'] == {'pending': 2}
+
+    hub.publish('x', 'PROGRESS', progress=50)
+    hub.publish('y', 'SUCCESS', result=1)
+    hub.publish('z', 'SUCCESS', result=1)
+    updates = [m['args'][0] for m in socket_client.get_received() if m['name'] == 'task_batch_update']
+    assert [u['event']['task_id'] for u in updates] == ['x', 'y']
+    assert updates[-1]['summary']['progress'] == 75.0
+
+    socket_client.emit('unsubscribe_tasks', {})
+    hub.publish('x', 'SUCCESS', result=1)
+    assert not [m for m in socket_client.get_received() if m['name'] == 'task_batch_update']
+    assert not task_events._watchers
+    socket_client.disconnect()
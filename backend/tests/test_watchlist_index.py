@@ -0,0 +1,94 @@
+import pytest
+from app import app
+from backend.extensions import db, socketio
+from backend.models import Alert, PriceWatchlist, User
+from backend.services.alert_registry import AlertRegistry
+from backend.services.market_service import MarketIntelligenceService
+from backend.services.watchlist_index import watchlist_index
+
+@pytest.fixture
+def test_client(monkeypatch):
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    monkeypatch.setattr(socketio, 'emit', lambda *args, **kwargs: None)
+    monkeypatch.setattr(AlertRegistry, '_send_emails', staticmethod(lambda targets: []))
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+            yield client
+            db.drop_all()
+
+def _users(count):
+    users = []
+    for i in range(count):
+        user = User(username=f'trader{i}', email=f'trader{i}@example.com', phone=f'+9100000{i:04d}')
+        user.password_hash = 'x'
+        db.session.add(user)
+        users.append(user)
+    db.session.commit()
+    return users
+
+def _price(crop, district, price, previous=None):
+    return {'crop_name': crop, 'district': district, 'modal_price': price, 'previous_price': previous}
+
+def _matched(updates):
+    return sorted(m.watch_id for m in watchlist_index.match(updates))
+
+def test_only_crossed_targets_match(test_client):
+    a, b, c = _users(3)
+    low = MarketIntelligenceService.add_watch(a.id, 'Onion', 1500, district='Nashik')
+    mid = MarketIntelligenceService.add_watch(b.id, 'Onion', 2000, district='Nashik')
+    high = MarketIntelligenceService.add_watch(c.id, 'Onion', 2500, district='Nashik')
+    anywhere = MarketIntelligenceService.add_watch(c.id, 'onion ', 1800)
+
+    # First price seen: every target at or below it
+    assert _matched([_price('Onion', 'Nashik', 1900)]) == sorted([low.id, anywhere.id])
+    # Only the targets between the previous and the new price
+    assert _matched([_price('Onion', 'Nashik', 2600)]) == sorted([mid.id, high.id])
+    assert _matched([_price('Onion', 'Nashik', 2700)]) == []
+    # Falling below and rising again re-arms the watch
+    assert _matched([_price('Onion', 'Nashik', 1700), _price('Onion', 'Nashik', 1850)]) == [anywhere.id]
+    # District-wide watches match any district; other crops do not
+    assert _matched([_price('Onion', 'Pune', 1900, previous=1000)]) == [anywhere.id]
+    assert _matched([_price('Wheat', 'Nashik', 9000, previous=0)]) == []
+
+def test_watchlist_crud_updates_index(test_client):
+    a, b = _users(2)
+    watch = MarketIntelligenceService.add_watch(a.id, 'Tomato', 1000, district='Pune')
+    assert watchlist_index.stats()['watches'] == 1
+    assert _matched([_price('Tomato', 'Pune', 900)]) == []
+
+    # A new watch below the current price fires on the next update
+    other = MarketIntelligenceService.add_watch(b.id, 'Tomato', 800, district='Pune')
+    assert _matched([_price('Tomato', 'Pune', 950)]) == [other.id]
+
+    MarketIntelligenceService.update_watch(watch.id, a.id, target_price=940)
+    assert MarketIntelligenceService.update_watch(watch.id, b.id, target_price=1) is None
+    assert _matched([_price('Tomato', 'Pune', 960)]) == [watch.id]
+
+    MarketIntelligenceService.update_watch(watch.id, a.id, target_price=1200, alert_enabled=False)
+    assert MarketIntelligenceService.remove_watch(other.id, b.id)
+    assert watchlist_index.stats()['watches'] == 0
+    assert _matched([_price('Tomato', 'Pune', 2000, previous=0)]) == []
+
+def test_rebuild_picks_up_rows_written_elsewhere(test_client):
+    (a,) = _users(1)
+    MarketIntelligenceService.add_watch(a.id, 'Rice', 3000, district='Nagpur')
+    db.session.add(PriceWatchlist(user_id=a.id, crop_name='Rice', district='Nagpur', target_price=3100))
+    db.session.commit()
+    assert watchlist_index.rebuild() == 2
+    assert len(_matched([_price('Rice', 'Nagpur', 3200, previous=2900)])) == 2
+
+def test_alerts_are_registered_in_bulk(test_client):
+    users = _users(4)
+    for i, user in enumerate(users):
+        MarketIntelligenceService.add_watch(user.id, 'Cotton', 5000 + i * 100, district='Aurangabad')
+
+    triggered = MarketIntelligenceService.check_watchlist_alerts([_price('Cotton', 'Aurangabad', 5250, previous=4900)])
+    assert sorted(t['user_id'] for t in triggered) == sorted(u.id for u in users[:3])
+
+    alerts = Alert.query.order_by(Alert.user_id).all()
+    assert len(alerts) == 3
+    assert {a.category for a in alerts} == {'MARKET'} and {a.priority for a in alerts} == {'HIGH'}
+    assert alerts[0].group_key == 'price_Cotton_Aurangabad'
+    assert 'crossing your target of ₹5000' in alerts[0].message
@@ -0,0 +1,112 @@
+import asyncio
+import threading
+import time
+import pytest
+from app import app
+from backend.extensions import db
+from backend.models import Alert
+from backend.models.insurance import InsurancePolicy
+from backend.models.irrigation import IrrigationZone
+from backend.models.weather import WeatherData, RiskTrigger
+from backend.services.risk_adjustment_service import RiskAdjustmentService
+from backend.services.weather_cache import WeatherCache
+from backend.services.weather_service import WeatherService
+from backend.utils.weather_api_client import WeatherAPIClient
+
+def payload(temp=30.0, humidity=50.0, rain=None):
+    data = {'main': {'temp': temp, 'humidity': humidity}, 'wind': {'speed': 3.0, 'deg': 90},
+            'weather': [{'main': 'Clear'}]}
+    if rain is not None:
+        data['rain'] = {'1h': rain}
+    return data
+
+@pytest.fixture
+def api(monkeypatch):
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    calls = []
+    responses = {'Pune': payload(temp=42.0), 'Nashik': payload(rain=60.0), 'Delhi': payload()}
+
+    def fake_fetch(self, location):
+        calls.append(location)
+        return responses.get(location, payload())
+
+    monkeypatch.setattr(WeatherAPIClient, '_fetch', fake_fetch)
+    WeatherCache.invalidate()
+    with app.app_context():
+        db.create_all()
+        yield calls
+        db.drop_all()
+    WeatherCache.invalidate()
+
+def test_nearby_points_share_cached_observation(api):
+    assert WeatherCache.key_for('30.0001,75.0002') == WeatherCache.key_for('30.0,75.0')
+    assert WeatherCache.key_for(' New  Delhi') == WeatherCache.key_for('new delhi')
+    assert WeatherCache.key_for('30.0,75.0') != WeatherCache.key_for('30.5,75.0')
+
+    first = WeatherService.get_latest_weather('30.0,75.0')
+    assert WeatherService.get_latest_weather('30.0001,75.0002').id == first.id
+    assert WeatherService.get_latest_weather('30.0,75.0').id == first.id
+    assert api == ['30.0,75.0']
+
+    # Explicit updates always go to the API and replace the cached row
+    updated = WeatherService.update_weather_for_location('30.0,75.0')
+    assert WeatherService.get_latest_weather('30.0,75.0').id == updated.id != first.id
+    assert len(api) == 2
+
+def test_concurrent_fetches_share_one_call():
+    calls = []
+    release = threading.Event()
+
+    def slow_fetch(location):
+        calls.append(location)
+        release.wait(5)
+        return payload()
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(WeatherCache.fetch('Pune', slow_fetch))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    time.sleep(0.1)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert calls == ['Pune'] and len(results) == 8
+    assert all(result is results[0] for result in results)
+
+def test_bulk_refresh_evaluates_rules_once(api, monkeypatch):
+    recalculated = []
+    monkeypatch.setattr(RiskAdjustmentService, 'calculate_actuarial_flux', recalculated.append)
+
+    zone = IrrigationZone(farm_id=1, name='Nashik North', fertigation_enabled=True)
+    policy = InsurancePolicy(user_id=1, policy_number='P-1', coverage_amount=1000, premium_amount=50,
+                             crop_type='Wheat', farm_location='Pune')
+    other = InsurancePolicy(user_id=1, policy_number='P-2', coverage_amount=1000, premium_amount=50,
+                            crop_type='Wheat', farm_location='Delhi')
+    db.session.add_all([zone, policy, other, RiskTrigger(crop_type='Wheat', max_temp_threshold=41.0)])
+    db.session.commit()
+
+    summary = WeatherService.refresh_locations(['Pune', 'Nashik', 'Delhi', 'Pune'])
+    assert summary == {'requested': 3, 'cached': 0, 'fetched': 3, 'failed': 0}
+    assert sorted(api) == ['Delhi', 'Nashik', 'Pune']
+    assert WeatherData.query.count() == 3
+
+    assert sorted(a.title for a in Alert.query) == ['Extreme Heat Alert', 'Heavy Rainfall Warning - FERTIGATION PAUSED']
+    assert db.session.get(IrrigationZone, zone.id).fertigation_enabled is False
+    assert recalculated == [policy.id]
+
+    # Fresh observations are not refetched unless forced
+    assert WeatherService.refresh_locations(['Pune', 'Delhi'])['cached'] == 2
+    assert WeatherService.refresh_locations(['Pune'], force=True)['fetched'] == 1
+    assert len(api) == 4
+
+def test_bulk_fetch_works_inside_a_running_loop(api):
+    async def from_async_caller():
+        client = WeatherAPIClient()
+        return client.get_current_weather_many(['Pune', 'Delhi']), \
+            await client.get_current_weather_many_async(['Nashik'])
+
+    batch, awaited = asyncio.run(from_async_caller())
+    assert batch['Pune']['main']['temp'] == 42.0 and awaited['Nashik']['rain'] == {'1h': 60.0}
+    assert sorted(api) == ['Delhi', 'Nashik', 'Pune']
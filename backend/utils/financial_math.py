@@ -7,12 +7,17 @@ This module provides:
 - Financial precision handling
 - Gain/loss calculations
 - Cost basis methods (FIFO, LIFO, weighted average)
+- Lot books with incremental lot consumption and realized-gain ranges
 """
 
+from bisect import bisect_left, bisect_right
+from collections import deque
 from datetime import datetime, date
 from decimal import Decimal, ROUND_HALF_UP, ROUND_DOWN, ROUND_UP, InvalidOperation
-from typing import Dict, List, Optional, Tuple, Union
-from dataclasses import dataclass
+from itertools import count
+from typing import Any, Dict, List, Optional, Tuple, Union
+from dataclasses import dataclass, field
+import heapq
 import logging
 
 logger = logging.getLogger(__name__)
@@ -379,6 +384,227 @@ class CostBasisCalculator:
         return round_rate(total_cost / total_amount)
 
 
+@dataclass
+class Lot:
+    """An acquisition lot; ``remaining`` drops as the lot is consumed."""
+    lot_id: Any
+    amount: Decimal
+    rate: Decimal
+    acquired: datetime
+    remaining: Decimal = None
+    seq: int = field(default=0, compare=False)
+    
+    def __post_init__(self):
+        if self.remaining is None:
+            self.remaining = self.amount
+
+
+class LotBook:
+    """
+    Open lots of one position plus its realized-gain history.
+    
+    Replaces re-sorting a list of lot dicts on every sale:
+    - Lots sit in a deque in acquisition order, so FIFO consumes from the
+      left and LIFO from the right in O(k) for the k lots touched
+    - HIFO (highest rate first) uses a heap built on first use
+    - Specific identification goes straight to the lot by ID; lots closed
+      out of order are dropped lazily when they reach an end of the deque
+    - Realized gains are kept as prefix sums by disposal date, so a date
+      range total is two binary searches instead of a replay
+    """
+    
+    METHODS = ('FIFO', 'LIFO', 'HIFO', 'SPECIFIC')
+    
+    def __init__(self, lots: List[Lot] = None):
+        self._lots = deque()
+        self._by_id = {}
+        self._heap = None
+        self._seq = count()
+        self._remaining = Decimal('0')
+        self._gain_dates = []
+        self._gain_prefix = [Decimal('0')]
+        for lot in sorted(lots or [], key=lambda lot: lot.acquired):
+            self._append(lot)
+    
+    def __len__(self) -> int:
+        return len(self._by_id)
+    
+    @property
+    def remaining_amount(self) -> Decimal:
+        """Total unconsumed amount across open lots."""
+        return self._remaining
+    
+    def open_lots(self) -> List[Lot]:
+        """Open lots in acquisition order."""
+        return [lot for lot in self._lots if lot.remaining > 0]
+    
+    def add(
+        self,
+        lot_id: Any,
+        amount: Union[Decimal, float, str],
+        rate: Union[Decimal, float, str],
+        acquired: datetime = None
+    ) -> Lot:
+        """
+        Open a new lot.
+        
+        Appending in acquisition order is O(1); a backdated lot is inserted
+        at its position in the deque.
+        """
+        if lot_id in self._by_id:
+            raise ValueError(f"Lot {lot_id} already exists")
+        
+        lot = Lot(lot_id, to_decimal(amount), to_decimal(rate), acquired or datetime.utcnow())
+        if lot.amount <= 0:
+            raise ValueError("Lot amount must be positive")
+        
+        if self._lots and lot.acquired < self._lots[-1].acquired:
+            keys = [existing.acquired for existing in self._lots]
+            self._lots.insert(bisect_right(keys, lot.acquired), lot)
+            self._register(lot)
+        else:
+            self._append(lot)
+        return lot
+    
+    def consume(
+        self,
+        amount: Union[Decimal, float, str],
+        method: str = 'FIFO',
+        lot_ids: List[Any] = None,
+        proceeds_rate: Union[Decimal, float, str] = None,
+        disposed: datetime = None
+    ) -> Dict:
+        """
+        Consume lots for a sale.
+        
+        Args:
+            amount: Amount sold
+            method: FIFO, LIFO, HIFO or SPECIFIC
+            lot_ids: Lots to draw from, in order (SPECIFIC only)
+            proceeds_rate: Sale rate; when given the realized gain is
+                recorded under ``disposed``
+            disposed: Disposal timestamp (defaults to now)
+            
+        Returns:
+            Dict with cost_basis, proceeds, realized_gain and the consumed
+            (lot_id, amount, rate) tuples
+            
+        Raises:
+            ValueError: For an unknown method or insufficient lots
+        """
+        amount = to_decimal(amount)
+        method = method.upper()
+        if method not in self.METHODS:
+            raise ValueError(f"Unknown cost basis method: {method}")
+        if amount <= 0:
+            raise ValueError("Amount to consume must be positive")
+        
+        if method == 'SPECIFIC':
+            if not lot_ids:
+                raise ValueError("Specific identification requires lot_ids")
+            selected = [self._by_id.get(lot_id) for lot_id in lot_ids]
+            if any(lot is None for lot in selected):
+                raise ValueError("Unknown or closed lot in lot_ids")
+            available = sum((lot.remaining for lot in selected), Decimal('0'))
+        else:
+            available = self._remaining
+        
+        if available < amount:
+            raise ValueError(f"Insufficient lots: {available} available, {amount} requested")
+        
+        if method == 'SPECIFIC':
+            candidates = iter(selected)
+        elif method == 'HIFO':
+            candidates = self._pop_heap()
+        else:
+            candidates = self._pop_end(left=(method == 'FIFO'))
+        
+        consumed = []
+        cost_basis = Decimal('0')
+        outstanding = amount
+        while outstanding > 0:
+            lot = next(candidates)
+            take = min(lot.remaining, outstanding)
+            lot.remaining -= take
+            outstanding -= take
+            cost_basis += take * lot.rate
+            consumed.append((lot.lot_id, take, lot.rate))
+            if lot.remaining == 0:
+                del self._by_id[lot.lot_id]
+        self._remaining -= amount
+        
+        result = {
+            'amount': amount,
+            'cost_basis': cost_basis,
+            'lots': consumed
+        }
+        if proceeds_rate is not None:
+            proceeds = amount * to_decimal(proceeds_rate)
+            result['proceeds'] = proceeds
+            result['realized_gain'] = proceeds - cost_basis
+            self.record_gain(result['realized_gain'], disposed or datetime.utcnow())
+        
+        return result
+    
+    def record_gain(self, gain: Decimal, disposed: datetime):
+        """Add a realized gain to the prefix-sum history."""
+        gain = to_decimal(gain)
+        if not self._gain_dates or disposed >= self._gain_dates[-1]:
+            self._gain_dates.append(disposed)
+            self._gain_prefix.append(self._gain_prefix[-1] + gain)
+            return
+        
+        # Backdated disposal: shift the prefix sums after it
+        index = bisect_right(self._gain_dates, disposed)
+        self._gain_dates.insert(index, disposed)
+        self._gain_prefix.insert(index + 1, self._gain_prefix[index] + gain)
+        for i in range(index + 2, len(self._gain_prefix)):
+            self._gain_prefix[i] += gain
+    
+    def realized_gain(self, start: datetime = None, end: datetime = None) -> Decimal:
+        """Total realized gain for disposals in [start, end]."""
+        low = bisect_left(self._gain_dates, start) if start else 0
+        high = bisect_right(self._gain_dates, end) if end else len(self._gain_dates)
+        if high <= low:
+            return Decimal('0')
+        return self._gain_prefix[high] - self._gain_prefix[low]
+    
+    def _append(self, lot: Lot):
+        self._lots.append(lot)
+        self._register(lot)
+    
+    def _register(self, lot: Lot):
+        lot.seq = next(self._seq)
+        self._by_id[lot.lot_id] = lot
+        self._remaining += lot.remaining
+        if self._heap is not None and lot.remaining > 0:
+            heapq.heappush(self._heap, (-lot.rate, lot.seq, lot))
+    
+    def _pop_end(self, left: bool):
+        """Yield open lots from one end, discarding closed ones on the way."""
+        while self._lots:
+            lot = self._lots[0] if left else self._lots[-1]
+            if lot.remaining <= 0:
+                if left:
+                    self._lots.popleft()
+                else:
+                    self._lots.pop()
+                continue
+            yield lot
+    
+    def _pop_heap(self):
+        """Yield open lots by descending rate."""
+        if self._heap is None:
+            self._heap = [(-lot.rate, lot.seq, lot) for lot in self._lots if lot.remaining > 0]
+            heapq.heapify(self._heap)
+        while self._heap:
+            lot = self._heap[0][2]
+            if lot.remaining <= 0:
+                heapq.heappop(self._heap)
+                continue
+            yield lot
+
+
 def calculate_unrealized_pnl(
     positions: List[Dict],
     current_rates: Dict[str, Decimal],
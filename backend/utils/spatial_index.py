@@ -0,0 +1,264 @@
+"""
+Spatial index helpers for point data (incidents, farms, outbreak zones).
+
+Provides a vectorized NumPy haversine, a lat/lon grid index whose cells
+are at least one search radius wide (so a radius query only has to look
+at the 3x3 block of cells around a point), and a DBSCAN built on it, plus
+centroid helpers for geohash codes and WKT cells.
+"""
+
+import math
+import re
+from collections import defaultdict
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE_LAT = math.pi * EARTH_RADIUS_KM / 180.0
+
+# Upper bound on the size of a pairwise distance block (rows x candidates)
+MAX_BLOCK_ELEMENTS = 4_000_000
+
+
+def haversine_km(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """
+    Great-circle distance in kilometers between coordinates given in degrees.
+
+    Arguments broadcast like NumPy arrays, so (n, 1) against (1, m) inputs
+    yield an (n, m) distance matrix.
+    """
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=np.float64)) for v in (lat1, lon1, lat2, lon2))
+
+    a = (
+        np.sin((lat2 - lat1) / 2.0) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2.0) ** 2
+    )
+    return 2.0 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def bounding_box(lat: float, lon: float, radius_km: float) -> Tuple[float, float, float, float]:
+    """
+    Lat/lon box that contains every point within radius_km of (lat, lon).
+
+    Returns:
+        (min_lat, max_lat, min_lon, max_lon); the longitude span is widened
+        to the full globe near the poles.
+    """
+    dlat = radius_km / KM_PER_DEGREE_LAT
+    min_lat, max_lat = max(lat - dlat, -90.0), min(lat + dlat, 90.0)
+
+    max_abs_lat = max(abs(min_lat), abs(max_lat))
+    if max_abs_lat >= 89.9:
+        return min_lat, max_lat, -180.0, 180.0
+
+    dlon = min(dlat / math.cos(math.radians(max_abs_lat)), 180.0)
+    return min_lat, max_lat, lon - dlon, lon + dlon
+
+
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+
+def geohash(lat: float, lon: float, precision: int = 5) -> str:
+    """
+    Standard base-32 geohash of a point.
+
+    Nearby points share a prefix; precision 5 cells are roughly 4.9 x 4.9 km
+    at the equator, precision 6 roughly 1.2 x 0.6 km.
+    """
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        interval, coord = (lon_range, lon) if even else (lat_range, lat)
+        mid = (interval[0] + interval[1]) / 2.0
+        value <<= 1
+        if coord >= mid:
+            value |= 1
+            interval[0] = mid
+        else:
+            interval[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(GEOHASH_ALPHABET[value])
+            bits = 0
+            value = 0
+    return ''.join(chars)
+
+
+def geohash_center(code: str) -> Optional[Tuple[float, float]]:
+    """(lat, lon) at the center of a geohash cell, or None if not a geohash."""
+    code = (code or '').strip().lower()
+    if not code or any(c not in GEOHASH_ALPHABET for c in code):
+        return None
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    even = True
+    for char in code:
+        value = GEOHASH_ALPHABET.index(char)
+        for shift in range(4, -1, -1):
+            interval = lon_range if even else lat_range
+            mid = (interval[0] + interval[1]) / 2.0
+            if (value >> shift) & 1:
+                interval[0] = mid
+            else:
+                interval[1] = mid
+            even = not even
+    return (lat_range[0] + lat_range[1]) / 2.0, (lon_range[0] + lon_range[1]) / 2.0
+
+
+_WKT_POINT = re.compile(r'(-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?)\s+(-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?)')
+
+
+def wkt_centroid(wkt: str) -> Optional[Tuple[float, float]]:
+    """
+    (lat, lon) mean of the vertices of a WKT geometry (``x y`` = lon lat),
+    or None if it has no coordinates. A closing vertex that repeats the
+    first one is counted once.
+    """
+    points = [(float(x), float(y)) for x, y in _WKT_POINT.findall(wkt or '')]
+    if len(points) > 1 and points[0] == points[-1]:
+        points.pop()
+    if not points:
+        return None
+    lons, lats = zip(*points)
+    lat, lon = sum(lats) / len(lats), sum(lons) / len(lons)
+    if not (-90.0 <= lat <= 90.0 and -180.0 <= lon <= 180.0):
+        return None
+    return lat, lon
+
+
+class GeoGridIndex:
+    """
+    Buckets points into a regular lat/lon grid.
+
+    Cells are at least ``cell_km`` wide everywhere in the data set, so all
+    points within ``cell_km`` of a point lie in its own or an adjacent cell.
+    """
+
+    def __init__(self, lats, lons, cell_km: float):
+        self.lats = np.asarray(lats, dtype=np.float64)
+        self.lons = np.asarray(lons, dtype=np.float64)
+        self.cell_km = float(cell_km)
+
+        self.dlat = max(self.cell_km / KM_PER_DEGREE_LAT, 1e-9)
+        max_abs_lat = float(np.abs(self.lats).max()) if len(self.lats) else 0.0
+        if max_abs_lat >= 89.0:
+            self.dlon = 360.0
+        else:
+            self.dlon = min(self.dlat / math.cos(math.radians(max_abs_lat)), 360.0)
+
+        rows = np.floor(self.lats / self.dlat).astype(np.int64)
+        cols = np.floor(self.lons / self.dlon).astype(np.int64)
+
+        cells = defaultdict(list)
+        for index, key in enumerate(zip(rows.tolist(), cols.tolist())):
+            cells[key].append(index)
+        self.cells: Dict[Tuple[int, int], np.ndarray] = {
+            key: np.asarray(members, dtype=np.int64) for key, members in cells.items()
+        }
+
+    def _cell_of(self, lat: float, lon: float) -> Tuple[int, int]:
+        return int(math.floor(lat / self.dlat)), int(math.floor(lon / self.dlon))
+
+    def neighbourhood(self, cell: Tuple[int, int]) -> np.ndarray:
+        """Indices of all points in the 3x3 block of cells around ``cell``."""
+        row, col = cell
+        parts = [
+            self.cells[key]
+            for key in ((row + dr, col + dc) for dr in (-1, 0, 1) for dc in (-1, 0, 1))
+            if key in self.cells
+        ]
+        if not parts:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(parts)
+
+    def query_radius(self, lat: float, lon: float, radius_km: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Points within radius_km of (lat, lon).
+
+        Returns:
+            (indices, distances_km), both ordered by index
+        """
+        if radius_km > self.cell_km:
+            candidates = np.arange(len(self.lats))
+        else:
+            candidates = self.neighbourhood(self._cell_of(lat, lon))
+
+        distances = haversine_km(lat, lon, self.lats[candidates], self.lons[candidates])
+        mask = distances <= radius_km
+        order = np.argsort(candidates[mask], kind='stable')
+        return candidates[mask][order], distances[mask][order]
+
+    def iter_distance_blocks(self) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """
+        Yield (row_indices, candidate_indices, distance_matrix) blocks that
+        together cover every point against its 3x3 neighbourhood.
+        """
+        for cell, members in self.cells.items():
+            candidates = self.neighbourhood(cell)
+            step = max(1, MAX_BLOCK_ELEMENTS // max(len(candidates), 1))
+            for start in range(0, len(members), step):
+                rows = members[start:start + step]
+                distances = haversine_km(
+                    self.lats[rows][:, None], self.lons[rows][:, None],
+                    self.lats[candidates][None, :], self.lons[candidates][None, :]
+                )
+                yield rows, candidates, distances
+
+
+def dbscan_haversine(lats, lons, radius_km: float, min_samples: int) -> np.ndarray:
+    """
+    DBSCAN over geographic points using great-circle distance.
+
+    A point is a core point when at least ``min_samples`` points (itself
+    included) lie within ``radius_km``. Clusters grow transitively through
+    core points; border points join the first cluster that reaches them.
+
+    Returns:
+        Array of cluster labels (0..k-1), -1 for noise
+    """
+    n = len(lats)
+    labels = np.full(n, -1, dtype=np.int64)
+    if n == 0:
+        return labels
+
+    index = GeoGridIndex(lats, lons, radius_km)
+
+    # Only core points are ever expanded, so only their neighbourhoods are kept
+    core_neighbours: Dict[int, np.ndarray] = {}
+    for rows, candidates, distances in index.iter_distance_blocks():
+        within = distances <= radius_km
+        counts = within.sum(axis=1)
+        for row_pos in np.nonzero(counts >= min_samples)[0]:
+            core_neighbours[int(rows[row_pos])] = candidates[within[row_pos]]
+
+    cluster_id = 0
+    for seed in sorted(core_neighbours):
+        if labels[seed] != -1:
+            continue
+
+        labels[seed] = cluster_id
+        frontier = [seed]
+        while frontier:
+            point = frontier.pop()
+            neighbours = core_neighbours[point]
+            fresh = neighbours[labels[neighbours] == -1]
+            labels[fresh] = cluster_id
+            frontier.extend(p for p in fresh.tolist() if p in core_neighbours)
+
+        cluster_id += 1
+
+    return labels
+
+
+def group_by_label(labels: np.ndarray) -> List[np.ndarray]:
+    """Point indices for each non-noise label, ordered by label."""
+    clustered = np.nonzero(labels >= 0)[0]
+    if len(clustered) == 0:
+        return []
+    order = clustered[np.argsort(labels[clustered], kind='stable')]
+    boundaries = np.nonzero(np.diff(labels[order]))[0] + 1
+    return np.split(order, boundaries)
@@ -1,3 +1,5 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 import requests
 import time
 import logging
@@ -15,21 +17,9 @@ class WeatherAPIClient:
 
     def get_current_weather(self, location, retries=3):
         """Fetch current weather for a location with automatic retries"""
-        params = {
-            'q': location,
-            'appid': self.api_key,
-            'units': 'metric'
-        }
-        
         for attempt in range(retries):
             try:
-                # Mocking the actual request for demonstration if no key is provided
-                if self.api_key == "MOCK_API_KEY":
-                    return self._get_mock_weather(location)
-                
-                response = requests.get(f"{self.base_url}/weather", params=params, timeout=5)
-                response.raise_for_status()
-                return response.json()
+                return self._fetch(location)
             except Exception as e:
                 logger.warning(f"Weather API attempt {attempt + 1} failed for {location}: {str(e)}")
                 if attempt < retries - 1:
@@ -38,6 +28,86 @@ class WeatherAPIClient:
                     logger.error(f"Weather API finalized failure for {location}")
                     return None
 
+    async def get_current_weather_async(self, location, retries=3):
+        """
+        Coroutine version of get_current_weather. The blocking request runs
+        in a worker thread and backoff uses asyncio.sleep, so one slow or
+        failing location does not hold up the others.
+        """
+        for attempt in range(retries):
+            try:
+                return await asyncio.to_thread(self._fetch, location)
+            except Exception as e:
+                logger.warning(f"Weather API attempt {attempt + 1} failed for {location}: {str(e)}")
+                if attempt < retries - 1:
+                    await asyncio.sleep(2 ** attempt)
+                else:
+                    logger.error(f"Weather API finalized failure for {location}")
+                    return None
+
+    def get_current_weather_many(self, locations, concurrency=16, retries=3):
+        """
+        Fetch current weather for many locations concurrently.
+
+        Args:
+            locations: Location names or "lat,lon" strings
+            concurrency: Maximum requests in flight at once
+            retries: Attempts per location
+
+        Returns:
+            Dict of location -> raw payload (None for locations that failed)
+        """
+        locations = list(dict.fromkeys(locations))
+        if not locations:
+            return {}
+
+        concurrency = max(1, min(concurrency, len(locations)))
+
+        async def fetch_all():
+            # Size the thread pool to the concurrency limit; the loop's
+            # default pool is capped by CPU count
+            asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=concurrency))
+            return await self.get_current_weather_many_async(locations, concurrency=concurrency, retries=retries)
+
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(fetch_all())
+
+        # asyncio.run refuses to nest inside a running loop (e.g. an async
+        # worker), so give the batch its own loop on a separate thread
+        with ThreadPoolExecutor(max_workers=1) as runner:
+            return runner.submit(asyncio.run, fetch_all()).result()
+
+    async def get_current_weather_many_async(self, locations, concurrency=16, retries=3):
+        """
+        Coroutine version of get_current_weather_many for callers already
+        inside an event loop. Requests run in the loop's default executor.
+        """
+        locations = list(dict.fromkeys(locations))
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def fetch_one(location):
+            async with semaphore:
+                return await self.get_current_weather_async(location, retries=retries)
+
+        return dict(zip(locations, await asyncio.gather(*(fetch_one(location) for location in locations))))
+
+    def _fetch(self, location):
+        """Single request without retries"""
+        # Mocking the actual request for demonstration if no key is provided
+        if self.api_key == "MOCK_API_KEY":
+            return self._get_mock_weather(location)
+
+        params = {
+            'q': location,
+            'appid': self.api_key,
+            'units': 'metric'
+        }
+        response = requests.get(f"{self.base_url}/weather", params=params, timeout=5)
+        response.raise_for_status()
+        return response.json()
+
     def _get_mock_weather(self, location):
         """Provides simulated data for development and testing"""
         import random
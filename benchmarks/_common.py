@@ -0,0 +1,43 @@
+"""
+Shared setup for the database-backed benchmarks: a bare Flask app bound
+to the given database and a counter for the SQL statements it runs.
+"""
+
+from flask import Flask
+from sqlalchemy import event
+from backend.extensions import db, mail, socketio
+
+
+def make_app(database_url, alerts=False):
+    """
+    Flask app with only the extensions the benchmark needs. With alerts,
+    mail runs inline with MAIL_SUPPRESS_SEND and Socket.IO is initialised
+    without clients so AlertRegistry can dispatch.
+    """
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_url
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    if alerts:
+        app.config['MAIL_SUPPRESS_SEND'] = True
+        app.config['MAIL_DEFAULT_SENDER'] = 'alerts@agritech.local'
+        app.config['ALERT_EMAIL_ASYNC'] = False
+        mail.init_app(app)
+        socketio.init_app(app, async_mode='threading')
+    return app
+
+
+class QueryCounter:
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._on_execute)
@@ -0,0 +1,153 @@
+"""
+Arbitrage Matrix Benchmark
+==========================
+Compares the previous pairwise arbitrage scan with the matrix scan in
+AlgorithmicArbitrageMatrix.identify_arbitrage_vectors:
+
+- Legacy: for every crop, source and target grid, a forecast query per
+  price estimate, a haversine per pair and an ArbitrageOpportunity lookup
+  per profitable pair (run on --legacy-grids cells)
+- Matrix: one crops x grids price matrix, blockwise NumPy margins over
+  centroid distances, a prefetched set of open pairs and bulk inserts
+
+Grids are 0.1 degree WKT cells scattered over India. Most forecasts are
+normal; --outlier-rate of them signal a glut or a scarcity. Trade
+execution is replaced by a no-op so the numbers isolate the scan.
+
+Usage:
+    python benchmarks/bench_arbitrage_matrix.py [--grids 2000]
+        [--legacy-grids 60] [--outlier-rate 0.01]
+        [--database sqlite:///:memory:]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from _common import make_app, QueryCounter
+from backend.extensions import db
+from backend.models.arbitrage import ArbitrageOpportunity
+from backend.models.spatial_yield import SpatialYieldGrid, TemporalYieldForex
+from backend.services.arbitrage_service import AlgorithmicArbitrageMatrix, PROFIT_MARGIN_TRIGGER_PCT
+from backend.services.prophet_engine import CROP_YIELD_BASE_KG_PER_HA
+from backend.utils.spatial_index import wkt_centroid
+
+
+def seed(grid_count, outlier_rate, rng):
+    grids = []
+    for i in range(grid_count):
+        lon, lat = rng.uniform(69.0, 88.0), rng.uniform(9.0, 32.0)
+        grids.append({
+            'region_id': f"CELL-{i}",
+            'bounding_box_wkt': f"POLYGON(({lon} {lat}, {lon + 0.1} {lat}, {lon + 0.1} {lat + 0.1}, "
+                                f"{lon} {lat + 0.1}, {lon} {lat}))"
+        })
+    db.session.bulk_insert_mappings(SpatialYieldGrid, grids)
+    db.session.commit()
+
+    def accel():
+        roll = rng.random()
+        if roll < outlier_rate:
+            return rng.uniform(1.25, 1.5)   # Bumper harvest
+        if roll < 2 * outlier_rate:
+            return rng.uniform(0.5, 0.75)   # Drought
+        return rng.uniform(0.85, 1.15)
+
+    grid_ids = [grid_id for (grid_id,) in db.session.query(SpatialYieldGrid.id).order_by(SpatialYieldGrid.id)]
+    db.session.bulk_insert_mappings(TemporalYieldForex, [{
+        'grid_id': grid_id,
+        'crop_type': crop,
+        'base_yield_kg_per_hectare': base_yield,
+        'growth_acceleration_factor': accel()
+    } for grid_id in grid_ids for crop, base_yield in CROP_YIELD_BASE_KG_PER_HA.items()])
+    db.session.commit()
+
+
+def legacy_scan(grid_limit):
+    """The previous nested loop, with real centroids instead of random coordinates."""
+    grids = SpatialYieldGrid.query.order_by(SpatialYieldGrid.id).limit(grid_limit).all()
+    detected = 0
+    for crop in CROP_YIELD_BASE_KG_PER_HA.keys():
+        for source_grid in grids:
+            source_price = AlgorithmicArbitrageMatrix._estimate_dynamic_market_price(crop, source_grid)
+            for target_grid in grids:
+                if source_grid.id == target_grid.id:
+                    continue
+                target_price = AlgorithmicArbitrageMatrix._estimate_dynamic_market_price(crop, target_grid)
+                if target_price <= source_price:
+                    continue
+                logistics_usd = AlgorithmicArbitrageMatrix.calculate_freight_logistics_cost(
+                    *wkt_centroid(source_grid.bounding_box_wkt), *wkt_centroid(target_grid.bounding_box_wkt), 20000.0
+                )
+                cogs = source_price * 20000.0 + logistics_usd
+                net_profit = target_price * 20000.0 - cogs
+                margin_pct = net_profit / cogs * 100.0
+                if margin_pct >= PROFIT_MARGIN_TRIGGER_PCT:
+                    opp = ArbitrageOpportunity.query.filter_by(
+                        commodity_type=crop, source_grid_id=source_grid.id,
+                        target_grid_id=target_grid.id, status='IDENTIFIED'
+                    ).first()
+                    if not opp:
+                        db.session.add(ArbitrageOpportunity(
+                            commodity_type=crop, source_grid_id=source_grid.id, source_price_per_kg=source_price,
+                            target_grid_id=target_grid.id, target_price_per_kg=target_price,
+                            estimated_transport_cost_usd=logistics_usd, gross_margin_pct=round(margin_pct, 2),
+                            net_arbitrage_profit=round(net_profit, 2), confidence_score=0.88,
+                            expires_at=datetime.utcnow() + timedelta(hours=48)
+                        ))
+                        detected += 1
+    db.session.commit()
+    return detected
+
+
+def timed(label, fn):
+    with QueryCounter(db.engine) as counter:
+        started = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - started
+    print(f"  {label:<34} {elapsed:8.3f}s  {counter.count:8d} statements")
+    return elapsed, result
+
+
+def run(grid_count, legacy_grids, outlier_rate, database_url):
+    rng = random.Random(5)
+    app = make_app(database_url)
+    AlgorithmicArbitrageMatrix._execute_trade = staticmethod(lambda opportunity, volume_kg: None)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        seed(grid_count, outlier_rate, rng)
+        crops = len(CROP_YIELD_BASE_KG_PER_HA)
+        print(f"Grids: {grid_count}, crops: {crops}, outlier forecasts: {outlier_rate:.1%} gluts "
+              f"+ {outlier_rate:.1%} scarcities, database: {database_url}")
+
+        legacy, legacy_found = timed(f"legacy pairwise ({legacy_grids} grids)", lambda: legacy_scan(legacy_grids))
+        ArbitrageOpportunity.query.delete()
+        db.session.commit()
+        matrix, stats = timed(f"matrix scan ({grid_count} grids)", AlgorithmicArbitrageMatrix.identify_arbitrage_vectors)
+        _, again = timed("matrix rescan (all pairs open)", AlgorithmicArbitrageMatrix.identify_arbitrage_vectors)
+
+        legacy_pairs = crops * legacy_grids * (legacy_grids - 1)
+        matrix_pairs = crops * grid_count * (grid_count - 1)
+        print(f"  per pair: legacy {legacy / legacy_pairs * 1e6:.2f} us ({legacy_found} opportunities), "
+              f"matrix {matrix / matrix_pairs * 1e6:.3f} us ({stats['vectors_detected']} opportunities, "
+              f"{stats['trades_executed']} auto-executed), {legacy / legacy_pairs / (matrix / matrix_pairs):.0f}x")
+        print(f"  legacy extrapolated to {grid_count} grids: {legacy / legacy_pairs * matrix_pairs:.0f}s; "
+              f"rescan found {again['vectors_detected']} new")
+
+        db.drop_all()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--grids', type=int, default=2000)
+    parser.add_argument('--legacy-grids', type=int, default=60)
+    parser.add_argument('--outlier-rate', type=float, default=0.01)
+    parser.add_argument('--database', default='sqlite:///:memory:')
+    args = parser.parse_args()
+    run(args.grids, args.legacy_grids, args.outlier_rate, args.database)
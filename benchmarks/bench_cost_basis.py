@@ -0,0 +1,113 @@
+"""
+Cost Basis Benchmark
+====================
+Compares the deque/heap-backed LotBook with CostBasisCalculator, which
+re-sorts the whole list of lot dicts and rebuilds remaining_lots on every
+sale. Also compares realized-gain range queries: a scan over the recorded
+sales versus LotBook's prefix sums.
+
+Usage:
+    python benchmarks/bench_cost_basis.py [--lots 100000] [--sales 200] [--queries 1000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.utils.financial_math import CostBasisCalculator, LotBook
+
+START = datetime(2020, 1, 1)
+
+
+def make_lots(count, seed_value=7):
+    rng = random.Random(seed_value)
+    return [
+        {
+            'id': i,
+            'amount': round(rng.uniform(10, 1000), 2),
+            'rate': round(rng.uniform(0.8, 1.4), 6),
+            'date': START + timedelta(minutes=i)
+        }
+        for i in range(count)
+    ]
+
+
+def make_sales(count, lots, seed_value=11):
+    rng = random.Random(seed_value)
+    average = sum(lot['amount'] for lot in lots) / len(lots)
+    sold_at = START + timedelta(minutes=len(lots))
+    return [
+        (Decimal(str(round(rng.uniform(1, 5) * average, 2))),
+         Decimal(str(round(rng.uniform(0.8, 1.4), 6))),
+         sold_at + timedelta(hours=i))
+        for i in range(count)
+    ]
+
+
+def legacy_sales(lots, sales, method):
+    calculate = CostBasisCalculator.fifo_cost_basis if method == 'FIFO' else CostBasisCalculator.lifo_cost_basis
+    history = []
+    for amount, rate, sold_at in sales:
+        cost, lots = calculate(lots, amount)
+        history.append((sold_at, amount * rate - cost))
+    return history
+
+
+def lot_book_sales(lots, sales, method):
+    book = LotBook()
+    for lot in lots:
+        book.add(lot['id'], lot['amount'], lot['rate'], lot['date'])
+    for amount, rate, sold_at in sales:
+        book.consume(amount, method, proceeds_rate=rate, disposed=sold_at)
+    return book
+
+
+def timed(label, fn):
+    started = time.perf_counter()
+    result = fn()
+    print(f"  {label:<44} {time.perf_counter() - started:8.3f}s")
+    return result
+
+
+def run(lot_count, sale_count, query_count):
+    lots = make_lots(lot_count)
+    sales = make_sales(sale_count, lots)
+    print(f"Lots: {lot_count}, sales: {sale_count}, range queries: {query_count}")
+
+    rng = random.Random(3)
+    ranges = []
+    for _ in range(query_count):
+        a, b = sorted(rng.sample(range(sale_count), 2))
+        ranges.append((sales[a][2], sales[b][2]))
+
+    for method in ('FIFO', 'LIFO'):
+        history = timed(f'{method} list-of-dicts calculator', lambda: legacy_sales(lots, sales, method))
+        book = timed(f'{method} LotBook (incl. loading lots)', lambda: lot_book_sales(lots, sales, method))
+
+        scanned = timed(f'{method} range gains, scan sales', lambda: [
+            sum((gain for sold_at, gain in history if start <= sold_at <= end), Decimal('0'))
+            for start, end in ranges
+        ])
+        indexed = timed(f'{method} range gains, LotBook prefix sums', lambda: [
+            book.realized_gain(start, end) for start, end in ranges
+        ])
+        # The calculator rounds each sale's cost to cents; LotBook keeps it exact
+        tolerance = Decimal('0.005') * sale_count
+        assert all(abs(a - b) <= tolerance for a, b in zip(scanned, indexed))
+
+    timed('HIFO LotBook (incl. loading lots)', lambda: lot_book_sales(lots, sales, 'HIFO'))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--lots', type=int, default=100000)
+    parser.add_argument('--sales', type=int, default=200)
+    parser.add_argument('--queries', type=int, default=1000)
+    args = parser.parse_args()
+    run(args.lots, args.sales, args.queries)
@@ -0,0 +1,71 @@
+"""
+Crop Recommendation Benchmark
+=============================
+Scores synthetic fields against CROP_DATABASE with the per-field
+recommend_crops call and with a single recommend_crops_batch call, and
+reports the raw scoring time of the precompiled matrix on its own.
+
+Usage:
+    python benchmarks/bench_crop_recommendation.py [--fields 1000 10000 100000]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agri_utils import recommend_crops, recommend_crops_batch, score_crops_batch
+
+SEASONS = [None, 'kharif', 'rabi', 'summer']
+
+
+def make_fields(count, seed=42):
+    rng = np.random.default_rng(seed)
+    ph = rng.uniform(4.5, 8.5, size=count).round(1)
+    temperature = rng.uniform(5, 40, size=count).round(1)
+    rainfall = rng.uniform(200, 3000, size=count).round()
+    seasons = rng.integers(0, len(SEASONS), size=count)
+    return [
+        {'ph': p, 'temperature': t, 'rainfall_mm': r, 'season': SEASONS[s]}
+        for p, t, r, s in zip(ph.tolist(), temperature.tolist(), rainfall.tolist(), seasons.tolist())
+    ]
+
+
+def run(sizes):
+    print(f"{'fields':>8} {'per-field s':>12} {'batch s':>10} {'score-only s':>13} {'speedup':>8}")
+    for count in sizes:
+        fields = make_fields(count)
+
+        started = time.perf_counter()
+        legacy = [
+            recommend_crops('loamy', f['ph'], 0, 0, 0, f['temperature'], 0, f['rainfall_mm'], f['season'])
+            for f in fields
+        ]
+        per_field = time.perf_counter() - started
+
+        started = time.perf_counter()
+        batched = recommend_crops_batch(fields)
+        batch = time.perf_counter() - started
+        assert batched == legacy
+
+        started = time.perf_counter()
+        score_crops_batch(
+            [f['ph'] for f in fields],
+            [f['temperature'] for f in fields],
+            [f['rainfall_mm'] for f in fields],
+            [f['season'] for f in fields]
+        )
+        score_only = time.perf_counter() - started
+
+        print(f"{count:>8} {per_field:>12.3f} {batch:>10.3f} {score_only:>13.4f} {per_field / batch:>7.1f}x")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--fields', type=int, nargs='+', default=[1000, 10000, 100000])
+    args = parser.parse_args()
+    run(args.fields)
@@ -0,0 +1,141 @@
+"""
+FX Revaluation Benchmark
+========================
+Compares the batched FXRevaluationEngine with the previous per-vault loop,
+which resolved every position balance and rate individually and added one
+snapshot at a time. Reports wall time and the number of SQL statements issued.
+
+Usage:
+    python benchmarks/bench_fx_revaluation.py [--vaults 2000] [--currencies 4]
+        [--database sqlite:///bench_fx_revaluation.db]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime
+from decimal import Decimal
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from _common import make_app, QueryCounter
+from backend.extensions import db
+from backend.models.ledger import (
+    LedgerAccount, AccountType, TransactionType, Vault, VaultCurrencyPosition, FXValuationSnapshot
+)
+from backend.services.fx_revaluation import FXRevaluationEngine
+from backend.services.ledger_service import LedgerService
+
+CURRENCIES = ['EUR', 'GBP', 'INR', 'JPY', 'CHF', 'AUD', 'CAD', 'BRL']
+
+
+def legacy_revalue_all(rates):
+    """The previous implementation: one balance lookup and snapshot per position."""
+    for vault in Vault.query.filter_by(auto_fx_revaluation=True, is_active=True).all():
+        for position in vault.currency_positions.all():
+            if position.currency == vault.base_currency:
+                continue
+            balance = LedgerService.get_account_balance(position.ledger_account_id)
+            if balance <= 0:
+                continue
+            new_rate = rates[position.currency]
+            old_rate = position.last_fx_rate or position.cost_basis_rate or new_rate
+            if old_rate == new_rate:
+                continue
+            delta = balance * new_rate - balance * old_rate
+            db.session.add(FXValuationSnapshot(
+                entity_type='vault_position', entity_id=position.id, currency=position.currency,
+                position_amount=balance, original_fx_rate=old_rate, current_fx_rate=new_rate,
+                base_currency=vault.base_currency, original_base_value=balance * old_rate,
+                current_base_value=balance * new_rate, unrealized_gain_loss=delta,
+                cumulative_unrealized_gain=(position.cumulative_unrealized_fx_gain or 0) + delta
+            ))
+            position.last_fx_rate = new_rate
+            position.last_revaluation_date = datetime.utcnow()
+            position.cumulative_unrealized_fx_gain = (position.cumulative_unrealized_fx_gain or 0) + delta
+        db.session.commit()
+
+
+def seed(vaults, currencies, seed_value=7):
+    rng = random.Random(seed_value)
+    cash, _ = LedgerService.get_or_create_account('1000-CASH', 'Cash', AccountType.ASSET)
+
+    positions = []
+    for i in range(vaults):
+        vault_id = str(uuid.uuid4())
+        account = LedgerAccount(account_code=f"VAULT-{vault_id[:8].upper()}", name=f"Vault {i}",
+                                account_type=AccountType.ASSET, entity_type='vault')
+        db.session.add(account)
+        db.session.flush()
+        vault = Vault(vault_id=vault_id, name=f"Vault {i}", owner_type='farm', owner_id=i,
+                      ledger_account_id=account.id)
+        db.session.add(vault)
+        db.session.flush()
+        for currency in CURRENCIES[:currencies]:
+            position_account = LedgerAccount(
+                account_code=f"VAULT-{vault_id[:8].upper()}-{currency}", name=f"Vault {i} - {currency}",
+                account_type=AccountType.ASSET, currency=currency, parent_id=account.id,
+                entity_type='vault_position', entity_id=vault.id
+            )
+            db.session.add(position_account)
+            db.session.flush()
+            positions.append(VaultCurrencyPosition(
+                vault_id=vault.id, currency=currency, ledger_account_id=position_account.id,
+                cost_basis_rate=Decimal('1.0'), cumulative_realized_fx_gain=0, cumulative_unrealized_fx_gain=0
+            ))
+    db.session.add_all(positions)
+    db.session.commit()
+
+    LedgerService.create_transactions_bulk([
+        {
+            'transaction_type': TransactionType.DEPOSIT,
+            'entries': [
+                {'account_id': p.ledger_account_id, 'entry_type': 'DEBIT', 'amount': amount,
+                 'currency': p.currency, 'fx_rate': 1.0},
+                {'account_id': cash.id, 'entry_type': 'CREDIT', 'amount': amount, 'currency': 'USD'}
+            ]
+        }
+        for p in positions
+        for amount in [round(rng.uniform(100, 10000), 2)]
+    ])
+
+
+def measure(label, fn):
+    with QueryCounter(db.engine) as counter:
+        started = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - started
+    print(f"  {label:<38} {elapsed:8.3f}s  {counter.count:7d} queries")
+
+
+def run(vaults, currencies, database_url):
+    app = make_app(database_url)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        seed(vaults, currencies)
+
+        rng = random.Random(11)
+        first = {c: Decimal(str(round(rng.uniform(0.5, 2.0), 6))) for c in CURRENCIES}
+        second = {c: rate * Decimal('1.01') for c, rate in first.items()}
+
+        print(f"Vaults: {vaults}, positions: {vaults * currencies}, database: {database_url}")
+        measure('legacy per-vault loop', lambda: legacy_revalue_all(first))
+        measure('batched engine (+ ledger postings)', lambda: FXRevaluationEngine.revalue(current_rates=second))
+        measure('batched engine, all below threshold', lambda: FXRevaluationEngine.revalue(
+            current_rates={c: rate * Decimal('1.00001') for c, rate in second.items()}
+        ))
+
+        db.drop_all()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--vaults', type=int, default=2000)
+    parser.add_argument('--currencies', type=int, default=4)
+    parser.add_argument('--database', default='sqlite:///:memory:')
+    args = parser.parse_args()
+    run(args.vaults, args.currencies, args.database)
@@ -0,0 +1,92 @@
+"""
+Ledger Posting Benchmark
+========================
+Compares per-transaction posting (LedgerService.create_transaction) with
+batched posting (LedgerService.create_transactions_bulk) and reports the
+throughput of each in transactions per second.
+
+Usage:
+    python benchmarks/bench_ledger_posting.py [--transactions 5000] [--accounts 50]
+        [--database sqlite:///bench_ledger.db]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from _common import make_app
+from backend.extensions import db
+from backend.models.ledger import AccountType, TransactionType
+from backend.services.ledger_service import LedgerService
+
+
+def make_batch(account_ids, count, seed=42):
+    rng = random.Random(seed)
+    start = datetime.utcnow() - timedelta(days=30)
+    batch = []
+    for _ in range(count):
+        debit_id, credit_id = rng.sample(account_ids, 2)
+        amount = round(rng.uniform(1, 5000), 2)
+        batch.append({
+            'transaction_type': TransactionType.TRANSFER,
+            'description': 'benchmark transfer',
+            'entry_date': start + timedelta(minutes=rng.randint(0, 30 * 24 * 60)),
+            'entries': [
+                {'account_id': debit_id, 'entry_type': 'DEBIT', 'amount': amount},
+                {'account_id': credit_id, 'entry_type': 'CREDIT', 'amount': amount}
+            ]
+        })
+    return batch
+
+
+def run(transactions, accounts, database_url):
+    app = make_app(database_url)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+        account_ids = [
+            LedgerService.create_account(
+                account_code=f'BENCH-{i:05d}',
+                name=f'Benchmark Account {i}',
+                account_type=AccountType.ASSET
+            ).id
+            for i in range(accounts)
+        ]
+
+        batch = make_batch(account_ids, transactions)
+
+        started = time.perf_counter()
+        for txn in batch:
+            LedgerService.create_transaction(**txn)
+        single_elapsed = time.perf_counter() - started
+
+        started = time.perf_counter()
+        result = LedgerService.create_transactions_bulk(batch)
+        bulk_elapsed = time.perf_counter() - started
+
+        verification = LedgerService.verify_balance_checkpoints()
+
+        print(f"Transactions: {transactions}, accounts: {accounts}, database: {database_url}")
+        print(f"  create_transaction loop:  {single_elapsed:8.3f}s  "
+              f"{transactions / single_elapsed:10.1f} txn/s")
+        print(f"  create_transactions_bulk: {bulk_elapsed:8.3f}s  "
+              f"{result['transaction_count'] / bulk_elapsed:10.1f} txn/s")
+        print(f"  speedup: {single_elapsed / bulk_elapsed:.1f}x, "
+              f"checkpoints consistent: {verification['is_consistent']}")
+
+        db.drop_all()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--transactions', type=int, default=5000)
+    parser.add_argument('--accounts', type=int, default=50)
+    parser.add_argument('--database', default='sqlite:///:memory:')
+    args = parser.parse_args()
+    run(args.transactions, args.accounts, args.database)
@@ -0,0 +1,101 @@
+"""
+LLM Gateway Benchmark
+=====================
+Replays loan-eligibility requests through the previous /process-loan
+caching (MD5 of a prompt that embeds the dict repr, no coalescing) and
+through LLMGateway. Requests repeat a small set of applications, with
+their keys in a different order and stray whitespace, and arrive from
+concurrent clients. A StubLLM with a fixed latency stands in for Gemini.
+
+Usage:
+    python benchmarks/bench_llm_gateway.py [--requests 400] [--applications 40]
+        [--clients 16] [--latency-ms 200]
+"""
+
+import argparse
+import hashlib
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.services.llm_gateway import LLMGateway, StubLLM, canonical_json
+
+PROMPT = "You are a financial loan eligibility advisor.\nJSON Data = {data}\nAssess the eligibility."
+
+
+def make_requests(request_count, application_count, seed=11):
+    rng = random.Random(seed)
+    applications = [{
+        'loan_type': rng.choice(['Crop Cultivation', 'Farm Equipment', 'Water Resources']),
+        'land_size': float(rng.randint(1, 20)),
+        'annual_income': rng.randint(50, 500) * 1000,
+        'district': f"District {i}",
+    } for i in range(application_count)]
+
+    requests = []
+    for _ in range(request_count):
+        items = list(rng.choice(applications).items())
+        rng.shuffle(items)
+        # Clients send the same values with varying key order and whitespace
+        requests.append({key: (f" {value} " if isinstance(value, str) and rng.random() < 0.3 else value)
+                         for key, value in items})
+    return requests
+
+
+def legacy_client(model):
+    cache, lock = {}, threading.Lock()
+
+    def handle(data):
+        prompt = PROMPT.format(data=data)
+        key = f"gemini_loan_{hashlib.md5(prompt.encode()).hexdigest()}"
+        with lock:
+            if key in cache:
+                return cache[key]
+        reply = model.generate_content(prompt).text
+        with lock:
+            cache[key] = reply
+        return reply
+
+    return handle
+
+
+def gateway_client(model):
+    def handle(data):
+        return LLMGateway.generate_text('loan_eligibility', PROMPT.format(data=canonical_json(data)), client=model)
+    return handle
+
+
+def measure(label, handler_factory, requests, clients, latency):
+    model = StubLLM(delay=latency)
+    handle = handler_factory(model)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        list(pool.map(handle, requests))
+    elapsed = time.perf_counter() - started
+    print(f"  {label:<24} {elapsed:8.3f}s  {len(model.calls):6d} model calls  "
+          f"{1 - len(model.calls) / len(requests):7.1%} served without a call")
+
+
+def run(request_count, application_count, clients, latency_ms):
+    requests = make_requests(request_count, application_count)
+    print(f"Requests: {request_count} over {application_count} applications, "
+          f"{clients} concurrent clients, model latency {latency_ms}ms")
+    measure('legacy md5 cache', legacy_client, requests, clients, latency_ms / 1000.0)
+    LLMGateway.reset()
+    LLMGateway.MAX_CONCURRENCY = clients
+    measure('LLM gateway', gateway_client, requests, clients, latency_ms / 1000.0)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--applications', type=int, default=40)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--latency-ms', type=int, default=200)
+    args = parser.parse_args()
+    run(args.requests, args.applications, args.clients, args.latency_ms)
@@ -0,0 +1,102 @@
+"""
+Model Registry Benchmark
+========================
+Measures what the ModelRegistry saves over ad hoc loading of the crop
+RandomForest:
+
+- Per-call cost of joblib.load (how the disease pipeline used to load its
+  model for every payload) versus a registry lookup
+- Private memory per forked worker when every worker loads the model itself
+  (lazy) versus loading it once in the parent before forking (preload), in
+  which case the workers share the parent's pages copy-on-write
+
+Private memory is read from /proc/<pid>/smaps_rollup, so the fork part
+only runs on Linux.
+
+Usage:
+    python benchmarks/bench_model_registry.py [--calls 200] [--workers 4]
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+import warnings
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import joblib
+import numpy as np
+
+from backend.services.model_registry import ModelRegistry, CROP_MODEL_PATH
+
+ROWS = np.random.default_rng(3).uniform(0, 100, size=(256, 7))
+
+
+def private_bytes(pid='self'):
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].endswith(':') and parts[1].isdigit():
+                fields[parts[0][:-1]] = int(parts[1]) * 1024
+    return fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0)
+
+
+def worker(conn):
+    before = private_bytes()
+    model = ModelRegistry.get('crop_model')
+    model.predict_proba(ROWS)
+    conn.send(private_bytes() - before)
+    conn.close()
+
+
+def fork_workers(count):
+    context = multiprocessing.get_context('fork')
+    pipes, processes = [], []
+    for _ in range(count):
+        parent, child = context.Pipe()
+        process = context.Process(target=worker, args=(child,))
+        process.start()
+        pipes.append(parent)
+        processes.append(process)
+    growth = [pipe.recv() for pipe in pipes]
+    for process in processes:
+        process.join()
+    return growth
+
+
+def timed(label, fn, calls):
+    started = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    elapsed = time.perf_counter() - started
+    print(f"  {label:<40} {elapsed:8.3f}s  {elapsed / calls * 1000:8.3f}ms/call")
+
+
+def run(calls, workers):
+    warnings.filterwarnings('ignore')
+    print(f"Model: {CROP_MODEL_PATH} ({os.path.getsize(CROP_MODEL_PATH) / 1e6:.1f} MB)")
+
+    timed('joblib.load + predict per call', lambda: joblib.load(CROP_MODEL_PATH).predict_proba(ROWS), calls)
+    timed('registry.get + predict per call', lambda: ModelRegistry.get('crop_model').predict_proba(ROWS), calls)
+
+    if not os.path.exists('/proc/self/smaps_rollup'):
+        print("  (fork memory comparison needs /proc/self/smaps_rollup)")
+        return
+
+    ModelRegistry.unload()
+    lazy = fork_workers(workers)
+    ModelRegistry.get('crop_model')
+    preloaded = fork_workers(workers)
+    print(f"  {'lazy: private MB added per worker':<40} {np.mean(lazy) / 1e6:8.2f}")
+    print(f"  {'preload: private MB added per worker':<40} {np.mean(preloaded) / 1e6:8.2f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--calls', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+    run(args.calls, args.workers)
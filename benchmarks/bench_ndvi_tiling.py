@@ -0,0 +1,101 @@
+"""
+NDVI Tiling Benchmark
+=====================
+Writes synthetic uint16 red/NIR bands as .npy files and computes NDVI stats
+and a heatmap two ways: whole-array (the previous float64 formula plus full
+size masks) and windowed with spatial_analytics.tiling on memory-mapped
+bands. Each mode runs in a child process so peak RSS can be compared.
+
+Usage:
+    python benchmarks/bench_ndvi_tiling.py [--size 10980] [--tile-size 1024]
+        [--workers 4] [--skip-full]
+"""
+
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from spatial_analytics.tiling import BandSource, process_raster
+
+
+def write_bands(directory, size, seed=42):
+    rng = np.random.default_rng(seed)
+    paths = []
+    for name, high in (('red', 4000), ('nir', 6000)):
+        path = os.path.join(directory, f'{name}.npy')
+        band = np.lib.format.open_memmap(path, mode='w+', dtype=np.uint16, shape=(size, size))
+        for start in range(0, size, 1024):
+            band[start:start + 1024] = rng.integers(0, high, size=band[start:start + 1024].shape, dtype=np.uint16)
+        band.flush()
+        del band
+        paths.append(path)
+    return paths
+
+
+def full_array(red_path, nir_path, heatmap_dir):
+    red, nir = np.load(red_path), np.load(nir_path)
+    np.seterr(divide='ignore', invalid='ignore')
+    ndvi = (nir.astype(float) - red.astype(float)) / (nir.astype(float) + red.astype(float))
+    ndvi = np.nan_to_num(ndvi, nan=-1.0, posinf=1.0, neginf=-1.0)
+    heatmap = np.zeros(ndvi.shape + (3,), dtype=np.uint8)
+    heatmap[:, :] = [0, 0, 255]
+    heatmap[(ndvi >= 0.1) & (ndvi < 0.4)] = [0, 255, 255]
+    heatmap[ndvi >= 0.4] = [0, 255, 0]
+    return float(ndvi.mean())
+
+
+def tiled(red_path, nir_path, heatmap_dir, tile_size, workers):
+    manifest = process_raster(BandSource(red_path, nir_path), heatmap_dir=heatmap_dir,
+                              tile_size=tile_size, workers=workers)
+    return manifest['stats']['mean']
+
+
+def measure(target, args, queue):
+    started = time.perf_counter()
+    mean = target(*args)
+    elapsed = time.perf_counter() - started
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    queue.put((elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, children, mean))
+
+
+def run_child(target, args):
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=measure, args=(target, args, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def run(size, tile_size, workers, skip_full):
+    with tempfile.TemporaryDirectory() as directory:
+        red_path, nir_path = write_bands(directory, size)
+        heatmap_dir = os.path.join(directory, 'heatmap')
+        print(f"raster {size}x{size} uint16, tile {tile_size}, workers {workers}")
+
+        modes = [('tiled', tiled, (red_path, nir_path, heatmap_dir, tile_size, workers))]
+        if not skip_full:
+            modes.insert(0, ('full array', full_array, (red_path, nir_path, heatmap_dir)))
+
+        for label, target, args in modes:
+            elapsed, rss_kb, child_rss_kb, mean = run_child(target, args)
+            print(f"{label:>10}: {elapsed:7.2f}s  peak RSS {rss_kb / 1024:8.1f} MB"
+                  f"  (largest worker {child_rss_kb / 1024:.1f} MB)  mean NDVI {mean:.5f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--size', type=int, default=10980)
+    parser.add_argument('--tile-size', type=int, default=1024)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--skip-full', action='store_true')
+    args = parser.parse_args()
+    run(args.size, args.tile_size, args.workers, args.skip_full)
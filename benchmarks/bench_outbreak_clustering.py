@@ -0,0 +1,113 @@
+"""
+Outbreak Clustering Benchmark
+=============================
+Compares the previous all-pairs outbreak clustering loop with the grid
+indexed DBSCAN used by GeospatialService on synthetic disease incidents
+(hotspots plus background noise across India), at 1k, 10k and 100k points.
+
+The all-pairs loop is quadratic, so it is only timed up to --legacy-limit
+incidents.
+
+Usage:
+    python benchmarks/bench_outbreak_clustering.py [--sizes 1000 10000 100000]
+        [--radius-km 50] [--min-incidents 3] [--legacy-limit 10000]
+"""
+
+import argparse
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.utils.spatial_index import dbscan_haversine, group_by_label
+
+# Rough bounding box of India
+LAT_RANGE = (8.0, 35.0)
+LON_RANGE = (68.0, 97.0)
+
+
+def make_incidents(count, seed=42):
+    rng = np.random.default_rng(seed)
+    hotspots = max(count // 200, 5)
+    centers_lat = rng.uniform(*LAT_RANGE, size=hotspots)
+    centers_lon = rng.uniform(*LON_RANGE, size=hotspots)
+
+    clustered = int(count * 0.7)
+    picks = rng.integers(0, hotspots, size=clustered)
+    lats = np.concatenate([
+        centers_lat[picks] + rng.normal(0, 0.15, size=clustered),
+        rng.uniform(*LAT_RANGE, size=count - clustered)
+    ])
+    lons = np.concatenate([
+        centers_lon[picks] + rng.normal(0, 0.15, size=clustered),
+        rng.uniform(*LON_RANGE, size=count - clustered)
+    ])
+    return lats, lons
+
+
+def _distance(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, [lat1, lon1, lat2, lon2])
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 6371 * 2 * math.asin(math.sqrt(a))
+
+
+def legacy_clusters(lats, lons, radius_km, min_incidents):
+    """The all-pairs loop GeospatialService used before the spatial index."""
+    points = list(zip(lats.tolist(), lons.tolist()))
+    visited = set()
+    clusters = []
+    for i, (lat, lon) in enumerate(points):
+        if i in visited:
+            continue
+        neighbors = [
+            j for j, (other_lat, other_lon) in enumerate(points)
+            if j != i and _distance(lat, lon, other_lat, other_lon) <= radius_km
+        ]
+        if len(neighbors) + 1 >= min_incidents:
+            clusters.append([i] + neighbors)
+            visited.add(i)
+            visited.update(neighbors)
+    return clusters
+
+
+def run(sizes, radius_km, min_incidents, legacy_limit):
+    print(f"radius: {radius_km} km, min incidents: {min_incidents}")
+    for size in sizes:
+        lats, lons = make_incidents(size)
+
+        started = time.perf_counter()
+        labels = dbscan_haversine(lats, lons, radius_km, min_incidents)
+        clusters = group_by_label(labels)
+        indexed_elapsed = time.perf_counter() - started
+        clustered = int((labels >= 0).sum())
+
+        line = (f"  {size:>7} incidents  indexed DBSCAN: {indexed_elapsed:8.3f}s  "
+                f"{len(clusters):>5} clusters, {clustered} clustered")
+
+        if size <= legacy_limit:
+            started = time.perf_counter()
+            legacy = legacy_clusters(lats, lons, radius_km, min_incidents)
+            legacy_elapsed = time.perf_counter() - started
+            assigned = sum(len(c) for c in legacy)
+            unique = len({i for c in legacy for i in c})
+            line += (f"  |  all-pairs: {legacy_elapsed:8.3f}s  {len(legacy)} clusters, "
+                     f"{assigned - unique} double-counted  |  "
+                     f"speedup {legacy_elapsed / indexed_elapsed:.1f}x")
+        else:
+            line += "  |  all-pairs: skipped"
+
+        print(line)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--radius-km', type=float, default=50.0)
+    parser.add_argument('--min-incidents', type=int, default=3)
+    parser.add_argument('--legacy-limit', type=int, default=10000)
+    args = parser.parse_args()
+    run(args.sizes, args.radius_km, args.min_incidents, args.legacy_limit)
@@ -0,0 +1,111 @@
+"""
+Task Progress Benchmark
+=======================
+Compares how clients learn that their async tasks finished:
+
+- Polling: the client requests the status of every task it is waiting on
+  once per interval, like the /api/task/<task_id> endpoints are used today
+- Long-poll: one /tasks/updates request watches all the tasks and returns
+  as soon as any of them changes (TaskProgressHub.wait)
+
+Simulated tasks publish progress through TaskProgressHub in-process, so the
+numbers show requests issued and the delay between a task finishing and the
+client noticing, not network cost.
+
+Usage:
+    python benchmarks/bench_task_progress.py [--tasks 50] [--duration 3]
+        [--steps 10] [--interval 1.0]
+"""
+
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.services.task_progress import TaskProgressHub, TERMINAL_STATUSES
+
+
+def run_tasks(task_ids, duration, steps, finished_at):
+    """Start one thread per task that reports `steps` progress updates then succeeds."""
+    def work(task_id, runtime):
+        TaskProgressHub.publish(task_id, 'STARTED')
+        for step in range(1, steps + 1):
+            time.sleep(runtime / steps)
+            TaskProgressHub.publish(task_id, 'PROGRESS', progress=100.0 * step / steps)
+        TaskProgressHub.publish(task_id, 'SUCCESS', result={'ok': True})
+        finished_at[task_id] = time.monotonic()
+
+    rng = random.Random(7)
+    threads = [threading.Thread(target=work, args=(task_id, rng.uniform(0.3, 1.0) * duration))
+               for task_id in task_ids]
+    for thread in threads:
+        thread.start()
+    return threads
+
+
+def poll(task_ids, interval, seen_at):
+    requests = 0
+    waiting = set(task_ids)
+    while waiting:
+        for task_id in list(waiting):
+            requests += 1
+            if TaskProgressHub.snapshot([task_id], fallback=False)[task_id]['status'] in TERMINAL_STATUSES:
+                seen_at[task_id] = time.monotonic()
+                waiting.discard(task_id)
+        if waiting:
+            time.sleep(interval)
+    return requests
+
+
+def long_poll(task_ids, seen_at):
+    requests, cursor = 0, 0
+    waiting = set(task_ids)
+    while waiting:
+        requests += 1
+        updates = TaskProgressHub.wait(task_ids, since=cursor, timeout=25)
+        cursor = updates['cursor']
+        now = time.monotonic()
+        for event in updates['events']:
+            if event['status'] in TERMINAL_STATUSES and event['task_id'] in waiting:
+                seen_at[event['task_id']] = now
+                waiting.discard(event['task_id'])
+    return requests
+
+
+def measure(label, task_count, duration, steps, client):
+    TaskProgressHub.clear()
+    task_ids = [f"{label}-{i}" for i in range(task_count)]
+    finished_at, seen_at = {}, {}
+    started = time.perf_counter()
+    threads = run_tasks(task_ids, duration, steps, finished_at)
+    requests = client(task_ids, seen_at)
+    elapsed = time.perf_counter() - started
+    for thread in threads:
+        thread.join()
+
+    delays = sorted(seen_at[task_id] - finished_at[task_id] for task_id in task_ids)
+    print(f"  {label:<22} {elapsed:7.2f}s  {requests:7d} requests  "
+          f"notice delay avg {sum(delays) / len(delays) * 1000:7.1f}ms  max {delays[-1] * 1000:7.1f}ms")
+
+
+def run(task_count, duration, steps, interval):
+    # Without Redis the hub stores events in-process, which is what we time
+    TaskProgressHub._client = classmethod(lambda cls: None)
+    print(f"Tasks: {task_count}, runtime up to {duration}s, {steps} progress steps each, "
+          f"poll interval {interval}s")
+    measure('polling', task_count, duration, steps, lambda ids, seen: poll(ids, interval, seen))
+    measure('long-poll', task_count, duration, steps, long_poll)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--tasks', type=int, default=50)
+    parser.add_argument('--duration', type=float, default=3.0)
+    parser.add_argument('--steps', type=int, default=10)
+    parser.add_argument('--interval', type=float, default=1.0)
+    args = parser.parse_args()
+    run(args.tasks, args.duration, args.steps, args.interval)
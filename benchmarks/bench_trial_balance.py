@@ -0,0 +1,108 @@
+"""
+Trial Balance Benchmark
+=======================
+Compares the grouped-aggregate trial balance (LedgerService.get_trial_balance)
+with the previous per-account path, which called LedgerAccount.get_balance
+once per account. Reports wall time and the number of SQL statements issued.
+
+Usage:
+    python benchmarks/bench_trial_balance.py [--accounts 5000] [--transactions 20000]
+        [--database sqlite:///bench_trial_balance.db]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from _common import make_app, QueryCounter
+from backend.extensions import db
+from backend.models.ledger import LedgerAccount, AccountType, TransactionType
+from backend.services.ledger_service import LedgerService
+
+
+def legacy_trial_balance(as_of_date=None):
+    """The previous implementation: one balance lookup per account."""
+    rows = []
+    for account in LedgerAccount.query.filter_by(is_active=True).all():
+        balance = account.get_balance(as_of_date)
+        rows.append((account.account_code, balance))
+    return rows
+
+
+def seed(accounts, transactions, seed_value=7):
+    rng = random.Random(seed_value)
+    types = list(AccountType)
+
+    # Ten top-level accounts, everything else hangs beneath one of them
+    parents = []
+    for i in range(accounts):
+        account = LedgerAccount(
+            account_code=f'TB-{i:05d}',
+            name=f'Account {i}',
+            account_type=types[i % len(types)],
+            parent_id=rng.choice(parents) if parents and i >= 10 else None
+        )
+        db.session.add(account)
+        db.session.flush()
+        if i < 10 or rng.random() < 0.1:
+            parents.append(account.id)
+    db.session.commit()
+
+    account_ids = [row[0] for row in db.session.query(LedgerAccount.id)]
+    start = datetime.utcnow() - timedelta(days=90)
+    batch = []
+    for _ in range(transactions):
+        debit_id, credit_id = rng.sample(account_ids, 2)
+        amount = round(rng.uniform(1, 1000), 2)
+        currency = rng.choice(['USD', 'USD', 'EUR', 'INR'])
+        batch.append({
+            'transaction_type': TransactionType.TRANSFER,
+            'entry_date': start + timedelta(minutes=rng.randint(0, 90 * 24 * 60)),
+            'entries': [
+                {'account_id': debit_id, 'entry_type': 'DEBIT', 'amount': amount, 'currency': currency},
+                {'account_id': credit_id, 'entry_type': 'CREDIT', 'amount': amount, 'currency': currency}
+            ]
+        })
+    LedgerService.create_transactions_bulk(batch)
+
+
+def measure(label, fn):
+    with QueryCounter(db.engine) as counter:
+        started = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - started
+    print(f"  {label:<38} {elapsed:8.3f}s  {counter.count:7d} queries")
+
+
+def run(accounts, transactions, database_url):
+    app = make_app(database_url)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        seed(accounts, transactions)
+
+        as_of = datetime.utcnow() - timedelta(days=30)
+        print(f"Accounts: {accounts}, transactions: {transactions}, database: {database_url}")
+        measure('legacy per-account balances', legacy_trial_balance)
+        measure('legacy per-account balances (as_of)', lambda: legacy_trial_balance(as_of))
+        measure('grouped trial balance', LedgerService.get_trial_balance)
+        measure('grouped trial balance (as_of)', lambda: LedgerService.get_trial_balance(as_of_date=as_of))
+        measure('grouped + rollup + currencies', lambda: LedgerService.get_trial_balance(
+            include_children=True, currency_breakdown=True
+        ))
+
+        db.drop_all()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--accounts', type=int, default=5000)
+    parser.add_argument('--transactions', type=int, default=20000)
+    parser.add_argument('--database', default='sqlite:///:memory:')
+    args = parser.parse_args()
+    run(args.accounts, args.transactions, args.database)
@@ -0,0 +1,154 @@
+"""
+Watchlist Alert Benchmark
+=========================
+Matches a stream of mandi price updates against price watchlists:
+
+- Legacy: one PriceWatchlist query per update for every enabled watch on
+  the crop, then a Python comparison per watch (the previous
+  check_watchlist_alerts), run on the first --legacy-limit updates and
+  extrapolated
+- Index: WatchlistIndex, one bisect per update and (crop, district) book
+
+Then registers a sample of the matched alerts with a register_alert loop
+and with AlertRegistry.register_alerts_batch. Mail runs inline with
+MAIL_SUPPRESS_SEND and Socket.IO has no connected clients. SQLite runs the
+batch's ordered INSERT ... RETURNING one row per statement; PostgreSQL
+batches it.
+
+Usage:
+    python benchmarks/bench_watchlist_index.py [--watchers 100000]
+        [--updates 5000] [--legacy-limit 100] [--alert-sample 2000]
+        [--database sqlite:///:memory:]
+"""
+
+import argparse
+import logging
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from _common import make_app, QueryCounter
+from backend.extensions import db
+from backend.models import Alert, PriceWatchlist, User
+from backend.services.alert_registry import AlertRegistry
+from backend.services.watchlist_index import watchlist_index
+
+CROPS = ['Tomato', 'Onion', 'Wheat', 'Rice', 'Cotton', 'Soybean', 'Maize', 'Chana', 'Tur', 'Groundnut']
+DISTRICTS = [f"District {i}" for i in range(50)]
+
+
+def seed(watchers, rng):
+    users = max(watchers // 5, 1)
+    db.session.bulk_insert_mappings(User, [{
+        'username': f'trader{i}',
+        'full_name': f'Trader {i}',
+        'email': f'trader{i}@example.com',
+        'password_hash': 'x',
+        'role': 'farmer'
+    } for i in range(users)])
+    db.session.commit()
+    user_ids = [uid for (uid,) in db.session.query(User.id)]
+
+    base = {crop: rng.randint(1500, 6000) for crop in CROPS}
+    rows = [{
+        'user_id': rng.choice(user_ids),
+        'crop_name': crop,
+        # One watch in five covers every district
+        'district': None if rng.random() < 0.2 else rng.choice(DISTRICTS),
+        'target_price': round(base[crop] * rng.uniform(0.8, 1.3), 2),
+        'alert_enabled': rng.random() > 0.05
+    } for crop in rng.choices(CROPS, k=watchers)]
+    for start in range(0, len(rows), 10000):
+        db.session.bulk_insert_mappings(PriceWatchlist, rows[start:start + 10000])
+    db.session.commit()
+    return base
+
+
+def make_updates(count, base, rng):
+    prices = {(crop, district): base[crop] for crop in CROPS for district in DISTRICTS}
+    updates = []
+    for _ in range(count):
+        key = rng.choice(list(prices))
+        previous = prices[key]
+        prices[key] = round(previous * rng.uniform(0.95, 1.06), 2)
+        updates.append({'crop_name': key[0], 'district': key[1],
+                        'modal_price': prices[key], 'previous_price': previous})
+    return updates
+
+
+def legacy_match(updates):
+    matches = []
+    for price_data in updates:
+        watchers = PriceWatchlist.query.filter_by(crop_name=price_data['crop_name'], alert_enabled=True).all()
+        for watcher in watchers:
+            if price_data['modal_price'] >= watcher.target_price:
+                matches.append((watcher.id, price_data['district']))
+    return matches
+
+
+def timed(label, fn):
+    with QueryCounter(db.engine) as counter:
+        started = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - started
+    print(f"  {label:<40} {elapsed:8.3f}s  {counter.count:7d} statements")
+    return elapsed, result
+
+
+def run(watchers, update_count, legacy_limit, alert_sample, database_url):
+    # Socket.IO logs an error per emit without a message queue; keep output readable
+    logging.disable(logging.ERROR)
+    rng = random.Random(42)
+    app = make_app(database_url, alerts=True)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        base = seed(watchers, rng)
+        updates = make_updates(update_count, base, rng)
+        db.session.expire_all()
+        print(f"Watchers: {watchers}, price updates: {update_count}, database: {database_url}")
+
+        legacy_updates = updates[:legacy_limit]
+        legacy, legacy_matches = timed(f"legacy query + filter ({len(legacy_updates)} updates)",
+                                       lambda: legacy_match(legacy_updates))
+        db.session.expunge_all()
+        _, indexed = timed("index load", watchlist_index.rebuild)
+        index, matches = timed(f"index bisect ({update_count} updates)", lambda: watchlist_index.match(updates))
+
+        per_legacy = legacy / max(len(legacy_updates), 1)
+        per_index = index / max(update_count, 1)
+        print(f"  per update: legacy {per_legacy * 1000:.3f} ms ({len(legacy_matches)} alerts on "
+              f"{len(legacy_updates)} updates, every watch at or below the price), index "
+              f"{per_index * 1000:.4f} ms ({len(matches)} crossings over {indexed} indexed watches), "
+              f"{per_legacy / per_index:.0f}x")
+        print(f"  legacy extrapolated to {update_count} updates: {per_legacy * update_count:.1f}s")
+
+        sample = [{
+            'user_id': m.user_id,
+            'title': "Market Price Alert",
+            'message': f"{m.crop_name} price in {m.district} reached {m.price}, crossing your target of {m.target_price}.",
+            'group_key': f"price_{m.crop_name}_{m.district}"
+        } for m in matches[:alert_sample]]
+        loop, _ = timed(f"register_alert loop ({len(sample)})", lambda: [
+            AlertRegistry.register_alert(category='MARKET', priority='HIGH', **alert) for alert in sample
+        ])
+        batch, summary = timed(f"register_alerts_batch ({len(sample)})",
+                               lambda: AlertRegistry.register_alerts_batch(sample, category='MARKET', priority='HIGH'))
+        print(f"  alerts: batch created {summary['alerts_created']} ({loop / max(batch, 1e-9):.1f}x faster), "
+              f"alerts in table: {Alert.query.count()}")
+
+        db.drop_all()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--watchers', type=int, default=100000)
+    parser.add_argument('--updates', type=int, default=5000)
+    parser.add_argument('--legacy-limit', type=int, default=100)
+    parser.add_argument('--alert-sample', type=int, default=2000)
+    parser.add_argument('--database', default='sqlite:///:memory:')
+    args = parser.parse_args()
+    run(args.watchers, args.updates, args.legacy_limit, args.alert_sample, args.database)
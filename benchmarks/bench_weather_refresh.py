@@ -0,0 +1,142 @@
+"""
+Weather Refresh Benchmark
+=========================
+Compares WeatherService.refresh_locations, which fetches locations
+concurrently, commits once and evaluates the alert/fertigation/insurance
+rules over the whole batch, with the previous per-location loop (one
+blocking request, commit and rule pass per location). Requests go to a
+local stand-in for the weather API that answers after a fixed delay.
+
+Also times repeated get_latest_weather lookups served from the TTL cache
+against the same lookups hitting the database.
+
+Usage:
+    python benchmarks/bench_weather_refresh.py [--locations 300] [--latency-ms 50]
+        [--concurrency 32] [--database sqlite:///bench_weather_refresh.db]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from _common import make_app, QueryCounter
+from backend.extensions import db
+from backend.models.weather import WeatherData, RiskTrigger
+from backend.services import weather_service as weather_module
+from backend.services.weather_cache import WeatherCache
+from backend.services.weather_service import WeatherService
+from backend.utils.weather_api_client import WeatherAPIClient
+
+
+def start_stand_in_api(latency):
+    """Local weather API returning mild weather (no alerts) after `latency` seconds."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            location = parse_qs(urlparse(self.path).query).get('q', [''])[0]
+            rng = random.Random(location)
+            body = json.dumps({
+                'main': {'temp': rng.uniform(18, 32), 'humidity': rng.uniform(30, 70)},
+                'wind': {'speed': rng.uniform(1, 8), 'deg': rng.uniform(0, 360)},
+                'weather': [{'main': 'Clear'}],
+                'name': location
+            }).encode()
+            time.sleep(latency)
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def legacy_refresh(locations, client):
+    """The previous implementation: fetch, commit and evaluate rules per location."""
+    for location in locations:
+        raw = client.get_current_weather(location)
+        weather = WeatherData(
+            location=location, temperature=raw['main']['temp'], humidity=raw['main']['humidity'],
+            rainfall=0, wind_speed=raw['wind']['speed'], wind_direction=raw['wind'].get('deg', 0),
+            weather_condition=raw['weather'][0]['main']
+        )
+        db.session.add(weather)
+        db.session.commit()
+        WeatherService._evaluate_rules([weather])
+
+
+def legacy_lookups(locations, repeats):
+    for _ in range(repeats):
+        for location in locations:
+            WeatherData.query.filter(
+                WeatherData.location == location,
+                WeatherData.timestamp >= datetime.utcnow() - WeatherService.STALE_AFTER
+            ).order_by(WeatherData.timestamp.desc()).first()
+
+
+def measure(label, fn):
+    with QueryCounter(db.engine) as counter:
+        started = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - started
+    print(f"  {label:<38} {elapsed:8.3f}s  {counter.count:7d} queries")
+
+
+def run(location_count, latency_ms, concurrency, database_url):
+    server = start_stand_in_api(latency_ms / 1000.0)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    # Point every client the service creates at the stand-in API
+    weather_module.WeatherAPIClient = lambda: WeatherAPIClient(api_key='bench', base_url=base_url)
+
+    app = make_app(database_url)
+    app.config['WEATHER_FETCH_CONCURRENCY'] = concurrency
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        # Triggers that never fire still have to be checked
+        db.session.add_all([RiskTrigger(crop_type=f"Crop {i}", max_temp_threshold=60.0) for i in range(20)])
+        db.session.commit()
+
+        locations = [f"Village {i:04d}" for i in range(location_count)]
+        print(f"Locations: {location_count}, API latency: {latency_ms}ms, "
+              f"concurrency: {concurrency}, database: {database_url}")
+
+        client = WeatherAPIClient(api_key='bench', base_url=base_url)
+        measure('legacy per-location loop', lambda: legacy_refresh(locations, client))
+        WeatherCache.invalidate()
+        measure('bulk refresh', lambda: WeatherService.refresh_locations(locations))
+        measure('bulk refresh, all cached', lambda: WeatherService.refresh_locations(locations))
+
+        measure('latest weather x10, database', lambda: legacy_lookups(locations, 10))
+        measure('latest weather x10, cache', lambda: [
+            WeatherService.get_latest_weather(location) for _ in range(10) for location in locations
+        ])
+
+        db.drop_all()
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--locations', type=int, default=300)
+    parser.add_argument('--latency-ms', type=int, default=50)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--database', default='sqlite:///:memory:')
+    args = parser.parse_args()
+    run(args.locations, args.latency_ms, args.concurrency, args.database)
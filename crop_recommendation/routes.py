@@ -2,27 +2,38 @@ import sys
 import os
 sys.path.insert(0, os.path.abspath('..'))
 
-from flask import Blueprint, render_template, request, send_file, jsonify
+from flask import Blueprint, current_app, render_template, request, send_file, jsonify
 from auth_utils import token_required, roles_required
-import joblib
 import numpy as np
 import re
 from functools import wraps
 from reportlab.lib.pagesizes import A4
 from reportlab.pdfgen import canvas
-from io import BytesIO
+from io import BytesIO, StringIO
+import csv
 import datetime
+from backend.services.crop_inference import CropInferenceBatcher, FEATURES
+from backend.services.model_registry import ModelRegistry
 
 crop_bp = Blueprint('crop', __name__, template_folder='templates', static_folder='static')
 
-try:
-    model = joblib.load('model/rf_model.pkl')
-    label_encoder = joblib.load('model/label_encoder.pkl')  # Load encoder
-except (FileNotFoundError, IndexError):
-    model = None
-    label_encoder = None
+# Models are loaded (memory-mapped) and hot reloaded by the model registry;
+# nothing is loaded at import time unless ML_MODEL_LOAD_POLICY is 'preload'
+if not ModelRegistry.is_available('crop_model'):
     print("Warning: Crop models not found. Prediction disabled.")
 
+# Accepted range and display name per model feature
+FIELD_LIMITS = {
+    'N': (0, 200, "Nitrogen (N)"),
+    'P': (0, 200, "Phosphorus (P)"),
+    'K': (0, 200, "Potassium (K)"),
+    'temperature': (-50, 100, "Temperature"),
+    'humidity': (0, 100, "Humidity"),
+    'ph': (0, 14, "pH"),
+    'rainfall': (0, 1000, "Rainfall")
+}
+MAX_BULK_ROWS = 50000
+
 # Input validation helper functions
 def validate_required_fields(required_fields):
     def decorator(f):
@@ -57,6 +68,36 @@ def sanitize_input(text, max_length=255):
         return ""
     return text.strip()[:max_length]
 
+def sanitize_sample(sample):
+    """Validate one soil sample and return its values in model feature order"""
+    return [
+        sanitize_numeric_input(sample[field], low, high, label)
+        for field, (low, high, label) in FIELD_LIMITS.items()
+    ]
+
+def read_bulk_samples():
+    """Read soil samples from an uploaded CSV file, a CSV body or a JSON body"""
+    upload = request.files.get('file')
+    if upload is not None:
+        text = upload.read().decode('utf-8-sig')
+    elif request.mimetype == 'text/csv':
+        text = request.get_data(as_text=True)
+    else:
+        payload = request.get_json(silent=True)
+        if isinstance(payload, dict):
+            payload = payload.get('samples')
+        if not isinstance(payload, list):
+            raise ValueError("Expected a JSON list of samples or {\"samples\": [...]}")
+        return payload
+
+    reader = csv.DictReader(StringIO(text))
+    # Match headers case-insensitively (e.g. "n" or "PH")
+    columns = {name.strip().lower(): name for name in reader.fieldnames or []}
+    missing = [field for field in FEATURES if field.lower() not in columns]
+    if missing:
+        raise ValueError(f"CSV is missing columns: {', '.join(missing)}")
+    return [{field: row[columns[field.lower()]] for field in FEATURES} for row in reader]
+
 @crop_bp.route('/')
 def home():
     return render_template('index.html')
@@ -79,15 +120,7 @@ def predict():
                     return render_template('index.html', error=f"Missing required field: {field}")
 
             # Sanitize and validate all numeric inputs
-            data = [
-                sanitize_numeric_input(request.form['N'], 0, 200, "Nitrogen (N)"),
-                sanitize_numeric_input(request.form['P'], 0, 200, "Phosphorus (P)"),
-                sanitize_numeric_input(request.form['K'], 0, 200, "Potassium (K)"),
-                sanitize_numeric_input(request.form['temperature'], -50, 100, "Temperature"),
-                sanitize_numeric_input(request.form['humidity'], 0, 100, "Humidity"),
-                sanitize_numeric_input(request.form['ph'], 0, 14, "pH"),
-                sanitize_numeric_input(request.form['rainfall'], 0, 1000, "Rainfall")
-            ]
+            data = sanitize_sample(request.form)
             
             input_params = {
                 'N': str(data[0]),
@@ -99,14 +132,15 @@ def predict():
                 'rainfall': str(data[6])
             }
             
-            if model is None or label_encoder is None:
+            if not CropInferenceBatcher.is_available():
                 return render_template('index.html', error="Prediction model is currently unavailable.")
 
-            prediction_num = model.predict([data])[0]
-            prediction_label = label_encoder.inverse_transform([prediction_num])[0]
+            # Concurrent requests are scored together in one predict_proba call
+            top_crops = CropInferenceBatcher.predict([data])[0]
+            prediction_label = top_crops[0]['crop']
             
             # Handle the Form Submission (POST)
-            return render_template('result.html', crop=prediction_label, params=input_params)
+            return render_template('result.html', crop=prediction_label, params=input_params, top_crops=top_crops)
             
         except ValueError as e:
             # Render the form again with the error message visible
@@ -115,6 +149,76 @@ def predict():
             crop_bp.logger.error(f"Prediction error: {str(e)}")
             return jsonify({'error': 'Prediction failed'}), 500
 
+@crop_bp.route('/predict/bulk', methods=['POST'])
+@token_required
+@roles_required('farmer', 'admin', 'consultant')
+def predict_bulk():
+    """
+    Score many soil samples at once.
+
+    Accepts a CSV upload ("file"), a text/csv body, or JSON. Invalid rows are
+    reported in "errors" and skipped. Add ?format=csv for a CSV response.
+    """
+    try:
+        samples = read_bulk_samples()
+        if len(samples) > MAX_BULK_ROWS:
+            return jsonify({'error': f'At most {MAX_BULK_ROWS} samples per request'}), 400
+        top_k = min(max(request.args.get('top_k', 3, type=int), 1), 10)
+
+        rows, indices, errors = [], [], []
+        for index, sample in enumerate(samples):
+            try:
+                if not isinstance(sample, dict):
+                    raise ValueError("Sample must be an object")
+                missing = [field for field in FEATURES if field not in sample]
+                if missing:
+                    raise ValueError(f"Missing fields: {', '.join(missing)}")
+                rows.append(sanitize_sample(sample))
+                indices.append(index)
+            except ValueError as e:
+                errors.append({'index': index, 'error': str(e)})
+
+        if rows and not CropInferenceBatcher.is_available():
+            return jsonify({'error': 'Prediction model is currently unavailable'}), 503
+
+        ranked = CropInferenceBatcher.predict_many(rows, top_k=top_k) if rows else []
+        predictions = [
+            {'index': index, 'prediction': crops[0]['crop'], 'top_crops': crops}
+            for index, crops in zip(indices, ranked)
+        ]
+
+        if request.args.get('format') == 'csv':
+            output = StringIO()
+            writer = csv.writer(output)
+            writer.writerow(['index', *FEATURES, 'prediction', 'probability', 'top_crops'])
+            for values, result in zip(rows, predictions):
+                writer.writerow([
+                    result['index'], *values, result['prediction'], result['top_crops'][0]['probability'],
+                    ';'.join(f"{c['crop']}:{c['probability']}" for c in result['top_crops'])
+                ])
+            return send_file(BytesIO(output.getvalue().encode('utf-8')), as_attachment=True,
+                             download_name="crop_predictions.csv", mimetype='text/csv')
+
+        return jsonify({
+            'status': 'success',
+            'count': len(predictions),
+            'predictions': predictions,
+            'errors': errors
+        })
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        current_app.logger.error(f"Bulk prediction error: {str(e)}")
+        return jsonify({'error': 'Bulk prediction failed'}), 500
+
+@crop_bp.route('/predict/stats', methods=['GET'])
+@token_required
+@roles_required('admin')
+def predict_stats():
+    """Micro-batching metrics: batch sizes, queue depth and latency"""
+    return jsonify({'status': 'success', 'data': CropInferenceBatcher.stats()})
+
 # PDF download route
 @crop_bp.route('/download_report', methods=['POST'])
 @token_required
@@ -0,0 +1,38 @@
+"""Add outbreak propagation bookkeeping
+
+Revision ID: fbf583dcca05
+Revises: 8be05540cfac
+Create Date: 2026-10-18 19:45:12.403817
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'fbf583dcca05'
+down_revision = '8be05540cfac'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('outbreak_zones', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('propagation_inputs_hash', sa.String(length=40), nullable=True))
+        batch_op.add_column(sa.Column('last_simulated_at', sa.DateTime(), nullable=True))
+
+    # Existing projections keep a NULL horizon; the next propagation run
+    # treats them as stale and replaces them with one row per horizon.
+    with op.batch_alter_table('outbreak_projections', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('horizon_hours', sa.Integer(), nullable=True))
+        batch_op.create_index('idx_outbreak_projection_zone_horizon', ['outbreak_zone_id', 'horizon_hours'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('outbreak_projections', schema=None) as batch_op:
+        batch_op.drop_index('idx_outbreak_projection_zone_horizon')
+        batch_op.drop_column('horizon_hours')
+
+    with op.batch_alter_table('outbreak_zones', schema=None) as batch_op:
+        batch_op.drop_column('last_simulated_at')
+        batch_op.drop_column('propagation_inputs_hash')
@@ -3,6 +3,9 @@ from backend.extensions import db
 from .models import Field, FieldAnalysis
 from backend.models import User
 from .utils import SpatialUtils
+from backend.celery_app import celery_app
+from backend.services.task_progress import STATUS_BY_STATE
+from backend.tasks.spatial_tasks import analyze_field_raster_task
 import json
 import os
 import uuid
@@ -64,10 +67,19 @@ def get_fields():
 def analyze_field(field_id):
     """
     Trigger NDVI analysis for a field.
-    In production, this would dispatch a Celery task.
+    
+    With a JSON body {"raster": {"red": ..., "nir": ..., "red_band": 1,
+    "nir_band": 1, "transform": [...]}} (paths relative to UPLOAD_FOLDER)
+    the tiled NDVI engine runs in analyze_field_raster_task; the response
+    is 202 with a task id to poll at /api/spatial/analyze/tasks/<task_id>.
+    Without one, a mock heatmap is computed inline and returned with 201.
     """
     try:
         field = Field.query.get_or_404(field_id)
+        raster = (request.get_json(silent=True) or {}).get('raster')
+        
+        if raster:
+            return _analyze_raster(field, raster)
         
         # Mock Analysis
         # 1. Fetch satellite data for field location (Mocked in Utils)
@@ -96,3 +108,53 @@ def analyze_field(field_id):
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+
+def _upload_path(relative_path):
+    """Resolve a path inside UPLOAD_FOLDER, rejecting anything outside it"""
+    root = os.path.realpath(current_app.config['UPLOAD_FOLDER'])
+    full_path = os.path.realpath(os.path.join(root, relative_path))
+    if os.path.commonpath([root, full_path]) != root or not os.path.isfile(full_path):
+        raise ValueError(f"Raster not found: {relative_path}")
+    return full_path
+
+def _analyze_raster(field, raster):
+    """Queue tiled NDVI over an uploaded raster, clipped to the field boundary"""
+    try:
+        red_path = _upload_path(raster['red'])
+        nir_path = _upload_path(raster['nir']) if raster.get('nir') else None
+    except (KeyError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # Tiles and manifest.json go in one directory per analysis
+    dirname = f"ndvi_{field.id}_{uuid.uuid4().hex[:8]}"
+    heatmap_dir = os.path.join(current_app.config['UPLOAD_FOLDER'], 'spatial_outputs', dirname)
+    
+    task = analyze_field_raster_task.delay(
+        field.id, red_path, nir_path, heatmap_dir,
+        f"uploads/spatial_outputs/{dirname}/manifest.json",
+        red_band=raster.get('red_band', 1),
+        nir_band=raster.get('nir_band', 1),
+        transform=raster.get('transform')
+    )
+    
+    return jsonify({
+        'status': 'submitted',
+        'task_id': task.id,
+        'status_url': f"/api/spatial/analyze/tasks/{task.id}",
+        'message': 'NDVI analysis queued. Poll status_url for the result.'
+    }), 202
+
+@spatial_bp.route('/analyze/tasks/<task_id>', methods=['GET'])
+def get_analysis_task(task_id):
+    """Status of a queued raster analysis; includes the FieldAnalysis once completed"""
+    try:
+        task = celery_app.AsyncResult(task_id)
+        status = STATUS_BY_STATE.get(task.state, task.state)
+        
+        if status == 'completed':
+            return jsonify({'status': status, **(task.result or {})}), 200
+        if status == 'failed':
+            return jsonify({'status': status, 'message': str(task.info)}), 200
+        return jsonify({'status': status}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
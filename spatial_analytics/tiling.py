@@ -0,0 +1,369 @@
+"""
+Tiled NDVI engine for rasters too large to process in one array.
+
+Bands are read one window at a time (rasterio windows, or memory-mapped
+.npy arrays when rasterio is not installed), NDVI is computed in float32
+in place, pixels outside the field boundary are masked per tile and
+statistics are accumulated incrementally. Tiles can be spread over a
+process pool; each tile's heatmap is written as its own PNG.
+"""
+import os
+import json
+import math
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+try:
+    import rasterio
+    from rasterio.warp import transform_geom
+    from rasterio.windows import Window
+except ImportError:
+    rasterio = None
+
+import cv2
+
+DEFAULT_TILE_SIZE = 1024
+HISTOGRAM_BINS = 20
+
+# Heatmap classes: < 0.1 soil/dead, 0.1 - 0.4 unhealthy, >= 0.4 healthy
+NDVI_CLASS_THRESHOLDS = (0.1, 0.4)
+# BGRA per class; the last row is the transparent "outside field" colour
+HEATMAP_COLORS = np.array([
+    [0, 0, 255, 255],
+    [0, 255, 255, 255],
+    [0, 255, 0, 255],
+    [0, 0, 0, 0]
+], dtype=np.uint8)
+OUTSIDE_FIELD = len(HEATMAP_COLORS) - 1
+
+
+def ndvi_tile(red_band, nir_band):
+    """
+    NDVI = (NIR - Red) / (NIR + Red) in float32, using two buffers.
+
+    Zero-sum pixels follow calculate_ndvi: nan -> -1, +inf -> 1, -inf -> -1.
+    """
+    red_band = np.asarray(red_band)
+    ndvi = np.array(nir_band, dtype=np.float32)
+    denominator = red_band.astype(np.float32)
+    denominator += ndvi
+    ndvi -= red_band
+    with np.errstate(divide='ignore', invalid='ignore'):
+        np.divide(ndvi, denominator, out=ndvi)
+    np.nan_to_num(ndvi, copy=False, nan=-1.0, posinf=1.0, neginf=-1.0)
+    return ndvi
+
+
+def ndvi_classes(ndvi):
+    """Heatmap class index (uint8) per pixel; NaN falls into the lowest class."""
+    low, high = NDVI_CLASS_THRESHOLDS
+    classes = (ndvi >= low).view(np.uint8)
+    classes += (ndvi >= high).view(np.uint8)
+    return classes
+
+
+def heatmap_tile(ndvi, field_mask=None):
+    """BGRA heatmap for one tile; pixels outside field_mask are transparent."""
+    classes = ndvi_classes(ndvi)
+    if field_mask is not None:
+        classes[~field_mask] = OUTSIDE_FIELD
+    return HEATMAP_COLORS[classes]
+
+
+class NDVIStats:
+    """
+    Streaming NDVI statistics: mean/std/min/max, a fixed-bin histogram
+    over [-1, 1] and per-class pixel counts. Partial results merge exactly.
+    """
+
+    def __init__(self, bins=HISTOGRAM_BINS):
+        self.edges = np.linspace(-1.0, 1.0, bins + 1)
+        self.histogram = np.zeros(bins, dtype=np.int64)
+        self.class_counts = np.zeros(3, dtype=np.int64)
+        self.count = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, values):
+        values = np.asarray(values).ravel()
+        if not values.size:
+            return
+        low, high = NDVI_CLASS_THRESHOLDS
+        below = np.count_nonzero(values < low)
+        above = np.count_nonzero(values >= high)
+
+        self.count += values.size
+        self.total += float(values.sum(dtype=np.float64))
+        self.total_sq += float(np.square(values, dtype=np.float64).sum())
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self.histogram += np.histogram(values, bins=self.edges)[0]
+        self.class_counts += (below, values.size - below - above, above)
+
+    def merge(self, other):
+        self.count += other.count
+        self.total += other.total
+        self.total_sq += other.total_sq
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.histogram += other.histogram
+        self.class_counts += other.class_counts
+
+    def to_dict(self):
+        if not self.count:
+            return {"pixel_count": 0, "mean": None, "max": None, "min": None, "health_score": None}
+        mean = self.total / self.count
+        variance = max(self.total_sq / self.count - mean * mean, 0.0)
+        return {
+            "pixel_count": self.count,
+            "mean": mean,
+            "max": self.max,
+            "min": self.min,
+            "std": math.sqrt(variance),
+            "health_score": int((mean + 1) * 50),  # Scale 0-100
+            "histogram": {"edges": self.edges.round(4).tolist(), "counts": self.histogram.tolist()},
+            "class_fractions": dict(zip(
+                ("bare", "stressed", "healthy"), (self.class_counts / self.count).round(4).tolist()
+            ))
+        }
+
+
+class BandSource:
+    """
+    Picklable description of where the red and NIR bands live.
+
+    red/nir are paths to rasters readable by rasterio, paths to .npy files
+    (opened with mmap_mode='r') or in-memory arrays. When nir is None both
+    bands come from the same multi-band file. Band numbers are 1-based.
+    transform maps pixels to map coordinates as (a, b, c, d, e, f):
+    x = a*col + b*row + c, y = d*col + e*row + f. Rasterio files supply it.
+    """
+
+    def __init__(self, red, nir=None, red_band=1, nir_band=1, transform=None):
+        self.red = red
+        self.nir = red if nir is None else nir
+        self.red_band = red_band
+        self.nir_band = nir_band
+        self.transform = tuple(transform)[:6] if transform is not None else None
+        self.crs = None
+        self._handles = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_handles'] = None
+        return state
+
+    def _open_one(self, source):
+        if not isinstance(source, str):
+            return np.asarray(source)
+        if source.endswith('.npy'):
+            return np.load(source, mmap_mode='r')
+        if rasterio is None:
+            raise RuntimeError("rasterio is required to read raster files")
+        return rasterio.open(source)
+
+    def open(self):
+        if self._handles is None:
+            red = self._open_one(self.red)
+            nir = red if self.nir is self.red else self._open_one(self.nir)
+            self._handles = (red, nir)
+            if rasterio is not None and not isinstance(red, np.ndarray):
+                if self.transform is None:
+                    self.transform = tuple(red.transform)[:6]
+                self.crs = red.crs
+        return self._handles
+
+    def close(self):
+        if self._handles is not None:
+            red, nir = self._handles
+            for handle in (red,) if nir is red else (red, nir):
+                if hasattr(handle, 'close'):
+                    handle.close()
+            self._handles = None
+
+    @property
+    def shape(self):
+        red, _ = self.open()
+        if isinstance(red, np.ndarray):
+            return red.shape[-2:]
+        return red.height, red.width
+
+    @staticmethod
+    def _read_band(handle, band, row, col, height, width):
+        if isinstance(handle, np.ndarray):
+            data = handle[band - 1] if handle.ndim == 3 else handle
+            return data[row:row + height, col:col + width]
+        return handle.read(band, window=Window(col, row, width, height))
+
+    def read(self, row, col, height, width):
+        """Read the red and NIR window starting at (row, col)."""
+        red, nir = self.open()
+        return (self._read_band(red, self.red_band, row, col, height, width),
+                self._read_band(nir, self.nir_band, row, col, height, width))
+
+    def boundary_rings(self, boundary_geojson):
+        """
+        Field boundary rings in pixel coordinates (col, row).
+
+        Accepts a Feature, FeatureCollection, Polygon or MultiPolygon given
+        in lon/lat; reprojected to the raster CRS when rasterio knows it.
+        """
+        self.open()
+        if self.transform is None:
+            raise ValueError("A pixel transform is required to clip to a boundary")
+
+        geometries = _geometries(boundary_geojson)
+        if self.crs is not None and str(self.crs) != 'EPSG:4326':
+            geometries = [transform_geom('EPSG:4326', self.crs, geometry) for geometry in geometries]
+
+        a, b, c, d, e, f = self.transform
+        det = a * e - b * d
+        rings = []
+        for geometry in geometries:
+            polygons = [geometry['coordinates']] if geometry['type'] == 'Polygon' else geometry['coordinates']
+            for polygon in polygons:
+                for ring in polygon:
+                    x, y = np.asarray(ring, dtype=np.float64)[:, :2].T
+                    cols = (e * (x - c) - b * (y - f)) / det
+                    rows = (a * (y - f) - d * (x - c)) / det
+                    rings.append(np.column_stack([cols, rows]))
+        return rings
+
+
+def _geometries(boundary_geojson):
+    if isinstance(boundary_geojson, str):
+        boundary_geojson = json.loads(boundary_geojson)
+    kind = boundary_geojson.get('type')
+    if kind == 'FeatureCollection':
+        return [g for feature in boundary_geojson['features'] for g in _geometries(feature)]
+    if kind == 'Feature':
+        return _geometries(boundary_geojson['geometry'])
+    if kind in ('Polygon', 'MultiPolygon'):
+        return [boundary_geojson]
+    raise ValueError(f"Unsupported boundary geometry: {kind}")
+
+
+def rings_mask(rings, row, col, height, width):
+    """
+    Even-odd rasterization of rings over one tile (pixel centres).
+
+    Each ring edge toggles the parity from its crossing column onward in
+    every tile row it spans, so holes and multipolygons need no special case.
+    """
+    toggles = np.zeros((height, width + 1), dtype=np.int32)
+    ys = row + np.arange(height) + 0.5
+    for ring in rings:
+        x0, y0 = ring[:-1, 0], ring[:-1, 1]
+        x1, y1 = ring[1:, 0], ring[1:, 1]
+        if ring[0, 0] != ring[-1, 0] or ring[0, 1] != ring[-1, 1]:
+            x0, y0 = np.append(x0, ring[-1, 0]), np.append(y0, ring[-1, 1])
+            x1, y1 = np.append(x1, ring[0, 0]), np.append(y1, ring[0, 1])
+
+        spans = (y0[None, :] <= ys[:, None]) != (y1[None, :] <= ys[:, None])
+        tile_rows, edges = np.nonzero(spans)
+        if not tile_rows.size:
+            continue
+        x = x0[edges] + (ys[tile_rows] - y0[edges]) * (x1[edges] - x0[edges]) / (y1[edges] - y0[edges])
+        first_inside = np.clip(np.ceil(x - col - 0.5), 0, width).astype(np.int64)
+        np.add.at(toggles, (tile_rows, first_inside), 1)
+
+    return (np.cumsum(toggles, axis=1)[:, :width] & 1).astype(bool)
+
+
+def iter_tiles(height, width, tile_size=DEFAULT_TILE_SIZE, rings=None):
+    """
+    Yield (row, col, tile_height, tile_width) windows covering the raster,
+    skipping tiles outside the bounding box of rings when given.
+    """
+    row_start, row_stop, col_start, col_stop = 0, height, 0, width
+    if rings:
+        points = np.vstack(rings)
+        col_start = max(int(np.floor(points[:, 0].min() / tile_size)) * tile_size, 0)
+        row_start = max(int(np.floor(points[:, 1].min() / tile_size)) * tile_size, 0)
+        col_stop = min(int(np.ceil(points[:, 0].max())), width)
+        row_stop = min(int(np.ceil(points[:, 1].max())), height)
+
+    for row in range(row_start, row_stop, tile_size):
+        for col in range(col_start, col_stop, tile_size):
+            yield row, col, min(tile_size, height - row), min(tile_size, width - col)
+
+
+# Per-process state for tile workers (set once by _init_worker)
+_worker = {}
+
+
+def _init_worker(source, rings, heatmap_dir, bins):
+    _worker.update(source=source, rings=rings, heatmap_dir=heatmap_dir, bins=bins)
+
+
+def _process_tile(tile):
+    row, col, height, width = tile
+    red, nir = _worker['source'].read(row, col, height, width)
+    ndvi = ndvi_tile(red, nir)
+
+    field_mask = rings_mask(_worker['rings'], row, col, height, width) if _worker['rings'] else None
+    stats = NDVIStats(_worker['bins'])
+    stats.update(ndvi[field_mask] if field_mask is not None else ndvi)
+
+    path = None
+    if _worker['heatmap_dir'] and stats.count:
+        path = os.path.join(_worker['heatmap_dir'], f"tile_{row}_{col}.png")
+        cv2.imwrite(path, heatmap_tile(ndvi, field_mask))
+    return tile, stats, path
+
+
+def process_raster(source, boundary_geojson=None, heatmap_dir=None, tile_size=DEFAULT_TILE_SIZE,
+                   workers=None, bins=HISTOGRAM_BINS):
+    """
+    Compute NDVI statistics (and optionally a tiled heatmap) tile by tile.
+
+    Args:
+        source: BandSource describing the red/NIR bands
+        boundary_geojson: Field boundary to clip to (None = whole raster)
+        heatmap_dir: Directory for tile_<row>_<col>.png files and manifest.json
+        tile_size: Tile edge in pixels
+        workers: Process count (None = CPU count, 1 = run inline)
+        bins: Histogram bins over [-1, 1]
+
+    Returns:
+        Manifest dict with the raster shape, tile list and merged stats
+    """
+    height, width = source.shape
+    rings = source.boundary_rings(boundary_geojson) if boundary_geojson else None
+    tiles = list(iter_tiles(height, width, tile_size, rings))
+    if heatmap_dir:
+        os.makedirs(heatmap_dir, exist_ok=True)
+
+    workers = min(workers or os.cpu_count() or 1, len(tiles)) or 1
+    initargs = (source, rings, heatmap_dir, bins)
+    stats = NDVIStats(bins)
+    written = []
+
+    def collect(results):
+        for (row, col, tile_height, tile_width), tile_stats, path in results:
+            stats.merge(tile_stats)
+            if path:
+                written.append({"row": row, "col": col, "height": tile_height, "width": tile_width,
+                                "path": os.path.basename(path)})
+
+    if workers > 1:
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=initargs) as pool:
+            collect(pool.map(_process_tile, tiles, chunksize=max(len(tiles) // (workers * 4), 1)))
+    else:
+        _init_worker(*initargs)
+        try:
+            collect(map(_process_tile, tiles))
+        finally:
+            _worker.clear()
+
+    manifest = {
+        "shape": [height, width],
+        "tile_size": tile_size,
+        "tiles": written,
+        "stats": stats.to_dict()
+    }
+    if heatmap_dir:
+        with open(os.path.join(heatmap_dir, "manifest.json"), "w") as f:
+            json.dump(manifest, f)
+    return manifest
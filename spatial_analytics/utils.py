@@ -12,6 +12,11 @@ except ImportError:
 import cv2
 from datetime import datetime
 
+from .tiling import HEATMAP_COLORS, BandSource, ndvi_classes, ndvi_tile, process_raster
+
+# Rows colored per pass in generate_heatmap; bounds temporaries on large matrices
+HEATMAP_STRIP_ROWS = 1024
+
 class SpatialUtils:
     
     @staticmethod
@@ -19,17 +24,11 @@ class SpatialUtils:
         """
         Calculate NDVI from Red and NIR bands (numpy arrays).
         NDVI = (NIR - Red) / (NIR + Red)
-        """
-        # Allow division by zero
-        np.seterr(divide='ignore', invalid='ignore')
-        
-        # Calculate NDVI
-        ndvi = (nir_band.astype(float) - red_band.astype(float)) / (nir_band.astype(float) + red_band.astype(float))
         
-        # Handle nan/inf
-        ndvi = np.nan_to_num(ndvi, nan=-1.0, posinf=1.0, neginf=-1.0)
-        
-        return ndvi
+        Computed in float32 in place; division by zero is suppressed locally
+        instead of changing the global numpy error state.
+        """
+        return ndvi_tile(red_band, nir_band)
     
     @staticmethod
     def generate_heatmap(ndvi_matrix):
@@ -37,37 +36,36 @@ class SpatialUtils:
         Convert NDVI matrix (-1 to 1) to a colored heatmap image (Red-Yellow-Green).
         Returns raw image bytes or saves to path.
         """
-        # Normalize to 0-255
-        norm_ndvi = ((ndvi_matrix + 1) / 2 * 255).astype(np.uint8)
-        
-        # Apply colormap (COLORMAP_JET or custom encoding)
-        # Green is high NDVI, Red is low.
-        # OpenCV Colormap: Jet goes Blue(low) to Red(high). 
-        # We want Red(low) to Green(high).
-        # Custom map or simple modification:
-        
-        # Let's use simple logic:
-        # < 0.2: Red (Soil/Dead)
-        # 0.2 - 0.5: Yellow (Unhealthy)
-        # > 0.5: Green (Healthy)
-        
+        # < 0.1: Red (Soil/Dead)
+        # 0.1 - 0.4: Yellow (Unhealthy)
+        # >= 0.4: Green (Healthy)
+        # Colors are BGR for OpenCV, looked up per class in row strips so
+        # no full-size masks are allocated.
         height, width = ndvi_matrix.shape
-        heatmap = np.zeros((height, width, 3), dtype=np.uint8)
-        
-        # Vectorized color assignment
-        # Default Red
-        heatmap[:,:] = [0, 0, 255] # BGR for OpenCV
+        heatmap = np.empty((height, width, 3), dtype=np.uint8)
+        colors = HEATMAP_COLORS[:, :3]
         
-        # Yellow for 0.1 to 0.4
-        mask_yellow = (ndvi_matrix >= 0.1) & (ndvi_matrix < 0.4)
-        heatmap[mask_yellow] = [0, 255, 255] # Cyan/Yellowish
-        
-        # Green for > 0.4
-        mask_green = (ndvi_matrix >= 0.4)
-        heatmap[mask_green] = [0, 255, 0]
+        for start in range(0, height, HEATMAP_STRIP_ROWS):
+            stop = start + HEATMAP_STRIP_ROWS
+            heatmap[start:stop] = colors[ndvi_classes(ndvi_matrix[start:stop])]
         
         return heatmap
 
+    @staticmethod
+    def process_raster_ndvi(red_path, nir_path=None, boundary_geojson=None, heatmap_dir=None,
+                            red_band=1, nir_band=1, transform=None, workers=None):
+        """
+        Windowed NDVI for full-size rasters (e.g. 10980x10980 Sentinel-2 tiles).
+        
+        Reads tile by tile, clips to the field boundary, streams stats and
+        writes the heatmap as PNG tiles plus manifest.json in heatmap_dir.
+        """
+        source = BandSource(red_path, nir_path, red_band=red_band, nir_band=nir_band, transform=transform)
+        try:
+            return process_raster(source, boundary_geojson, heatmap_dir, workers=workers)
+        finally:
+            source.close()
+
     @staticmethod
     def process_satellite_imagery(image_path, boundary_geojson):
         """
@@ -90,7 +88,7 @@ class SpatialUtils:
         x = np.linspace(-1, 1, width)
         y = np.linspace(-1, 1, height)
         xv, yv = np.meshgrid(x, y)
-        synthetic_ndvi = 0.5 * np.sin(3*xv) + 0.5 * np.cos(3*yv) # Range approx -1 to 1
+        synthetic_ndvi = 0.5 * np.sin(3*xv) + 0.5 * np.cos(3*yv)  # Range approx -1 to 1
         
         # Generate Heatmap
         heatmap = SpatialUtils.generate_heatmap(synthetic_ndvi)
@@ -100,7 +98,7 @@ class SpatialUtils:
             "mean": float(np.mean(synthetic_ndvi)),
             "max": float(np.max(synthetic_ndvi)),
             "min": float(np.min(synthetic_ndvi)),
-            "health_score": int((np.mean(synthetic_ndvi) + 1) * 50) # Scale 0-100
+            "health_score": int((np.mean(synthetic_ndvi) + 1) * 50)  # Scale 0-100
         }
         
         return heatmap, stats
@@ -0,0 +1,92 @@
+import pytest
+import sys
+import os
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import agri_utils
+from agri_utils import CROP_DATABASE, compile_crop_matrix, recommend_crops, recommend_crops_batch
+
+
+def reference_scores(ph, temperature, rainfall_mm, season):
+    """Per-crop scoring rules, written out one crop at a time."""
+    scores = {}
+    for crop_id, crop in CROP_DATABASE.items():
+        ph_min, ph_max = crop["optimal_ph"]
+        temp_min, temp_max = crop["optimal_temperature"]
+        water_min, water_max = crop["water_requirement_mm"]
+
+        score = 25 if ph_min <= ph <= ph_max else 15 if ph_min - 0.5 <= ph <= ph_max + 0.5 else 0
+        score += 25 if temp_min <= temperature <= temp_max else 15 if temp_min - 5 <= temperature <= temp_max + 5 else 0
+        near_water = water_min * 0.7 <= rainfall_mm <= water_max * 1.3
+        score += 25 if water_min <= rainfall_mm <= water_max else 15 if near_water else 5
+        if season:
+            score += 25 if season.lower() in crop["growing_season"] else 0
+        else:
+            score += 15
+        scores[crop_id] = score
+    return scores
+
+
+class TestRecommendCropsBatch:
+    """Test suite for vectorized crop recommendation."""
+
+    def test_batch_matches_per_crop_rules(self):
+        """Test that batch scores and ordering follow the per-crop rules."""
+        rng = random.Random(7)
+        fields = [
+            {
+                "ph": rng.choice([rng.uniform(4.5, 8.5), 5.5, 6.0, 7.5]),
+                "temperature": rng.choice([rng.uniform(5, 40), 20, 25, 35]),
+                "rainfall_mm": rng.choice([rng.uniform(200, 3000), 500, 1500]),
+                "season": rng.choice([None, "kharif", "Rabi", "summer", "monsoon"])
+            }
+            for _ in range(300)
+        ]
+
+        for field, recommendations in zip(fields, recommend_crops_batch(fields)):
+            expected = reference_scores(field["ph"], field["temperature"], field["rainfall_mm"], field["season"])
+            ranked = [crop_id for crop_id, score in sorted(expected.items(), key=lambda item: item[1], reverse=True)
+                      if score >= 40][:10]
+
+            assert [r["crop_id"] for r in recommendations] == ranked
+            for r in recommendations:
+                assert r["suitability_score"] == pytest.approx(expected[r["crop_id"]])
+                assert sum(f["score"] for f in r["factors"]) == expected[r["crop_id"]]
+
+    def test_single_field_api_delegates_to_batch(self):
+        """Test that recommend_crops returns the batch result for one field."""
+        single = recommend_crops("loamy", 6.5, 80, 40, 40, 25, 70, 1000, "kharif")
+        batch = recommend_crops_batch([{"ph": 6.5, "temperature": 25, "rainfall_mm": 1000, "season": "kharif"}])
+
+        assert single == batch[0]
+        assert single[0]["factors"][0] == {"factor": "pH", "status": "optimal", "score": 25}
+
+    def test_top_k_and_empty_input(self):
+        """Test that top_k limits each result and empty input is handled."""
+        fields = [{"ph": 6.5, "temperature": 25, "rainfall_mm": 1000}] * 3
+
+        assert all(len(r) == 2 for r in recommend_crops_batch(fields, top_k=2))
+        assert recommend_crops_batch([]) == []
+
+    def test_recompile_picks_up_new_crops(self):
+        """Test that compile_crop_matrix refreshes after CROP_DATABASE changes."""
+        CROP_DATABASE["test_millet"] = {
+            **CROP_DATABASE["maize"],
+            "name": "Test Millet",
+            "optimal_ph": (9.0, 9.5),
+            "optimal_temperature": (40, 45),
+            "water_requirement_mm": (100, 200),
+            "growing_season": ["zaid"]
+        }
+        try:
+            compile_crop_matrix()
+            top = recommend_crops_batch([{"ph": 9.2, "temperature": 42, "rainfall_mm": 150, "season": "zaid"}])[0]
+            assert top[0]["crop_id"] == "test_millet"
+            assert top[0]["suitability_score"] == 100
+        finally:
+            del CROP_DATABASE["test_millet"]
+            compile_crop_matrix()
+
+        assert "test_millet" not in agri_utils._crop_matrix["crop_ids"]
@@ -0,0 +1,144 @@
+import pytest
+import sys
+import os
+import json
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from spatial_analytics.tiling import BandSource, NDVIStats, process_raster, rings_mask
+from spatial_analytics.utils import SpatialUtils
+
+# 1 pixel = 0.001 degrees, origin at (lon 75.0, lat 20.0), north up
+TRANSFORM = (0.001, 0.0, 75.0, 0.0, -0.001, 20.0)
+
+
+def make_bands(tmp_path, height=700, width=900, seed=5):
+    rng = np.random.default_rng(seed)
+    red = rng.integers(0, 4000, size=(height, width), dtype=np.uint16)
+    nir = rng.integers(0, 6000, size=(height, width), dtype=np.uint16)
+    red[:10, :10] = 0
+    nir[:10, :10] = 0
+    np.save(tmp_path / "red.npy", red)
+    np.save(tmp_path / "nir.npy", nir)
+    return red, nir
+
+
+def rectangle(col0, row0, col1, row1):
+    """GeoJSON Feature covering pixel columns [col0, col1) and rows [row0, row1)."""
+    lon0, lon1 = 75.0 + col0 * 0.001, 75.0 + col1 * 0.001
+    lat0, lat1 = 20.0 - row0 * 0.001, 20.0 - row1 * 0.001
+    ring = [[lon0, lat0], [lon1, lat0], [lon1, lat1], [lon0, lat1], [lon0, lat0]]
+    return {"type": "Feature", "geometry": {"type": "Polygon", "coordinates": [ring]}, "properties": {}}
+
+
+class TestNDVI:
+    """Test suite for float32 NDVI and heatmap coloring."""
+
+    def test_calculate_ndvi_matches_float64_formula(self):
+        """Test that float32 NDVI matches the float64 formula, including 0/0 pixels."""
+        rng = np.random.default_rng(1)
+        red = rng.integers(0, 10000, size=(200, 300)).astype(np.uint16)
+        nir = rng.integers(0, 10000, size=(200, 300)).astype(np.uint16)
+        red[0, :5] = nir[0, :5] = 0
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            expected = (nir.astype(float) - red.astype(float)) / (nir.astype(float) + red.astype(float))
+        expected = np.nan_to_num(expected, nan=-1.0, posinf=1.0, neginf=-1.0)
+
+        ndvi = SpatialUtils.calculate_ndvi(red, nir)
+        assert ndvi.dtype == np.float32
+        np.testing.assert_allclose(ndvi, expected, atol=1e-6)
+        assert np.all(ndvi[0, :5] == -1.0)
+
+    def test_generate_heatmap_classes(self):
+        """Test that heatmap colors follow the 0.1 / 0.4 thresholds."""
+        ndvi = np.array([[-1.0, 0.0999, 0.1, 0.3999, 0.4, 1.0, np.nan]])
+        heatmap = SpatialUtils.generate_heatmap(ndvi)
+
+        red, yellow, green = [0, 0, 255], [0, 255, 255], [0, 255, 0]
+        assert heatmap[0].tolist() == [red, red, yellow, yellow, green, green, red]
+
+
+class TestTiledProcessing:
+    """Test suite for windowed NDVI processing."""
+
+    def test_tiled_stats_match_full_raster(self, tmp_path):
+        """Test that merged tile statistics equal whole-raster statistics."""
+        red, nir = make_bands(tmp_path)
+        source = BandSource(str(tmp_path / "red.npy"), str(tmp_path / "nir.npy"), transform=TRANSFORM)
+
+        manifest = process_raster(source, tile_size=256, workers=1)
+
+        full = NDVIStats()
+        full.update(SpatialUtils.calculate_ndvi(red, nir))
+        expected = full.to_dict()
+        assert manifest["stats"]["pixel_count"] == red.size
+        assert manifest["stats"]["histogram"]["counts"] == expected["histogram"]["counts"]
+        assert manifest["stats"]["mean"] == pytest.approx(expected["mean"])
+        assert manifest["stats"]["std"] == pytest.approx(expected["std"])
+        assert manifest["stats"]["min"] == expected["min"]
+
+    def test_boundary_clipping_with_process_pool(self, tmp_path):
+        """Test clipping to a field, skipping tiles outside it, and writing PNG tiles."""
+        red, nir = make_bands(tmp_path)
+        source = BandSource(str(tmp_path / "red.npy"), str(tmp_path / "nir.npy"), transform=TRANSFORM)
+        heatmap_dir = tmp_path / "heatmap"
+
+        manifest = process_raster(source, json.dumps(rectangle(300, 100, 620, 330)),
+                                  heatmap_dir=str(heatmap_dir), tile_size=128, workers=2)
+
+        inside = SpatialUtils.calculate_ndvi(red, nir)[100:330, 300:620]
+        assert manifest["stats"]["pixel_count"] == inside.size
+        assert manifest["stats"]["mean"] == pytest.approx(float(inside.mean(dtype=np.float64)))
+
+        # Only tiles overlapping the field are processed and written
+        assert {(t["row"], t["col"]) for t in manifest["tiles"]} == {
+            (row, col) for row in (0, 128, 256) for col in (256, 384, 512)
+        }
+        assert all((heatmap_dir / t["path"]).exists() for t in manifest["tiles"])
+        assert json.loads((heatmap_dir / "manifest.json").read_text())["stats"] == manifest["stats"]
+
+    def test_rings_mask_handles_holes(self):
+        """Test that an inner ring cuts a hole in the mask."""
+        outer = np.array([[0, 0], [10, 0], [10, 10], [0, 10], [0, 0]], dtype=float)
+        hole = np.array([[3, 3], [7, 3], [7, 7], [3, 7], [3, 3]], dtype=float)
+
+        mask = rings_mask([outer, hole], 0, 0, 12, 12)
+
+        assert mask.sum() == 100 - 16
+        assert not mask[5, 5] and mask[1, 1] and not mask[11, 11]
+
+
+class TestAnalyzeRoute:
+    """Test that raster analysis is queued instead of run in the request."""
+
+    def test_raster_analysis_is_dispatched_to_celery(self, app, client, tmp_path):
+        from unittest.mock import MagicMock, patch
+        from backend.extensions import db
+        from backend.tasks.spatial_tasks import analyze_field_raster_task
+        from spatial_analytics.models import Field, FieldAnalysis
+
+        make_bands(tmp_path, height=200, width=200)
+        app.config.update(SQLALCHEMY_DATABASE_URI='sqlite:///:memory:', UPLOAD_FOLDER=str(tmp_path))
+        with app.app_context():
+            db.create_all()
+            field = Field(user_id=1, name='Plot', boundary_geojson=json.dumps(rectangle(20, 20, 120, 150)))
+            db.session.add(field)
+            db.session.commit()
+
+            with patch('spatial_analytics.routes.analyze_field_raster_task') as task:
+                task.delay.return_value = MagicMock(id='abc123')
+                response = client.post(f'/api/spatial/analyze/{field.id}', json={
+                    'raster': {'red': 'red.npy', 'nir': 'nir.npy', 'transform': list(TRANSFORM)}
+                })
+
+            assert response.status_code == 202
+            assert response.get_json()['status_url'] == '/api/spatial/analyze/tasks/abc123'
+            assert FieldAnalysis.query.count() == 0
+
+            args, kwargs = task.delay.call_args
+            result = analyze_field_raster_task.run(*args, **kwargs)
+            assert result['status'] == 'success'
+            assert result['analysis']['result_data']['pixel_count'] == 100 * 130
+            db.drop_all()